@@ -2,10 +2,12 @@
 PowerShell Script Manager - Flask Application
 """
 from flask import Flask, jsonify
+import click
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_socketio import SocketIO
-from flask_migrate import Migrate
+from flask_migrate import Migrate, stamp as stamp_schema, upgrade as upgrade_schema
+from sqlalchemy import inspect
 from dotenv import load_dotenv
 import os
 import sys
@@ -17,7 +19,20 @@ load_dotenv()
 from models import db, User
 from routes.auth import auth_bp
 from routes.scripts import scripts_bp
-from routes.execution import execution_bp
+from routes.execution import execution_bp, register_socketio_handlers
+from services.execution_scheduler import scheduler, get_execution_queue
+from services.execution_queue import database_queue
+from services.execution_runner import run_execution
+from services.security_rules import reload_rule_set
+from services.script_verdicts import start_verdict_refresh
+from services.module_preload import preload_module_sets
+from services.script_search import ensure_index as ensure_search_index, rebuild_index as rebuild_search_index
+from services.script_tags import link_untagged_scripts
+from services.output_stream import streamer
+from services.output_codec import codec
+from services.result_cache import result_cache
+from services.facet_cache import facet_cache
+from services.output_store import recompress_output
 
 # Create Flask app
 app = Flask(__name__)
@@ -32,18 +47,60 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv(
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SQLALCHEMY_ECHO'] = os.getenv('FLASK_ENV') == 'development'
 
+# Execution scheduler limits
+app.config['EXECUTION_MAX_CONCURRENCY'] = int(os.getenv('EXECUTION_MAX_CONCURRENCY', 4))
+app.config['EXECUTION_MAX_PER_USER'] = int(os.getenv('EXECUTION_MAX_PER_USER', 2))
+app.config['EXECUTION_MAX_QUEUE'] = int(os.getenv('EXECUTION_MAX_QUEUE', 100))
+app.config['EXECUTION_RETRY_AFTER'] = int(os.getenv('EXECUTION_RETRY_AFTER', 5))
+app.config['EXECUTION_MAX_BATCH_SIZE'] = int(os.getenv('EXECUTION_MAX_BATCH_SIZE', 1000))
+# Shortest-expected-job-first: EWMA weight of the newest run, estimate for scripts without
+# history, and seconds of estimate a job gains per second waited
+app.config['EXECUTION_ESTIMATE_ALPHA'] = float(os.getenv('EXECUTION_ESTIMATE_ALPHA', 0.3))
+app.config['EXECUTION_DEFAULT_ESTIMATE'] = float(os.getenv('EXECUTION_DEFAULT_ESTIMATE', 60))
+app.config['EXECUTION_AGING_RATE'] = float(os.getenv('EXECUTION_AGING_RATE', 1.0))
+# Execution agents (python -m worker) run scripts; the API only enqueues
+app.config['EXECUTION_AGENTS'] = os.getenv('EXECUTION_AGENTS', 'false').lower() == 'true'
+app.config['EXECUTION_HEARTBEAT_INTERVAL'] = float(os.getenv('EXECUTION_HEARTBEAT_INTERVAL', 10))
+app.config['EXECUTION_HEARTBEAT_TIMEOUT'] = float(os.getenv('EXECUTION_HEARTBEAT_TIMEOUT', 60))
+app.config['SOCKETIO_MESSAGE_QUEUE'] = os.getenv('SOCKETIO_MESSAGE_QUEUE') or None
+app.config['RESULT_CACHE_SIZE'] = int(os.getenv('RESULT_CACHE_SIZE', 1024))
+app.config['FACET_CACHE_SIZE'] = int(os.getenv('FACET_CACHE_SIZE', 1024))
+app.config['FACET_CACHE_CHECK_INTERVAL'] = float(os.getenv('FACET_CACHE_CHECK_INTERVAL', 1.0))
+app.config['OUTPUT_BATCH_INTERVAL'] = float(os.getenv('OUTPUT_BATCH_INTERVAL_MS', 50)) / 1000
+app.config['OUTPUT_TAIL_LINES'] = int(os.getenv('OUTPUT_TAIL_LINES', 5000))
+app.config['OUTPUT_TAIL_BYTES'] = int(os.getenv('OUTPUT_TAIL_BYTES', 4 * 1024 * 1024))
+app.config['OUTPUT_FLUSH_BYTES'] = int(os.getenv('OUTPUT_FLUSH_BYTES', 65536))
+app.config['OUTPUT_FLUSH_INTERVAL'] = float(os.getenv('OUTPUT_FLUSH_INTERVAL_MS', 1000)) / 1000
+app.config['OUTPUT_COMPRESSION'] = os.getenv('OUTPUT_COMPRESSION', 'zstd')
+app.config['OUTPUT_COMPRESSION_MIN_BYTES'] = int(os.getenv('OUTPUT_COMPRESSION_MIN_BYTES', 256))
+
 # Initialize extensions
 db.init_app(app)
-migrate = Migrate(app, db)
+# SQLite alters tables by copying them (batch mode)
+migrate = Migrate(app, db, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'),
+                  render_as_batch=True)
+
+# Schema of databases created with db.create_all() before migrations existed
+SCHEMA_BASELINE_REVISION = 'e6fdd5e5ab25'
 jwt = JWTManager(app)
-socketio = SocketIO(app, cors_allowed_origins='*')
+socketio = SocketIO(app, cors_allowed_origins='*', message_queue=app.config['SOCKETIO_MESSAGE_QUEUE'])
+if app.config['EXECUTION_AGENTS']:
+    database_queue.init_app(app)
+else:
+    scheduler.init_app(app, runner=run_execution)
+streamer.init_app(app, socketio)
+codec.init_app(app)
+result_cache.init_app(app)
+facet_cache.init_app(app)
+register_socketio_handlers(socketio)
 
 # Enable CORS
 CORS(app, resources={
     r"/api/*": {
         "origins": ["http://localhost:5173", "http://localhost:3000"],
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
+        "allow_headers": ["Content-Type", "Authorization"],
+        "expose_headers": ["X-Next-Cursor", "X-Total-Count", "X-Total-Count-Estimated"]
     }
 })
 
@@ -152,6 +209,10 @@ def validate_config():
     elif not (db_url.startswith('postgresql://') or db_url.startswith('sqlite://')):
         errors.append(f"Invalid DATABASE_URL format: {db_url.split('://')[0] if '://' in db_url else 'unknown'}")
 
+    # Check scheduling settings: queue order divides estimates by the aging rate
+    if app.config['EXECUTION_AGING_RATE'] <= 0:
+        errors.append("EXECUTION_AGING_RATE must be greater than 0")
+
     # Print warnings
     if warnings:
         print("\n⚠️  Configuration Warnings:")
@@ -171,12 +232,45 @@ def validate_config():
         print("✅ Configuration validation passed")
 
 
+@app.cli.command('recompress-output')
+@click.option('--batch-size', default=500, show_default=True, help='Rows rewritten per transaction.')
+def recompress_output_command(batch_size):
+    """Compress execution output stored before compression (or another codec) was enabled."""
+    stats = recompress_output(batch_size=batch_size)
+    print(f"Recompressed {stats['rows']} rows: "
+          f"{stats['bytes_before']} -> {stats['bytes_after']} stored characters")
+
+
+@app.cli.command('reindex-scripts')
+def reindex_scripts_command():
+    """Rebuild the full-text search index of all scripts."""
+    print(f"Indexed {rebuild_search_index()} scripts for search")
+
+
 # Database initialization
+def migrate_db():
+    """
+    Bring the database schema up to date.
+
+    A new database is created from the models and stamped with the latest
+    migration; one created before migrations existed is stamped with the
+    baseline revision, then upgraded like any other.
+    """
+    tables = inspect(db.engine).get_table_names()
+    if 'alembic_version' not in tables:
+        if 'users' not in tables:
+            db.create_all()
+            stamp_schema()
+            return
+        stamp_schema(revision=SCHEMA_BASELINE_REVISION)
+    upgrade_schema()
+
+
 def init_db():
     """Initialize database and create tables."""
     with app.app_context():
-        db.create_all()
-        print("Database tables created successfully")
+        migrate_db()
+        print("Database schema up to date")
 
         # Create default admin user if none exists
         if User.query.count() == 0:
@@ -191,6 +285,22 @@ def init_db():
             print("Default admin user created (username: admin, password: admin)")
             print("IMPORTANT: Change the admin password immediately!")
 
+        # Index scripts saved before full-text search was set up, and link
+        # their tags into script_tags
+        ensure_search_index()
+        link_untagged_scripts()
+
+        # Compile the script validation rules (built-ins, SECURITY_RULES_FILE, DB)
+        # and validate, in the background, script bodies the rule set has not seen
+        reload_rule_set()
+        start_verdict_refresh(app)
+
+        # Start warm workers for the module sets scripts declare (pooling only)
+        preload_module_sets()
+
+        # Resume executions that were queued before the last shutdown
+        get_execution_queue().recover()
+
 
 if __name__ == '__main__':
     # Validate configuration first
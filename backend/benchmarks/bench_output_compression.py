@@ -0,0 +1,75 @@
+"""
+Micro-benchmark: stored size and codec cost of execution output.
+
+Usage:
+    cd backend
+    python -m benchmarks.bench_output_compression [--lines 20000] [--chunk-kib 64]
+
+Output is stored in chunks of roughly OUTPUT_FLUSH_BYTES, each compressed on
+its own and base64 encoded, so the ratio is measured per chunk rather than on
+the whole log.
+"""
+import argparse
+import random
+import time
+
+from services.output_codec import OutputCodec, zstandard
+
+LEVELS = ['VERBOSE', 'INFO', 'INFO', 'INFO', 'WARNING']
+ACTIONS = ['Copied', 'Skipped', 'Checked', 'Updated']
+
+
+def synthetic_log(lines):
+    rng = random.Random(7)
+    out = []
+    for i in range(lines):
+        out.append(
+            f'2024-05-{1 + i % 28:02d}T10:{i % 60:02d}:{rng.randint(0, 59):02d} '
+            f'[{rng.choice(LEVELS)}] {rng.choice(ACTIONS)} \\\\fileserver\\share\\dept{i % 12}\\'
+            f'report_{rng.randint(0, 500)}.xlsx ({rng.randint(1, 9999)} KB)'
+        )
+    return out
+
+
+def chunked(lines, chunk_bytes):
+    chunk, size = [], 0
+    for line in lines:
+        chunk.append(line + '\n')
+        size += len(line) + 1
+        if size >= chunk_bytes:
+            yield ''.join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--lines', type=int, default=20000)
+    parser.add_argument('--chunk-kib', type=int, default=64)
+    args = parser.parse_args()
+
+    chunks = list(chunked(synthetic_log(args.lines), args.chunk_kib * 1024))
+    raw = sum(len(chunk.encode('utf-8')) for chunk in chunks)
+    print(f'output: {args.lines} lines, {raw / 1024:.0f} KiB in {len(chunks)} chunks\n')
+    print(f'{"method":>7} {"stored KiB":>11} {"ratio":>7} {"encode ms":>10} {"decode ms":>10}')
+
+    methods = ['zlib'] + (['zstd'] if zstandard is not None else [])
+    for method in methods:
+        codec = OutputCodec(method)
+        start = time.perf_counter()
+        stored = [codec.encode(chunk) for chunk in chunks]
+        encode_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        decoded = [codec.decode(value) for value in stored]
+        decode_ms = (time.perf_counter() - start) * 1000
+        assert decoded == chunks
+        size = sum(len(value) for value in stored)
+        print(f'{method:>7} {size / 1024:>11.0f} {raw / size:>6.1f}x {encode_ms:>10.1f} {decode_ms:>10.1f}')
+
+    if zstandard is None:
+        print('\n(zstandard is not installed; zstd falls back to zlib)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Micro-benchmark: throughput of reading child process output.
+
+Usage:
+    cd backend
+    python -m benchmarks.bench_output_reader [--mb 1024] [--line-bytes 120]
+
+A stub child (python, standing in for pwsh) writes --mb MiB of log lines as
+fast as it can. Each reader counts lines through a callback, the way the
+runner forwards them to the output store and the live stream:
+
+    readline  text-mode pipe, one readline() and one callback per line
+              (the executor's previous reader)
+    chunked   LineBatchReader: raw 256 KiB reads into a reused buffer, one
+              decode and one callback per chunk
+"""
+import argparse
+import subprocess
+import sys
+import threading
+import time
+
+from services.output_reader import CHUNK_SIZE, LineBatchReader
+
+STUB = '''
+import sys
+total, line_bytes = int(sys.argv[1]), int(sys.argv[2])
+line = (b'[INFO] Processed \\\\\\\\fileserver\\\\share\\\\report.xlsx ' * 8)[:line_bytes - 1] + b'\\n'
+block = line * max(1, (1 << 20) // len(line))
+out = sys.stdout.buffer
+written = 0
+while written < total:
+    out.write(block)
+    written += len(block)
+out.flush()
+'''
+
+
+def spawn(total_bytes, line_bytes, text):
+    return subprocess.Popen(
+        [sys.executable, '-c', STUB, str(total_bytes), str(line_bytes)],
+        stdout=subprocess.PIPE,
+        text=text,
+        bufsize=1 if text else 0
+    )
+
+
+def read_readline(total_bytes, line_bytes):
+    count = 0
+
+    def on_line(line):
+        nonlocal count
+        count += 1
+
+    process = spawn(total_bytes, line_bytes, text=True)
+    for line in iter(process.stdout.readline, ''):
+        on_line(line.rstrip())
+    process.stdout.close()
+    process.wait()
+    return count
+
+
+def read_chunked(total_bytes, line_bytes):
+    count = 0
+
+    def on_batch(lines):
+        nonlocal count
+        count += len(lines)
+
+    process = spawn(total_bytes, line_bytes, text=False)
+    reader = threading.Thread(target=LineBatchReader(process.stdout, on_batch).run)
+    reader.start()
+    reader.join()
+    process.wait()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--mb', type=int, default=1024)
+    parser.add_argument('--line-bytes', type=int, default=120)
+    args = parser.parse_args()
+
+    total = args.mb * 1024 * 1024
+    print(f'stub output: {args.mb} MiB in {args.line_bytes}-byte lines, '
+          f'chunk size {CHUNK_SIZE // 1024} KiB\n')
+    print(f'{"reader":>9} {"seconds":>8} {"MiB/s":>8} {"Mlines/s":>9}')
+
+    results = {}
+    for name, reader in [('readline', read_readline), ('chunked', read_chunked)]:
+        start = time.perf_counter()
+        lines = reader(total, args.line_bytes)
+        elapsed = time.perf_counter() - start
+        results[name] = (lines, elapsed)
+        print(f'{name:>9} {elapsed:>8.2f} {args.mb / elapsed:>8.0f} {lines / elapsed / 1e6:>9.2f}')
+
+    assert results['readline'][0] == results['chunked'][0]
+    print(f'\nchunked speedup: {results["readline"][1] / results["chunked"][1]:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Micro-benchmark: compiled rule engine vs. the legacy per-rule re.search loop.
+
+Usage:
+    cd backend
+    python -m benchmarks.bench_security_rules [--lines 2000] [--repeat 5]
+
+The legacy loop makes one pass over the script per rule, so its cost grows
+linearly with the rule count. The compiled engine scans once; cmdlet rules
+are dictionary lookups, so its time should stay flat as cmdlets are added.
+"""
+import argparse
+import random
+import re
+import time
+
+from services.security_rules import CompiledRuleSet, SecurityRuleDefinition, default_rules
+
+VERBS = ['Get', 'Set', 'New', 'Remove', 'Invoke', 'Start', 'Stop', 'Clear', 'Export', 'Import']
+
+
+def synthetic_rules(cmdlets, patterns):
+    rules = default_rules()
+    for i in range(cmdlets):
+        rules.append(SecurityRuleDefinition('cmdlet', f'{VERBS[i % len(VERBS)]}-Thing{i}'))
+    for i in range(patterns):
+        rules.append(SecurityRuleDefinition('pattern', rf'danger{i}\s*\('))
+    return rules
+
+
+def synthetic_script(lines):
+    rng = random.Random(42)
+    out = []
+    for i in range(lines):
+        verb = rng.choice(VERBS)
+        out.append(f'$v{i} = {verb}-Item{rng.randint(0, 999)} -Path "C:\\data\\{i}" | Where-Object {{ $_.Size -gt {i} }}')
+    return '\n'.join(out)
+
+
+def legacy_validate(rules, text):
+    issues = []
+    for rule in rules:
+        if rule.rule_type == 'cmdlet':
+            pattern = rf'\b{re.escape(rule.value)}\b'
+        else:
+            pattern = rule.value
+        if re.search(pattern, text, re.IGNORECASE):
+            issues.append(rule.message)
+    return issues
+
+
+def best_of(repeat, fn):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--lines', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    text = synthetic_script(args.lines)
+    print(f'script: {args.lines} lines, {len(text) / 1024:.0f} KiB\n')
+    print(f'{"cmdlets":>8} {"patterns":>9} {"rules":>6} {"legacy ms":>10} {"compiled ms":>12} {"speedup":>8}')
+
+    for cmdlets, patterns in [(0, 0), (100, 0), (250, 0), (500, 0), (0, 25), (0, 100), (500, 100)]:
+        rules = synthetic_rules(cmdlets, patterns)
+        compiled = CompiledRuleSet(rules)
+        legacy = best_of(args.repeat, lambda: legacy_validate(rules, text))
+        fast = best_of(args.repeat, lambda: compiled.validate(text))
+        print(f'{cmdlets:>8} {patterns:>9} {len(rules):>6} {legacy * 1000:>10.2f} '
+              f'{fast * 1000:>12.2f} {legacy / fast:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""Add security_rules
+
+Revision ID: 0a17ac752428
+Revises: 7eb1af7c65cd
+Create Date: 2026-10-16 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a17ac752428'
+down_revision = '7eb1af7c65cd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('security_rules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('rule_type', sa.String(length=20), nullable=False),
+    sa.Column('value', sa.String(length=500), nullable=False),
+    sa.Column('message', sa.String(length=500), nullable=True),
+    sa.Column('enabled', sa.Boolean(), nullable=True),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('security_rules')
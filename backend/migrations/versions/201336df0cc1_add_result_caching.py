@@ -0,0 +1,34 @@
+"""Add result caching
+
+Revision ID: 201336df0cc1
+Revises: b7b2fc0d945c
+Create Date: 2026-10-16 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '201336df0cc1'
+down_revision = 'b7b2fc0d945c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cached_from_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_executions_cached_from_id', 'executions', ['cached_from_id'], ['id'], ondelete='SET NULL')
+
+    with op.batch_alter_table('scripts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cache_ttl_seconds', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('scripts', schema=None) as batch_op:
+        batch_op.drop_column('cache_ttl_seconds')
+
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_executions_cached_from_id', type_='foreignkey')
+        batch_op.drop_column('cached_from_id')
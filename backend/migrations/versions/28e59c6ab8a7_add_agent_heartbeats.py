@@ -0,0 +1,40 @@
+"""Add execution agent claims and heartbeats
+
+Revision ID: 28e59c6ab8a7
+Revises: 620a85a7a107
+Create Date: 2026-10-16 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '28e59c6ab8a7'
+down_revision = '620a85a7a107'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('worker_id', sa.String(length=120), nullable=True))
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('cancel_requested', sa.Boolean(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_executions_worker_id'), ['worker_id'], unique=False)
+
+    op.create_table('agent_heartbeats',
+    sa.Column('worker_id', sa.String(length=120), nullable=False),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('worker_id')
+    )
+
+
+def downgrade():
+    op.drop_table('agent_heartbeats')
+
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_executions_worker_id'))
+        batch_op.drop_column('cancel_requested')
+        batch_op.drop_column('heartbeat_at')
+        batch_op.drop_column('worker_id')
@@ -0,0 +1,47 @@
+"""Add tag tables
+
+Revision ID: 2e6108939741
+Revises: 603727c9cae7
+Create Date: 2026-10-16 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2e6108939741'
+down_revision = '603727c9cae7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tags',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('tags', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tags_name'), ['name'], unique=True)
+
+    op.create_table('script_tags',
+    sa.Column('script_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['script_id'], ['scripts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('script_id', 'tag_id')
+    )
+    with op.batch_alter_table('script_tags', schema=None) as batch_op:
+        batch_op.create_index('ix_script_tags_tag_id_script_id', ['tag_id', 'script_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('script_tags', schema=None) as batch_op:
+        batch_op.drop_index('ix_script_tags_tag_id_script_id')
+
+    op.drop_table('script_tags')
+    with op.batch_alter_table('tags', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tags_name'))
+
+    op.drop_table('tags')
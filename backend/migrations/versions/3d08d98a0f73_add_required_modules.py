@@ -0,0 +1,32 @@
+"""Add required modules
+
+Revision ID: 3d08d98a0f73
+Revises: 69e48248c617
+Create Date: 2026-10-16 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d08d98a0f73'
+down_revision = '69e48248c617'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('module_import_seconds', sa.Float(), nullable=True))
+
+    with op.batch_alter_table('scripts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('required_modules', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('scripts', schema=None) as batch_op:
+        batch_op.drop_column('required_modules')
+
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.drop_column('module_import_seconds')
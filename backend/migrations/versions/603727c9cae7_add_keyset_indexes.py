@@ -0,0 +1,36 @@
+"""Add keyset pagination indexes
+
+Revision ID: 603727c9cae7
+Revises: 3d08d98a0f73
+Create Date: 2026-10-16 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '603727c9cae7'
+down_revision = '3d08d98a0f73'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.create_index('ix_executions_script_started_at_id', ['script_id', 'started_at', 'id'], unique=False)
+        batch_op.create_index('ix_executions_started_at_id', ['started_at', 'id'], unique=False)
+        batch_op.create_index('ix_executions_user_started_at_id', ['user_id', 'started_at', 'id'], unique=False)
+
+    with op.batch_alter_table('scripts', schema=None) as batch_op:
+        batch_op.create_index('ix_scripts_updated_at_id', ['updated_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('scripts', schema=None) as batch_op:
+        batch_op.drop_index('ix_scripts_updated_at_id')
+
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.drop_index('ix_executions_user_started_at_id')
+        batch_op.drop_index('ix_executions_started_at_id')
+        batch_op.drop_index('ix_executions_script_started_at_id')
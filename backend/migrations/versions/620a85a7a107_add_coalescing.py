@@ -0,0 +1,34 @@
+"""Add execution coalescing
+
+Revision ID: 620a85a7a107
+Revises: 201336df0cc1
+Create Date: 2026-10-16 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '620a85a7a107'
+down_revision = '201336df0cc1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('coalesced_with_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_executions_coalesced_with_id', 'executions', ['coalesced_with_id'], ['id'], ondelete='SET NULL')
+
+    with op.batch_alter_table('scripts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('coalesce', sa.Boolean(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('scripts', schema=None) as batch_op:
+        batch_op.drop_column('coalesce')
+
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_executions_coalesced_with_id', type_='foreignkey')
+        batch_op.drop_column('coalesced_with_id')
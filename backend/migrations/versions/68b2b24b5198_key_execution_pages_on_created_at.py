@@ -0,0 +1,43 @@
+"""Key execution pages on created_at
+
+Revision ID: 68b2b24b5198
+Revises: e46785092aee
+Create Date: 2026-10-16 22:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '68b2b24b5198'
+down_revision = 'e46785092aee'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+
+    op.execute('UPDATE executions SET created_at = coalesce(queued_at, started_at, CURRENT_TIMESTAMP)')
+
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+        batch_op.drop_index('ix_executions_user_started_at_id')
+        batch_op.drop_index('ix_executions_started_at_id')
+        batch_op.drop_index('ix_executions_script_started_at_id')
+        batch_op.create_index('ix_executions_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_executions_script_created_at_id', ['script_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_executions_user_created_at_id', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.drop_index('ix_executions_user_created_at_id')
+        batch_op.drop_index('ix_executions_script_created_at_id')
+        batch_op.drop_index('ix_executions_created_at_id')
+        batch_op.create_index('ix_executions_script_started_at_id', ['script_id', 'started_at', 'id'], unique=False)
+        batch_op.create_index('ix_executions_started_at_id', ['started_at', 'id'], unique=False)
+        batch_op.create_index('ix_executions_user_started_at_id', ['user_id', 'started_at', 'id'], unique=False)
+        batch_op.drop_column('created_at')
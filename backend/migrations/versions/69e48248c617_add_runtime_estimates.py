@@ -0,0 +1,36 @@
+"""Add runtime estimates
+
+Revision ID: 69e48248c617
+Revises: 28e59c6ab8a7
+Create Date: 2026-10-16 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '69e48248c617'
+down_revision = '28e59c6ab8a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('estimated_duration_seconds', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('priority_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_executions_status_priority', ['status', 'priority_at'], unique=False)
+
+    with op.batch_alter_table('scripts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('estimated_duration_seconds', sa.Float(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('scripts', schema=None) as batch_op:
+        batch_op.drop_column('estimated_duration_seconds')
+
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.drop_index('ix_executions_status_priority')
+        batch_op.drop_column('priority_at')
+        batch_op.drop_column('estimated_duration_seconds')
@@ -0,0 +1,41 @@
+"""Add validation verdicts and script content hashes
+
+Revision ID: 7529c3543d18
+Revises: 0a17ac752428
+Create Date: 2026-10-16 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7529c3543d18'
+down_revision = '0a17ac752428'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('validation_verdicts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('rule_set_version', sa.String(length=16), nullable=False),
+    sa.Column('is_valid', sa.Boolean(), nullable=False),
+    sa.Column('issues', sa.JSON(), nullable=True),
+    sa.Column('hits', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash', 'rule_set_version', name='uq_verdict_hash_version')
+    )
+    with op.batch_alter_table('scripts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_scripts_content_hash'), ['content_hash'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('scripts', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_scripts_content_hash'))
+        batch_op.drop_column('content_hash')
+
+    op.drop_table('validation_verdicts')
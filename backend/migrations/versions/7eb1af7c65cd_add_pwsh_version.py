@@ -0,0 +1,26 @@
+"""Add pwsh_version to scripts
+
+Revision ID: 7eb1af7c65cd
+Revises: f53e92f63202
+Create Date: 2026-10-16 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7eb1af7c65cd'
+down_revision = 'f53e92f63202'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('scripts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('pwsh_version', sa.String(length=20), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('scripts', schema=None) as batch_op:
+        batch_op.drop_column('pwsh_version')
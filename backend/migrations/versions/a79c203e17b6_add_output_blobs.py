@@ -0,0 +1,59 @@
+"""Add deduplicated output blobs
+
+Revision ID: a79c203e17b6
+Revises: c0dc591a25c1
+Create Date: 2026-10-16 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a79c203e17b6'
+down_revision = 'c0dc591a25c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('output_blobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('length', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash')
+    )
+    with op.batch_alter_table('execution_output_chunks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('blob_id', sa.Integer(), nullable=True))
+        batch_op.alter_column('execution_id',
+               existing_type=sa.INTEGER(),
+               nullable=True)
+        batch_op.create_index('ix_output_chunks_blob_pos', ['blob_id', 'start_pos'], unique=False)
+        batch_op.create_foreign_key('fk_execution_output_chunks_blob_id', 'output_blobs', ['blob_id'], ['id'])
+
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('stdout_blob_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('stderr_blob_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_executions_stdout_blob_id', 'output_blobs', ['stdout_blob_id'], ['id'])
+        batch_op.create_foreign_key('fk_executions_stderr_blob_id', 'output_blobs', ['stderr_blob_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_executions_stderr_blob_id', type_='foreignkey')
+        batch_op.drop_constraint('fk_executions_stdout_blob_id', type_='foreignkey')
+        batch_op.drop_column('stderr_blob_id')
+        batch_op.drop_column('stdout_blob_id')
+
+    with op.batch_alter_table('execution_output_chunks', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_execution_output_chunks_blob_id', type_='foreignkey')
+        batch_op.drop_index('ix_output_chunks_blob_pos')
+        batch_op.alter_column('execution_id',
+               existing_type=sa.INTEGER(),
+               nullable=False)
+        batch_op.drop_column('blob_id')
+
+    op.drop_table('output_blobs')
@@ -0,0 +1,52 @@
+"""Add execution batches
+
+Revision ID: b7b2fc0d945c
+Revises: df7e0374db3a
+Create Date: 2026-10-16 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7b2fc0d945c'
+down_revision = 'df7e0374db3a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('execution_batches',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('script_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('parallelism', sa.Integer(), nullable=False),
+    sa.Column('timeout_seconds', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['script_id'], ['scripts.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('execution_batches', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_execution_batches_script_id'), ['script_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_execution_batches_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('batch_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_executions_batch_id'), ['batch_id'], unique=False)
+        batch_op.create_foreign_key('fk_executions_batch_id', 'execution_batches', ['batch_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_executions_batch_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_executions_batch_id'))
+        batch_op.drop_column('batch_id')
+
+    with op.batch_alter_table('execution_batches', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_execution_batches_user_id'))
+        batch_op.drop_index(batch_op.f('ix_execution_batches_script_id'))
+
+    op.drop_table('execution_batches')
@@ -0,0 +1,39 @@
+"""Add execution output chunks
+
+Revision ID: c0dc591a25c1
+Revises: 7529c3543d18
+Create Date: 2026-10-16 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c0dc591a25c1'
+down_revision = '7529c3543d18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('execution_output_chunks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('execution_id', sa.Integer(), nullable=False),
+    sa.Column('stream', sa.String(length=6), nullable=False),
+    sa.Column('start_pos', sa.BigInteger(), nullable=False),
+    sa.Column('length', sa.Integer(), nullable=False),
+    sa.Column('data', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['execution_id'], ['executions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('execution_output_chunks', schema=None) as batch_op:
+        batch_op.create_index('ix_output_chunks_execution_stream_pos', ['execution_id', 'stream', 'start_pos'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('execution_output_chunks', schema=None) as batch_op:
+        batch_op.drop_index('ix_output_chunks_execution_stream_pos')
+
+    op.drop_table('execution_output_chunks')
@@ -0,0 +1,40 @@
+"""Add resource limits and usage
+
+Revision ID: df7e0374db3a
+Revises: a79c203e17b6
+Create Date: 2026-10-16 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'df7e0374db3a'
+down_revision = 'a79c203e17b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cpu_user_seconds', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('cpu_system_seconds', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('max_rss_kb', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('io_read_blocks', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('io_write_blocks', sa.Integer(), nullable=True))
+
+    with op.batch_alter_table('scripts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('resource_limits', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('scripts', schema=None) as batch_op:
+        batch_op.drop_column('resource_limits')
+
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.drop_column('io_write_blocks')
+        batch_op.drop_column('io_read_blocks')
+        batch_op.drop_column('max_rss_kb')
+        batch_op.drop_column('cpu_system_seconds')
+        batch_op.drop_column('cpu_user_seconds')
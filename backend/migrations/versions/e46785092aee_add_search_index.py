@@ -0,0 +1,43 @@
+"""Add search index
+
+Revision ID: e46785092aee
+Revises: e52e27238e6a
+Create Date: 2026-10-16 22:00:00.000000
+
+The index lives outside the models (see services.script_search), so env.py
+keeps it out of autogenerate. Existing scripts are indexed at startup by
+ensure_index.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e46785092aee'
+down_revision = 'e52e27238e6a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute('CREATE VIRTUAL TABLE IF NOT EXISTS scripts_fts USING fts5(name, description, tags, content)')
+    elif dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('ALTER TABLE scripts ADD COLUMN IF NOT EXISTS search_vector tsvector')
+        op.execute('CREATE INDEX IF NOT EXISTS ix_scripts_search_vector ON scripts USING gin (search_vector)')
+        op.execute('CREATE INDEX IF NOT EXISTS ix_scripts_name_trgm ON scripts USING gin (name gin_trgm_ops)')
+        op.execute('CREATE INDEX IF NOT EXISTS ix_scripts_content_trgm ON scripts USING gin (content gin_trgm_ops)')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS scripts_fts')
+    elif dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_scripts_content_trgm')
+        op.execute('DROP INDEX IF EXISTS ix_scripts_name_trgm')
+        op.execute('DROP INDEX IF EXISTS ix_scripts_search_vector')
+        op.execute('ALTER TABLE scripts DROP COLUMN IF EXISTS search_vector')
@@ -0,0 +1,30 @@
+"""Queue executions in the database
+
+Revision ID: f53e92f63202
+Revises: e6fdd5e5ab25
+Create Date: 2026-10-16 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f53e92f63202'
+down_revision = 'e6fdd5e5ab25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('timeout_seconds', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('queued_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_executions_status'), ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('executions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_executions_status'))
+        batch_op.drop_column('queued_at')
+        batch_op.drop_column('timeout_seconds')
@@ -4,6 +4,7 @@ Database models for PowerShell Script Manager.
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import bcrypt
+from services.output_codec import codec
 
 db = SQLAlchemy()
 
@@ -52,9 +53,16 @@ class Script(db.Model):
     name = db.Column(db.String(200), nullable=False, index=True)
     description = db.Column(db.Text)
     content = db.Column(db.Text, nullable=False)
+    content_hash = db.Column(db.String(64), index=True)  # sha256 of content, keys validation verdicts
     category = db.Column(db.String(50), index=True)  # VMware, Azure, AD, Utilities, etc.
-    tags = db.Column(db.String(500))  # Comma-separated tags
+    tags = db.Column(db.String(500))  # Comma-separated tags, mirrored into script_tags (see script_tags)
     parameters = db.Column(db.JSON)  # JSON array of parameter definitions
+    pwsh_version = db.Column(db.String(20))  # Version selector ('7', '7.4'), None = default interpreter
+    resource_limits = db.Column(db.JSON)  # memory_mb, cpu_seconds, open_files, max_output_bytes
+    cache_ttl_seconds = db.Column(db.Integer)  # Idempotent script: reuse results this long (None = never)
+    coalesce = db.Column(db.Boolean, default=False)  # Identical in-flight requests share one run
+    estimated_duration_seconds = db.Column(db.Float)  # EWMA of completed run durations (see duration_estimates)
+    required_modules = db.Column(db.JSON)  # Module names preloaded by warm workers (see module_preload)
     author_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -64,6 +72,20 @@ class Script(db.Model):
     # Relationships
     executions = db.relationship('Execution', backref='script', lazy=True, cascade='all, delete-orphan')
     versions = db.relationship('ScriptVersion', backref='script', lazy=True, cascade='all, delete-orphan')
+    tag_objects = db.relationship('Tag', secondary='script_tags', lazy=True)
+
+    __table_args__ = (
+        # Keyset pagination of the script list (see pagination)
+        db.Index('ix_scripts_updated_at_id', 'updated_at', 'id'),
+    )
+
+    @classmethod
+    def list_options(cls):
+        """Loader options for list views: the author's name joined in, content left unloaded."""
+        return (
+            db.defer(cls.content),
+            db.joinedload(cls.author).load_only(User.username)
+        )
 
     def to_dict(self, include_content=True):
         """Convert script to dictionary."""
@@ -74,6 +96,12 @@ class Script(db.Model):
             'category': self.category,
             'tags': self.tags.split(',') if self.tags else [],
             'parameters': self.parameters or [],
+            'pwsh_version': self.pwsh_version,
+            'resource_limits': self.resource_limits or {},
+            'cache_ttl_seconds': self.cache_ttl_seconds,
+            'coalesce': bool(self.coalesce),
+            'estimated_duration_seconds': self.estimated_duration_seconds,
+            'required_modules': self.required_modules or [],
             'author_id': self.author_id,
             'author_username': self.author.username if self.author else None,
             'created_at': self.created_at.isoformat(),
@@ -86,6 +114,23 @@ class Script(db.Model):
         return data
 
 
+script_tags = db.Table(
+    'script_tags',
+    db.Column('script_id', db.Integer, db.ForeignKey('scripts.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True),
+    # Scripts carrying a tag; the primary key serves a script's tags
+    db.Index('ix_script_tags_tag_id_script_id', 'tag_id', 'script_id')
+)
+
+
+class Tag(db.Model):
+    """Script tag, linked to scripts through script_tags."""
+    __tablename__ = 'tags'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False, index=True)
+
+
 class ScriptVersion(db.Model):
     """Script version history."""
     __tablename__ = 'script_versions'
@@ -117,14 +162,98 @@ class Execution(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     script_id = db.Column(db.Integer, db.ForeignKey('scripts.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    batch_id = db.Column(db.Integer, db.ForeignKey('execution_batches.id'), index=True)  # Fan-out parent, if any
+    cached_from_id = db.Column(db.Integer, db.ForeignKey('executions.id', ondelete='SET NULL'))  # Memoized result source
+    coalesced_with_id = db.Column(db.Integer, db.ForeignKey('executions.id', ondelete='SET NULL'))  # Leader this run mirrors
     parameters = db.Column(db.JSON)  # Parameters passed to script
-    status = db.Column(db.String(20), default='pending')  # pending, running, completed, failed
-    output = db.Column(db.Text)  # Script output
-    error_output = db.Column(db.Text)  # Error messages
+    status = db.Column(db.String(20), default='pending', index=True)  # pending, queued, running, completed, failed, cancelled
+    # Output of executions run before output chunks; stored through output_codec
+    _output = db.deferred(db.Column('output', db.Text))
+    _error_output = db.deferred(db.Column('error_output', db.Text))
     exit_code = db.Column(db.Integer)
+    timeout_seconds = db.Column(db.Integer, default=300)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Never changes; history order
+    queued_at = db.Column(db.DateTime)
+    # Script estimate when queued, and the queue order key derived from it (see duration_estimates)
+    estimated_duration_seconds = db.Column(db.Float)
+    priority_at = db.Column(db.DateTime)
     started_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime)
     duration_seconds = db.Column(db.Float)
+    module_import_seconds = db.Column(db.Float)  # Part of the run spent importing required modules
+    # Execution agent that claimed the run (see execution_queue), its liveness and cancel flag
+    worker_id = db.Column(db.String(120), index=True)
+    heartbeat_at = db.Column(db.DateTime)
+    cancel_requested = db.Column(db.Boolean, default=False)
+    # Resource usage of the pwsh process tree (rusage at reap time, cold runs only)
+    cpu_user_seconds = db.Column(db.Float)
+    cpu_system_seconds = db.Column(db.Float)
+    max_rss_kb = db.Column(db.Integer)
+    io_read_blocks = db.Column(db.Integer)
+    io_write_blocks = db.Column(db.Integer)
+    # Deduplicated output of finished executions (see OutputBlob)
+    stdout_blob_id = db.Column(db.Integer, db.ForeignKey('output_blobs.id'))
+    stderr_blob_id = db.Column(db.Integer, db.ForeignKey('output_blobs.id'))
+
+    output_chunks = db.relationship('ExecutionOutputChunk', backref='execution', lazy='dynamic',
+                                    cascade='all, delete-orphan')
+
+    __table_args__ = (
+        # Queue order for agents claiming work
+        db.Index('ix_executions_status_priority', 'status', 'priority_at'),
+        # Keyset pagination of execution history: all, per user, per script (see pagination)
+        db.Index('ix_executions_created_at_id', 'created_at', 'id'),
+        db.Index('ix_executions_user_created_at_id', 'user_id', 'created_at', 'id'),
+        db.Index('ix_executions_script_created_at_id', 'script_id', 'created_at', 'id'),
+    )
+
+    @classmethod
+    def list_options(cls):
+        """Loader options for list views: script and user names joined in, nothing else of theirs."""
+        return (
+            db.joinedload(cls.script).load_only(Script.name),
+            db.joinedload(cls.user).load_only(User.username)
+        )
+
+    @property
+    def output(self):
+        """Script output (decompressed on access)."""
+        return codec.decode(self._output)
+
+    @output.setter
+    def output(self, text):
+        self._output = codec.encode(text)
+
+    @property
+    def error_output(self):
+        """Error messages (decompressed on access)."""
+        return codec.decode(self._error_output)
+
+    @error_output.setter
+    def error_output(self, text):
+        self._error_output = codec.encode(text)
+
+    def chunk_query(self, stream):
+        """
+        Query the chunks holding 'stdout' or 'stderr': the shared blob once
+        finished, followed by any lines appended after that, else our own.
+        """
+        blob_id = self.stdout_blob_id if stream == 'stdout' else self.stderr_blob_id
+        if blob_id:
+            query = ExecutionOutputChunk.query.filter(db.or_(
+                ExecutionOutputChunk.blob_id == blob_id,
+                db.and_(ExecutionOutputChunk.execution_id == self.id, ExecutionOutputChunk.stream == stream)
+            ))
+        else:
+            query = self.output_chunks.filter_by(stream=stream)
+        return query.order_by(ExecutionOutputChunk.start_pos)
+
+    def stream_text(self, stream):
+        """Full text of 'stdout' or 'stderr', from output chunks or the legacy columns."""
+        chunks = self.chunk_query(stream)
+        if chunks.first() is None:
+            return self.output if stream == 'stdout' else self.error_output
+        return ''.join(chunk.data for chunk in chunks)
 
     def to_dict(self, include_output=True):
         """Convert execution to dictionary."""
@@ -134,19 +263,135 @@ class Execution(db.Model):
             'script_name': self.script.name if self.script else None,
             'user_id': self.user_id,
             'username': self.user.username if self.user else None,
+            'batch_id': self.batch_id,
+            'cached_from_id': self.cached_from_id,
+            'coalesced_with_id': self.coalesced_with_id,
             'parameters': self.parameters or {},
             'status': self.status,
             'exit_code': self.exit_code,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
             'started_at': self.started_at.isoformat(),
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
-            'duration_seconds': self.duration_seconds
+            'duration_seconds': self.duration_seconds,
+            'module_import_seconds': self.module_import_seconds,
+            'estimated_duration_seconds': self.estimated_duration_seconds,
+            'worker_id': self.worker_id,
+            'resource_usage': {
+                'cpu_user_seconds': self.cpu_user_seconds,
+                'cpu_system_seconds': self.cpu_system_seconds,
+                'max_rss_kb': self.max_rss_kb,
+                'io_read_blocks': self.io_read_blocks,
+                'io_write_blocks': self.io_write_blocks
+            } if self.cpu_user_seconds is not None else None
         }
         if include_output:
-            data['output'] = self.output
-            data['error_output'] = self.error_output
+            data['output'] = self.stream_text('stdout')
+            data['error_output'] = self.stream_text('stderr')
         return data
 
 
+class ExecutionBatch(db.Model):
+    """One script fanned out over many parameter sets; each set runs as a child Execution."""
+    __tablename__ = 'execution_batches'
+
+    id = db.Column(db.Integer, primary_key=True)
+    script_id = db.Column(db.Integer, db.ForeignKey('scripts.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    total = db.Column(db.Integer, nullable=False)  # Number of child executions
+    parallelism = db.Column(db.Integer, nullable=False)  # Children allowed to run at once
+    timeout_seconds = db.Column(db.Integer, default=300)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    script = db.relationship('Script', backref=db.backref('batches', cascade='all, delete-orphan'))
+    user = db.relationship('User')
+    executions = db.relationship('Execution', backref='batch', lazy='dynamic',
+                                 cascade='all, delete-orphan')
+
+    def progress(self):
+        """Count children per status, computed in the database."""
+        counts = dict(
+            db.session.query(Execution.status, db.func.count(Execution.id))
+            .filter(Execution.batch_id == self.id)
+            .group_by(Execution.status)
+        )
+        finished = sum(counts.get(status, 0) for status in ('completed', 'failed', 'cancelled'))
+        return {
+            'total': self.total,
+            'by_status': counts,
+            'finished': finished,
+            'succeeded': counts.get('completed', 0),
+            'complete': finished >= self.total
+        }
+
+    def to_dict(self, include_executions=False):
+        """Convert batch to dictionary with aggregated progress."""
+        data = {
+            'id': self.id,
+            'script_id': self.script_id,
+            'script_name': self.script.name if self.script else None,
+            'user_id': self.user_id,
+            'total': self.total,
+            'parallelism': self.parallelism,
+            'timeout_seconds': self.timeout_seconds,
+            'created_at': self.created_at.isoformat(),
+            'progress': self.progress()
+        }
+        if include_executions:
+            data['executions'] = [
+                {
+                    'id': execution.id,
+                    'parameters': execution.parameters or {},
+                    'status': execution.status,
+                    'exit_code': execution.exit_code,
+                    'duration_seconds': execution.duration_seconds
+                }
+                for execution in self.executions.order_by(Execution.id)
+            ]
+        return data
+
+
+class OutputBlob(db.Model):
+    """Output stream content stored once and shared by every execution that produced it."""
+    __tablename__ = 'output_blobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False, unique=True)  # sha256 of the stream
+    length = db.Column(db.BigInteger, nullable=False)  # utf-8 byte length
+    ref_count = db.Column(db.Integer, nullable=False, default=1)  # execution streams referencing it
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class ExecutionOutputChunk(db.Model):
+    """
+    Append-only slice of an execution's stdout or stderr, written during the
+    run. When the run finishes the chunks are handed over to an OutputBlob
+    (execution_id cleared), or dropped if an identical blob already exists.
+    """
+    __tablename__ = 'execution_output_chunks'
+    __table_args__ = (
+        db.Index('ix_output_chunks_execution_stream_pos', 'execution_id', 'stream', 'start_pos'),
+        db.Index('ix_output_chunks_blob_pos', 'blob_id', 'start_pos'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    execution_id = db.Column(db.Integer, db.ForeignKey('executions.id'))
+    blob_id = db.Column(db.Integer, db.ForeignKey('output_blobs.id'))
+    stream = db.Column(db.String(6), nullable=False)  # stdout, stderr (as written)
+    start_pos = db.Column(db.BigInteger, nullable=False)  # utf-8 byte offset within the stream
+    length = db.Column(db.Integer, nullable=False)  # utf-8 byte length of data
+    _data = db.Column('data', db.Text, nullable=False)  # stored through output_codec
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def data(self):
+        """Whole output lines, each newline-terminated (decompressed on access)."""
+        return codec.decode(self._data)
+
+    @data.setter
+    def data(self, text):
+        self._data = codec.encode(text)
+
+
 class Credential(db.Model):
     """Encrypted credential storage for script execution."""
     __tablename__ = 'credentials'
@@ -175,3 +420,70 @@ class Credential(db.Model):
         if include_password:
             data['encrypted_password'] = self.encrypted_password
         return data
+
+
+class ValidationVerdict(db.Model):
+    """Security validation result for a script body under one rule-set version."""
+    __tablename__ = 'validation_verdicts'
+    __table_args__ = (
+        db.UniqueConstraint('content_hash', 'rule_set_version', name='uq_verdict_hash_version'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False)
+    rule_set_version = db.Column(db.String(16), nullable=False)
+    is_valid = db.Column(db.Boolean, nullable=False)
+    issues = db.Column(db.JSON)  # List of issue messages
+    hits = db.Column(db.JSON)  # List of rule hits with line/column
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert verdict to dictionary."""
+        return {
+            'valid': self.is_valid,
+            'issues': self.issues or [],
+            'hits': self.hits or [],
+            'rule_set_version': self.rule_set_version,
+            'content_hash': self.content_hash,
+            'validated_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class SecurityRule(db.Model):
+    """Additional script validation rule appended to the built-in rule set."""
+    __tablename__ = 'security_rules'
+
+    id = db.Column(db.Integer, primary_key=True)
+    rule_type = db.Column(db.String(20), nullable=False)  # cmdlet, pattern
+    value = db.Column(db.String(500), nullable=False)
+    message = db.Column(db.String(500))
+    enabled = db.Column(db.Boolean, default=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert security rule to dictionary."""
+        return {
+            'id': self.id,
+            'rule_type': self.rule_type,
+            'value': self.value,
+            'message': self.message,
+            'enabled': self.enabled,
+            'created_at': self.created_at.isoformat()
+        }
+
+
+class CacheVersion(db.Model):
+    """Counter bumped whenever data behind a process-local cache changes (see facet_cache)."""
+    __tablename__ = 'cache_versions'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class AgentHeartbeat(db.Model):
+    """Last heartbeat of each execution agent, busy or idle (see execution_queue)."""
+    __tablename__ = 'agent_heartbeats'
+
+    worker_id = db.Column(db.String(120), primary_key=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=False)
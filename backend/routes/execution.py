@@ -1,20 +1,41 @@
 """
 Script execution routes with real-time output via SocketIO.
 """
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from flask_socketio import emit, join_room
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity, decode_token
+from flask_socketio import emit, join_room, leave_room
+from werkzeug.local import LocalProxy
 from datetime import datetime
-from models import db, User, Script, Execution
+from sqlalchemy import insert
+from models import db, User, Script, Execution, ExecutionBatch
 from services.powershell_executor import PowerShellExecutor
+from services.powershell_pool import worker_pool_stats
+from services.process_supervisor import process_supervisor_stats
+from services.interpreter_registry import registry, InterpreterNotFoundError
+from services.execution_scheduler import get_execution_queue, QueueFullError
 from services.security import validate_script_parameters
-import threading
+from services.script_verdicts import get_script_verdict
+from services.output_stream import streamer, room_name
+from services.output_store import (
+    read_range, stream_length, output_storage_stats, append_message, share_output
+)
+from services.facet_cache import facet_cache
+from services.result_cache import result_cache, cache_key
+from services.process_registry import process_registry
+from services.execution_coalescer import coalescer, coalesce_key, mirror_leader
+from services.duration_estimates import schedule_fields, queue_priority
+from services.pagination import page_args, keyset_page, total_count, set_page_headers
 
 execution_bp = Blueprint('execution', __name__)
 
 # Global executor instance
 executor = PowerShellExecutor(enable_restrictions=True)
 
+# In-process scheduler, or the database queue when execution agents run scripts
+execution_queue = LocalProxy(get_execution_queue)
+
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+
 
 @execution_bp.route('/execute/<int:script_id>', methods=['POST'])
 @jwt_required()
@@ -26,7 +47,7 @@ def execute_script(script_id):
     - parameters: dict of parameter values (optional)
     - timeout: execution timeout in seconds (optional, default 300)
     """
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     user = User.query.get(user_id)
 
     script = Script.query.get(script_id)
@@ -51,76 +72,362 @@ def execute_script(script_id):
                 'validation_errors': errors
             }), 400
 
+    # Idempotent scripts: answer from a recent identical run (cached in this process only)
+    if script.cache_ttl_seconds and execution_queue.runs_locally:
+        cached = _execution_from_cache(script, user, parameters, timeout)
+        if cached:
+            return jsonify({
+                'message': 'Cached result returned',
+                'execution_id': cached.id,
+                'status': cached.status,
+                'cached': True,
+                'cached_from_id': cached.cached_from_id
+            }), 200
+
+    # Coalescable scripts: identical requests in flight share one run (runs in this process only)
+    key = None
+    if script.coalesce and execution_queue.runs_locally:
+        key = coalesce_key(script, parameters, user.role != 'admin')
+
+    # Shed load before creating the execution record (followers take no queue slot)
+    if key is None or coalescer.leader_of(key) is None:
+        try:
+            execution_queue.check_capacity()
+        except QueueFullError as e:
+            return _queue_full_response(e)
+
     # Create execution record
+    queued_at = datetime.utcnow()
     execution = Execution(
         script_id=script_id,
         user_id=user_id,
         parameters=parameters,
-        status='running'
+        status='queued',
+        timeout_seconds=timeout,
+        queued_at=queued_at,
+        **schedule_fields(script, queued_at),
+        **execution_queue.owner_fields()
     )
     db.session.add(execution)
     db.session.commit()
 
     execution_id = execution.id
 
-    # Execute script in background thread
-    def execute_in_background():
-        try:
-            # Disable restrictions for admin users
-            exec_instance = PowerShellExecutor(enable_restrictions=(user.role != 'admin'))
-
-            result = exec_instance.execute(
-                script_content=script.content,
-                parameters=parameters,
-                timeout=timeout
-            )
-
-            # Update execution record
-            execution_record = Execution.query.get(execution_id)
-            execution_record.status = result['status']
-            execution_record.output = result['output']
-            execution_record.error_output = result['error_output']
-            execution_record.exit_code = result['exit_code']
-            execution_record.completed_at = datetime.utcnow()
-            execution_record.duration_seconds = result['duration_seconds']
-
-            # Update script execution count
-            script_record = Script.query.get(script_id)
-            script_record.execution_count += 1
-
-            db.session.commit()
-
-        except Exception as e:
-            # Handle execution errors
-            execution_record = Execution.query.get(execution_id)
-            execution_record.status = 'failed'
-            execution_record.error_output = str(e)
-            execution_record.completed_at = datetime.utcnow()
-            db.session.commit()
-
-    thread = threading.Thread(target=execute_in_background)
-    thread.start()
+    if key is not None:
+        leader_id = coalescer.join_or_lead(key, execution_id)
+        if leader_id is not None:
+            execution = _follow_leader(execution, leader_id)
+            return jsonify({
+                'message': 'Attached to an identical execution in progress',
+                'execution_id': execution_id,
+                'status': execution.status,
+                'coalesced_with_id': leader_id
+            }), 202
+
+    try:
+        position = execution_queue.submit(execution_id, user_id, priority=queue_priority(execution.priority_at))
+    except QueueFullError as e:
+        _retire_leader(execution, 'failed', 'Execution queue is full')
+        db.session.delete(execution)
+        db.session.commit()
+        return _queue_full_response(e)
+
+    return jsonify({
+        'message': 'Script execution queued',
+        'execution_id': execution_id,
+        'status': 'queued',
+        'queue_position': position,
+        'estimated_duration_seconds': execution.estimated_duration_seconds
+    }), 202
+
+
+@execution_bp.route('/execute/<int:script_id>/batch', methods=['POST'])
+@jwt_required()
+def execute_batch(script_id):
+    """
+    Run a script once per parameter set, with bounded parallelism.
+
+    Request body should contain:
+    - parameter_sets: list of parameter dicts, one child execution each
+    - parallelism: children run at once (optional, default and maximum is the
+      scheduler's concurrency)
+    - timeout: execution timeout in seconds per child (optional, default 300)
+    """
+    user_id = int(get_jwt_identity())
+    user = User.query.get(user_id)
+
+    script = Script.query.get(script_id)
+
+    if not script:
+        return jsonify({'error': 'Script not found'}), 404
+
+    # Check access permissions
+    if script.author_id != user_id and not script.is_public and user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+
+    data = request.get_json() or {}
+    parameter_sets = data.get('parameter_sets')
+    timeout = data.get('timeout', 300)
+
+    if not isinstance(parameter_sets, list) or not parameter_sets:
+        return jsonify({'error': 'parameter_sets must be a non-empty list'}), 400
+    if len(parameter_sets) > execution_queue.max_batch_size:
+        return jsonify({'error': f'A batch may contain at most {execution_queue.max_batch_size} parameter sets'}), 400
+
+    # Validate every parameter set before creating anything
+    validation_errors = []
+    for index, parameters in enumerate(parameter_sets):
+        if not isinstance(parameters, dict):
+            validation_errors.append({'index': index, 'errors': ['Parameter set must be an object']})
+            continue
+        if script.parameters:
+            is_valid, errors = validate_script_parameters(parameters, script.parameters)
+            if not is_valid:
+                validation_errors.append({'index': index, 'errors': errors})
+    if validation_errors:
+        return jsonify({
+            'error': 'Parameter validation failed',
+            'validation_errors': validation_errors
+        }), 400
+
+    parallelism = data.get('parallelism') or execution_queue.max_concurrency
+    if not isinstance(parallelism, int) or parallelism < 1:
+        return jsonify({'error': 'parallelism must be a positive integer'}), 400
+    parallelism = min(parallelism, execution_queue.max_concurrency)
+
+    # Shed load before creating the batch
+    try:
+        execution_queue.check_capacity(len(parameter_sets))
+    except QueueFullError as e:
+        return _queue_full_response(e)
+
+    batch = ExecutionBatch(
+        script_id=script_id,
+        user_id=user_id,
+        total=len(parameter_sets),
+        parallelism=parallelism,
+        timeout_seconds=timeout
+    )
+    db.session.add(batch)
+    db.session.flush()
+
+    # Children in one multi-row INSERT, IDs returned in parameter order
+    queued_at = datetime.utcnow()
+    scheduling = schedule_fields(script, queued_at)
+    execution_ids = db.session.scalars(
+        insert(Execution).values(**execution_queue.owner_fields())
+        .returning(Execution.id, sort_by_parameter_order=True),
+        [
+            {
+                'script_id': script_id,
+                'user_id': user_id,
+                'batch_id': batch.id,
+                'parameters': parameters,
+                'status': 'queued',
+                'timeout_seconds': timeout,
+                'created_at': queued_at,
+                'queued_at': queued_at,
+                **scheduling
+            }
+            for parameters in parameter_sets
+        ]
+    ).all()
+    db.session.commit()
+
+    try:
+        execution_queue.submit_batch(
+            execution_ids, user_id, batch.id, parallelism,
+            priority=queue_priority(scheduling['priority_at'])
+        )
+    except QueueFullError as e:
+        db.session.delete(batch)
+        db.session.commit()
+        return _queue_full_response(e)
 
     return jsonify({
-        'message': 'Script execution started',
-        'execution_id': execution_id
+        'message': 'Batch queued',
+        'batch_id': batch.id,
+        'total': batch.total,
+        'parallelism': parallelism,
+        'status': 'queued'
     }), 202
 
 
+@execution_bp.route('/batches/<int:batch_id>', methods=['GET'])
+@jwt_required()
+def get_batch(batch_id):
+    """Get a batch's aggregated progress and per-child results."""
+    user_id = int(get_jwt_identity())
+    user = User.query.get(user_id)
+
+    batch = ExecutionBatch.query.get(batch_id)
+
+    if not batch:
+        return jsonify({'error': 'Batch not found'}), 404
+
+    # Check access permissions
+    if batch.user_id != user_id and user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+
+    return jsonify(batch.to_dict(include_executions=True)), 200
+
+
+def _execution_from_cache(script, user, parameters, timeout):
+    """
+    Create a completed execution sharing the output of a cached run.
+
+    Returns:
+        The new Execution, or None if there is no usable cached result
+    """
+    # Cached output must not bypass the checks a real run would apply
+    if user.role != 'admin' and not get_script_verdict(script).is_valid:
+        return None
+
+    key = cache_key(script, parameters)
+    source_id = result_cache.get(key)
+    if source_id is None:
+        return None
+    source = Execution.query.get(source_id)
+    if source is None or source.status != 'completed':
+        result_cache.discard(key)
+        return None
+
+    now = datetime.utcnow()
+    execution = Execution(
+        script_id=script.id,
+        user_id=user.id,
+        parameters=parameters,
+        status='completed',
+        exit_code=source.exit_code,
+        timeout_seconds=timeout,
+        queued_at=now,
+        started_at=now,
+        completed_at=now,
+        duration_seconds=0,
+        cached_from_id=source.id
+    )
+    db.session.add(execution)
+    if not share_output(source, execution):
+        db.session.rollback()
+        result_cache.discard(key)
+        return None
+    db.session.commit()
+    return execution
+
+
+def _follow_leader(execution, leader_id):
+    """
+    Record that an execution mirrors leader_id instead of running itself.
+
+    The status only moves forward from 'queued', so a leader finishing
+    concurrently (which finalizes its followers) is not overwritten.
+    """
+    leader = Execution.query.get(leader_id)
+    execution.coalesced_with_id = leader_id
+    db.session.commit()
+    if leader.status == 'running':
+        Execution.query.filter_by(id=execution.id, status='queued').update({
+            'status': 'running',
+            'started_at': leader.started_at,
+            'worker_id': leader.worker_id,
+            'heartbeat_at': leader.heartbeat_at
+        })
+        db.session.commit()
+    db.session.refresh(execution)
+    return execution
+
+
+def _retire_leader(execution, status, message):
+    """Finish the followers of a coalescing leader that will not run."""
+    followers = coalescer.finish(execution.id)
+    if followers:
+        execution.status = status
+        execution.completed_at = execution.completed_at or datetime.utcnow()
+        mirror_leader(execution, followers, message=message)
+
+
+def _mark_cancelled(execution, note=True):
+    """Mark a single execution cancelled and tell its subscribers."""
+    execution.status = 'cancelled'
+    execution.completed_at = datetime.utcnow()
+    if note:
+        append_message(execution, 'stderr', 'Execution cancelled')
+    db.session.commit()
+    streamer.publish_status(execution.id, 'cancelled')
+
+
+def _promote_follower(execution):
+    """Queue the first follower of a cancelled queued leader in its place."""
+    new_leader_id = coalescer.promote(execution.id)
+    if new_leader_id is None:
+        return
+    Execution.query.filter(Execution.coalesced_with_id == execution.id).update(
+        {'coalesced_with_id': new_leader_id}, synchronize_session=False
+    )
+    leader = Execution.query.get(new_leader_id)
+    leader.coalesced_with_id = None
+    db.session.commit()
+    execution_queue.submit(new_leader_id, leader.user_id, force=True,
+                           priority=queue_priority(leader.priority_at))
+
+
+def _queue_full_response(error):
+    """Build the 429 response returned when the execution queue is full."""
+    response = jsonify({
+        'error': 'Execution queue is full, try again later',
+        'retry_after': error.retry_after
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def _execution_to_dict(execution, include_output, queue_positions=None):
+    """
+    Serialize an execution, adding its queue position while queued.
+
+    Args:
+        queue_positions: Positions looked up in bulk by list views; when
+                         omitted the position is queried for this execution
+    """
+    data = execution.to_dict(include_output=include_output)
+    if execution.status != 'queued':
+        data['queue_position'] = None
+    elif queue_positions is not None:
+        data['queue_position'] = queue_positions.get(execution.id)
+    else:
+        data['queue_position'] = execution_queue.queue_position(execution.id)
+    return data
+
+
 @execution_bp.route('/executions', methods=['GET'])
 @jwt_required()
 def list_executions():
-    """List execution history."""
-    user_id = get_jwt_identity()
+    """
+    List execution history, most recently created first.
+
+    Pages are keyed on created_at, which unlike started_at does not change
+    when a queued run starts, so rows never move between pages.
+
+    Query parameters:
+    - script_id, status: filters
+    - limit: page size (default 50)
+    - cursor: X-Next-Cursor header of the previous page
+    - count: 'exact' or 'estimate' to return X-Total-Count
+    """
+    user_id = int(get_jwt_identity())
     user = User.query.get(user_id)
 
     # Get query parameters
     script_id = request.args.get('script_id', type=int)
     status = request.args.get('status')
-    limit = request.args.get('limit', 50, type=int)
+    try:
+        limit, after, count_mode = page_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     # Build query
-    query = Execution.query
+    query = Execution.query.options(*Execution.list_options())
 
     # Non-admin users see only their executions
     if user.role != 'admin':
@@ -132,17 +439,87 @@ def list_executions():
     if status:
         query = query.filter(Execution.status == status)
 
-    executions = query.order_by(Execution.started_at.desc()).limit(limit).all()
+    count = total_count(query, count_mode) if count_mode else None
+    executions, next_cursor = keyset_page(query, Execution.created_at, Execution.id, limit, after)
+    positions = execution_queue.queue_positions(
+        [execution.id for execution in executions if execution.status == 'queued']
+    )
 
     # Don't include full output in list view
-    return jsonify([exec.to_dict(include_output=False) for exec in executions]), 200
+    response = jsonify([
+        _execution_to_dict(execution, include_output=False, queue_positions=positions)
+        for execution in executions
+    ])
+    return set_page_headers(response, next_cursor, count), 200
 
 
 @execution_bp.route('/executions/<int:execution_id>', methods=['GET'])
 @jwt_required()
 def get_execution(execution_id):
     """Get execution details with full output."""
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
+    user = User.query.get(user_id)
+
+    execution = Execution.query.get(execution_id)
+
+    if not execution:
+        return jsonify({'error': 'Execution not found'}), 404
+
+    # Check access permissions
+    if execution.user_id != user_id and user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+
+    return jsonify(_execution_to_dict(execution, include_output=True)), 200
+
+
+def _parse_cursor(cursor):
+    """Split an output cursor ('<stdout bytes>.<stderr bytes>') into positions."""
+    if not cursor:
+        return 0, 0
+    stdout_pos, stderr_pos = (int(part) for part in cursor.split('.'))
+    if stdout_pos < 0 or stderr_pos < 0:
+        raise ValueError('negative cursor')
+    return stdout_pos, stderr_pos
+
+
+def _output_range_response(execution):
+    """Serve a byte range of finished output for a Range request."""
+    stream = request.args.get('stream', 'stdout')
+    if stream not in ('stdout', 'stderr'):
+        return jsonify({'error': "stream must be 'stdout' or 'stderr'"}), 400
+    if execution.status not in FINISHED_STATUSES:
+        return jsonify({'error': 'Range requests require a finished execution'}), 409
+
+    length = stream_length(execution, stream)
+    byte_range = request.range.range_for_length(length) if request.range else None
+    if byte_range is None:
+        response = current_app.response_class(status=416)
+        response.headers['Content-Range'] = f'bytes */{length}'
+        return response
+
+    start, stop = byte_range
+    response = current_app.response_class(
+        read_range(execution, stream, start, stop), status=206,
+        content_type='text/plain; charset=utf-8'
+    )
+    response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{length}'
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
+
+
+@execution_bp.route('/executions/<int:execution_id>/output', methods=['GET'])
+@jwt_required()
+def get_execution_output(execution_id):
+    """
+    Get only the output produced since a cursor.
+
+    Query parameters:
+    - since: cursor returned by the previous call (omit to start from the beginning)
+
+    A Range header (with optional ?stream=stdout|stderr) instead returns a
+    byte range of a finished execution's output with status 206.
+    """
+    user_id = int(get_jwt_identity())
     user = User.query.get(user_id)
 
     execution = Execution.query.get(execution_id)
@@ -154,14 +531,113 @@ def get_execution(execution_id):
     if execution.user_id != user_id and user.role != 'admin':
         return jsonify({'error': 'Access denied'}), 403
 
-    return jsonify(execution.to_dict(include_output=True)), 200
+    if 'Range' in request.headers:
+        return _output_range_response(execution)
+
+    try:
+        stdout_pos, stderr_pos = _parse_cursor(request.args.get('since'))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    finished = execution.status in FINISHED_STATUSES
+    live = None if finished else streamer.read(execution_id, stdout_pos, stderr_pos)
+
+    if live and not live['truncated']:
+        # Running here: the live buffer is ahead of the chunk store
+        stdout, stderr = live['stdout'], live['stderr']
+        stdout_pos, stderr_pos = live['stdout_pos'], live['stderr_pos']
+    else:
+        # Finished, running in another process, or behind the live buffer
+        stdout_bytes = read_range(execution, 'stdout', stdout_pos)
+        stderr_bytes = read_range(execution, 'stderr', stderr_pos)
+        stdout = stdout_bytes.decode('utf-8', errors='replace')
+        stderr = stderr_bytes.decode('utf-8', errors='replace')
+        stdout_pos += len(stdout_bytes)
+        stderr_pos += len(stderr_bytes)
+
+    return jsonify({
+        'execution_id': execution_id,
+        'status': execution.status,
+        'stdout': stdout,
+        'stderr': stderr,
+        'cursor': f'{stdout_pos}.{stderr_pos}',
+        'complete': finished
+    }), 200
+
+
+@execution_bp.route('/executions/<int:execution_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_execution(execution_id):
+    """
+    Cancel a queued or running execution.
+
+    A queued execution is cancelled immediately. A running one has its whole
+    process tree killed; the response is 202 and the 'cancelled' status
+    follows once the runner has stored the partial output. Cancelling a
+    coalesced execution only detaches it; the run it mirrors carries on for
+    its other callers. Likewise a coalescing leader with followers only
+    cancels the caller's own execution: a queued one hands its place to a
+    follower, a running one keeps running until no follower is left. An
+    execution claimed by an execution agent is flagged, and the agent kills
+    it on its next heartbeat (202).
+    """
+    user_id = int(get_jwt_identity())
+    user = User.query.get(user_id)
+
+    execution = Execution.query.get(execution_id)
+
+    if not execution:
+        return jsonify({'error': 'Execution not found'}), 404
+
+    # Check permissions
+    if execution.user_id != user_id and user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+
+    if execution.status in FINISHED_STATUSES:
+        return jsonify({'error': f'Execution already {execution.status}'}), 409
+
+    leader_id = execution.coalesced_with_id
+    if leader_id and coalescer.detach(leader_id, execution_id):
+        _mark_cancelled(execution)
+        if coalescer.orphaned(leader_id):
+            # Its own caller cancelled the run before; nobody is waiting for it now
+            process_registry.cancel(leader_id)
+        return jsonify({'message': 'Execution cancelled', 'status': 'cancelled'}), 200
+
+    if execution.status == 'queued' and execution_queue.remove(execution_id):
+        _mark_cancelled(execution)
+        _promote_follower(execution)
+        return jsonify({'message': 'Execution cancelled', 'status': 'cancelled'}), 200
+
+    if coalescer.abandon(execution_id):
+        # Other callers share this run: it carries on for them (its output is
+        # theirs, so no message is added to it)
+        _mark_cancelled(execution, note=False)
+        return jsonify({'message': 'Execution cancelled', 'status': 'cancelled'}), 200
+
+    if process_registry.cancel(execution_id):
+        return jsonify({'message': 'Cancellation requested', 'status': execution.status}), 202
+
+    if execution.worker_id:
+        # Claimed by an execution agent, which applies it on its next heartbeat
+        execution.cancel_requested = True
+        db.session.commit()
+        return jsonify({'message': 'Cancellation requested', 'status': execution.status}), 202
+
+    return jsonify({'error': 'Execution is not running on this server'}), 409
 
 
 @execution_bp.route('/executions/<int:execution_id>', methods=['DELETE'])
 @jwt_required()
 def delete_execution(execution_id):
-    """Delete an execution record."""
-    user_id = get_jwt_identity()
+    """
+    Delete an execution record.
+
+    A queued execution still in this server's queue is dropped from it. One
+    that is running (or claimed by an agent) is refused with 409: cancel it
+    first and delete it once its runner has let go of it.
+    """
+    user_id = int(get_jwt_identity())
     user = User.query.get(user_id)
 
     execution = Execution.query.get(execution_id)
@@ -173,6 +649,12 @@ def delete_execution(execution_id):
     if execution.user_id != user_id and user.role != 'admin':
         return jsonify({'error': 'Access denied'}), 403
 
+    leader_id = execution.coalesced_with_id
+    if not (leader_id and coalescer.detach(leader_id, execution_id)):
+        if execution_queue.remove(execution_id):
+            _promote_follower(execution)
+        elif execution.status not in FINISHED_STATUSES or execution_id in process_registry.running():
+            return jsonify({'error': 'Execution is still running; cancel it before deleting it'}), 409
     db.session.delete(execution)
     db.session.commit()
 
@@ -183,7 +665,7 @@ def delete_execution(execution_id):
 @jwt_required()
 def validate_script(script_id):
     """Validate script for security issues without executing."""
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     user = User.query.get(user_id)
 
     script = Script.query.get(script_id)
@@ -197,10 +679,9 @@ def validate_script(script_id):
 
     # Validate script (only if restrictions enabled)
     if user.role != 'admin':
-        is_valid, issues = executor.validate_script(script.content)
+        verdict = get_script_verdict(script)
         return jsonify({
-            'valid': is_valid,
-            'issues': issues,
+            **verdict.to_dict(),
             'restrictions_enabled': True
         }), 200
     else:
@@ -216,7 +697,103 @@ def validate_script(script_id):
 @jwt_required()
 def get_system_info():
     """Get PowerShell system information."""
+    try:
+        interpreter = registry.get().to_dict()
+    except InterpreterNotFoundError:
+        interpreter = None
+
     return jsonify({
-        'powershell_version': executor.get_powershell_version(),
-        'restrictions_enabled': executor.enable_restrictions
+        'powershell_version': interpreter['version'] if interpreter else 'Unknown',
+        'powershell_edition': interpreter['edition'] if interpreter else None,
+        'restrictions_enabled': executor.enable_restrictions,
+        'worker_pools': worker_pool_stats(),
+        'process_supervisor': process_supervisor_stats(),
+        'scheduler': execution_queue.stats(),
+        'output_storage': output_storage_stats(),
+        'result_cache': result_cache.stats(),
+        'facet_cache': facet_cache.stats(),
+        'coalescing': coalescer.stats()
     }), 200
+
+
+@execution_bp.route('/system/interpreters', methods=['GET'])
+@jwt_required()
+def list_interpreters():
+    """List installed PowerShell interpreters selectable per script."""
+    return jsonify([interpreter.to_dict() for interpreter in registry.all()]), 200
+
+
+@execution_bp.route('/system/interpreters/refresh', methods=['POST'])
+@jwt_required()
+def refresh_interpreters():
+    """Re-probe installed PowerShell interpreters (admin only)."""
+    user_id = int(get_jwt_identity())
+    user = User.query.get(user_id)
+
+    if user.role != 'admin':
+        return jsonify({'error': 'Admin access required'}), 403
+
+    return jsonify([interpreter.to_dict() for interpreter in registry.refresh()]), 200
+
+
+def register_socketio_handlers(socketio):
+    """
+    Register the live output handshake on the SocketIO server.
+
+    Clients emit 'subscribe_execution' with {execution_id, offset, token},
+    where offset is the sequence number of the next line they expect (0 on
+    first connect). They are joined to the execution's room, replayed any
+    buffered lines from offset, and sent the current status. Subsequent
+    'execution_output' batches and 'execution_status' events arrive on the
+    room; batches may overlap a replay, so clients skip offsets they have.
+    """
+
+    @socketio.on('subscribe_execution')
+    def subscribe_execution(data):
+        data = data or {}
+        try:
+            decoded = decode_token(data.get('token', ''))
+            if decoded['type'] != 'access':
+                raise ValueError('Not an access token')
+            user_id = int(decoded['sub'])
+        except Exception:
+            emit('execution_error', {'error': 'Invalid token'})
+            return
+
+        try:
+            offset = int(data.get('offset') or 0)
+        except (TypeError, ValueError):
+            offset = -1
+        if offset < 0:
+            emit('execution_error', {'error': 'Invalid offset'})
+            return
+
+        user = User.query.get(user_id)
+        execution = Execution.query.get(data.get('execution_id'))
+        if not execution:
+            emit('execution_error', {'error': 'Execution not found'})
+            return
+        if not user or (execution.user_id != user_id and user.role != 'admin'):
+            emit('execution_error', {'error': 'Access denied'})
+            return
+
+        join_room(room_name(execution.id))
+
+        catch_up = streamer.replay(execution.id, offset)
+        if catch_up and catch_up['lines']:
+            emit('execution_output', catch_up)
+
+        emit('execution_status', {
+            'execution_id': execution.id,
+            'status': execution.status,
+            'exit_code': execution.exit_code,
+            'duration_seconds': execution.duration_seconds,
+            'queue_position': execution_queue.queue_position(execution.id),
+            'truncated': bool(catch_up and catch_up['truncated'])
+        })
+
+    @socketio.on('unsubscribe_execution')
+    def unsubscribe_execution(data):
+        execution_id = (data or {}).get('execution_id')
+        if execution_id:
+            leave_room(room_name(int(execution_id)))
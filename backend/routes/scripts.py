@@ -5,53 +5,89 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 from models import db, User, Script, ScriptVersion
+from services.script_verdicts import record_script_verdict
+from services.resource_limits import validate_resource_limits
+from services.module_preload import (
+    validate_required_modules, normalize_modules, preload_modules, retire_unused_module_pools
+)
+from services.pagination import page_args, keyset_page, total_count, set_page_headers
+from services import script_search
+from services.script_tags import join_tags, split_tags, tag_filter, facet_counts
+from services.facet_cache import facet_cache
 
 scripts_bp = Blueprint('scripts', __name__)
 
 
+def _visible_scripts(user):
+    """Condition on Script for the scripts user may see (None for admins: all)."""
+    if user.role == 'admin':
+        return None
+    return db.or_(Script.author_id == user.id, Script.is_public == True)
+
+
 @scripts_bp.route('/', methods=['GET'])
 @jwt_required()
 def list_scripts():
-    """List all scripts accessible to user."""
+    """
+    List scripts accessible to user, most recently updated first, or best
+    match first when searching.
+
+    Query parameters:
+    - search: full-text search over name, description, tags and content;
+      each result carries a highlighted search_snippet
+    - category: filter
+    - tags: comma-separated tag names; tag_mode 'all' (default) or 'any'
+    - limit: page size (default 100)
+    - cursor: X-Next-Cursor header of the previous page
+    - count: 'exact' or 'estimate' to return X-Total-Count
+    """
     user_id = int(get_jwt_identity())
     user = User.query.get(user_id)
 
     # Get filter parameters
     category = request.args.get('category')
     search = request.args.get('search')
-    tags = request.args.get('tags')
+    tags = split_tags(request.args.get('tags'))
+    tag_mode = request.args.get('tag_mode', 'all')
+    if tag_mode not in ('all', 'any'):
+        return jsonify({'error': "tag_mode must be 'all' or 'any'"}), 400
+    try:
+        limit, after, count_mode = page_args(default_limit=100, value_type=float if search else datetime)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     # Build query
-    query = Script.query
+    query = Script.query.options(*Script.list_options())
 
     # Non-admin users see only their scripts and public scripts
-    if user.role != 'admin':
-        query = query.filter(
-            db.or_(Script.author_id == user_id, Script.is_public == True)
-        )
+    visible = _visible_scripts(user)
+    if visible is not None:
+        query = query.filter(visible)
 
     # Apply filters
     if category:
         query = query.filter(Script.category == category)
 
     if search:
-        search_pattern = f'%{search}%'
-        query = query.filter(
-            db.or_(
-                Script.name.ilike(search_pattern),
-                Script.description.ilike(search_pattern)
-            )
-        )
+        query = script_search.match(query, search)
 
     if tags:
-        tag_list = tags.split(',')
-        for tag in tag_list:
-            query = query.filter(Script.tags.contains(tag.strip()))
+        query = query.filter(tag_filter(tags, match_all=tag_mode == 'all'))
 
-    scripts = query.order_by(Script.updated_at.desc()).all()
+    count = total_count(query, count_mode) if count_mode else None
 
     # Don't include full content in list view
-    return jsonify([script.to_dict(include_content=False) for script in scripts]), 200
+    if search:
+        results, next_cursor = script_search.ranked_page(query, search, limit, after)
+        items = [
+            {**script.to_dict(include_content=False), 'search_snippet': snippet}
+            for script, snippet in results
+        ]
+    else:
+        scripts, next_cursor = keyset_page(query, Script.updated_at, Script.id, limit, after)
+        items = [script.to_dict(include_content=False) for script in scripts]
+    response = jsonify(items)
+    return set_page_headers(response, next_cursor, count), 200
 
 
 @scripts_bp.route('/<int:script_id>', methods=['GET'])
@@ -73,6 +109,11 @@ def get_script(script_id):
     return jsonify(script.to_dict(include_content=True)), 200
 
 
+def _valid_cache_ttl(value):
+    """Check a cache_ttl_seconds value (None or 0 turns caching off)."""
+    return value is None or (isinstance(value, int) and not isinstance(value, bool) and value >= 0)
+
+
 @scripts_bp.route('/', methods=['POST'])
 @jwt_required()
 def create_script():
@@ -89,19 +130,36 @@ def create_script():
     if not all([name, content]):
         return jsonify({'error': 'Name and content are required'}), 400
 
+    is_valid, errors = validate_resource_limits(data.get('resource_limits'))
+    if not is_valid:
+        return jsonify({'error': 'Invalid resource limits', 'validation_errors': errors}), 400
+    if not _valid_cache_ttl(data.get('cache_ttl_seconds')):
+        return jsonify({'error': 'cache_ttl_seconds must be a non-negative integer'}), 400
+    is_valid, errors = validate_required_modules(data.get('required_modules'))
+    if not is_valid:
+        return jsonify({'error': 'Invalid required modules', 'validation_errors': errors}), 400
+
     # Create script
     script = Script(
         name=name,
         description=data.get('description', ''),
         content=content,
         category=data.get('category', 'Utilities'),
-        tags=','.join(data.get('tags', [])) if data.get('tags') else '',
+        tags=join_tags(data.get('tags')),
         parameters=data.get('parameters', []),
+        pwsh_version=data.get('pwsh_version') or None,
+        resource_limits=data.get('resource_limits') or None,
+        cache_ttl_seconds=data.get('cache_ttl_seconds') or None,
+        coalesce=bool(data.get('coalesce', False)),
+        required_modules=list(normalize_modules(data.get('required_modules'))) or None,
         author_id=user_id,
         is_public=data.get('is_public', False)
     )
 
     db.session.add(script)
+    db.session.flush()
+    script_search.index_script(script)
+    facet_cache.invalidate()
     db.session.commit()
 
     # Create initial version
@@ -115,6 +173,11 @@ def create_script():
     db.session.add(version)
     db.session.commit()
 
+    # Validate once now; executions look the verdict up by content hash
+    record_script_verdict(script)
+    # Warm workers with the script's modules before its first run
+    preload_modules(script.pwsh_version, script.required_modules)
+
     return jsonify({
         'message': 'Script created successfully',
         'script': script.to_dict()
@@ -142,6 +205,19 @@ def update_script(script_id):
     if not data:
         return jsonify({'error': 'No data provided'}), 400
 
+    if 'resource_limits' in data:
+        is_valid, errors = validate_resource_limits(data['resource_limits'])
+        if not is_valid:
+            return jsonify({'error': 'Invalid resource limits', 'validation_errors': errors}), 400
+
+    if not _valid_cache_ttl(data.get('cache_ttl_seconds')):
+        return jsonify({'error': 'cache_ttl_seconds must be a non-negative integer'}), 400
+
+    if 'required_modules' in data:
+        is_valid, errors = validate_required_modules(data['required_modules'])
+        if not is_valid:
+            return jsonify({'error': 'Invalid required modules', 'validation_errors': errors}), 400
+
     # Track if content changed for versioning
     content_changed = False
     old_content = script.content
@@ -157,13 +233,26 @@ def update_script(script_id):
     if 'category' in data:
         script.category = data['category']
     if 'tags' in data:
-        script.tags = ','.join(data['tags']) if isinstance(data['tags'], list) else data['tags']
+        script.tags = join_tags(data['tags'])
     if 'parameters' in data:
         script.parameters = data['parameters']
+    if 'pwsh_version' in data:
+        script.pwsh_version = data['pwsh_version'] or None
+    if 'resource_limits' in data:
+        script.resource_limits = data['resource_limits'] or None
+    if 'cache_ttl_seconds' in data:
+        script.cache_ttl_seconds = data['cache_ttl_seconds'] or None
+    if 'coalesce' in data:
+        script.coalesce = bool(data['coalesce'])
+    if 'required_modules' in data:
+        script.required_modules = list(normalize_modules(data['required_modules'])) or None
     if 'is_public' in data:
         script.is_public = data['is_public']
 
     script.updated_at = datetime.utcnow()
+    db.session.flush()
+    script_search.index_script(script)
+    facet_cache.invalidate()
     db.session.commit()
 
     # Create new version if content changed
@@ -184,6 +273,12 @@ def update_script(script_id):
         db.session.add(version)
         db.session.commit()
 
+        record_script_verdict(script)
+
+    if 'required_modules' in data or 'pwsh_version' in data:
+        preload_modules(script.pwsh_version, script.required_modules)
+        retire_unused_module_pools()
+
     return jsonify({
         'message': 'Script updated successfully',
         'script': script.to_dict()
@@ -206,9 +301,15 @@ def delete_script(script_id):
     if script.author_id != user_id and user.role != 'admin':
         return jsonify({'error': 'Access denied'}), 403
 
+    script_search.remove_script(script.id)
+    facet_cache.invalidate()
+    had_modules = bool(script.required_modules)
     db.session.delete(script)
     db.session.commit()
 
+    if had_modules:
+        retire_unused_module_pools()
+
     return jsonify({'message': 'Script deleted successfully'}), 200
 
 
@@ -235,10 +336,24 @@ def get_script_versions(script_id):
     return jsonify([version.to_dict() for version in versions]), 200
 
 
+@scripts_bp.route('/facets', methods=['GET'])
+@jwt_required()
+def get_facets():
+    """Get tag and category counts over the scripts the user can see."""
+    user = User.query.get(int(get_jwt_identity()))
+    visible = _visible_scripts(user)
+    scope = None if visible is None else user.id
+    return jsonify(facet_cache.get(('facets', scope), lambda: facet_counts(visible))), 200
+
+
 @scripts_bp.route('/categories', methods=['GET'])
 @jwt_required()
 def get_categories():
     """Get list of all script categories."""
+    return jsonify(facet_cache.get(('categories',), _list_categories)), 200
+
+
+def _list_categories():
     categories = db.session.query(Script.category).distinct().all()
     category_list = [cat[0] for cat in categories if cat[0]]
 
@@ -248,4 +363,4 @@ def get_categories():
         if cat not in category_list:
             category_list.append(cat)
 
-    return jsonify(sorted(category_list)), 200
+    return sorted(category_list)
@@ -0,0 +1,90 @@
+"""
+Runtime estimates for shortest-expected-job-first scheduling.
+
+Each script keeps an exponentially weighted moving average of the durations
+of its completed runs (Script.estimated_duration_seconds), so recent runs
+count most and one outlier does not dominate. A script without history is
+seeded from its stored executions the first time one completes.
+
+Queued executions are ordered by priority_at = queued_at + estimate /
+aging_rate rather than by queued_at alone. A job that has waited w seconds
+ranks like a job estimated w * aging_rate seconds shorter, so a 2-second
+interactive script overtakes a 20-minute report queued a moment earlier, yet
+the report is never passed by work submitted more than estimate / aging_rate
+seconds after it. Scripts without an estimate use EXECUTION_DEFAULT_ESTIMATE.
+
+The key is computed once, when the execution is queued, and stored on the
+row, so the in-process scheduler and execution agents order work the same
+way and waiting time survives a restart.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from flask import current_app
+
+from models import Execution
+
+DEFAULT_ALPHA = 0.3
+DEFAULT_ESTIMATE = 60.0
+DEFAULT_AGING_RATE = 1.0
+# Completed runs folded in when a script gets its first estimate
+SEED_RUNS = 50
+
+
+def ewma(durations, alpha: float, start: Optional[float] = None) -> Optional[float]:
+    """Fold durations, oldest first, into an exponentially weighted mean."""
+    estimate = start
+    for duration in durations:
+        estimate = duration if estimate is None else alpha * duration + (1 - alpha) * estimate
+    return estimate
+
+
+def record_duration(script, duration_seconds: Optional[float]):
+    """
+    Update a script's estimate with a completed run (through the session, not committed).
+
+    Args:
+        script: Script whose run completed
+        duration_seconds: Wall-clock duration of the run
+    """
+    if duration_seconds is None:
+        return
+    alpha = current_app.config.get('EXECUTION_ESTIMATE_ALPHA', DEFAULT_ALPHA)
+    if script.estimated_duration_seconds is not None:
+        script.estimated_duration_seconds = ewma([duration_seconds], alpha, script.estimated_duration_seconds)
+        return
+
+    # First estimate: replay the script's recent history (which includes this run)
+    history = [
+        duration for duration, in Execution.query.with_entities(Execution.duration_seconds).filter(
+            Execution.script_id == script.id,
+            Execution.status == 'completed',
+            Execution.duration_seconds.isnot(None)
+        ).order_by(Execution.completed_at.desc(), Execution.id.desc()).limit(SEED_RUNS)
+    ]
+    script.estimated_duration_seconds = ewma(reversed(history or [duration_seconds]), alpha)
+
+
+def schedule_fields(script, queued_at: datetime) -> Dict:
+    """
+    Return the estimate and queue order key of a new execution of script.
+
+    Returns:
+        Dictionary with estimated_duration_seconds (None without history)
+        and priority_at, ready to set on the Execution row
+    """
+    config = current_app.config
+    estimate = script.estimated_duration_seconds
+    expected = estimate if estimate is not None else config.get('EXECUTION_DEFAULT_ESTIMATE', DEFAULT_ESTIMATE)
+    aging_rate = config.get('EXECUTION_AGING_RATE', DEFAULT_AGING_RATE)
+    return {
+        'estimated_duration_seconds': estimate,
+        'priority_at': queued_at + timedelta(seconds=expected / aging_rate)
+    }
+
+
+def queue_priority(priority_at: Optional[datetime]) -> Optional[float]:
+    """Convert a priority_at (naive UTC) into the scheduler's priority, None meaning FIFO."""
+    if priority_at is None:
+        return None
+    return priority_at.replace(tzinfo=timezone.utc).timestamp()
@@ -0,0 +1,164 @@
+"""
+Execution agent: runs queued executions claimed from the shared database.
+
+An agent is a standalone process (python -m worker) with a fixed number of
+slots. Each slot claims the oldest runnable execution (see execution_queue),
+runs it with the same runner the in-process scheduler uses, and claims the
+next. A heartbeat thread refreshes the agent's heartbeat and heartbeat_at on
+the rows it is running, applies cancel requests made through the API, and
+fails the runs of agents that stopped sending heartbeats.
+
+Output reaches clients through the chunk store (polled over REST) and, when
+SOCKETIO_MESSAGE_QUEUE is set for both the API and the agents, as live
+SocketIO events relayed by the API.
+"""
+import threading
+from typing import Callable, Optional, Set
+
+from models import db
+from services.execution_queue import claim_execution, heartbeat, reap_stale_executions
+from services.execution_scheduler import default_worker_id
+from services.process_registry import process_registry
+
+
+class ExecutionAgent:
+    """Claims and runs queued executions until stopped."""
+
+    def __init__(
+        self,
+        app,
+        runner: Callable[[int], None],
+        worker_id: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        poll_interval: float = 1.0,
+        heartbeat_interval: Optional[float] = None,
+        heartbeat_timeout: Optional[float] = None
+    ):
+        """
+        Initialize agent.
+
+        Args:
+            app: Flask application; an app context is pushed around each run
+            runner: Callable that executes one execution ID to completion
+            worker_id: Name stored on claimed rows (default: host:pid)
+            concurrency: Executions run at once (default EXECUTION_MAX_CONCURRENCY)
+            poll_interval: Seconds an idle slot waits before claiming again
+            heartbeat_interval: Seconds between heartbeats (default EXECUTION_HEARTBEAT_INTERVAL)
+            heartbeat_timeout: Seconds without a heartbeat before a run is
+                considered abandoned (default EXECUTION_HEARTBEAT_TIMEOUT)
+        """
+        self.app = app
+        self.runner = runner
+        self.worker_id = worker_id or default_worker_id()
+        self.concurrency = concurrency or app.config.get('EXECUTION_MAX_CONCURRENCY', 4)
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval or app.config.get('EXECUTION_HEARTBEAT_INTERVAL', 10)
+        self.heartbeat_timeout = heartbeat_timeout or app.config.get('EXECUTION_HEARTBEAT_TIMEOUT', 60)
+        self.max_per_user = app.config.get('EXECUTION_MAX_PER_USER', 2)
+
+        self.completed = 0
+        self._active: Set[int] = set()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+        self._heartbeat_thread = None
+
+    def start(self):
+        """Start the slot threads and the heartbeat thread."""
+        self._stopping.clear()
+        self._stopped.clear()
+        self._threads = [
+            threading.Thread(target=self._slot_loop, name=f'execution-agent-{index}', daemon=True)
+            for index in range(self.concurrency)
+        ]
+        self._heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop, name='execution-agent-heartbeat', daemon=True
+        )
+        for thread in self._threads + [self._heartbeat_thread]:
+            thread.start()
+
+    def run(self):
+        """Run until interrupted, then let the current executions finish."""
+        self.start()
+        try:
+            while not self._stopping.wait(1):
+                pass
+        except KeyboardInterrupt:
+            pass
+        self.stop()
+
+    def shutdown(self):
+        """Stop claiming work; run() returns once running executions finish."""
+        self._stopping.set()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop claiming work and wait for running executions to finish."""
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        # Keep heartbeating until the last run is done, or another agent would reap it
+        self._stopped.set()
+        if self._heartbeat_thread:
+            self._heartbeat_thread.join(timeout)
+
+    def _claim(self) -> Optional[int]:
+        with self.app.app_context():
+            try:
+                return claim_execution(self.worker_id, self.max_per_user)
+            finally:
+                db.session.remove()
+
+    def _slot_loop(self):
+        while not self._stopping.is_set():
+            try:
+                execution_id = self._claim()
+            except Exception:
+                execution_id = None
+            if execution_id is None:
+                self._stopping.wait(self.poll_interval)
+                continue
+
+            with self._lock:
+                self._active.add(execution_id)
+            try:
+                with self.app.app_context():
+                    self.runner(execution_id)
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._active.discard(execution_id)
+                    self.completed += 1
+
+    def beat(self):
+        """Send one heartbeat, apply cancel requests and reap abandoned runs."""
+        with self._lock:
+            active = list(self._active)
+        with self.app.app_context():
+            try:
+                for execution_id in heartbeat(self.worker_id, active):
+                    process_registry.cancel(execution_id)
+                reap_stale_executions(self.heartbeat_timeout)
+            finally:
+                db.session.remove()
+
+    def _heartbeat_loop(self):
+        # Beat at once, so the agent is counted as live from the start
+        while True:
+            try:
+                self.beat()
+            except Exception:
+                pass
+            if self._stopped.wait(self.heartbeat_interval):
+                break
+
+    def stats(self):
+        """Return the agent's name, slots and running executions."""
+        with self._lock:
+            return {
+                'worker_id': self.worker_id,
+                'concurrency': self.concurrency,
+                'running': sorted(self._active),
+                'completed': self.completed
+            }
@@ -0,0 +1,247 @@
+"""
+Single-flight coalescing of identical executions.
+
+Scripts flagged coalesce are safe to answer with another caller's run. While
+an execution of such a script is queued or running, a request with the same
+(content hash, normalized parameters, pwsh version) and the same
+restriction mode attaches to it instead of starting pwsh again: it gets its
+own Execution row (coalesced_with_id points at the leader) that mirrors the
+leader's status and live output, and shares the leader's stored output once
+it finishes. The follower's own timeout does not apply; the leader's does.
+
+Cancelling only ever cancels the caller's own execution. A cancelled
+follower is detached. A queued leader hands its place in the queue to its
+first follower, which becomes the leader of the rest. A running leader with
+followers is abandoned: its execution is marked cancelled, but the run goes
+on for the followers, and is killed only once none of them is left.
+
+The registry is in memory, so coalescing only spans requests handled by this
+process; followers still queued at a restart are recovered as ordinary runs.
+"""
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models import db, Execution
+from services.output_store import share_output, is_finalized, append_message
+from services.output_stream import streamer
+from services.result_cache import cache_key
+
+CoalesceKey = Tuple[str, str, str, bool]
+
+
+def coalesce_key(script, parameters: Optional[Dict], restricted: bool) -> CoalesceKey:
+    """
+    Build the key under which identical executions are coalesced.
+
+    Unrestricted (admin) runs are never shared with restricted callers, and
+    vice versa, so the restriction mode is part of the key.
+    """
+    return (*cache_key(script, parameters), restricted)
+
+
+class ExecutionCoalescer:
+    """Tracks the in-flight leader of each coalesce key and its followers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._leaders: Dict[CoalesceKey, int] = {}
+        self._keys: Dict[int, CoalesceKey] = {}
+        self._followers: Dict[int, List[int]] = {}
+        # Running leaders cancelled by their own caller, kept running for their followers
+        self._abandoned = set()
+        self.stats_counters = {'leaders': 0, 'coalesced': 0, 'promoted': 0, 'abandoned': 0}
+
+    def join_or_lead(self, key: CoalesceKey, execution_id: int) -> Optional[int]:
+        """
+        Attach an execution to the in-flight leader of key, or make it the leader.
+
+        Returns:
+            The leader's execution ID, or None if execution_id is now the leader
+        """
+        with self._lock:
+            leader_id = self._leaders.get(key)
+            if leader_id is not None:
+                self._followers[leader_id].append(execution_id)
+                streamer.alias(execution_id, leader_id)
+                self.stats_counters['coalesced'] += 1
+                return leader_id
+            self._leaders[key] = execution_id
+            self._keys[execution_id] = key
+            self._followers[execution_id] = []
+            self.stats_counters['leaders'] += 1
+            return None
+
+    def leader_of(self, key: CoalesceKey) -> Optional[int]:
+        """Return the in-flight leader of key, if any."""
+        with self._lock:
+            return self._leaders.get(key)
+
+    def followers(self, leader_id: int) -> List[int]:
+        """Return the executions currently attached to a leader."""
+        with self._lock:
+            return list(self._followers.get(leader_id, ()))
+
+    def detach(self, leader_id: int, follower_id: int) -> bool:
+        """
+        Detach a follower from its leader (the leader keeps running).
+
+        Returns:
+            True if the follower was still attached
+        """
+        with self._lock:
+            followers = self._followers.get(leader_id)
+            if not followers or follower_id not in followers:
+                return False
+            followers.remove(follower_id)
+            streamer.unalias(follower_id)
+        return True
+
+    def abandon(self, leader_id: int) -> bool:
+        """
+        Keep a leader's run going for its followers after its own caller cancelled it.
+
+        Returns:
+            True if the leader had followers (and is now abandoned); False if
+            the run can simply be cancelled
+        """
+        with self._lock:
+            if not self._followers.get(leader_id):
+                return False
+            self._abandoned.add(leader_id)
+            self.stats_counters['abandoned'] += 1
+            return True
+
+    def is_abandoned(self, leader_id: int) -> bool:
+        """True if the leader's own caller cancelled it while followers wait for its run."""
+        with self._lock:
+            return leader_id in self._abandoned
+
+    def orphaned(self, leader_id: int) -> bool:
+        """True if an abandoned leader has no follower left, so its run can be stopped."""
+        with self._lock:
+            return leader_id in self._abandoned and not self._followers.get(leader_id)
+
+    def promote(self, leader_id: int) -> Optional[int]:
+        """
+        Retire a leader that will not run, making its first follower the leader of the others.
+
+        Returns:
+            The new leader's execution ID, or None if there were no followers
+        """
+        with self._lock:
+            key = self._keys.pop(leader_id, None)
+            if key is not None and self._leaders.get(key) == leader_id:
+                del self._leaders[key]
+            self._abandoned.discard(leader_id)
+            followers = self._followers.pop(leader_id, [])
+            if not followers:
+                return None
+            new_leader_id, rest = followers[0], followers[1:]
+            streamer.unalias(new_leader_id)
+            for follower_id in rest:
+                streamer.alias(follower_id, new_leader_id)
+            if key is not None:
+                self._leaders[key] = new_leader_id
+                self._keys[new_leader_id] = key
+            self._followers[new_leader_id] = rest
+            self.stats_counters['promoted'] += 1
+            return new_leader_id
+
+    def finish(self, leader_id: int) -> List[int]:
+        """
+        Retire a leader that has reached a final state.
+
+        Later identical requests start a new run. Returns the followers
+        that must mirror the leader's result.
+        """
+        with self._lock:
+            key = self._keys.pop(leader_id, None)
+            if key is not None and self._leaders.get(key) == leader_id:
+                del self._leaders[key]
+            self._abandoned.discard(leader_id)
+            followers = self._followers.pop(leader_id, [])
+            for follower_id in followers:
+                streamer.unalias(follower_id)
+            return followers
+
+    def clear(self):
+        """Forget every leader and follower."""
+        with self._lock:
+            for followers in self._followers.values():
+                for follower_id in followers:
+                    streamer.unalias(follower_id)
+            self._leaders.clear()
+            self._keys.clear()
+            self._followers.clear()
+            self._abandoned.clear()
+
+    def stats(self) -> Dict:
+        """Return in-flight leaders, attached followers and counters."""
+        with self._lock:
+            return {
+                'in_flight': len(self._leaders),
+                'followers': sum(len(followers) for followers in self._followers.values()),
+                **self.stats_counters
+            }
+
+
+def mark_followers_running(leader: Execution, follower_ids: Iterable[int]):
+    """Move queued followers to 'running' along with their leader, heartbeated by its process."""
+    follower_ids = list(follower_ids)
+    if not follower_ids:
+        return
+    followers = Execution.query.filter(Execution.id.in_(follower_ids), Execution.status == 'queued').all()
+    for follower in followers:
+        follower.status = 'running'
+        follower.started_at = leader.started_at
+        follower.worker_id = leader.worker_id
+        follower.heartbeat_at = leader.heartbeat_at
+    db.session.commit()
+    for follower in followers:
+        streamer.publish_status(follower.id, 'running', started_at=follower.started_at.isoformat())
+
+
+def mirror_leader(leader: Execution, follower_ids: Iterable[int], message: Optional[str] = None,
+                  status: Optional[str] = None):
+    """
+    Give followers the final state and stored output of their finished leader.
+
+    Followers cancelled or finished on their own are left alone.
+
+    Args:
+        leader: Execution in its final state
+        follower_ids: Executions to finish (see ExecutionCoalescer.finish)
+        message: Written to the followers' stderr instead of sharing the
+            leader's output, for leaders that never ran
+        status: Final status of the run, when the leader's own differs
+            (an abandoned leader is 'cancelled')
+    """
+    follower_ids = list(follower_ids)
+    if not follower_ids:
+        return
+    followers = Execution.query.filter(
+        Execution.id.in_(follower_ids), Execution.status.in_(('queued', 'running'))
+    ).all()
+    shareable = message is None and is_finalized(leader)
+    for follower in followers:
+        follower.status = status or leader.status
+        follower.exit_code = leader.exit_code
+        follower.started_at = follower.started_at or leader.started_at
+        follower.completed_at = leader.completed_at or datetime.utcnow()
+        follower.duration_seconds = leader.duration_seconds
+        if message is not None:
+            append_message(follower, 'stderr', message)
+        elif not (shareable and share_output(leader, follower)):
+            append_message(follower, 'stderr', f'Output of execution {leader.id} is no longer available')
+    db.session.commit()
+    for follower in followers:
+        streamer.publish_status(
+            follower.id,
+            follower.status,
+            exit_code=follower.exit_code,
+            duration_seconds=follower.duration_seconds
+        )
+
+
+coalescer = ExecutionCoalescer()
@@ -0,0 +1,337 @@
+"""
+Database-backed execution queue drained by execution agents.
+
+With EXECUTION_AGENTS enabled the API does not run scripts: queued Execution
+rows are the queue, and any number of agent processes (python -m worker),
+on any number of hosts sharing the database, claim and run them. This class
+stands in for the in-process ExecutionScheduler on the API side, so routes
+use either through get_execution_queue().
+
+A claim sets the row's worker_id while it is still 'queued'; the runner then
+moves it to 'running' as usual. On PostgreSQL the candidate row is locked
+with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent agents never wait on
+each other. Other databases (SQLite in tests and single-host setups) fall
+back to a conditional UPDATE that only succeeds for an unclaimed row.
+
+Rows are claimed in priority_at order (shortest expected job first with
+aging, see duration_estimates), falling back to queued_at for rows queued
+without one. The per-user cap and batch parallelism are applied by the
+claim query.
+Agents claiming at the same instant can each see the same counts, so under
+contention the caps may be exceeded by the number of agents.
+
+Agents refresh heartbeat_at on the rows they run, and their own row in
+agent_heartbeats whether busy or idle; a row whose heartbeat is older than
+EXECUTION_HEARTBEAT_TIMEOUT belongs to a dead agent and is failed.
+Heartbeats are written and compared with the database's clock, never the
+agents' or the API's, so clock skew between hosts cannot fail live runs.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+
+from models import db, AgentHeartbeat, Execution, ExecutionBatch
+from services.execution_scheduler import QueueFullError
+from services.output_store import append_message
+
+_executions = Execution.__table__
+_agents = AgentHeartbeat.__table__
+
+
+def db_now(offset_seconds: float = 0):
+    """
+    SQL expression for the database's current UTC time (naive, like the
+    timestamps the application writes), optionally offset_seconds earlier.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return func.datetime('now', f'-{float(offset_seconds)} seconds')
+    if dialect == 'postgresql':
+        now = func.timezone('utc', func.now())
+    elif dialect in ('mysql', 'mariadb'):
+        now = func.utc_timestamp()
+    else:
+        now = func.now()
+    return now - timedelta(seconds=offset_seconds) if offset_seconds else now
+
+
+def claim_execution(worker_id: str, max_per_user: int, attempts: int = 5) -> Optional[int]:
+    """
+    Claim the highest-priority queued execution that is below its caps.
+
+    Args:
+        worker_id: Name of the claiming agent, stored on the row
+        max_per_user: Claimed executions a user may have outside batches
+        attempts: Candidates tried when another agent wins the race (SQLite)
+
+    Returns:
+        ID of the claimed execution, or None if nothing is runnable
+    """
+    active = _executions.alias('active')
+    batches = ExecutionBatch.__table__
+    active_for_user = (
+        select(func.count()).select_from(active)
+        .where(active.c.user_id == _executions.c.user_id, active.c.batch_id.is_(None),
+               active.c.worker_id.isnot(None), active.c.status.in_(('queued', 'running')))
+        .scalar_subquery()
+    )
+    active_in_batch = (
+        select(func.count()).select_from(active)
+        .where(active.c.batch_id == _executions.c.batch_id,
+               active.c.worker_id.isnot(None), active.c.status.in_(('queued', 'running')))
+        .scalar_subquery()
+    )
+    batch_parallelism = (
+        select(batches.c.parallelism).where(batches.c.id == _executions.c.batch_id).scalar_subquery()
+    )
+    candidate = (
+        select(_executions.c.id)
+        .where(
+            _executions.c.status == 'queued',
+            _executions.c.worker_id.is_(None),
+            or_(
+                and_(_executions.c.batch_id.is_(None), active_for_user < max_per_user),
+                and_(_executions.c.batch_id.isnot(None), active_in_batch < batch_parallelism)
+            )
+        )
+        .order_by(func.coalesce(_executions.c.priority_at, _executions.c.queued_at).asc(),
+                  _executions.c.id.asc())
+        .limit(1)
+    )
+    if db.engine.dialect.name == 'postgresql':
+        candidate = candidate.with_for_update(skip_locked=True, of=_executions)
+
+    for _ in range(attempts):
+        execution_id = db.session.execute(candidate).scalar()
+        if execution_id is None:
+            db.session.commit()
+            return None
+        claimed = db.session.execute(
+            update(_executions)
+            .where(_executions.c.id == execution_id, _executions.c.status == 'queued',
+                   _executions.c.worker_id.is_(None))
+            .values(worker_id=worker_id, heartbeat_at=db_now())
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return execution_id
+    return None
+
+
+def heartbeat(worker_id: str, execution_ids: List[int]) -> List[int]:
+    """
+    Refresh the heartbeat of an agent and of its executions.
+
+    Returns:
+        IDs among them that a user asked to cancel
+    """
+    if not db.session.execute(
+        update(_agents).where(_agents.c.worker_id == worker_id).values(heartbeat_at=db_now())
+    ).rowcount:
+        db.session.execute(insert(_agents).values(worker_id=worker_id, heartbeat_at=db_now()))
+    if not execution_ids:
+        db.session.commit()
+        return []
+    return heartbeat_executions(worker_id, execution_ids)
+
+
+def heartbeat_executions(worker_id: str, execution_ids: Optional[List[int]] = None) -> List[int]:
+    """
+    Refresh the heartbeat of executions stamped with worker_id.
+
+    Args:
+        worker_id: Agent or API process the executions belong to
+        execution_ids: Executions to refresh (None: all of its queued and running ones)
+
+    Returns:
+        IDs among them that a user asked to cancel
+    """
+    owned = _executions.c.worker_id == worker_id
+    if execution_ids is None:
+        owned = and_(owned, _executions.c.status.in_(('queued', 'running')))
+    else:
+        owned = and_(owned, _executions.c.id.in_(execution_ids))
+    db.session.execute(update(_executions).where(owned).values(heartbeat_at=db_now()))
+    cancelled = db.session.execute(
+        select(_executions.c.id).where(owned, _executions.c.cancel_requested.is_(True))
+    ).scalars().all()
+    db.session.commit()
+    return list(cancelled)
+
+
+def reap_stale_executions(timeout_seconds: float) -> int:
+    """
+    Fail claimed executions whose agent stopped sending heartbeats, and
+    forget such agents.
+
+    Returns:
+        Number of executions failed
+    """
+    deadline = db_now(timeout_seconds)
+    db.session.execute(delete(_agents).where(_agents.c.heartbeat_at < deadline))
+    stale = Execution.query.filter(
+        Execution.worker_id.isnot(None),
+        Execution.status.in_(('queued', 'running')),
+        Execution.heartbeat_at < deadline
+    ).all()
+    for execution in stale:
+        execution.status = 'failed'
+        execution.completed_at = datetime.utcnow()
+        append_message(execution, 'stderr', f'Execution agent {execution.worker_id} stopped responding')
+    db.session.commit()
+    return len(stale)
+
+
+class DatabaseExecutionQueue:
+    """API-side view of the execution rows waiting for an agent."""
+
+    runs_locally = False
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        max_per_user: int = 2,
+        max_queue_size: int = 100,
+        retry_after: int = 5,
+        max_batch_size: int = 1000,
+        heartbeat_timeout: float = 60
+    ):
+        """
+        Initialize queue.
+
+        Args:
+            max_concurrency: Upper bound for a batch's parallelism
+            max_per_user: Claimed executions a user may have outside batches
+            max_queue_size: Unclaimed executions before new work is rejected
+            retry_after: Seconds suggested to clients when the queue is full
+            max_batch_size: Number of executions a single batch may contain
+            heartbeat_timeout: Seconds without a heartbeat before a claimed run is failed
+        """
+        self.max_concurrency = max_concurrency
+        self.max_per_user = max_per_user
+        self.max_queue_size = max_queue_size
+        self.retry_after = retry_after
+        self.max_batch_size = max_batch_size
+        self.heartbeat_timeout = heartbeat_timeout
+
+    def init_app(self, app):
+        """Read limits from the application config and register as its execution queue."""
+        self.max_concurrency = app.config.get('EXECUTION_MAX_CONCURRENCY', self.max_concurrency)
+        self.max_per_user = app.config.get('EXECUTION_MAX_PER_USER', self.max_per_user)
+        self.max_queue_size = app.config.get('EXECUTION_MAX_QUEUE', self.max_queue_size)
+        self.retry_after = app.config.get('EXECUTION_RETRY_AFTER', self.retry_after)
+        self.max_batch_size = app.config.get('EXECUTION_MAX_BATCH_SIZE', self.max_batch_size)
+        self.heartbeat_timeout = app.config.get('EXECUTION_HEARTBEAT_TIMEOUT', self.heartbeat_timeout)
+        app.extensions['execution_queue'] = self
+
+    def _waiting(self):
+        """Filter for executions no agent has claimed yet."""
+        return and_(Execution.status == 'queued', Execution.worker_id.is_(None))
+
+    def owner_fields(self) -> Dict:
+        """New rows are left unclaimed for the agents."""
+        return {}
+
+    def check_capacity(self, count: int = 1):
+        """Raise QueueFullError if count new executions would exceed the queue size."""
+        if Execution.query.filter(self._waiting()).count() + count > self.max_queue_size:
+            raise QueueFullError(self.retry_after)
+
+    def submit(self, execution_id: int, user_id: int, force: bool = False,
+               priority: Optional[float] = None) -> int:
+        """
+        Accept a committed 'queued' execution; agents pick it up from the table
+        in priority_at order, so priority is not needed here.
+
+        Returns:
+            1-based position of the execution in the queue
+
+        Raises:
+            QueueFullError: If the queue was already full
+        """
+        if not force and Execution.query.filter(self._waiting()).count() > self.max_queue_size:
+            raise QueueFullError(self.retry_after)
+        return self.queue_position(execution_id) or 1
+
+    def submit_batch(self, execution_ids: List[int], user_id: int, batch_id: int,
+                     parallelism: int, force: bool = False, priority: Optional[float] = None) -> int:
+        """
+        Accept the committed children of a batch.
+
+        Returns:
+            Queue length after the batch was added
+
+        Raises:
+            QueueFullError: If the children do not all fit in the queue
+        """
+        waiting = Execution.query.filter(self._waiting()).count()
+        if not force and waiting > self.max_queue_size:
+            raise QueueFullError(self.retry_after)
+        return waiting
+
+    def remove(self, execution_id: int) -> bool:
+        """Withdraw an unclaimed execution (marking it cancelled). Returns True if no agent had it."""
+        withdrawn = db.session.execute(
+            update(_executions)
+            .where(_executions.c.id == execution_id, _executions.c.status == 'queued',
+                   _executions.c.worker_id.is_(None))
+            .values(status='cancelled')
+        ).rowcount
+        db.session.commit()
+        return bool(withdrawn)
+
+    def queue_position(self, execution_id: int) -> Optional[int]:
+        """Return the 1-based position of an unclaimed execution, or None."""
+        execution = db.session.get(Execution, execution_id)
+        if execution is None or execution.status != 'queued' or execution.worker_id:
+            return None
+        order_key = func.coalesce(Execution.priority_at, Execution.queued_at)
+        own_key = execution.priority_at or execution.queued_at
+        ahead = Execution.query.filter(
+            self._waiting(),
+            or_(order_key < own_key, and_(order_key == own_key, Execution.id < execution.id))
+        ).count()
+        return ahead + 1
+
+    def queue_positions(self, execution_ids: List[int]) -> Dict[int, int]:
+        """Return the 1-based positions of those executions no agent has claimed, in one query."""
+        if not execution_ids:
+            return {}
+        ranked = select(
+            Execution.id,
+            func.row_number().over(
+                order_by=(func.coalesce(Execution.priority_at, Execution.queued_at), Execution.id)
+            ).label('position')
+        ).where(self._waiting()).subquery()
+        rows = db.session.execute(
+            select(ranked.c.id, ranked.c.position).where(ranked.c.id.in_(execution_ids))
+        )
+        return dict(rows.all())
+
+    def recover(self):
+        """Fail runs of agents that died while the API was down; queued rows need no action."""
+        reap_stale_executions(self.heartbeat_timeout)
+
+    def stats(self) -> Dict:
+        """Return queued and running counts, live agents (busy or idle) and configured limits."""
+        agents = db.session.query(func.count(AgentHeartbeat.worker_id)).filter(
+            AgentHeartbeat.heartbeat_at >= db_now(self.heartbeat_timeout)
+        ).scalar()
+        return {
+            'queued': Execution.query.filter(Execution.status == 'queued').count(),
+            'running': Execution.query.filter(Execution.status == 'running').count(),
+            'max_concurrency': self.max_concurrency,
+            'max_per_user': self.max_per_user,
+            'max_queue_size': self.max_queue_size,
+            'batches': db.session.query(func.count(func.distinct(Execution.batch_id))).filter(
+                Execution.batch_id.isnot(None), Execution.status.in_(('queued', 'running'))
+            ).scalar(),
+            'agents': agents
+        }
+
+    def shutdown(self):
+        """Nothing runs in the API process."""
+
+
+database_queue = DatabaseExecutionQueue()
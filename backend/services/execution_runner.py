@@ -0,0 +1,187 @@
+"""
+Background execution of queued scripts.
+
+Everything needed to run an execution is loaded from its database row, so a
+queued execution can be resumed by any worker after a restart. Output is
+appended to the chunk store as it is produced rather than held in memory.
+"""
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func, update
+from models import db, Script, Execution
+from services.powershell_executor import PowerShellExecutor
+from services.powershell_pool import get_worker_pool
+from services.process_supervisor import get_process_supervisor
+from services.script_verdicts import get_script_verdict
+from services.output_stream import streamer
+from services.output_store import open_writer, discard_output, finalize_output, is_finalized
+from services.process_registry import process_registry
+from services.resource_limits import ResourceLimits
+from services.result_cache import result_cache, cache_key
+from services.execution_coalescer import coalescer, mark_followers_running, mirror_leader
+from services.duration_estimates import record_duration
+from services.execution_queue import db_now
+from services.execution_scheduler import scheduler, get_execution_queue
+from services.module_preload import normalize_modules
+
+
+def run_execution(execution_id: int):
+    """
+    Run a queued execution to completion and persist its result.
+
+    Args:
+        execution_id: ID of an Execution row in the 'queued' state
+    """
+    execution = Execution.query.get(execution_id)
+    if not execution:
+        return
+
+    if coalescer.is_abandoned(execution_id):
+        # An abandoned coalescing leader is already 'cancelled' but still runs for its followers
+        execution.started_at = datetime.utcnow()
+        db.session.commit()
+    else:
+        # Start only a still-queued row, atomically, so an execution queued by
+        # two processes (or claimed twice) runs once
+        started = db.session.execute(
+            update(Execution.__table__)
+            .where(Execution.id == execution_id, Execution.status == 'queued')
+            .values(status='running', started_at=datetime.utcnow(), heartbeat_at=db_now(),
+                    worker_id=func.coalesce(Execution.worker_id, scheduler.worker_id))
+        ).rowcount
+        db.session.commit()
+        if not started:
+            return
+        db.session.refresh(execution)
+    run_status = None
+
+    # Key of the content about to run: the script may be edited during the run
+    # (not cached when run by an agent, whose cache the API never reads)
+    cache_ttl = execution.script.cache_ttl_seconds if get_execution_queue().runs_locally else None
+    result_key = cache_key(execution.script, execution.parameters) if cache_ttl else None
+
+    process_registry.track(execution_id)
+    if execution.cancel_requested:
+        # Cancelled through the API after an agent claimed it
+        process_registry.cancel(execution_id)
+    streamer.open(execution_id)
+    streamer.publish_status(execution_id, 'running', started_at=execution.started_at.isoformat())
+    mark_followers_running(execution, coalescer.followers(execution_id))
+    writer = open_writer(execution_id, current_app.config)
+
+    def on_output(stream_name, lines):
+        writer.write_lines(stream_name, lines)
+        streamer.publish_lines(execution_id, lines, stream_name)
+
+    try:
+        # Disable restrictions for admin users
+        exec_instance = PowerShellExecutor(
+            enable_restrictions=(execution.user.role != 'admin'),
+            pwsh_version=execution.script.pwsh_version
+        )
+        # Warm workers that already have the script's modules imported, if it declares any
+        modules = normalize_modules(execution.script.required_modules)
+        exec_instance.pool = get_worker_pool(exec_instance.pwsh_path, modules)
+        exec_instance.supervisor = get_process_supervisor()
+
+        validation = None
+        if exec_instance.enable_restrictions:
+            verdict = get_script_verdict(execution.script)
+            validation = (verdict.is_valid, verdict.issues or [])
+
+        result = exec_instance.execute(
+            script_content=execution.script.content,
+            parameters=execution.parameters,
+            timeout=execution.timeout_seconds or 300,
+            validation=validation,
+            batch_callback=on_output,
+            retain_output=False,
+            on_process=lambda kill: process_registry.attach(execution_id, kill),
+            limits=ResourceLimits.from_dict(execution.script.resource_limits),
+            required_modules=modules
+        )
+        if process_registry.release(execution_id):
+            # Killed on request; whatever the executor reported is a side effect
+            result = {**result, 'status': 'cancelled', 'output': '',
+                      'error_output': 'Execution cancelled'}
+
+        # Messages the executor produced itself (timeouts, validation failures)
+        if result['output']:
+            writer.write('stdout', result['output'])
+        if result['error_output']:
+            writer.write('stderr', result['error_output'])
+        writer.close()
+        finalize_output(execution_id, writer)
+        db.session.expire(execution, ['stdout_blob_id', 'stderr_blob_id'])
+
+        # Update execution record (an abandoned leader stays cancelled for its caller)
+        run_status = result['status']
+        if not coalescer.is_abandoned(execution_id):
+            execution.status = run_status
+        execution.exit_code = result['exit_code']
+        execution.completed_at = datetime.utcnow()
+        execution.duration_seconds = result['duration_seconds']
+        execution.module_import_seconds = result.get('module_import_seconds')
+        for field, value in (result.get('resource_usage') or {}).items():
+            setattr(execution, field, value)
+
+        # Update script execution count and runtime estimate
+        script_record = Script.query.get(execution.script_id)
+        script_record.execution_count += 1
+        if run_status == 'completed':
+            record_duration(script_record, execution.duration_seconds)
+
+        db.session.commit()
+
+        # Remember successful runs of idempotent scripts
+        if result_key and run_status == 'completed' and execution.exit_code == 0 and is_finalized(execution):
+            result_cache.put(result_key, execution_id, cache_ttl)
+
+    except Exception as e:
+        # Handle execution errors; streams already moved into blobs are left
+        # alone, the error follows them as a chunk of the execution's own
+        db.session.rollback()
+        run_status = 'failed'
+        try:
+            writer.write('stderr', str(e))
+            writer.close()
+            finalize_output(execution_id, writer)
+        except Exception:
+            current_app.logger.exception('Could not store the error of execution %s', execution_id)
+        try:
+            execution = Execution.query.get(execution_id)
+            if execution:
+                if not coalescer.is_abandoned(execution_id):
+                    execution.status = run_status
+                execution.completed_at = datetime.utcnow()
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception('Could not mark execution %s failed', execution_id)
+
+    finally:
+        try:
+            process_registry.release(execution_id)
+            execution = Execution.query.get(execution_id)
+            followers = coalescer.finish(execution_id)
+            if execution is None:
+                # Deleted during the run: drop what its writer stored since, and
+                # finish its followers without output to share
+                discard_output(execution_id)
+                db.session.commit()
+                mirror_leader(Execution(id=execution_id), followers,
+                              message=f'Execution {execution_id} was deleted', status='failed')
+            else:
+                mirror_leader(execution, followers, status=run_status)
+                streamer.publish_status(
+                    execution_id,
+                    execution.status,
+                    exit_code=execution.exit_code,
+                    duration_seconds=execution.duration_seconds
+                )
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception('Could not finish execution %s', execution_id)
+        finally:
+            streamer.close(execution_id)
+            db.session.remove()
@@ -0,0 +1,514 @@
+"""
+Bounded execution scheduler.
+
+Replaces the thread-per-request model with a fixed set of worker threads fed
+from a queue. The queue is backed by Execution rows in the 'queued' state, so
+pending work survives a restart, and it enforces a global concurrency cap, a
+per-user cap and a maximum queue length beyond which new work is rejected.
+
+Jobs are taken shortest-expected-first: each carries a priority (its
+priority_at timestamp, see duration_estimates) that combines the script's
+estimated runtime with aging, and the runnable job with the lowest priority
+runs next. Jobs submitted without one are ordered by submission time. The
+queue is kept sorted as jobs come and go, so picking the next job and
+reporting positions never sorts it.
+
+Children of an execution batch (one script fanned out over many parameter
+sets) are limited by the batch's own parallelism instead of the per-user
+cap, so a large fan-out keeps every slot it is allowed busy.
+
+Several API processes may share the database. Each stamps the rows it
+queues with its own worker_id and refreshes their heartbeat_at like an
+execution agent (see execution_queue). recover() and the heartbeat only take
+over queued rows whose process stopped heartbeating and fail its runs, never
+those of live processes; the runner starts a row with a conditional UPDATE,
+so an execution runs once even if two processes queued it.
+
+With EXECUTION_AGENTS enabled, scripts run in separate agent processes
+instead and the API uses the database queue (see execution_queue); routes
+get whichever is active from get_execution_queue().
+"""
+import bisect
+import itertools
+import os
+import secrets
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import current_app
+
+from services.process_registry import process_registry
+
+
+def default_worker_id() -> str:
+    """Name a process after its host and process ID."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class QueueFullError(Exception):
+    """Raised when the execution queue cannot accept more work."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Execution queue is full")
+        self.retry_after = retry_after
+
+
+class ExecutionScheduler:
+    """Fixed-size worker pool draining a priority queue of execution IDs."""
+
+    runs_locally = True
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        max_per_user: int = 2,
+        max_queue_size: int = 100,
+        retry_after: int = 5,
+        max_batch_size: int = 1000,
+        heartbeat_interval: float = 10,
+        heartbeat_timeout: float = 60
+    ):
+        """
+        Initialize scheduler.
+
+        Args:
+            max_concurrency: Number of executions allowed to run at once
+            max_per_user: Number of executions a single user may run at once
+            max_queue_size: Number of queued executions before new work is rejected
+            retry_after: Seconds suggested to clients when the queue is full
+            max_batch_size: Number of executions a single batch may contain
+            heartbeat_interval: Seconds between heartbeats of the running executions
+            heartbeat_timeout: Seconds without a heartbeat before a run is
+                considered abandoned by its process
+        """
+        self.max_concurrency = max_concurrency
+        self.max_per_user = max_per_user
+        self.max_queue_size = max_queue_size
+        self.retry_after = retry_after
+        self.max_batch_size = max_batch_size
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        # Unique per process start, so a restarted process never inherits old runs
+        self.worker_id = f'{default_worker_id()}:{secrets.token_hex(3)}'
+
+        self.app = None
+        self.runner: Optional[Callable[[int], None]] = None
+
+        # execution_id -> user_id of queued jobs, and (priority, sequence,
+        # execution_id) entries kept sorted, ties in submission order
+        self._queue: Dict[int, int] = {}
+        self._order: List[Tuple[float, int, int]] = []
+        self._entries: Dict[int, Tuple[float, int, int]] = {}
+        self._sequence = itertools.count()
+        self._running: Dict[int, int] = {}
+        self._running_per_user: Dict[int, int] = {}
+        # Batch children: execution_id -> batch_id, and per batch its
+        # parallelism, running count and unfinished (queued + running) count
+        self._batch_of: Dict[int, int] = {}
+        self._batch_parallelism: Dict[int, int] = {}
+        self._running_per_batch: Dict[int, int] = {}
+        self._batch_pending: Dict[int, int] = {}
+        self._cond = threading.Condition()
+        self._workers = []
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def init_app(self, app, runner: Callable[[int], None]):
+        """
+        Bind the scheduler to an application.
+
+        Args:
+            app: Flask application; an app context is pushed around each run
+            runner: Callable that executes one execution ID to completion
+        """
+        self.app = app
+        self.runner = runner
+        self.max_concurrency = app.config.get('EXECUTION_MAX_CONCURRENCY', self.max_concurrency)
+        self.max_per_user = app.config.get('EXECUTION_MAX_PER_USER', self.max_per_user)
+        self.max_queue_size = app.config.get('EXECUTION_MAX_QUEUE', self.max_queue_size)
+        self.retry_after = app.config.get('EXECUTION_RETRY_AFTER', self.retry_after)
+        self.max_batch_size = app.config.get('EXECUTION_MAX_BATCH_SIZE', self.max_batch_size)
+        self.heartbeat_interval = app.config.get('EXECUTION_HEARTBEAT_INTERVAL', self.heartbeat_interval)
+        self.heartbeat_timeout = app.config.get('EXECUTION_HEARTBEAT_TIMEOUT', self.heartbeat_timeout)
+        app.extensions['execution_scheduler'] = self
+        app.extensions['execution_queue'] = self
+
+    def _ensure_workers(self):
+        """Start worker threads on first use (caller holds the lock)."""
+        self._workers = [w for w in self._workers if w.is_alive()]
+        while len(self._workers) < self.max_concurrency:
+            worker = threading.Thread(
+                target=self._worker_loop,
+                name=f'execution-worker-{len(self._workers)}',
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+        if self._heartbeat_thread is None or not self._heartbeat_thread.is_alive():
+            self._heartbeat_thread = threading.Thread(
+                target=self._heartbeat_loop, name='execution-heartbeat', daemon=True
+            )
+            self._heartbeat_thread.start()
+
+    def check_capacity(self, count: int = 1):
+        """
+        Raise QueueFullError if count new executions would exceed the queue size.
+
+        Lets routes shed load before creating Execution rows.
+        """
+        with self._cond:
+            if len(self._queue) + count > self.max_queue_size:
+                raise QueueFullError(self.retry_after)
+
+    def submit(self, execution_id: int, user_id: int, force: bool = False,
+               priority: Optional[float] = None) -> int:
+        """
+        Queue an execution.
+
+        Args:
+            execution_id: ID of an Execution row in the 'queued' state
+            user_id: Owner of the execution, used for the per-user cap
+            force: Accept even if the queue is full (used for recovery)
+            priority: Order key, lower runs first (default: now, i.e. FIFO)
+
+        Returns:
+            1-based position of the execution in the queue
+
+        Raises:
+            QueueFullError: If the queue is full
+        """
+        with self._cond:
+            if not force and len(self._queue) >= self.max_queue_size:
+                raise QueueFullError(self.retry_after)
+            self._enqueue(execution_id, user_id, time.time() if priority is None else priority)
+            self._ensure_workers()
+            self._cond.notify_all()
+            return self._position(execution_id)
+
+    def submit_batch(self, execution_ids: List[int], user_id: int, batch_id: int,
+                     parallelism: int, force: bool = False, priority: Optional[float] = None) -> int:
+        """
+        Queue the children of an execution batch.
+
+        A batch is accepted as a whole once it fits max_batch_size (checked by
+        the caller) and every child fits in the queue; no child is queued
+        otherwise.
+
+        Args:
+            execution_ids: IDs of the batch's Execution rows, in run order
+            user_id: Owner of the batch
+            batch_id: ID of the ExecutionBatch row
+            parallelism: Number of the batch's executions allowed to run at once
+            force: Accept even if the queue is full (used for recovery)
+            priority: Order key shared by the children (default: now)
+
+        Returns:
+            Queue length after the batch was added
+
+        Raises:
+            QueueFullError: If the children do not all fit in the queue
+        """
+        with self._cond:
+            if not force and len(self._queue) + len(execution_ids) > self.max_queue_size:
+                raise QueueFullError(self.retry_after)
+            self._batch_parallelism[batch_id] = max(1, parallelism)
+            self._batch_pending[batch_id] = self._batch_pending.get(batch_id, 0) + len(execution_ids)
+            if priority is None:
+                priority = time.time()
+            for execution_id in execution_ids:
+                self._enqueue(execution_id, user_id, priority)
+                self._batch_of[execution_id] = batch_id
+            self._ensure_workers()
+            self._cond.notify_all()
+            return len(self._queue)
+
+    def remove(self, execution_id: int) -> bool:
+        """Drop a queued execution. Returns True if it was still queued."""
+        with self._cond:
+            if execution_id not in self._queue:
+                return False
+            self._dequeue(execution_id)
+            self._release_batch_slot(execution_id)
+            return True
+
+    def _enqueue(self, execution_id: int, user_id: int, priority: float):
+        """Insert a job at its place in the sorted queue (lock held)."""
+        if execution_id in self._queue:
+            self._dequeue(execution_id)
+        entry = (priority, next(self._sequence), execution_id)
+        bisect.insort(self._order, entry)
+        self._entries[execution_id] = entry
+        self._queue[execution_id] = user_id
+
+    def _dequeue(self, execution_id: int):
+        """Take a job out of the sorted queue (lock held)."""
+        entry = self._entries.pop(execution_id)
+        del self._order[bisect.bisect_left(self._order, entry)]
+        del self._queue[execution_id]
+
+    def _position(self, execution_id: int) -> int:
+        """1-based position of a queued job (lock held)."""
+        return bisect.bisect_left(self._order, self._entries[execution_id]) + 1
+
+    def _release_batch_slot(self, execution_id: int):
+        """Forget a finished or withdrawn batch child (lock held)."""
+        batch_id = self._batch_of.pop(execution_id, None)
+        if batch_id is None:
+            return
+        remaining = self._batch_pending.get(batch_id, 1) - 1
+        if remaining:
+            self._batch_pending[batch_id] = remaining
+        else:
+            self._batch_pending.pop(batch_id, None)
+            self._batch_parallelism.pop(batch_id, None)
+
+    def queue_position(self, execution_id: int) -> Optional[int]:
+        """Return the 1-based queue position of an execution, or None."""
+        with self._cond:
+            if execution_id not in self._queue:
+                return None
+            return self._position(execution_id)
+
+    def queue_positions(self, execution_ids: List[int]) -> Dict[int, int]:
+        """Return the 1-based queue positions of those executions that are queued."""
+        wanted = set(execution_ids)
+        if not wanted:
+            return {}
+        with self._cond:
+            return {
+                execution_id: self._position(execution_id)
+                for execution_id in wanted if execution_id in self._queue
+            }
+
+    def _next_job(self):
+        """
+        Pop the highest-priority job below its cap (lock held): the batch's
+        parallelism for batch children, the per-user cap otherwise.
+        """
+        for _, _, execution_id in self._order:
+            user_id = self._queue[execution_id]
+            batch_id = self._batch_of.get(execution_id)
+            if batch_id is not None:
+                runnable = self._running_per_batch.get(batch_id, 0) < self._batch_parallelism[batch_id]
+            else:
+                runnable = self._running_per_user.get(user_id, 0) < self.max_per_user
+            if runnable:
+                self._dequeue(execution_id)
+                return execution_id, user_id
+        return None
+
+    def _mark_running(self, execution_id: int, user_id: int):
+        """Count a job against its caps (lock held)."""
+        self._running[execution_id] = user_id
+        batch_id = self._batch_of.get(execution_id)
+        if batch_id is not None:
+            self._running_per_batch[batch_id] = self._running_per_batch.get(batch_id, 0) + 1
+        else:
+            self._running_per_user[user_id] = self._running_per_user.get(user_id, 0) + 1
+
+    def _mark_finished(self, execution_id: int, user_id: int):
+        """Release a job's slots (lock held)."""
+        self._running.pop(execution_id, None)
+        batch_id = self._batch_of.get(execution_id)
+        if batch_id is not None:
+            remaining = self._running_per_batch.get(batch_id, 1) - 1
+            if remaining:
+                self._running_per_batch[batch_id] = remaining
+            else:
+                self._running_per_batch.pop(batch_id, None)
+            self._release_batch_slot(execution_id)
+            return
+        remaining = self._running_per_user.get(user_id, 1) - 1
+        if remaining:
+            self._running_per_user[user_id] = remaining
+        else:
+            self._running_per_user.pop(user_id, None)
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                job = None
+                while not self._stopping:
+                    job = self._next_job()
+                    if job:
+                        break
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                execution_id, user_id = job
+                self._mark_running(execution_id, user_id)
+                # Before the lock is released: once the job has left the queue a
+                # cancel finds it here and is applied when its process starts
+                process_registry.track(execution_id)
+
+            try:
+                with self.app.app_context():
+                    self.runner(execution_id)
+            except Exception:
+                self.app.logger.exception('Runner of execution %s failed', execution_id)
+            finally:
+                process_registry.release(execution_id)
+                with self._cond:
+                    self._mark_finished(execution_id, user_id)
+                    self._cond.notify_all()
+
+    def owner_fields(self) -> Dict:
+        """
+        Columns stamping a new execution row as queued in this process, so it
+        is heartbeated by it and no other process recovers it while it lives.
+        """
+        from services.execution_queue import db_now
+        return {'worker_id': self.worker_id, 'heartbeat_at': db_now()}
+
+    def beat(self):
+        """
+        Refresh the heartbeat of this process's executions, apply cancel
+        requests made through other processes, take over the queued
+        executions of processes that stopped and fail their runs.
+
+        Only executions actually queued or running here are refreshed, so a
+        row left behind by a crashed runner goes stale and is failed.
+        """
+        from models import db
+        from services.execution_queue import heartbeat_executions, reap_stale_executions
+
+        with self._cond:
+            execution_ids = list(self._queue)
+        execution_ids += process_registry.running()
+        with self.app.app_context():
+            try:
+                for execution_id in heartbeat_executions(self.worker_id, execution_ids):
+                    process_registry.cancel(execution_id)
+                adopted = self._adopt_queued(unowned=False)
+                reap_stale_executions(self.heartbeat_timeout)
+                self._requeue(adopted)
+            finally:
+                db.session.remove()
+
+    def _heartbeat_loop(self):
+        while True:
+            with self._cond:
+                if self._stopping or self._cond.wait_for(lambda: self._stopping, self.heartbeat_interval):
+                    return
+            try:
+                self.beat()
+            except Exception:
+                self.app.logger.exception('Execution heartbeat failed')
+
+    def _adopt_queued(self, unowned: bool) -> List[int]:
+        """
+        Stamp with this process the queued executions whose process stopped
+        heartbeating (and, with unowned, those no process owns).
+
+        Each row is taken with a conditional UPDATE, so when several
+        processes look at once every execution goes to exactly one of them.
+
+        Returns:
+            IDs of the executions taken over
+        """
+        from sqlalchemy import and_, or_, select, update
+        from models import db, Execution
+        from services.execution_queue import db_now
+
+        abandoned = and_(Execution.worker_id.isnot(None),
+                         Execution.heartbeat_at < db_now(self.heartbeat_timeout))
+        orphaned = or_(abandoned, Execution.worker_id.is_(None)) if unowned else abandoned
+        candidates = db.session.execute(
+            select(Execution.id).where(Execution.status == 'queued', orphaned)
+        ).scalars().all()
+        adopted = [
+            execution_id for execution_id in candidates
+            if db.session.execute(
+                update(Execution.__table__)
+                .where(Execution.id == execution_id, Execution.status == 'queued', orphaned)
+                .values(worker_id=self.worker_id, heartbeat_at=db_now())
+            ).rowcount
+        ]
+        db.session.commit()
+        return adopted
+
+    def _requeue(self, execution_ids: List[int]):
+        """Queue persisted executions in submission order, batch children per batch."""
+        from models import db, Execution, ExecutionBatch
+        from services.duration_estimates import queue_priority
+
+        if not execution_ids:
+            return
+        queued = Execution.query.filter(Execution.id.in_(execution_ids)).order_by(
+            Execution.queued_at.asc(), Execution.id.asc()
+        ).all()
+        batches: "OrderedDict[int, List[Execution]]" = OrderedDict()
+        for execution in queued:
+            if execution.batch_id:
+                batches.setdefault(execution.batch_id, []).append(execution)
+            else:
+                self.submit(execution.id, execution.user_id, force=True,
+                            priority=queue_priority(execution.priority_at))
+        for batch_id, children in batches.items():
+            batch = db.session.get(ExecutionBatch, batch_id)
+            if batch is None:
+                # Batch record gone: run what is left as ordinary executions
+                for child in children:
+                    self.submit(child.id, child.user_id, force=True, priority=queue_priority(child.priority_at))
+                continue
+            self.submit_batch([child.id for child in children], batch.user_id, batch_id, batch.parallelism,
+                              force=True, priority=queue_priority(children[0].priority_at))
+
+    def recover(self):
+        """
+        Take over the queued executions no live process owns and fail the
+        runs no live process heartbeats any more.
+
+        Executions of other API processes are left alone: they are stamped
+        with their process's worker_id from the moment they are queued, and
+        only taken over (queued) or failed (running) once its heartbeat is
+        older than heartbeat_timeout. Must be called inside an application
+        context.
+        """
+        from datetime import datetime
+        from models import db, Execution
+        from services.output_store import append_message
+        from services.execution_queue import reap_stale_executions
+
+        adopted = self._adopt_queued(unowned=True)
+        reap_stale_executions(self.heartbeat_timeout)
+        # Runs never stamped with a process cannot be heartbeating
+        interrupted = Execution.query.filter(
+            Execution.status == 'running', Execution.worker_id.is_(None)
+        ).all()
+        for execution in interrupted:
+            execution.status = 'failed'
+            append_message(execution, 'stderr', 'Execution interrupted by server restart')
+            execution.completed_at = datetime.utcnow()
+        db.session.commit()
+
+        self._requeue(adopted)
+
+    def stats(self) -> Dict:
+        """Return queue length, running count and configured limits."""
+        with self._cond:
+            return {
+                'queued': len(self._queue),
+                'running': len(self._running),
+                'max_concurrency': self.max_concurrency,
+                'max_per_user': self.max_per_user,
+                'max_queue_size': self.max_queue_size,
+                'batches': len(self._batch_pending)
+            }
+
+    def shutdown(self):
+        """Stop worker threads once their current execution finishes."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+
+scheduler = ExecutionScheduler()
+
+
+def get_execution_queue():
+    """Return the current application's execution queue (the scheduler unless agents run executions)."""
+    return current_app.extensions.get('execution_queue', scheduler)
@@ -0,0 +1,146 @@
+"""
+Cached category list and facet counts.
+
+Categories and tag/category facets are read on every script list page load
+but only change when a script is written. They are kept in memory, keyed by
+what they are scoped to (the user for facets), and recomputed on a miss.
+
+The script routes invalidate the cache in the same transaction as their
+write: the local entries are dropped and the 'script_facets' row of
+cache_versions is bumped. Every process compares its cached version with
+that row at most every FACET_CACHE_CHECK_INTERVAL seconds and drops its
+entries when another process has bumped it, so other workers serve stale
+counts for at most that long after a write.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, CacheVersion
+
+VERSION_NAME = 'script_facets'
+
+
+class FacetCache:
+    """LRU map of facet keys to computed results, invalidated through a database version counter."""
+
+    def __init__(self, max_entries: int = 1024, check_interval: float = 1.0):
+        """
+        Initialize cache.
+
+        Args:
+            max_entries: Results kept before the least recently used is evicted
+            check_interval: Seconds between reads of the shared version counter
+        """
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+        self._entries: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        # Bumped on every clear, so results computed before it are not stored
+        self._generation = 0
+        self.stats_counters = {
+            'hits': 0, 'misses': 0, 'evictions': 0,
+            'invalidations': 0, 'remote_invalidations': 0
+        }
+
+    def init_app(self, app):
+        """Read the cache size and version check interval from the application config."""
+        self.max_entries = app.config.get('FACET_CACHE_SIZE', self.max_entries)
+        self.check_interval = app.config.get('FACET_CACHE_CHECK_INTERVAL', self.check_interval)
+        app.extensions['facet_cache'] = self
+
+    def _drop_entries(self):
+        self._entries.clear()
+        self._generation += 1
+
+    def _sync(self):
+        """Drop the entries if the shared version moved since it was last read."""
+        now = time.monotonic()
+        with self._lock:
+            if self._version is not None and now - self._checked_at < self.check_interval:
+                return
+        version = db.session.execute(
+            select(CacheVersion.version).where(CacheVersion.name == VERSION_NAME)
+        ).scalar() or 0
+        with self._lock:
+            self._checked_at = now
+            if version != self._version:
+                if self._version is not None:
+                    self.stats_counters['remote_invalidations'] += 1
+                self._drop_entries()
+                self._version = version
+
+    def get(self, key: Hashable, compute: Callable[[], object]):
+        """
+        Return the result cached under key, computing and caching it on a miss.
+
+        Args:
+            key: Cache key, including whatever the result is scoped to
+            compute: Function producing the result from the database
+        """
+        self._sync()
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats_counters['hits'] += 1
+                return self._entries[key]
+            self.stats_counters['misses'] += 1
+            generation = self._generation
+
+        value = compute()
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = value
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.stats_counters['evictions'] += 1
+        return value
+
+    def invalidate(self):
+        """
+        Drop every entry and bump the shared version (through the session, not
+        committed), so other processes drop theirs once the write commits.
+        """
+        bump = update(CacheVersion).where(CacheVersion.name == VERSION_NAME).values(
+            version=CacheVersion.version + 1
+        )
+        if not db.session.execute(bump).rowcount:
+            # First write ever: create the row in a savepoint, so that losing
+            # the race to another first write only costs the savepoint
+            try:
+                with db.session.begin_nested():
+                    db.session.add(CacheVersion(name=VERSION_NAME, version=1))
+            except IntegrityError:
+                db.session.execute(bump)
+        with self._lock:
+            self._drop_entries()
+            # Re-read the counter on the next lookup rather than count our own bump as remote
+            self._version = None
+            self.stats_counters['invalidations'] += 1
+
+    def clear(self):
+        """Drop every entry without touching the shared version."""
+        with self._lock:
+            self._drop_entries()
+            self._version = None
+
+    def stats(self) -> Dict:
+        """Return entry count, capacity, counters, hit rate and the version last read."""
+        with self._lock:
+            lookups = self.stats_counters['hits'] + self.stats_counters['misses']
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                **self.stats_counters,
+                'hit_rate': round(self.stats_counters['hits'] / lookups, 3) if lookups else None,
+                'version': self._version
+            }
+
+
+facet_cache = FacetCache()
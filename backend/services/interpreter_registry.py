@@ -0,0 +1,175 @@
+"""
+Process-wide registry of installed PowerShell interpreters.
+
+Discovery and version probing spawn a pwsh process per installation, so they
+run once, lazily, on first use and the result is cached until refresh() is
+called. Importing the application therefore never starts pwsh, and a host
+without PowerShell only fails when a script is actually executed.
+"""
+import glob
+import os
+import shutil
+import subprocess
+import threading
+from typing import Dict, List, Optional
+
+
+PROBE_COMMAND = '$PSVersionTable.PSVersion.ToString(); $PSVersionTable.PSEdition'
+
+
+class InterpreterNotFoundError(RuntimeError):
+    """Raised when no (matching) PowerShell interpreter is installed."""
+
+
+class PowerShellInterpreter:
+    """An installed pwsh executable with its probed version and edition."""
+
+    def __init__(self, path: str, version: str, edition: str):
+        self.path = path
+        self.version = version
+        self.edition = edition
+
+    @property
+    def version_tuple(self) -> tuple:
+        """Numeric version for ordering (pre-release suffixes are ignored)."""
+        parts = []
+        for part in self.version.split('-')[0].split('.'):
+            parts.append(int(part) if part.isdigit() else 0)
+        return tuple(parts)
+
+    def matches(self, selector: str) -> bool:
+        """Return True if selector is this version or a dotted prefix of it ('7', '7.4')."""
+        return self.version == selector or self.version.startswith(selector + '.')
+
+    def to_dict(self) -> Dict:
+        """Convert interpreter to dictionary."""
+        return {
+            'path': self.path,
+            'version': self.version,
+            'edition': self.edition
+        }
+
+
+class InterpreterRegistry:
+    """Lazily discovers and caches installed pwsh interpreters."""
+
+    COMMANDS = ['pwsh', 'pwsh-preview', 'powershell']
+    SEARCH_GLOBS = [
+        '/opt/microsoft/powershell/*/pwsh',
+        '/usr/local/microsoft/powershell/*/pwsh',
+        r'C:\Program Files\PowerShell\*\pwsh.exe'
+    ]
+
+    def __init__(
+        self,
+        commands: Optional[List[str]] = None,
+        search_globs: Optional[List[str]] = None,
+        probe_timeout: int = 10
+    ):
+        """
+        Initialize registry (nothing is probed until first use).
+
+        Args:
+            commands: Command names resolved through PATH
+            search_globs: Glob patterns for side-by-side installations
+            probe_timeout: Seconds to wait for each version probe
+        """
+        self.commands = commands if commands is not None else list(self.COMMANDS)
+        self.search_globs = search_globs if search_globs is not None else list(self.SEARCH_GLOBS)
+        self.probe_timeout = probe_timeout
+        self._interpreters: Optional[List[PowerShellInterpreter]] = None
+        self._lock = threading.Lock()
+
+    def _candidate_paths(self) -> List[str]:
+        """Collect unique executable paths from PWSH_PATHS, PATH and install dirs."""
+        candidates = []
+        extra = os.getenv('PWSH_PATHS', '')
+        candidates.extend(p for p in extra.split(os.pathsep) if p)
+        for command in self.commands:
+            resolved = shutil.which(command)
+            if resolved:
+                candidates.append(resolved)
+        for pattern in self.search_globs:
+            candidates.extend(sorted(glob.glob(pattern)))
+
+        unique = []
+        seen = set()
+        for path in candidates:
+            real = os.path.realpath(path)
+            if real not in seen and os.access(real, os.X_OK):
+                seen.add(real)
+                unique.append(path)
+        return unique
+
+    def _probe(self, path: str) -> Optional[PowerShellInterpreter]:
+        """Run one pwsh process to read its version and edition."""
+        try:
+            result = subprocess.run(
+                [path, '-NoProfile', '-NonInteractive', '-Command', PROBE_COMMAND],
+                capture_output=True,
+                text=True,
+                timeout=self.probe_timeout
+            )
+        except (subprocess.SubprocessError, OSError):
+            return None
+
+        lines = [line.strip() for line in result.stdout.splitlines() if line.strip()]
+        if result.returncode != 0 or not lines:
+            return None
+        edition = lines[1] if len(lines) > 1 else 'Unknown'
+        return PowerShellInterpreter(path, lines[0], edition)
+
+    def _discover(self) -> List[PowerShellInterpreter]:
+        interpreters = []
+        for path in self._candidate_paths():
+            interpreter = self._probe(path)
+            if interpreter:
+                interpreters.append(interpreter)
+        interpreters.sort(key=lambda i: i.version_tuple, reverse=True)
+        return interpreters
+
+    def all(self) -> List[PowerShellInterpreter]:
+        """Return all installed interpreters, newest first (probes on first call)."""
+        with self._lock:
+            if self._interpreters is None:
+                self._interpreters = self._discover()
+            return list(self._interpreters)
+
+    def refresh(self) -> List[PowerShellInterpreter]:
+        """Forget cached results and probe again."""
+        with self._lock:
+            self._interpreters = self._discover()
+            return list(self._interpreters)
+
+    def get(self, version: Optional[str] = None) -> PowerShellInterpreter:
+        """
+        Select an interpreter.
+
+        Args:
+            version: Exact version or dotted prefix ('7', '7.4'); defaults to
+                     PWSH_DEFAULT_VERSION or the newest installed interpreter
+
+        Returns:
+            Matching PowerShellInterpreter
+
+        Raises:
+            InterpreterNotFoundError: If nothing installed matches
+        """
+        interpreters = self.all()
+        if not interpreters:
+            raise InterpreterNotFoundError("PowerShell Core (pwsh) not found. Please install PowerShell 7+")
+
+        selector = version or os.getenv('PWSH_DEFAULT_VERSION')
+        if not selector:
+            return interpreters[0]
+
+        for interpreter in interpreters:
+            if interpreter.matches(selector):
+                return interpreter
+
+        if version:
+            raise InterpreterNotFoundError(f"PowerShell version {version} is not installed")
+        return interpreters[0]
+
+
+registry = InterpreterRegistry()
@@ -0,0 +1,184 @@
+"""
+Required PowerShell modules of scripts.
+
+Scripts that spend most of their run in Import-Module (VMware.PowerCLI, Az)
+declare the modules in Script.required_modules. Pooled workers are then kept
+per module set (see powershell_pool): each runspace a worker opens imports the
+set while the worker is idle, so a run routed to a warm worker starts with its
+modules loaded. When no warm worker is free the pool starts a cold one, and
+runs outside the pool import the modules in a timed prologue instead.
+
+Either way the seconds a run spent waiting for its modules are reported as
+module_import_seconds (0 on a warm worker), apart from the run's duration.
+"""
+import re
+import secrets
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from models import Script
+from services.interpreter_registry import registry, InterpreterNotFoundError
+from services.powershell_pool import get_worker_pool, pool_enabled, retire_module_pools
+
+MODULE_NAME = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.\-]{0,127}$')
+MAX_MODULES = 20
+
+
+def validate_required_modules(modules) -> Tuple[bool, List[str]]:
+    """
+    Validate a script's required_modules list.
+
+    Returns:
+        Tuple of (is_valid, list_of_errors)
+    """
+    if modules is None:
+        return True, []
+    if not isinstance(modules, list):
+        return False, ['Required modules must be a list of module names']
+    if len(modules) > MAX_MODULES:
+        return False, [f'At most {MAX_MODULES} required modules are allowed']
+
+    errors = [
+        f"Invalid module name '{name}'" for name in modules
+        if not isinstance(name, str) or not MODULE_NAME.match(name)
+    ]
+    return len(errors) == 0, errors
+
+
+def normalize_modules(modules: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """Return a module set in canonical form: deduplicated ignoring case, sorted."""
+    unique = {}
+    for name in modules or ():
+        unique.setdefault(name.lower(), name)
+    return tuple(unique[key] for key in sorted(unique))
+
+
+def powershell_list(modules: Iterable[str]) -> str:
+    """Render module names as a PowerShell array literal body ('A', 'B')."""
+    return ', '.join("'" + name.replace("'", "''") + "'" for name in modules)
+
+
+class ModuleImportProbe:
+    """
+    Batch callback wrapper for runs outside the pool: a prologue imports the
+    modules and reports how long that took on a marker line, which is taken
+    out of the output.
+    """
+
+    def __init__(self, deliver: Optional[Callable[[str, List[str]], None]], retain_output: bool = True):
+        """
+        Initialize probe.
+
+        Args:
+            deliver: Batch callback receiving the script's own output
+            retain_output: Collect delivered lines for the result
+        """
+        self.deliver = deliver
+        self.retain_output = retain_output
+        self.seconds: Optional[float] = None
+        self.lines = {'stdout': [], 'stderr': []}
+        self._marker = f'{secrets.token_hex(8)} MODULES '
+        self._lock = threading.Lock()
+
+    def prologue(self, modules: Iterable[str]) -> str:
+        """PowerShell that imports modules and prints the marker line with the elapsed seconds."""
+        return (
+            "# Required modules\n"
+            "$__moduleTimer = [System.Diagnostics.Stopwatch]::StartNew()\n"
+            f"Import-Module -Name {powershell_list(modules)}\n"
+            f"[Console]::Out.WriteLine('{self._marker}' + "
+            "$__moduleTimer.Elapsed.TotalSeconds.ToString([cultureinfo]::InvariantCulture))\n"
+            "Remove-Variable __moduleTimer\n\n"
+        )
+
+    def __call__(self, stream_name: str, lines: List[str]):
+        if stream_name == 'stdout':
+            kept = []
+            for line in lines:
+                if line.startswith(self._marker) and self.seconds is None:
+                    try:
+                        self.seconds = float(line[len(self._marker):])
+                        continue
+                    except ValueError:
+                        pass
+                kept.append(line)
+            lines = kept
+        if not lines:
+            return
+        if self.retain_output:
+            with self._lock:
+                self.lines[stream_name].extend(lines)
+        if self.deliver:
+            self.deliver(stream_name, lines)
+
+    def apply(self, result: Dict) -> Dict:
+        """Merge retained output into an executor result and add module_import_seconds."""
+        output = '\n'.join(filter(None, ['\n'.join(self.lines['stdout']), result['output']]))
+        errors = '\n'.join(filter(None, ['\n'.join(self.lines['stderr']), result['error_output']]))
+        return {**result, 'output': output, 'error_output': errors, 'module_import_seconds': self.seconds}
+
+
+def preload_modules(pwsh_version: Optional[str], modules: Optional[Iterable[str]]) -> bool:
+    """
+    Start warming the worker pool for a module set in the background.
+
+    Args:
+        pwsh_version: Interpreter selector of the scripts using the set
+        modules: Module names (any order or case)
+
+    Returns:
+        True if a pool for the set exists or is being started
+    """
+    modules = normalize_modules(modules)
+    if not modules or not pool_enabled():
+        return False
+    try:
+        pwsh_path = registry.get(pwsh_version).path
+    except InterpreterNotFoundError:
+        return False
+    return get_worker_pool(pwsh_path, modules) is not None
+
+
+def declared_module_sets() -> Set[Tuple[Optional[str], Tuple[str, ...]]]:
+    """Return the (interpreter selector, module set) pairs scripts declare."""
+    return {
+        (pwsh_version, normalize_modules(modules))
+        for pwsh_version, modules in Script.query.with_entities(Script.pwsh_version, Script.required_modules)
+        if modules
+    }
+
+
+def preload_module_sets() -> int:
+    """
+    Warm a worker pool for every module set scripts declare (call at startup).
+
+    Returns:
+        Number of module set pools requested
+    """
+    if not pool_enabled():
+        return 0
+    declared = declared_module_sets()
+    retire_unused_module_pools(declared)
+    return sum(preload_modules(pwsh_version, modules) for pwsh_version, modules in declared)
+
+
+def retire_unused_module_pools(declared=None) -> int:
+    """
+    Shut down the idle pools of module sets no script declares any more
+    (call after a script's modules or interpreter changed, or it was deleted).
+
+    Args:
+        declared: Result of declared_module_sets(), if already at hand
+
+    Returns:
+        Number of pools shut down
+    """
+    if not pool_enabled():
+        return 0
+    keep = set()
+    for pwsh_version, modules in declared_module_sets() if declared is None else declared:
+        try:
+            keep.add((registry.get(pwsh_version).path, modules))
+        except InterpreterNotFoundError:
+            continue
+    return retire_module_pools(keep)
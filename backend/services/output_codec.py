@@ -0,0 +1,91 @@
+"""
+Transparent compression of stored execution output.
+
+Output text is stored in Text columns, so compressed values are base64
+encoded behind a format marker ('\\x1fzstd:' or '\\x1fzlib:'). Values without
+the marker are plain text, which keeps rows written before compression
+readable. zstd needs the zstandard package (in requirements.txt); a process
+without it writes zlib instead and cannot read zstd rows.
+"""
+import base64
+import zlib
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+MARKER = '\x1f'
+METHODS = ('zstd', 'zlib', 'none')
+
+
+class OutputCodec:
+    """Encodes output text for storage and decodes it on read."""
+
+    def __init__(self, method: str = 'zstd', min_size: int = 256, level: Optional[int] = None):
+        """
+        Initialize codec.
+
+        Args:
+            method: 'zstd' (falls back to zlib if zstandard is missing), 'zlib' or 'none'
+            min_size: Texts shorter than this many bytes are stored plain
+            level: Compression level (codec default when omitted)
+        """
+        self.min_size = min_size
+        self.level = level
+        self.method = self._resolve(method)
+
+    def init_app(self, app):
+        """Configure from OUTPUT_COMPRESSION and OUTPUT_COMPRESSION_MIN_BYTES."""
+        self.method = self._resolve(app.config.get('OUTPUT_COMPRESSION', self.method))
+        self.min_size = app.config.get('OUTPUT_COMPRESSION_MIN_BYTES', self.min_size)
+
+    @staticmethod
+    def _resolve(method: str) -> str:
+        if method not in METHODS:
+            raise ValueError(f"Unknown output compression '{method}', expected one of {METHODS}")
+        if method == 'zstd' and zstandard is None:
+            return 'zlib'
+        return method
+
+    def is_encoded(self, stored: Optional[str]) -> bool:
+        """Return whether a stored value carries a format marker."""
+        return bool(stored) and stored.startswith(MARKER)
+
+    def encode(self, text: Optional[str]) -> Optional[str]:
+        """Compress text for storage if that makes it smaller."""
+        if text is None:
+            return None
+        raw = text.encode('utf-8')
+        if self.method != 'none' and len(raw) >= self.min_size:
+            if self.method == 'zstd':
+                compressed = zstandard.ZstdCompressor(level=self.level or 3).compress(raw)
+            else:
+                compressed = zlib.compress(raw, self.level or 6)
+            stored = f'{MARKER}{self.method}:' + base64.b64encode(compressed).decode('ascii')
+            if len(stored) < len(raw):
+                return stored
+        if text.startswith(MARKER):
+            # Plain text that happens to start with the marker must not be misread
+            return f'{MARKER}raw:' + text
+        return text
+
+    def decode(self, stored: Optional[str]) -> Optional[str]:
+        """Return the original text of a stored value (plain or compressed)."""
+        if not self.is_encoded(stored):
+            return stored
+        method, _, payload = stored[1:].partition(':')
+        if method == 'raw':
+            return payload
+        data = base64.b64decode(payload)
+        if method == 'zlib':
+            return zlib.decompress(data).decode('utf-8')
+        if method == 'zstd':
+            if zstandard is None:
+                raise RuntimeError('Output is zstd-compressed but the zstandard package is not installed')
+            return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+        raise ValueError(f"Unknown output encoding '{method}'")
+
+
+codec = OutputCodec()
@@ -0,0 +1,142 @@
+"""
+Chunked reading of child process output.
+
+Instead of a text-mode readline() per line, output is read with large raw
+reads into a reusable buffer. Complete lines are decoded in one call per
+chunk and handed to the callback as a batch. A line never straddles a
+decode, since chunks are only decoded up to their last newline, so
+multi-byte characters are never split.
+"""
+from collections import deque
+from typing import Callable, List, Optional
+
+CHUNK_SIZE = 256 * 1024
+MAX_LINE = 1024 * 1024  # longer lines are delivered in pieces
+
+
+class LineSplitter:
+    """Turns a byte stream into batches of decoded, right-stripped lines."""
+
+    def __init__(self, max_line: int = MAX_LINE):
+        self.max_line = max_line
+        self._pending = bytearray()  # partial line carried between chunks
+
+    def feed(self, data, length: Optional[int] = None) -> List[str]:
+        """
+        Add raw bytes and return the lines they complete.
+
+        Args:
+            data: bytes or bytearray (a reusable read buffer is fine)
+            length: Number of valid bytes at the start of data (defaults to all)
+        """
+        length = len(data) if length is None else length
+        view = memoryview(data)[:length]
+        end = data.rfind(b'\n', 0, length)
+        if end < 0:
+            self._pending += view
+            if len(self._pending) < self.max_line:
+                return []
+            block, self._pending = self._pending, bytearray()
+            return [str(block, 'utf-8', 'replace').rstrip()]
+
+        if self._pending:
+            self._pending += view[:end]
+            text = str(self._pending, 'utf-8', 'replace')
+        else:
+            text = str(view[:end], 'utf-8', 'replace')  # decodes the buffer without a copy
+        self._pending = bytearray(view[end + 1:])
+        return [line.rstrip() for line in text.split('\n')]
+
+    def finish(self) -> List[str]:
+        """Return the final unterminated line, if any."""
+        if not self._pending:
+            return []
+        block, self._pending = self._pending, bytearray()
+        return [str(block, 'utf-8', 'replace').rstrip()]
+
+
+class LineBatchReader:
+    """Reads a binary file object to EOF, delivering lines in batches."""
+
+    def __init__(self, stream, on_batch: Callable[[List[str]], None],
+                 chunk_size: int = CHUNK_SIZE, max_line: int = MAX_LINE):
+        """
+        Initialize reader.
+
+        Args:
+            stream: Unbuffered binary file object (e.g. Popen(..., bufsize=0).stdout)
+            on_batch: Called with each non-empty list of lines
+            chunk_size: Bytes requested per read
+            max_line: Longest line buffered before it is delivered in pieces
+        """
+        self.stream = stream
+        self.on_batch = on_batch
+        self.chunk_size = chunk_size
+        self.splitter = LineSplitter(max_line)
+
+    def run(self):
+        """Read until EOF, then close the stream."""
+        buffer = bytearray(self.chunk_size)  # reused for every read
+        try:
+            while True:
+                count = self.stream.readinto(buffer)
+                if not count:
+                    break
+                lines = self.splitter.feed(buffer, count)
+                if lines:
+                    self.on_batch(lines)
+            lines = self.splitter.finish()
+            if lines:
+                self.on_batch(lines)
+        finally:
+            self.stream.close()
+
+
+def batch_from_line_callbacks(callback: Optional[Callable[[str], None]],
+                              error_callback: Optional[Callable[[str], None]]):
+    """
+    Adapt per-line stdout/stderr callbacks to a batch callback.
+
+    Returns:
+        Callable receiving ('stdout' | 'stderr', list of lines), or None when
+        neither callback is set
+    """
+    if callback is None and error_callback is None:
+        return None
+
+    def on_batch(stream_name: str, lines: List[str]):
+        line_callback = callback if stream_name == 'stdout' else error_callback
+        if line_callback:
+            for line in lines:
+                line_callback(line)
+    return on_batch
+
+
+class OutputTail:
+    """Ring buffer of the most recent lines, bounded by count and by bytes."""
+
+    def __init__(self, max_lines: int = 5000, max_bytes: int = 4 * 1024 * 1024):
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self._items = deque()
+        self._bytes = 0
+
+    def append(self, item, size: Optional[int] = None):
+        """Add an item of the given size (defaults to len(item)), evicting the oldest."""
+        size = len(item) if size is None else size
+        self._items.append((item, size))
+        self._bytes += size
+        while self._items and (len(self._items) > self.max_lines or self._bytes > self.max_bytes):
+            _, evicted = self._items.popleft()
+            self._bytes -= evicted
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self):
+        return (item for item, _ in self._items)
+
+    @property
+    def size_bytes(self) -> int:
+        """Total size of the buffered items."""
+        return self._bytes
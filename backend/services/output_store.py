@@ -0,0 +1,401 @@
+"""
+Append-only execution output store.
+
+While an execution runs, its output lines are buffered per stream and
+flushed to the execution_output_chunks table whenever the buffer reaches a
+size limit or a flush interval passes, so the memory used per run stays
+bounded and partial output is in the database if the worker dies. Chunks
+record their utf-8 byte position within the stream, so any byte range can be
+read back without loading the whole output. Chunk data is compressed by
+output_codec; positions and lengths always refer to the decompressed text.
+
+When an execution finishes, each of its streams is deduplicated by content
+hash: the chunks become a shared OutputBlob, or are dropped in favour of an
+identical existing blob whose reference count is raised. Deleting an
+execution releases its references and removes blobs nobody references.
+"""
+import hashlib
+import threading
+from typing import Dict, List, Optional
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from models import db, Execution, ExecutionOutputChunk, OutputBlob
+from services.output_codec import codec
+
+STREAMS = ('stdout', 'stderr')
+BACKPRESSURE_FACTOR = 8  # buffered multiples of flush_bytes before write() flushes inline
+
+
+class OutputChunkWriter:
+    """Buffers one execution's output and appends it to the chunk table."""
+
+    def __init__(self, execution_id: int, engine, flush_bytes: int = 65536,
+                 flush_interval: float = 1.0):
+        """
+        Initialize writer.
+
+        Args:
+            execution_id: Execution the output belongs to
+            engine: SQLAlchemy engine (writes happen on reader threads, outside
+                    the request session)
+            flush_bytes: Buffered bytes that trigger an immediate flush
+            flush_interval: Seconds between background flushes of a partial buffer
+        """
+        self.execution_id = execution_id
+        self.engine = engine
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.positions = {stream: 0 for stream in STREAMS}  # bytes written per stream
+        self.digests = {stream: hashlib.sha256() for stream in STREAMS}  # of the bytes written
+        self.finalized = set()  # streams finalize_output has moved into blobs
+        self._pending: Dict[str, List[str]] = {stream: [] for stream in STREAMS}
+        self._pending_bytes = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(
+            target=self._flush_loop, name=f'output-writer-{execution_id}', daemon=True
+        )
+        self._thread.start()
+
+    def write(self, stream: str, line: str):
+        """Buffer one line (newline-terminated on write) of a stream."""
+        self.write_lines(stream, [line])
+
+    def write_lines(self, stream: str, lines: List[str]):
+        """
+        Buffer a batch of lines of a stream.
+
+        A full buffer is handed to the background flusher, so callers (reader
+        threads, or the supervisor's event loop) do not wait on the database
+        unless the flusher falls far behind.
+        """
+        block = '\n'.join(lines) + '\n'
+        size = len(block.encode('utf-8'))
+        with self._lock:
+            self._pending[stream].append(block)
+            self._pending_bytes += size
+            pending_bytes = self._pending_bytes
+        if pending_bytes >= self.flush_bytes * BACKPRESSURE_FACTOR:
+            self.flush()
+        elif pending_bytes >= self.flush_bytes:
+            self._wake.set()
+
+    def flush(self):
+        """Append buffered lines to the chunk table, one chunk per stream."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {stream: [] for stream in STREAMS}
+                self._pending_bytes = 0
+
+            rows = []
+            for stream in STREAMS:
+                if not pending[stream]:
+                    continue
+                data = ''.join(pending[stream])
+                rows.append({
+                    'execution_id': self.execution_id,
+                    'stream': stream,
+                    'start_pos': self.positions[stream],
+                    'length': len(data.encode('utf-8')),
+                    'data': data
+                })
+            if not rows:
+                return
+
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(
+                        ExecutionOutputChunk.__table__.insert(),
+                        [{**row, 'data': codec.encode(row['data'])} for row in rows]
+                    )
+            except Exception:
+                # Keep the lines for the next attempt, ahead of anything written since
+                with self._lock:
+                    for row in rows:
+                        self._pending[row['stream']].insert(0, row['data'])
+                        self._pending_bytes += row['length']
+                raise
+
+            for row in rows:
+                self.positions[row['stream']] += row['length']
+                self.digests[row['stream']].update(row['data'].encode('utf-8'))
+
+    def _flush_loop(self):
+        while not self._closed.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+    def close(self):
+        """Stop the background flusher and write what is left."""
+        self._closed.set()
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+
+def open_writer(execution_id: int, config: Dict) -> OutputChunkWriter:
+    """Create a chunk writer for an execution using the app's output settings."""
+    return OutputChunkWriter(
+        execution_id,
+        db.engine,
+        flush_bytes=config.get('OUTPUT_FLUSH_BYTES', 65536),
+        flush_interval=config.get('OUTPUT_FLUSH_INTERVAL', 1.0)
+    )
+
+
+def finalize_output(execution_id: int, writer: OutputChunkWriter, attempts: int = 3):
+    """
+    Deduplicate a finished execution's streams into content-addressed blobs.
+
+    Each stream is handled in its own transaction on the writer's engine, so
+    the blob, its reference and the execution's pointer change together.
+    Streams finalized by an earlier call are skipped; lines written to them
+    since stay chunks of the execution's own, read after the blob.
+    Callers holding the execution in a session should expire its blob ids.
+
+    Raises:
+        LookupError: If the execution has been deleted; the stream's
+                     transaction is rolled back (see discard_output)
+    """
+    table = ExecutionOutputChunk.__table__
+    blobs = OutputBlob.__table__
+
+    for stream in STREAMS:
+        length = writer.positions[stream]
+        if not length or stream in writer.finalized:
+            continue
+        digest = writer.digests[stream].hexdigest()
+        pointer = {f'{stream}_blob_id': None}
+
+        for _ in range(attempts):
+            try:
+                # First time this content is seen: our chunks become the blob
+                with writer.engine.begin() as connection:
+                    blob_id = connection.execute(
+                        insert(blobs).values(content_hash=digest, length=length, ref_count=1)
+                    ).inserted_primary_key[0]
+                    connection.execute(
+                        update(table)
+                        .where(table.c.execution_id == execution_id, table.c.stream == stream)
+                        .values(blob_id=blob_id, execution_id=None)
+                    )
+                    pointer[f'{stream}_blob_id'] = blob_id
+                    _point_at(connection, execution_id, pointer)
+                writer.finalized.add(stream)
+                break
+            except IntegrityError:
+                pass
+
+            # Identical output already stored: reference it and drop our copy
+            with writer.engine.begin() as connection:
+                blob_id = connection.execute(
+                    select(blobs.c.id).where(blobs.c.content_hash == digest)
+                ).scalar()
+                referenced = blob_id is not None and connection.execute(
+                    update(blobs).where(blobs.c.id == blob_id).values(ref_count=blobs.c.ref_count + 1)
+                ).rowcount
+                if not referenced:
+                    continue  # collected in the meantime, try to create it again
+                connection.execute(
+                    delete(table).where(table.c.execution_id == execution_id, table.c.stream == stream)
+                )
+                pointer[f'{stream}_blob_id'] = blob_id
+                _point_at(connection, execution_id, pointer)
+            writer.finalized.add(stream)
+            break
+
+
+def _point_at(connection, execution_id: int, pointer: Dict):
+    """Set an execution's blob id; raising (so the transaction rolls back) if it was deleted."""
+    executions = Execution.__table__
+    if not connection.execute(
+        update(executions).where(executions.c.id == execution_id).values(**pointer)
+    ).rowcount:
+        raise LookupError(f'Execution {execution_id} no longer exists')
+
+
+def discard_output(execution_id: int):
+    """Delete the chunks left behind by an execution deleted while it ran (not committed)."""
+    db.session.execute(
+        delete(ExecutionOutputChunk.__table__).where(ExecutionOutputChunk.__table__.c.execution_id == execution_id)
+    )
+
+
+def share_output(source: Execution, target: Execution) -> bool:
+    """
+    Point target at the finished output blobs of source, taking a reference
+    on each (through the session, not committed).
+
+    Returns:
+        False if a blob of source has been collected in the meantime
+    """
+    blobs = OutputBlob.__table__
+    for stream in STREAMS:
+        blob_id = getattr(source, f'{stream}_blob_id')
+        if blob_id:
+            referenced = db.session.execute(
+                update(blobs).where(blobs.c.id == blob_id).values(ref_count=blobs.c.ref_count + 1)
+            ).rowcount
+            if not referenced:
+                return False
+        setattr(target, f'{stream}_blob_id', blob_id)
+    return True
+
+
+def is_finalized(execution: Execution) -> bool:
+    """True if every non-empty stream of a finished execution lives in a shared blob."""
+    return not execution.output_chunks.filter(ExecutionOutputChunk.execution_id.isnot(None)).first()
+
+
+@event.listens_for(Execution, 'after_delete')
+def _release_output_blobs(mapper, connection, execution):
+    """Drop a deleted execution's blob references and collect unreferenced blobs."""
+    blobs = OutputBlob.__table__
+    blob_ids = [blob_id for blob_id in (execution.stdout_blob_id, execution.stderr_blob_id) if blob_id]
+    if not blob_ids:
+        return
+    for blob_id in blob_ids:
+        connection.execute(
+            update(blobs).where(blobs.c.id == blob_id).values(ref_count=blobs.c.ref_count - 1)
+        )
+    garbage = select(blobs.c.id).where(blobs.c.id.in_(blob_ids), blobs.c.ref_count <= 0)
+    connection.execute(
+        delete(ExecutionOutputChunk.__table__).where(ExecutionOutputChunk.__table__.c.blob_id.in_(garbage))
+    )
+    connection.execute(delete(blobs).where(blobs.c.id.in_(blob_ids), blobs.c.ref_count <= 0))
+
+
+def output_storage_stats() -> Dict:
+    """
+    Return deduplication statistics for finished execution output.
+
+    logical_bytes counts every execution stream's output in full;
+    stored_bytes counts each distinct output once.
+    """
+    blobs, references, stored, logical = db.session.query(
+        func.count(OutputBlob.id),
+        func.coalesce(func.sum(OutputBlob.ref_count), 0),
+        func.coalesce(func.sum(OutputBlob.length), 0),
+        func.coalesce(func.sum(OutputBlob.length * OutputBlob.ref_count), 0)
+    ).one()
+    return {
+        'blobs': blobs,
+        'references': references,
+        'stored_bytes': stored,
+        'logical_bytes': logical,
+        'dedup_ratio': round(logical / stored, 2) if stored else None
+    }
+
+
+def recompress_output(batch_size: int = 500) -> Dict:
+    """
+    Re-encode stored output with the configured codec, in id-ordered batches.
+
+    Covers the legacy output columns of executions and output chunks; rows
+    already stored with the configured method are left untouched. Requires an
+    app context. Commits after every batch.
+
+    Returns:
+        Dictionary with rows rewritten and stored characters before and after
+    """
+    stats = {'rows': 0, 'bytes_before': 0, 'bytes_after': 0}
+
+    def rewrite(row, attributes):
+        changed = False
+        for attribute in attributes:
+            stored = getattr(row, attribute)
+            if not stored:
+                continue
+            recoded = codec.encode(codec.decode(stored))
+            if recoded != stored:
+                setattr(row, attribute, recoded)
+                stats['bytes_before'] += len(stored)
+                stats['bytes_after'] += len(recoded)
+                changed = True
+        stats['rows'] += changed
+
+    for model, attributes in (
+        (Execution, ('_output', '_error_output')),
+        (ExecutionOutputChunk, ('_data',))
+    ):
+        last_id = 0
+        while True:
+            query = model.query.filter(model.id > last_id).order_by(model.id).limit(batch_size)
+            if model is Execution:
+                query = query.options(db.undefer(Execution._output), db.undefer(Execution._error_output))
+            batch = query.all()
+            if not batch:
+                break
+            for row in batch:
+                rewrite(row, attributes)
+            last_id = batch[-1].id
+            db.session.commit()
+
+    return stats
+
+
+def _legacy_bytes(execution: Execution, stream: str) -> bytes:
+    text = execution.output if stream == 'stdout' else execution.error_output
+    return (text or '').encode('utf-8')
+
+
+def _has_chunks(execution: Execution, stream: str) -> bool:
+    return db.session.query(execution.chunk_query(stream).order_by(None).exists()).scalar()
+
+
+def stream_length(execution: Execution, stream: str) -> int:
+    """Return the stored byte length of one output stream of an execution."""
+    end = execution.chunk_query(stream).order_by(None).with_entities(
+        func.max(ExecutionOutputChunk.start_pos + ExecutionOutputChunk.length)
+    ).scalar()
+    if end is None:
+        return len(_legacy_bytes(execution, stream))
+    return end
+
+
+def append_message(execution: Execution, stream: str, text: str):
+    """
+    Append a line to a stored output stream through the session (not committed).
+
+    On a finalized stream the line follows the shared blob as a chunk of the
+    execution's own, so the blob is left intact for its other references and
+    the execution no longer counts as finalized (its output is not shared).
+    """
+    data = text + '\n'
+    db.session.add(ExecutionOutputChunk(
+        execution_id=execution.id,
+        stream=stream,
+        start_pos=stream_length(execution, stream),
+        length=len(data.encode('utf-8')),
+        data=data
+    ))
+
+
+def read_range(execution: Execution, stream: str, start: int, stop: Optional[int] = None) -> bytes:
+    """
+    Read bytes [start, stop) of a stored output stream.
+
+    Only the chunks overlapping the range are loaded. Executions recorded
+    before output chunks existed are served from their output columns.
+    """
+    if not _has_chunks(execution, stream):
+        return _legacy_bytes(execution, stream)[start:stop]
+
+    query = execution.chunk_query(stream).filter(
+        ExecutionOutputChunk.start_pos + ExecutionOutputChunk.length > start
+    )
+    if stop is not None:
+        query = query.filter(ExecutionOutputChunk.start_pos < stop)
+
+    chunks = query.all()
+    if not chunks:
+        return b''
+    data = b''.join(chunk.data.encode('utf-8') for chunk in chunks)
+    offset = chunks[0].start_pos
+    return data[start - offset:None if stop is None else stop - offset]
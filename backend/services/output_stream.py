@@ -0,0 +1,253 @@
+"""
+Live execution output over SocketIO.
+
+Output lines are numbered per execution (a single sequence across stdout and
+stderr) and buffered. A background task flushes pending lines to the
+execution's room every few milliseconds, so a chatty script produces one
+event per batch instead of one per line. Clients subscribe with the offset
+of the next line they expect, so a reconnecting client is replayed exactly
+what it missed.
+
+Each line also records its utf-8 byte position within its own stream, which
+is what the REST output endpoint uses as a cursor: the live buffer and the
+persisted output (lines joined by newlines) share the same byte offsets.
+
+A coalesced execution (see execution_coalescer) is an alias of its leader:
+reads and replays resolve to the leader's stream, and output batches are
+emitted to the follower's room as well.
+"""
+import threading
+from typing import Dict, List, Optional, Tuple
+from services.output_reader import OutputTail
+
+
+def room_name(execution_id: int) -> str:
+    """SocketIO room that receives an execution's events."""
+    return f'execution_{execution_id}'
+
+
+class ExecutionStream:
+    """Buffered, sequence-numbered output of one execution."""
+
+    def __init__(self, execution_id: int, max_buffer_lines: int, max_buffer_bytes: int):
+        self.execution_id = execution_id
+        self.buffer = OutputTail(max_buffer_lines, max_buffer_bytes)  # recent lines, for replay
+        self.next_offset = 0  # sequence number of the next line
+        self.flushed_offset = 0  # lines below this have been emitted
+        self.positions = {'stdout': 0, 'stderr': 0}  # byte length of each stream so far
+        self.status: Optional[str] = None
+
+    @property
+    def buffer_start(self) -> int:
+        """Offset of the oldest line still held in the buffer."""
+        return self.next_offset - len(self.buffer)
+
+    def lines_since(self, offset: int) -> List[Dict]:
+        """Return buffered lines with sequence number >= offset."""
+        skip = max(0, offset - self.buffer_start)
+        return [entry for index, entry in enumerate(self.buffer) if index >= skip]
+
+    def text_since(self, stream_name: str, position: int) -> Tuple[str, int, bool]:
+        """
+        Return the buffered text of one stream from a byte position.
+
+        Returns:
+            Tuple of (text, next position, truncated), where truncated means
+            bytes between position and the oldest buffered line were dropped
+        """
+        entries = [entry for entry in self.buffer if entry['stream'] == stream_name]
+        if not entries:
+            return '', max(position, self.positions[stream_name]), position < self.positions[stream_name]
+        truncated = position < entries[0]['pos']
+        text = ''.join(entry['text'] + '\n' for entry in entries if entry['pos'] >= position)
+        return text, max(position, self.positions[stream_name]), truncated
+
+
+class OutputStreamer:
+    """Publishes execution output and status changes to SocketIO rooms."""
+
+    def __init__(self, batch_interval: float = 0.05, max_buffer_lines: int = 5000,
+                 max_buffer_bytes: int = 4 * 1024 * 1024):
+        """
+        Initialize streamer.
+
+        Args:
+            batch_interval: Seconds between flushes of pending output
+            max_buffer_lines: Lines kept per running execution for replay
+            max_buffer_bytes: Bytes of text kept per running execution, so a
+                              few very long lines cannot pin unbounded memory
+        """
+        self.batch_interval = batch_interval
+        self.max_buffer_lines = max_buffer_lines
+        self.max_buffer_bytes = max_buffer_bytes
+        self.socketio = None
+        self._streams: Dict[int, ExecutionStream] = {}
+        self._aliases: Dict[int, int] = {}  # follower execution -> leader execution
+        self._lock = threading.Lock()
+        self._flusher_started = False
+
+    def init_app(self, app, socketio):
+        """Bind to the application's SocketIO server."""
+        self.socketio = socketio
+        self.batch_interval = app.config.get('OUTPUT_BATCH_INTERVAL', self.batch_interval)
+        self.max_buffer_lines = app.config.get('OUTPUT_TAIL_LINES', self.max_buffer_lines)
+        self.max_buffer_bytes = app.config.get('OUTPUT_TAIL_BYTES', self.max_buffer_bytes)
+        app.extensions['output_streamer'] = self
+
+    def _ensure_flusher(self):
+        if self._flusher_started or self.socketio is None:
+            return
+        self._flusher_started = True
+        self.socketio.start_background_task(self._flush_loop)
+
+    def _flush_loop(self):
+        while True:
+            self.socketio.sleep(self.batch_interval)
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+    def get(self, execution_id: int) -> Optional[ExecutionStream]:
+        """Return the live stream of an execution, if it is running here."""
+        with self._lock:
+            return self._streams.get(self._aliases.get(execution_id, execution_id))
+
+    def alias(self, follower_id: int, leader_id: int):
+        """Serve a coalesced execution from its leader's stream."""
+        with self._lock:
+            self._aliases[follower_id] = leader_id
+
+    def unalias(self, follower_id: int):
+        """Stop serving an execution from another's stream."""
+        with self._lock:
+            self._aliases.pop(follower_id, None)
+
+    def _followers(self, leader_id: int) -> List[int]:
+        """Executions aliased to leader_id (lock held)."""
+        return [follower for follower, leader in self._aliases.items() if leader == leader_id]
+
+    def open(self, execution_id: int) -> ExecutionStream:
+        """Start buffering output for an execution."""
+        with self._lock:
+            stream = self._streams.get(execution_id)
+            if stream is None:
+                stream = ExecutionStream(execution_id, self.max_buffer_lines, self.max_buffer_bytes)
+                self._streams[execution_id] = stream
+        self._ensure_flusher()
+        return stream
+
+    def publish(self, execution_id: int, line: str, stream_name: str = 'stdout'):
+        """Queue one output line for the next batch."""
+        self.publish_lines(execution_id, [line], stream_name)
+
+    def publish_lines(self, execution_id: int, lines: List[str], stream_name: str = 'stdout'):
+        """Queue a batch of output lines of one stream for the next batch."""
+        with self._lock:
+            stream = self._streams.get(execution_id)
+            if stream is None:
+                return
+            for line in lines:
+                size = len(line.encode('utf-8')) + 1
+                stream.buffer.append({
+                    'offset': stream.next_offset,
+                    'stream': stream_name,
+                    'pos': stream.positions[stream_name],
+                    'text': line
+                }, size)
+                stream.next_offset += 1
+                stream.positions[stream_name] += size
+
+    def flush(self, execution_id: Optional[int] = None):
+        """Emit pending lines (of one execution, or all) as batched events."""
+        batches = []
+        with self._lock:
+            streams = [self._streams.get(execution_id)] if execution_id else list(self._streams.values())
+            for stream in streams:
+                if stream is None or stream.flushed_offset == stream.next_offset:
+                    continue
+                lines = stream.lines_since(stream.flushed_offset)
+                stream.flushed_offset = stream.next_offset
+                if lines:
+                    for target_id in [stream.execution_id] + self._followers(stream.execution_id):
+                        batches.append((target_id, lines))
+
+        if self.socketio is None:
+            return
+        for target_id, lines in batches:
+            self.socketio.emit('execution_output', {
+                'execution_id': target_id,
+                'offset': lines[0]['offset'],
+                'next_offset': lines[-1]['offset'] + 1,
+                'lines': lines
+            }, to=room_name(target_id))
+
+    def publish_status(self, execution_id: int, status: str, **details):
+        """Flush pending output, then emit a status change event."""
+        stream = self.get(execution_id)
+        if stream:
+            self.flush(execution_id)
+            stream.status = status
+        if self.socketio is not None:
+            self.socketio.emit('execution_status', {
+                'execution_id': execution_id,
+                'status': status,
+                **details
+            }, to=room_name(execution_id))
+
+    def close(self, execution_id: int):
+        """Stop tracking a finished execution (its output now lives in the DB)."""
+        self.flush(execution_id)
+        with self._lock:
+            self._streams.pop(execution_id, None)
+            for follower in self._followers(execution_id):
+                del self._aliases[follower]
+
+    def replay(self, execution_id: int, offset: int) -> Optional[Dict]:
+        """
+        Build the catch-up payload for a client resuming at offset.
+
+        Returns:
+            Dictionary with buffered lines since offset, or None if the
+            execution is not streaming in this process. 'truncated' is True
+            when lines before the buffer start were dropped and the client
+            should fetch the full output over REST.
+        """
+        with self._lock:
+            stream = self._streams.get(self._aliases.get(execution_id, execution_id))
+            if stream is None:
+                return None
+            lines = stream.lines_since(offset)
+            return {
+                'execution_id': execution_id,
+                'offset': lines[0]['offset'] if lines else stream.next_offset,
+                'next_offset': stream.next_offset,
+                'lines': lines,
+                'truncated': offset < stream.buffer_start
+            }
+
+    def read(self, execution_id: int, stdout_pos: int, stderr_pos: int) -> Optional[Dict]:
+        """
+        Read live output from byte positions in stdout and stderr.
+
+        Returns:
+            Dictionary with 'stdout', 'stderr', their next positions and a
+            'truncated' flag, or None if the execution is not streaming in
+            this process
+        """
+        with self._lock:
+            stream = self._streams.get(self._aliases.get(execution_id, execution_id))
+            if stream is None:
+                return None
+            stdout, next_stdout, stdout_truncated = stream.text_since('stdout', stdout_pos)
+            stderr, next_stderr, stderr_truncated = stream.text_since('stderr', stderr_pos)
+        return {
+            'stdout': stdout,
+            'stderr': stderr,
+            'stdout_pos': next_stdout,
+            'stderr_pos': next_stderr,
+            'truncated': stdout_truncated or stderr_truncated
+        }
+
+
+streamer = OutputStreamer()
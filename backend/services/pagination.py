@@ -0,0 +1,160 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Lists are ordered newest first on a (timestamp, id) pair, and the next page
+starts strictly after the last row served: WHERE (ts, id) < (last_ts,
+last_id). With a composite index on (ts, id) every page is an index range
+scan, however deep, where OFFSET would read and discard all earlier rows.
+Rows inserted while a client pages do not shift or repeat later pages.
+Ranked search results page the same way on (score, id), best first.
+
+Cursors are opaque to clients: the position is JSON encoded as URL-safe
+base64 and returned in the X-Next-Cursor header (absent on the last page).
+Total counts are optional because an exact COUNT(*) reads every matching
+row; count=estimate uses the PostgreSQL planner's row estimate instead.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple, Union
+
+from flask import request
+
+from models import db
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+SortValue = Union[datetime, float]
+
+
+def encode_cursor(value: SortValue, row_id: int) -> str:
+    """Encode the position after a row (its sort value and ID) into an opaque cursor."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, value_type: type = datetime) -> Tuple[SortValue, int]:
+    """
+    Decode a cursor made by encode_cursor.
+
+    Args:
+        cursor: Token from X-Next-Cursor
+        value_type: Expected sort value, datetime or float
+
+    Raises:
+        ValueError: If the cursor is malformed or holds another kind of value
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, row_id = json.loads(raw)
+        if value_type is datetime:
+            value = datetime.fromisoformat(value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = float(value)
+        else:
+            raise ValueError('unexpected sort value')
+        return value, int(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f'Invalid cursor: {e}')
+
+
+def page_args(default_limit: int = DEFAULT_PAGE_SIZE, value_type: type = datetime
+              ) -> Tuple[int, Optional[Tuple[SortValue, int]], Optional[str]]:
+    """
+    Read limit, cursor and count from the request's query string.
+
+    Args:
+        default_limit: Page size when none is given
+        value_type: Sort value the cursor must hold (see decode_cursor)
+
+    Returns:
+        Tuple of (limit, decoded cursor or None, count mode or None)
+
+    Raises:
+        ValueError: If any of them is invalid
+    """
+    limit = request.args.get('limit', default_limit, type=int)
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    cursor = request.args.get('cursor')
+    count = request.args.get('count')
+    if count not in (None, 'exact', 'estimate'):
+        raise ValueError("count must be 'exact' or 'estimate'")
+    return limit, decode_cursor(cursor, value_type) if cursor else None, count
+
+
+def keyset_page(query, sort_key, id_column, limit: int,
+                after: Optional[Tuple[SortValue, int]] = None, descending: bool = True,
+                position: Optional[Callable] = None) -> Tuple[List, Optional[str]]:
+    """
+    Fetch one page of query.
+
+    Args:
+        query: Filtered ORM query (without ordering or limit)
+        sort_key: First sort column or expression (e.g. Script.updated_at)
+        id_column: Unique tiebreaker (the primary key)
+        limit: Rows per page
+        after: Decoded cursor of the previous page
+        descending: Newest (largest) first; False serves smallest first
+        position: Callable returning (sort value, id) of a result row; by
+                  default both are read as attributes named after the columns
+
+    Returns:
+        Tuple of (rows, cursor of the next page or None on the last page)
+    """
+    if after is not None:
+        value, row_id = after
+        if descending:
+            query = query.filter(db.or_(sort_key < value, db.and_(sort_key == value, id_column < row_id)))
+        else:
+            query = query.filter(db.or_(sort_key > value, db.and_(sort_key == value, id_column > row_id)))
+    if descending:
+        query = query.order_by(sort_key.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_key.asc(), id_column.asc())
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    if position is None:
+        position = lambda row: (getattr(row, sort_key.key), getattr(row, id_column.key))
+    return rows, encode_cursor(*position(rows[-1]))
+
+
+def total_count(query, mode: str) -> Tuple[int, bool]:
+    """
+    Count the rows of a list query.
+
+    Args:
+        query: Filtered ORM query
+        mode: 'exact', or 'estimate' to use the planner's estimate where the
+              database offers one (PostgreSQL); elsewhere the count is exact
+
+    Returns:
+        Tuple of (count, whether it is an estimate)
+    """
+    query = query.enable_eagerloads(False).order_by(None)
+    if mode == 'estimate' and db.engine.dialect.name == 'postgresql':
+        compiled = query.statement.compile(dialect=db.engine.dialect)
+        plan = db.session.connection().exec_driver_sql(
+            'EXPLAIN (FORMAT JSON) ' + str(compiled), compiled.params
+        ).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows']), True
+    return query.count(), False
+
+
+def set_page_headers(response, next_cursor: Optional[str], count: Optional[Tuple[int, bool]] = None):
+    """Add X-Next-Cursor and, when counted, X-Total-Count (and X-Total-Count-Estimated) to a response."""
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    if count is not None:
+        total, estimated = count
+        response.headers['X-Total-Count'] = str(total)
+        if estimated:
+            response.headers['X-Total-Count-Estimated'] = 'true'
+    return response
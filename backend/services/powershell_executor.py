@@ -5,60 +5,64 @@ import subprocess
 import threading
 import re
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from services.module_preload import ModuleImportProbe
+from services.output_reader import LineBatchReader, batch_from_line_callbacks
+from services.powershell_pool import PoolUnavailableError
+from services.process_registry import kill_process_tree
+from services.resource_limits import OutputBudget, ResourceLimits, wait_with_rusage
+from services.security_rules import DEFAULT_CMDLETS, DEFAULT_PATTERNS, RuleHit, get_active_rule_set
+from services.interpreter_registry import (
+    registry, InterpreterRegistry, PowerShellInterpreter, InterpreterNotFoundError
+)
 
 
 class PowerShellExecutor:
     """Secure PowerShell script executor."""
 
-    # Dangerous cmdlets that should be restricted
-    RESTRICTED_CMDLETS = [
-        'Remove-Item', 'Remove-Computer', 'Remove-ADUser',
-        'Format-Volume', 'Clear-Disk', 'Initialize-Disk',
-        'Remove-VM', 'Remove-VMHost', 'Remove-Datacenter',
-        'Invoke-Expression', 'Invoke-Command',
-        'Start-Process', 'New-Service', 'Stop-Service',
-        'Disable-WindowsOptionalFeature', 'Uninstall-WindowsFeature',
-        'Set-ExecutionPolicy', 'Remove-Module'
-    ]
-
-    # Dangerous patterns to detect
-    DANGEROUS_PATTERNS = [
-        r'rm\s+-rf',
-        r'del\s+/[fs]',
-        r'\|\s*Out-File\s+.*>',
-        r'Invoke-WebRequest.*\|.*Invoke-Expression',
-        r'iex\s*\(',
-        r'&\s*\(',
-    ]
-
-    def __init__(self, enable_restrictions: bool = True):
+    # Dangerous cmdlets and patterns (built-in rules of the security rule set)
+    RESTRICTED_CMDLETS = DEFAULT_CMDLETS
+    DANGEROUS_PATTERNS = DEFAULT_PATTERNS
+
+    def __init__(
+        self,
+        enable_restrictions: bool = True,
+        pool=None,
+        pwsh_version: Optional[str] = None,
+        interpreter_registry: Optional[InterpreterRegistry] = None,
+        supervisor=None
+    ):
         """
         Initialize PowerShell executor.
 
+        PowerShell is not looked up here; the interpreter is resolved from the
+        process-wide registry on first use, so construction is free.
+
         Args:
             enable_restrictions: Enable security restrictions (disable only for admin users)
+            pool: Optional PowerShellWorkerPool; when set, scripts run on warm
+                  pooled workers instead of a cold pwsh process per run
+            pwsh_version: Optional version selector ('7', '7.4', '7.4.6')
+            interpreter_registry: Registry to resolve pwsh from (defaults to the shared one)
+            supervisor: Optional ProcessSupervisor; when set (and no pool is), cold
+                        pwsh processes run on its event loop instead of three
+                        threads per execution
         """
         self.enable_restrictions = enable_restrictions
-        self.pwsh_path = self._find_powershell()
+        self.pool = pool
+        self.supervisor = supervisor
+        self.pwsh_version = pwsh_version
+        self.interpreter_registry = interpreter_registry or registry
 
-    def _find_powershell(self) -> str:
-        """Find PowerShell Core executable."""
-        # Try PowerShell Core first (cross-platform)
-        for cmd in ['pwsh', 'powershell']:
-            try:
-                result = subprocess.run(
-                    [cmd, '-Version'],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                if result.returncode == 0:
-                    return cmd
-            except (subprocess.SubprocessError, FileNotFoundError):
-                continue
+    @property
+    def interpreter(self) -> PowerShellInterpreter:
+        """Interpreter selected for this executor (cached by the registry)."""
+        return self.interpreter_registry.get(self.pwsh_version)
 
-        raise RuntimeError("PowerShell Core (pwsh) not found. Please install PowerShell 7+")
+    @property
+    def pwsh_path(self) -> str:
+        """Path of the selected PowerShell executable."""
+        return self.interpreter.path
 
     def validate_script(self, script_content: str) -> Tuple[bool, List[str]]:
         """
@@ -73,19 +77,19 @@ class PowerShellExecutor:
         if not self.enable_restrictions:
             return True, []
 
-        issues = []
+        is_valid, issues, _ = get_active_rule_set().validate(script_content)
+        return is_valid, issues
 
-        # Check for restricted cmdlets
-        for cmdlet in self.RESTRICTED_CMDLETS:
-            if re.search(rf'\b{re.escape(cmdlet)}\b', script_content, re.IGNORECASE):
-                issues.append(f"Restricted cmdlet detected: {cmdlet}")
-
-        # Check for dangerous patterns
-        for pattern in self.DANGEROUS_PATTERNS:
-            if re.search(pattern, script_content, re.IGNORECASE):
-                issues.append(f"Dangerous pattern detected: {pattern}")
+    def scan_script(self, script_content: str) -> List[RuleHit]:
+        """
+        Scan script against the active rule set.
 
-        return len(issues) == 0, issues
+        Returns:
+            List of rule hits with line and column
+        """
+        if not self.enable_restrictions:
+            return []
+        return get_active_rule_set().scan(script_content)
 
     def build_script_with_parameters(self, script_content: str, parameters: Dict) -> str:
         """
@@ -136,7 +140,14 @@ class PowerShellExecutor:
         script_content: str,
         parameters: Optional[Dict] = None,
         timeout: int = 300,
-        callback: Optional[callable] = None
+        callback: Optional[callable] = None,
+        validation: Optional[Tuple[bool, List[str]]] = None,
+        error_callback: Optional[callable] = None,
+        retain_output: bool = True,
+        batch_callback: Optional[callable] = None,
+        on_process: Optional[callable] = None,
+        limits: Optional[ResourceLimits] = None,
+        required_modules: Sequence[str] = ()
     ) -> Dict:
         """
         Execute PowerShell script with security controls.
@@ -146,14 +157,33 @@ class PowerShellExecutor:
             parameters: Dictionary of parameters to pass to script
             timeout: Execution timeout in seconds
             callback: Optional callback function for real-time output (receives line string)
+            validation: Precomputed (is_valid, issues) verdict for script_content;
+                        when omitted the script is validated here
+            error_callback: Optional callback for real-time error output (receives line string)
+            retain_output: Collect streamed lines into the result; pass False when the
+                           callbacks store output, so the result only holds messages
+                           (timeouts, validation failures) that were not streamed
+            batch_callback: Optional callback receiving ('stdout' | 'stderr', list of lines);
+                            replaces callback/error_callback with one call per read
+            on_process: Optional callback receiving a zero-argument function that
+                        kills the run's process tree, called once the process exists
+            limits: Optional resource limits; rlimits run the script in a dedicated
+                    process even when a worker pool is set
+            required_modules: Modules the script needs; they are preloaded when
+                              the pool's workers keep them imported, else
+                              imported by a prologue before the script
 
         Returns:
-            Dictionary with execution results
+            Dictionary with execution results; 'resource_usage' holds the child's
+            rusage when the thread runner reaped it, else None, and
+            'module_import_seconds' the time spent importing required_modules
         """
         start_time = datetime.utcnow()
 
         # Validate script
-        is_valid, issues = self.validate_script(script_content)
+        if validation is None or not self.enable_restrictions:
+            validation = self.validate_script(script_content)
+        is_valid, issues = validation
         if not is_valid:
             return {
                 'status': 'failed',
@@ -167,6 +197,106 @@ class PowerShellExecutor:
         if parameters:
             script_content = self.build_script_with_parameters(script_content, parameters)
 
+        budget = None
+        if limits and limits.max_output_bytes:
+            budget = OutputBudget(
+                limits.max_output_bytes,
+                batch_callback or batch_from_line_callbacks(callback, error_callback),
+                retain_output
+            )
+            batch_callback, callback, error_callback = budget, None, None
+            on_process = budget.wrap_on_process(on_process)
+            retain_output = False  # the budget keeps what it delivered
+
+        if batch_callback is None:
+            batch_callback = batch_from_line_callbacks(callback, error_callback)
+        result = self._dispatch(
+            script_content, timeout, batch_callback, start_time, retain_output, on_process, limits,
+            required_modules or ()
+        )
+        return budget.apply(result) if budget else result
+
+    def _uses_pool(self, limits: Optional[ResourceLimits]) -> bool:
+        """Return True if a run with these limits goes to the worker pool."""
+        return (self.pool is not None and not self.pool.closed
+                and not (limits and limits.needs_own_process))
+
+    def _preloads(self, modules: Sequence[str], limits: Optional[ResourceLimits]) -> bool:
+        """Return True if the run lands on pooled workers that keep all modules imported."""
+        if not self._uses_pool(limits):
+            return False
+        loaded = {name.lower() for name in self.pool.modules}
+        return all(name.lower() in loaded for name in modules)
+
+    def _dispatch(
+        self,
+        script_content: str,
+        timeout: int,
+        batch_callback: Optional[callable],
+        start_time: datetime,
+        retain_output: bool,
+        on_process: Optional[callable],
+        limits: Optional[ResourceLimits],
+        required_modules: Sequence[str]
+    ) -> Dict:
+        """
+        Run a validated, prepared script on the pool, or in a cold process if
+        no pooled worker is available; modules the chosen process does not
+        keep imported are imported by a prologue.
+        """
+        if self._uses_pool(limits):
+            result = self._importing(
+                () if self._preloads(required_modules, limits) else required_modules,
+                script_content, batch_callback, retain_output,
+                lambda script, deliver, retain: self._execute_pooled(
+                    script, timeout, deliver, start_time, retain, on_process
+                )
+            )
+            if result is not None:
+                return result
+
+        return self._importing(
+            required_modules, script_content, batch_callback, retain_output,
+            lambda script, deliver, retain: self._execute_cold(
+                script, timeout, deliver, start_time, retain, on_process, limits
+            )
+        )
+
+    @staticmethod
+    def _importing(
+        modules: Sequence[str],
+        script_content: str,
+        batch_callback: Optional[callable],
+        retain_output: bool,
+        run: Callable[[str, Optional[callable], bool], Optional[Dict]]
+    ) -> Optional[Dict]:
+        """Call run(script, batch_callback, retain_output) with a prologue importing modules, if any."""
+        if not modules:
+            return run(script_content, batch_callback, retain_output)
+        probe = ModuleImportProbe(batch_callback, retain_output)
+        # The probe keeps what it delivered
+        result = run(probe.prologue(modules) + script_content, probe, False)
+        return probe.apply(result) if result is not None else None
+
+    def _execute_cold(
+        self,
+        script_content: str,
+        timeout: int,
+        batch_callback: Optional[callable],
+        start_time: datetime,
+        retain_output: bool,
+        on_process: Optional[callable],
+        limits: Optional[ResourceLimits]
+    ) -> Dict:
+        """Run a prepared script in a cold pwsh process, on the supervisor or thread-watched."""
+        if self.supervisor is not None:
+            return self._execute_supervised(
+                script_content, timeout, batch_callback, start_time, retain_output, on_process,
+                limits
+            )
+
+        env = limits.child_env() if limits else None
+
         # Execute PowerShell script
         try:
             process = subprocess.Popen(
@@ -174,44 +304,61 @@ class PowerShellExecutor:
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1  # Line buffered
+                bufsize=0,  # raw pipes, read in large chunks
+                start_new_session=True,  # own process group, killed as a whole
+                env=env
             )
+            if limits:
+                try:
+                    limits.apply_to(process.pid)
+                except Exception:
+                    # Never leave the child waiting on its stdin
+                    kill_process_tree(process)
+                    process.communicate()
+                    raise
+            if on_process:
+                on_process(lambda: kill_process_tree(process))
 
             # Write script to stdin
-            process.stdin.write(script_content)
+            process.stdin.write(script_content.encode('utf-8'))
             process.stdin.close()
 
             # Collect output
             output_lines = []
             error_lines = []
 
-            def read_stdout():
-                for line in iter(process.stdout.readline, ''):
-                    if line:
-                        output_lines.append(line.rstrip())
-                        if callback:
-                            callback(line.rstrip())
-                process.stdout.close()
-
-            def read_stderr():
-                for line in iter(process.stderr.readline, ''):
-                    if line:
-                        error_lines.append(line.rstrip())
-                process.stderr.close()
+            def collector(stream_name, lines_store):
+                def on_batch(lines):
+                    if retain_output:
+                        lines_store.extend(lines)
+                    if batch_callback:
+                        batch_callback(stream_name, lines)
+                return on_batch
 
             # Start reader threads
-            stdout_thread = threading.Thread(target=read_stdout)
-            stderr_thread = threading.Thread(target=read_stderr)
+            stdout_thread = threading.Thread(
+                target=LineBatchReader(process.stdout, collector('stdout', output_lines)).run
+            )
+            stderr_thread = threading.Thread(
+                target=LineBatchReader(process.stderr, collector('stderr', error_lines)).run
+            )
             stdout_thread.start()
             stderr_thread.start()
 
-            # Wait for completion with timeout
+            # Wait for completion with timeout, reaping the child with its rusage
+            timed_out = threading.Event()
+
+            def on_timeout():
+                timed_out.set()
+                kill_process_tree(process)
+
+            timer = threading.Timer(timeout, on_timeout)
+            timer.start()
             try:
-                exit_code = process.wait(timeout=timeout)
-            except subprocess.TimeoutExpired:
-                process.kill()
-                process.wait()
+                exit_code, usage = wait_with_rusage(process)
+            finally:
+                timer.cancel()
+            if timed_out.is_set():
                 exit_code = -2
                 error_lines.append(f"Execution timeout after {timeout} seconds")
 
@@ -229,7 +376,8 @@ class PowerShellExecutor:
                 'output': '\n'.join(output_lines),
                 'error_output': '\n'.join(error_lines),
                 'exit_code': exit_code,
-                'duration_seconds': duration
+                'duration_seconds': duration,
+                'resource_usage': usage
             }
 
         except Exception as e:
@@ -244,6 +392,88 @@ class PowerShellExecutor:
                 'duration_seconds': duration
             }
 
+    def _execute_pooled(
+        self,
+        script_content: str,
+        timeout: int,
+        batch_callback: Optional[callable],
+        start_time: datetime,
+        retain_output: bool = True,
+        on_process: Optional[callable] = None
+    ) -> Optional[Dict]:
+        """
+        Execute a prepared script on a warm worker from the pool.
+
+        Returns None, without waiting, if no worker is free and none can be
+        started; the script has not run and goes to a cold process instead.
+        """
+        callback = error_callback = None
+        if batch_callback is not None:
+            # Pooled workers frame output per line
+            callback = lambda line: batch_callback('stdout', [line])
+            error_callback = lambda line: batch_callback('stderr', [line])
+        try:
+            result = self.pool.run(
+                script_content, timeout=timeout, callback=callback,
+                error_callback=error_callback, retain_output=retain_output,
+                on_process=on_process, acquire_timeout=0
+            )
+            exit_code = result['exit_code']
+            return {
+                'status': 'completed' if exit_code == 0 else 'failed',
+                'output': result['output'],
+                'error_output': result['error_output'],
+                'exit_code': exit_code,
+                'duration_seconds': (datetime.utcnow() - start_time).total_seconds(),
+                'module_import_seconds': result.get('module_import_seconds')
+            }
+        except PoolUnavailableError:
+            return None
+        except Exception as e:
+            return {
+                'status': 'failed',
+                'output': '',
+                'error_output': f"Execution error: {str(e)}",
+                'exit_code': -1,
+                'duration_seconds': (datetime.utcnow() - start_time).total_seconds()
+            }
+
+    def _execute_supervised(
+        self,
+        script_content: str,
+        timeout: int,
+        batch_callback: Optional[callable],
+        start_time: datetime,
+        retain_output: bool = True,
+        on_process: Optional[callable] = None,
+        limits: Optional[ResourceLimits] = None
+    ) -> Dict:
+        """Execute a prepared script in a cold pwsh process on the supervisor's event loop."""
+        try:
+            result = self.supervisor.run(
+                [self.pwsh_path, '-NoProfile', '-NonInteractive', '-Command', '-'],
+                script_content, timeout=timeout, batch_callback=batch_callback,
+                retain_output=retain_output, on_process=on_process,
+                on_spawn=limits.apply_to if limits else None,
+                env=limits.child_env() if limits else None
+            )
+            exit_code = result['exit_code']
+            return {
+                'status': 'completed' if exit_code == 0 else 'failed',
+                'output': result['output'],
+                'error_output': result['error_output'],
+                'exit_code': exit_code,
+                'duration_seconds': (datetime.utcnow() - start_time).total_seconds()
+            }
+        except Exception as e:
+            return {
+                'status': 'failed',
+                'output': '',
+                'error_output': f"Execution error: {str(e)}",
+                'exit_code': -1,
+                'duration_seconds': (datetime.utcnow() - start_time).total_seconds()
+            }
+
     def execute_async(
         self,
         script_content: str,
@@ -271,14 +501,6 @@ class PowerShellExecutor:
     def get_powershell_version(self) -> str:
         """Get PowerShell version information."""
         try:
-            result = subprocess.run(
-                [self.pwsh_path, '-Command', '$PSVersionTable.PSVersion.ToString()'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if result.returncode == 0:
-                return result.stdout.strip()
-            return "Unknown"
-        except Exception:
+            return self.interpreter.version
+        except InterpreterNotFoundError:
             return "Unknown"
@@ -0,0 +1,814 @@
+"""
+Warm PowerShell worker pool.
+
+Keeps a set of long-lived pwsh host processes around so that short scripts do
+not pay the .NET/pwsh startup cost on every run. Each host reads framed
+requests from stdin and answers with framed responses on stdout:
+
+    request:   RUN <base64 utf-8 script> | PING | QUIT
+    response:  <nonce> READY <pid> <module import seconds>
+               <nonce> OUT <base64 line>
+               <nonce> ERR <base64 line>
+               <nonce> END <exit code>
+               <nonce> PONG
+
+Every frame is a single line. The nonce is generated per worker so that a
+script writing directly to the console cannot forge control frames; any line
+without it is treated as plain stdout. Each run executes in a freshly opened
+runspace, so no variables, functions or imported modules leak between runs.
+
+A pool may be bound to a set of required modules (see module_preload). Its
+workers add the set to every runspace's initial session state, so the import
+happens when the runspace is opened, while the worker is idle, and a run
+finds its modules loaded. Only a worker started for a run that found no warm
+one makes that run wait for the import; the READY frame reports how long the
+first import took. Pools warm up in the background, so creating one never
+waits on pwsh. When no worker can be had (every one busy at max_size, or
+workers fail to start), run() raises PoolUnavailableError before the script
+starts, and the executor runs it in a cold pwsh process instead.
+
+At most PWSH_POOL_MAX_MODULE_POOLS module pools are kept. A new module set
+shuts down the least recently used idle one; when every module pool is busy
+the new set's runs go without a pool (and import their modules before the
+script). Pools of module sets no script declares any more are shut down by
+retire_module_pools once they are idle.
+"""
+import base64
+import os
+import secrets
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from services.process_registry import kill_process_tree
+
+
+# PowerShell host loop executed by every pooled worker. The next runspace is
+# opened right after a run finishes, so that cost (including importing the
+# worker's modules) is paid while the worker is idle instead of on the
+# critical path of the next script.
+HOST_SCRIPT = r'''
+$nonce = '__NONCE__'
+[string[]]$modules = @(__MODULES__)
+$importSeconds = 0
+$utf8 = [System.Text.UTF8Encoding]::new($false)
+$reader = [System.IO.StreamReader]::new([Console]::OpenStandardInput(), $utf8)
+$writer = [System.IO.StreamWriter]::new([Console]::OpenStandardOutput(), $utf8)
+$writer.AutoFlush = $true
+
+function Send-Frame([string]$kind, [string]$payload) {
+    $writer.WriteLine("$nonce $kind $payload")
+}
+
+function Send-Text([string]$kind, [string]$text) {
+    foreach ($line in ($text -split "`r?`n")) {
+        Send-Frame $kind ([Convert]::ToBase64String($utf8.GetBytes($line)))
+    }
+}
+
+function New-WorkerRunspace {
+    $iss = [System.Management.Automation.Runspaces.InitialSessionState]::CreateDefault()
+    if ($modules.Count) { $iss.ImportPSModule($modules) }
+    $rs = [System.Management.Automation.Runspaces.RunspaceFactory]::CreateRunspace($iss)
+    $timer = [System.Diagnostics.Stopwatch]::StartNew()
+    $rs.Open()
+    if ($modules.Count) { $script:importSeconds = $timer.Elapsed.TotalSeconds }
+    return $rs
+}
+
+$runspace = New-WorkerRunspace
+Send-Frame 'READY' ("$PID " + $importSeconds.ToString([cultureinfo]::InvariantCulture))
+
+while ($true) {
+    $line = $reader.ReadLine()
+    if ($null -eq $line -or $line -eq 'QUIT') { break }
+    if ($line -eq 'PING') { Send-Frame 'PONG' ''; continue }
+    if (-not $line.StartsWith('RUN ')) { Send-Text 'ERR' 'Malformed frame'; Send-Frame 'END' '-1'; continue }
+
+    $script = $utf8.GetString([Convert]::FromBase64String($line.Substring(4)))
+    $ps = [System.Management.Automation.PowerShell]::Create()
+    $ps.Runspace = $runspace
+    $null = $ps.AddScript($script)
+    $inputData = [System.Management.Automation.PSDataCollection[psobject]]::new()
+    $inputData.Complete()
+    $output = [System.Management.Automation.PSDataCollection[psobject]]::new()
+    $exitCode = 0
+
+    try {
+        $handle = $ps.BeginInvoke($inputData, $output)
+        $o = 0; $e = 0; $i = 0
+        while ($true) {
+            $done = $handle.IsCompleted
+            while ($o -lt $output.Count) { Send-Text 'OUT' (($output[$o] | Out-String).TrimEnd()); $o++ }
+            while ($i -lt $ps.Streams.Information.Count) { Send-Text 'OUT' ([string]$ps.Streams.Information[$i].MessageData); $i++ }
+            while ($e -lt $ps.Streams.Error.Count) { Send-Text 'ERR' ($ps.Streams.Error[$e].ToString()); $e++ }
+            if ($done) { break }
+            Start-Sleep -Milliseconds 5
+        }
+        $null = $ps.EndInvoke($handle)
+        $lastExit = $runspace.SessionStateProxy.GetVariable('LASTEXITCODE')
+        if ($lastExit) { $exitCode = [int]$lastExit }
+        elseif ($ps.HadErrors) { $exitCode = 1 }
+    } catch {
+        Send-Text 'ERR' $_.Exception.Message
+        $exitCode = 1
+    } finally {
+        $ps.Dispose()
+        $runspace.Dispose()
+    }
+
+    Send-Frame 'END' $exitCode
+    $runspace = New-WorkerRunspace
+}
+'''
+
+
+def build_host_command(pwsh_path: str, nonce: str, modules: Sequence[str] = ()) -> List[str]:
+    """Build the command line that starts a pwsh worker host preloading modules."""
+    quoted = ', '.join("'" + name.replace("'", "''") + "'" for name in modules)
+    script = HOST_SCRIPT.replace('__NONCE__', nonce).replace('__MODULES__', quoted)
+    encoded = base64.b64encode(script.encode('utf-16-le')).decode('ascii')
+    return [pwsh_path, '-NoProfile', '-NonInteractive', '-NoLogo', '-EncodedCommand', encoded]
+
+
+class WorkerError(RuntimeError):
+    """Raised when a pooled worker dies or violates the frame protocol."""
+
+
+class PoolUnavailableError(WorkerError):
+    """Raised by PowerShellWorkerPool.run when no worker could be acquired; the script did not start."""
+
+
+class PowerShellWorker:
+    """A single long-lived pwsh host process speaking the frame protocol."""
+
+    def __init__(
+        self,
+        pwsh_path: str,
+        startup_timeout: float = 30,
+        command_factory: Optional[Callable[[str, str, Sequence[str]], List[str]]] = None,
+        modules: Sequence[str] = ()
+    ):
+        """
+        Initialize a worker (the process is started by start()).
+
+        Args:
+            pwsh_path: Path to the pwsh executable
+            startup_timeout: Seconds to wait for the READY frame
+            command_factory: Optional callable (pwsh_path, nonce, modules) -> argv
+                             used instead of build_host_command (used by tests)
+            modules: Modules imported into every runspace of the worker
+        """
+        self.pwsh_path = pwsh_path
+        self.startup_timeout = startup_timeout
+        self.modules = tuple(modules)
+        self.command_factory = command_factory or build_host_command
+        self.nonce = secrets.token_hex(8)
+        self._prefix = (self.nonce + ' ').encode('ascii')
+        self.process: Optional[subprocess.Popen] = None
+        self.killed = False
+        self.run_count = 0
+        self.started_at: Optional[datetime] = None
+        self.last_used_at: Optional[float] = None
+        self.import_seconds = 0.0
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process else None
+
+    def is_alive(self) -> bool:
+        """Return True if the host process is still running."""
+        return not self.killed and self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Start the host process and wait until it reports READY."""
+        self.process = subprocess.Popen(
+            self.command_factory(self.pwsh_path, self.nonce, self.modules),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True  # scripts' child processes die with the worker
+        )
+        self.started_at = datetime.utcnow()
+
+        timer = threading.Timer(self.startup_timeout, self.kill)
+        timer.start()
+        try:
+            kind, payload = self._read_frame()
+        finally:
+            timer.cancel()
+
+        if kind != 'READY':
+            self.kill()
+            raise WorkerError(f"Worker failed to start (got {kind or 'EOF'})")
+        try:
+            self.import_seconds = float(payload.split()[1])
+        except (IndexError, ValueError):
+            self.import_seconds = 0.0
+
+    def _send(self, line: str):
+        try:
+            self.process.stdin.write(line.encode('utf-8') + b'\n')
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError) as e:
+            raise WorkerError(f"Worker stdin closed: {e}")
+
+    def _read_frame(self):
+        """
+        Read the next line from the worker.
+
+        Returns:
+            Tuple of (kind, payload). Lines without the nonce prefix are
+            returned as ('RAW', text); EOF is returned as (None, None).
+        """
+        raw = self.process.stdout.readline()
+        if not raw:
+            return None, None
+        raw = raw.rstrip(b'\r\n')
+        if not raw.startswith(self._prefix):
+            return 'RAW', raw.decode('utf-8', errors='replace')
+        kind, _, payload = raw[len(self._prefix):].decode('utf-8', errors='replace').partition(' ')
+        return kind, payload
+
+    def ping(self, timeout: float = 5) -> bool:
+        """Check that the worker answers a PING within timeout seconds."""
+        if not self.is_alive():
+            return False
+
+        timer = threading.Timer(timeout, self.kill)
+        timer.start()
+        try:
+            self._send('PING')
+            while True:
+                kind, _ = self._read_frame()
+                if kind == 'PONG':
+                    return True
+                if kind is None:
+                    return False
+        except WorkerError:
+            return False
+        finally:
+            timer.cancel()
+
+    def run(
+        self,
+        script_content: str,
+        timeout: int = 300,
+        callback: Optional[Callable[[str], None]] = None,
+        error_callback: Optional[Callable[[str], None]] = None,
+        retain_output: bool = True
+    ) -> Dict:
+        """
+        Run a script in a fresh runspace of this worker.
+
+        Args:
+            script_content: PowerShell script to execute
+            timeout: Execution timeout in seconds; the worker is killed on expiry
+            callback: Optional callback for real-time output (receives line string)
+            error_callback: Optional callback for real-time error output
+            retain_output: Collect streamed lines into the result
+
+        Returns:
+            Dictionary with output, error_output and exit_code
+        """
+        encoded = base64.b64encode(script_content.encode('utf-8')).decode('ascii')
+        output_lines = []
+        error_lines = []
+        timed_out = threading.Event()
+
+        def on_timeout():
+            timed_out.set()
+            self.kill()
+
+        timer = threading.Timer(timeout, on_timeout)
+        timer.start()
+        try:
+            self._send(f'RUN {encoded}')
+            self.run_count += 1
+            while True:
+                kind, payload = self._read_frame()
+                if kind is None:
+                    break
+                if kind == 'END':
+                    exit_code = int(payload) if payload.lstrip('-').isdigit() else -1
+                    return {
+                        'output': '\n'.join(output_lines),
+                        'error_output': '\n'.join(error_lines),
+                        'exit_code': exit_code
+                    }
+                if kind == 'RAW':
+                    line = payload
+                elif kind in ('OUT', 'ERR'):
+                    line = base64.b64decode(payload).decode('utf-8', errors='replace')
+                else:
+                    continue
+
+                if kind == 'ERR':
+                    if retain_output:
+                        error_lines.append(line)
+                    if error_callback:
+                        error_callback(line)
+                else:
+                    if retain_output:
+                        output_lines.append(line)
+                    if callback:
+                        callback(line)
+        finally:
+            timer.cancel()
+            self.last_used_at = time.monotonic()
+
+        if timed_out.is_set():
+            error_lines.append(f"Execution timeout after {timeout} seconds")
+            return {
+                'output': '\n'.join(output_lines),
+                'error_output': '\n'.join(error_lines),
+                'exit_code': -2
+            }
+        raise WorkerError("Worker exited before the run finished")
+
+    def memory_mb(self) -> Optional[float]:
+        """Resident set size of the worker in MB (Linux only, else None)."""
+        if not self.is_alive():
+            return None
+        try:
+            with open(f'/proc/{self.process.pid}/status') as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) / 1024
+        except (OSError, ValueError, IndexError):
+            pass
+        return None
+
+    def stop(self, timeout: float = 5):
+        """Ask the worker to exit, killing it if it does not comply."""
+        if not self.is_alive():
+            return
+        try:
+            self._send('QUIT')
+            self.process.wait(timeout=timeout)
+        except (WorkerError, subprocess.TimeoutExpired):
+            self.kill()
+
+    def kill(self):
+        """Kill the worker and any processes its scripts started."""
+        self.killed = True
+        if self.process and self.process.poll() is None:
+            try:
+                kill_process_tree(self.process)
+                self.process.wait()
+            except OSError:
+                pass
+
+
+class PowerShellWorkerPool:
+    """Pool of warm pwsh workers with recycling and health checks."""
+
+    def __init__(
+        self,
+        pwsh_path: str,
+        min_size: int = 1,
+        max_size: int = 4,
+        max_runs_per_worker: int = 100,
+        max_memory_mb: Optional[float] = 512,
+        health_check_interval: float = 30,
+        acquire_timeout: float = 30,
+        command_factory: Optional[Callable[[str, str, Sequence[str]], List[str]]] = None,
+        modules: Sequence[str] = ()
+    ):
+        """
+        Initialize the pool (workers are spawned by start()).
+
+        Args:
+            pwsh_path: Path to the pwsh executable
+            min_size: Number of warm workers kept ready
+            max_size: Maximum number of workers alive at once
+            max_runs_per_worker: Recycle a worker after this many runs
+            max_memory_mb: Recycle a worker whose RSS exceeds this (None disables)
+            health_check_interval: Seconds between background health checks (0 disables)
+            acquire_timeout: Seconds to wait for a free worker before giving up
+            command_factory: Optional callable (pwsh_path, nonce, modules) -> argv for workers
+            modules: Modules every worker of the pool keeps imported
+        """
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size, max_size >= 1")
+
+        self.pwsh_path = pwsh_path
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_runs_per_worker = max_runs_per_worker
+        self.max_memory_mb = max_memory_mb
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self.command_factory = command_factory
+        self.modules = tuple(modules)
+
+        self._idle: List[PowerShellWorker] = []
+        self._busy: List[PowerShellWorker] = []
+        self._starting = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._health_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+        self.stats_counters = {
+            'runs': 0,
+            'workers_started': 0,
+            'workers_recycled': 0,
+            'workers_failed': 0,
+            'cold_runs': 0
+        }
+
+    def _spawn(self) -> PowerShellWorker:
+        worker = PowerShellWorker(self.pwsh_path, command_factory=self.command_factory, modules=self.modules)
+        worker.start()
+        with self._cond:
+            self.stats_counters['workers_started'] += 1
+        return worker
+
+    def start(self, wait: bool = True):
+        """
+        Spawn min_size workers and start the health check thread.
+
+        Args:
+            wait: Block until the workers are ready; otherwise they are
+                  spawned in the background and runs arriving meanwhile start
+                  their own workers
+        """
+        if wait:
+            for _ in range(self.min_size):
+                worker = self._spawn()
+                with self._cond:
+                    self._idle.append(worker)
+        else:
+            threading.Thread(target=self._top_up, name='pwsh-pool-warmup', daemon=True).start()
+
+        if self.health_check_interval and self._health_thread is None:
+            self._health_thread = threading.Thread(
+                target=self._health_loop, name='pwsh-pool-health', daemon=True
+            )
+            self._health_thread.start()
+
+    def size(self) -> int:
+        """Number of live (idle + busy) workers."""
+        with self._cond:
+            return len(self._idle) + len(self._busy)
+
+    def acquire(self, timeout: Optional[float] = None) -> PowerShellWorker:
+        """
+        Take an idle worker, spawning one if the pool is below max_size.
+
+        Raises:
+            TimeoutError: If no worker became available within timeout
+        """
+        return self._acquire(timeout)[0]
+
+    def _acquire(self, timeout: Optional[float] = None) -> Tuple[PowerShellWorker, bool]:
+        """Acquire a worker; the flag is True if it was spawned for this caller."""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise WorkerError("Worker pool is shut down")
+                while self._idle:
+                    worker = self._idle.pop()
+                    if worker.is_alive():
+                        self._busy.append(worker)
+                        return worker, False
+                if len(self._busy) + self._starting < self.max_size:
+                    self._starting += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("No PowerShell worker available")
+                self._cond.wait(remaining)
+
+        try:
+            worker = self._spawn()
+        except Exception:
+            with self._cond:
+                self._starting -= 1
+                self.stats_counters['workers_failed'] += 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._starting -= 1
+            self._busy.append(worker)
+        return worker, True
+
+    def _needs_recycle(self, worker: PowerShellWorker) -> bool:
+        if not worker.is_alive():
+            return True
+        if self.max_runs_per_worker and worker.run_count >= self.max_runs_per_worker:
+            return True
+        if self.max_memory_mb:
+            rss = worker.memory_mb()
+            if rss is not None and rss > self.max_memory_mb:
+                return True
+        return False
+
+    def release(self, worker: PowerShellWorker):
+        """Return a worker to the pool, recycling it if it is worn out."""
+        recycle = self._needs_recycle(worker)
+        with self._cond:
+            if worker in self._busy:
+                self._busy.remove(worker)
+            if not recycle and not self._closed:
+                self._idle.append(worker)
+            elif recycle:
+                self.stats_counters['workers_recycled'] += 1
+            self._cond.notify()
+
+        if recycle or self._closed:
+            worker.stop()
+            if not self._closed:
+                self._top_up()
+
+    def _top_up(self):
+        """Spawn workers until min_size is reached again."""
+        while True:
+            with self._cond:
+                if self._closed or self.size() + self._starting >= self.min_size:
+                    return
+                self._starting += 1
+            try:
+                worker = self._spawn()
+            except Exception:
+                with self._cond:
+                    self._starting -= 1
+                    self.stats_counters['workers_failed'] += 1
+                return
+            with self._cond:
+                self._starting -= 1
+                self._idle.append(worker)
+                self._cond.notify()
+
+    def run(
+        self,
+        script_content: str,
+        timeout: int = 300,
+        callback: Optional[Callable[[str], None]] = None,
+        error_callback: Optional[Callable[[str], None]] = None,
+        retain_output: bool = True,
+        on_process: Optional[Callable[[Callable[[], None]], None]] = None,
+        acquire_timeout: Optional[float] = None
+    ) -> Dict:
+        """
+        Run a script on a pooled worker.
+
+        Args:
+            on_process: Optional callback receiving a function that kills the
+                        worker (and the run with it) while this run is active
+            acquire_timeout: Seconds to wait for a busy worker (defaults to the
+                             pool's acquire_timeout; 0 does not wait)
+
+        Returns:
+            Dictionary with output, error_output, exit_code and, for pools
+            with modules, module_import_seconds (0 when a warm worker ran it)
+
+        Raises:
+            PoolUnavailableError: If no worker was free, none could be started,
+                                  or the pool is shut down
+        """
+        try:
+            worker, spawned = self._acquire(acquire_timeout)
+        except Exception as e:
+            raise PoolUnavailableError(f"No PowerShell worker available: {e}") from e
+        guard = threading.Lock()
+        active = True
+
+        def kill_run():
+            # Never kill a worker that has moved on to another run
+            with guard:
+                if active:
+                    worker.kill()
+
+        if on_process:
+            on_process(kill_run)
+        try:
+            result = worker.run(
+                script_content, timeout=timeout, callback=callback,
+                error_callback=error_callback, retain_output=retain_output
+            )
+            if self.modules:
+                # A worker started for this run imported the modules on its critical path
+                result['module_import_seconds'] = worker.import_seconds if spawned else 0.0
+            return result
+        except WorkerError:
+            worker.kill()
+            raise
+        finally:
+            with guard:
+                active = False
+            with self._cond:
+                self.stats_counters['runs'] += 1
+                if spawned:
+                    self.stats_counters['cold_runs'] += 1
+            self.release(worker)
+
+    def health_check(self) -> Dict:
+        """
+        Ping idle workers, drop unresponsive or worn-out ones and top up.
+
+        Returns:
+            Dictionary with the number of healthy and replaced workers
+        """
+        with self._cond:
+            candidates = list(self._idle)
+            self._idle.clear()
+            self._busy.extend(candidates)
+
+        healthy = 0
+        replaced = 0
+        for worker in candidates:
+            if worker.ping() and not self._needs_recycle(worker):
+                healthy += 1
+            else:
+                worker.kill()
+                replaced += 1
+            self.release(worker)
+
+        self._top_up()
+        return {'healthy': healthy, 'replaced': replaced}
+
+    def _health_loop(self):
+        while not self._stop_event.wait(self.health_check_interval):
+            try:
+                self.health_check()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict:
+        """Return pool size and counters."""
+        with self._cond:
+            return {
+                'idle': len(self._idle),
+                'busy': len(self._busy),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'modules': list(self.modules),
+                **self.stats_counters
+            }
+
+    @property
+    def closed(self) -> bool:
+        """True once the pool is shut down (or closing) and takes no more runs."""
+        with self._cond:
+            return self._closed
+
+    @property
+    def idle(self) -> bool:
+        """True if no worker is busy or starting."""
+        with self._cond:
+            return not (self._busy or self._starting)
+
+    def close_if_idle(self) -> bool:
+        """
+        Stop taking runs if no worker is busy or starting; call shutdown()
+        afterwards to stop the idle workers.
+
+        Returns:
+            True if the pool was idle and is now closed
+        """
+        with self._cond:
+            if self._busy or self._starting:
+                return False
+            self._closed = True
+            return True
+
+    def shutdown(self):
+        """Stop all workers and the health check thread."""
+        self._stop_event.set()
+        with self._cond:
+            self._closed = True
+            workers = self._idle + self._busy
+            self._idle = []
+            self._busy = []
+            self._cond.notify_all()
+        for worker in workers:
+            worker.stop()
+
+
+# Least recently used first
+_pools: "OrderedDict[Tuple[str, Tuple[str, ...]], PowerShellWorkerPool]" = OrderedDict()
+_pool_lock = threading.Lock()
+
+
+def pool_enabled() -> bool:
+    """Return True if pooled execution is switched on via PWSH_POOL_ENABLED."""
+    return os.getenv('PWSH_POOL_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
+
+def get_worker_pool(pwsh_path: str, modules: Sequence[str] = ()) -> Optional[PowerShellWorkerPool]:
+    """
+    Return the process-wide worker pool for an interpreter and module set,
+    creating it on first use.
+
+    Pools warm up in the background, so no pwsh starts under the pool lock
+    and the first runs start their own workers rather than waiting. Pools
+    with modules are sized by PWSH_POOL_MODULE_* because workers holding
+    large modules use more memory. Creating one
+    beyond PWSH_POOL_MAX_MODULE_POOLS shuts down the least recently used idle
+    module pool.
+
+    Args:
+        pwsh_path: Path to the pwsh executable
+        modules: Canonical module set (see module_preload.normalize_modules)
+
+    Returns None unless PWSH_POOL_ENABLED is set, so pooling stays opt-in,
+    and for a new module set while every module pool at the cap is busy.
+    """
+    if not pool_enabled():
+        return None
+
+    key = (pwsh_path, tuple(modules))
+    evicted = []
+    with _pool_lock:
+        pool = _pools.get(key)
+        if pool is not None:
+            _pools.move_to_end(key)
+        elif modules:
+            evicted, fits = _evict_module_pools(int(os.getenv('PWSH_POOL_MAX_MODULE_POOLS', 8)) - 1)
+            if fits:
+                pool = _create_pool(key)
+        else:
+            pool = _create_pool(key)
+    for retired in evicted:
+        retired.shutdown()
+    return pool
+
+
+def _create_pool(key: Tuple[str, Tuple[str, ...]]) -> PowerShellWorkerPool:
+    """Create, start warming up and register the pool of (interpreter path, module set) (lock held)."""
+    pwsh_path, modules = key
+    if modules:
+        max_size = int(os.getenv('PWSH_POOL_MODULE_MAX_SIZE', 2))
+        max_memory = float(os.getenv('PWSH_POOL_MODULE_MAX_MEMORY_MB', 2048))
+    else:
+        max_size = int(os.getenv('PWSH_POOL_MAX_SIZE', 4))
+        max_memory = float(os.getenv('PWSH_POOL_MAX_MEMORY_MB', 512))
+    pool = PowerShellWorkerPool(
+        pwsh_path,
+        min_size=min(int(os.getenv('PWSH_POOL_MIN_SIZE', 1)), max_size),
+        max_size=max_size,
+        max_runs_per_worker=int(os.getenv('PWSH_POOL_MAX_RUNS', 100)),
+        max_memory_mb=max_memory or None,
+        health_check_interval=float(os.getenv('PWSH_POOL_HEALTH_INTERVAL', 30)),
+        modules=modules
+    )
+    pool.start(wait=False)
+    _pools[key] = pool
+    return pool
+
+
+def _evict_module_pools(keep: int) -> Tuple[List[PowerShellWorkerPool], bool]:
+    """
+    Close idle module pools, least recently used first, until at most keep
+    remain (lock held). Nothing is closed unless enough pools are idle.
+
+    Returns:
+        The closed pools, to be shut down by the caller outside the lock, and
+        whether at most keep module pools remain
+    """
+    module_keys = [key for key in _pools if key[1]]
+    excess = len(module_keys) - max(keep, 0)
+    if excess <= 0:
+        return [], True
+    candidates = [key for key in module_keys if _pools[key].idle][:excess]
+    if len(candidates) < excess:
+        return [], False
+    # A candidate may have taken a run since it was counted
+    closed = [_pools.pop(key) for key in candidates if _pools[key].close_if_idle()]
+    return closed, len(closed) == excess
+
+
+def retire_module_pools(declared: Sequence[Tuple[str, Tuple[str, ...]]]) -> int:
+    """
+    Shut down the idle module pools whose (interpreter path, module set) is
+    not declared; busy ones are left for a later call.
+
+    Returns:
+        Number of pools shut down
+    """
+    declared = set(declared)
+    with _pool_lock:
+        retired = [
+            _pools.pop(key) for key in list(_pools)
+            if key[1] and key not in declared and _pools[key].close_if_idle()
+        ]
+    for pool in retired:
+        pool.shutdown()
+    return len(retired)
+
+
+def worker_pool_stats() -> Dict[str, Dict]:
+    """Return stats for every pool created so far, keyed by interpreter path and module set."""
+    with _pool_lock:
+        return {
+            f"{path} [{', '.join(modules)}]" if modules else path: pool.stats()
+            for (path, modules), pool in _pools.items()
+        }
@@ -0,0 +1,117 @@
+"""
+In-memory registry of running executions and their processes.
+
+Every run is started in its own session (process group), so killing the
+group also stops any processes the script spawned. The runner tracks each
+execution it starts; the executor attaches a kill function once the process
+exists, and a cancel request calls it. A cancel that arrives before the
+process has started is remembered and applied on attach.
+"""
+import os
+import signal
+import subprocess
+import threading
+from typing import Callable, Dict, List, Optional
+
+
+def kill_process_tree(process):
+    """
+    Kill a process started with start_new_session=True and its descendants.
+
+    Args:
+        process: subprocess.Popen or asyncio.subprocess.Process
+    """
+    if os.name == 'nt':
+        subprocess.run(
+            ['taskkill', '/F', '/T', '/PID', str(process.pid)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        return
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        # The group is gone; make sure the leader itself is dead
+        try:
+            process.kill()
+        except (ProcessLookupError, OSError):
+            pass
+
+
+class ProcessRegistry:
+    """Maps execution IDs running in this process to kill functions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kills: Dict[int, Optional[Callable[[], None]]] = {}
+        self._cancelled = set()
+
+    def track(self, execution_id: int):
+        """
+        Register an execution that is about to start its process.
+
+        Tracking an execution again (the scheduler tracks it when it takes
+        the job, the runner when it starts) keeps a cancel requested meanwhile.
+        """
+        with self._lock:
+            if execution_id in self._kills:
+                return
+            self._kills[execution_id] = None
+            self._cancelled.discard(execution_id)
+
+    def attach(self, execution_id: int, kill: Callable[[], None]):
+        """
+        Attach the kill function of a tracked execution's process.
+
+        The process is killed straight away if the execution was cancelled
+        before it started.
+        """
+        with self._lock:
+            if execution_id not in self._kills:
+                return
+            self._kills[execution_id] = kill
+            cancelled = execution_id in self._cancelled
+        if cancelled:
+            kill()
+
+    def cancel(self, execution_id: int) -> bool:
+        """
+        Cancel a tracked execution, killing its process tree.
+
+        Returns:
+            True if the execution is running here, False otherwise
+        """
+        with self._lock:
+            if execution_id not in self._kills:
+                return False
+            self._cancelled.add(execution_id)
+            kill = self._kills[execution_id]
+        if kill:
+            kill()
+        return True
+
+    def is_cancelled(self, execution_id: int) -> bool:
+        """Return True if a cancel was requested for the execution."""
+        with self._lock:
+            return execution_id in self._cancelled
+
+    def release(self, execution_id: int) -> bool:
+        """
+        Stop tracking a finished execution.
+
+        Returns:
+            True if the execution was cancelled
+        """
+        with self._lock:
+            self._kills.pop(execution_id, None)
+            cancelled = execution_id in self._cancelled
+            self._cancelled.discard(execution_id)
+            return cancelled
+
+    def running(self) -> List[int]:
+        """Return IDs of the executions tracked in this process."""
+        with self._lock:
+            return list(self._kills)
+
+
+process_registry = ProcessRegistry()
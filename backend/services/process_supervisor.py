@@ -0,0 +1,249 @@
+"""
+Event-loop supervisor for PowerShell child processes.
+
+The thread-based executor path spends three OS threads per running script
+(a stdout reader, a stderr reader and a thread blocked in wait()). The
+supervisor instead runs every child on one asyncio event loop in a single
+background thread: output pipes of all children are multiplexed by the loop,
+and timeouts are loop timers rather than blocking waits.
+
+Callers submit a run and get a concurrent.futures.Future; the blocking
+run() helper keeps the executor's synchronous contract. Output callbacks are
+invoked on the loop thread and must not block.
+"""
+import asyncio
+import os
+import sys
+import threading
+import warnings
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+from services.output_reader import CHUNK_SIZE, LineSplitter, batch_from_line_callbacks
+from services.process_registry import kill_process_tree
+
+
+def _install_child_watcher(loop: asyncio.AbstractEventLoop):
+    """
+    Wait for children through pidfds on the loop itself.
+
+    Before Python 3.12 the default child watcher blocks one thread per child
+    in waitpid(), which would defeat the point of the supervisor. 3.12+ uses
+    pidfds by default where the kernel supports them.
+    """
+    if sys.version_info >= (3, 12) or not hasattr(os, 'pidfd_open'):
+        return
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        watcher = asyncio.PidfdChildWatcher()
+        watcher.attach_loop(loop)
+        asyncio.set_child_watcher(watcher)
+
+
+class ProcessSupervisor:
+    """Runs child processes on a single background asyncio event loop."""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._processes: Dict[int, asyncio.subprocess.Process] = {}
+        self.stats_counters = {'started': 0, 'completed': 0, 'timed_out': 0, 'failed': 0}
+
+    def start(self):
+        """Start the event loop thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            ready = threading.Event()
+
+            def serve():
+                self._loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(self._loop)
+                _install_child_watcher(self._loop)
+                ready.set()
+                self._loop.run_forever()
+
+            self._thread = threading.Thread(target=serve, name='process-supervisor', daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    def submit(
+        self,
+        argv: List[str],
+        stdin_data: str = '',
+        timeout: float = 300,
+        callback: Optional[Callable[[str], None]] = None,
+        error_callback: Optional[Callable[[str], None]] = None,
+        retain_output: bool = True,
+        batch_callback: Optional[Callable[[str, List[str]], None]] = None,
+        on_process: Optional[Callable[[Callable[[], None]], None]] = None,
+        on_spawn: Optional[Callable[[int], None]] = None,
+        env: Optional[Dict[str, str]] = None
+    ) -> Future:
+        """
+        Start a child process on the loop without blocking.
+
+        Args:
+            argv: Command line of the child
+            stdin_data: Text written to the child's stdin, which is then closed
+            timeout: Seconds before the child is killed
+            callback: Optional callback for each stdout line (called on the loop thread)
+            error_callback: Optional callback for each stderr line (called on the loop thread)
+            retain_output: Collect lines into the result
+            batch_callback: Optional callback receiving ('stdout' | 'stderr', list of lines)
+                            for each read; replaces callback/error_callback
+            on_process: Optional callback receiving a function that kills the child's
+                        process tree (callable from any thread), once it has started
+            on_spawn: Optional callback receiving the child's PID once it exists and
+                      before stdin_data is written (e.g. to set its rlimits)
+            env: Optional environment for the child
+
+        Returns:
+            Future resolving to a dictionary with output, error_output and exit_code
+            (-2 on timeout)
+        """
+        self.start()
+        if batch_callback is None:
+            batch_callback = batch_from_line_callbacks(callback, error_callback)
+        return asyncio.run_coroutine_threadsafe(
+            self._run(argv, stdin_data, timeout, batch_callback, retain_output, on_process,
+                      on_spawn, env),
+            self._loop
+        )
+
+    def run(self, argv: List[str], stdin_data: str = '', timeout: float = 300, **kwargs) -> Dict:
+        """Run a child process on the loop and wait for its result."""
+        return self.submit(argv, stdin_data, timeout, **kwargs).result()
+
+    @staticmethod
+    async def _pump(reader, stream_name: str, lines: List[str], batch_callback, retain_output: bool):
+        splitter = LineSplitter()
+        while True:
+            data = await reader.read(CHUNK_SIZE)
+            batch = splitter.feed(data) if data else splitter.finish()
+            if batch:
+                if retain_output:
+                    lines.extend(batch)
+                if batch_callback:
+                    batch_callback(stream_name, batch)
+            if not data:
+                return
+
+    async def _run(self, argv, stdin_data, timeout, batch_callback, retain_output,
+                   on_process=None, on_spawn=None, env=None) -> Dict:
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *argv,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                limit=CHUNK_SIZE,
+                start_new_session=True,  # own process group, killed as a whole
+                env=env
+            )
+        except Exception:
+            self.stats_counters['failed'] += 1
+            raise
+        if on_spawn:
+            try:
+                on_spawn(process.pid)
+            except Exception:
+                # Never leave the child waiting on its stdin
+                self.stats_counters['failed'] += 1
+                kill_process_tree(process)
+                process.stdin.close()
+                await process.wait()
+                raise
+        self.stats_counters['started'] += 1
+        self._processes[process.pid] = process
+        if on_process:
+            on_process(lambda: kill_process_tree(process))
+
+        output_lines: List[str] = []
+        error_lines: List[str] = []
+        timed_out = False
+
+        def on_timeout():
+            nonlocal timed_out
+            timed_out = True
+            if process.returncode is None:
+                kill_process_tree(process)
+
+        timer = asyncio.get_running_loop().call_later(timeout, on_timeout)
+        try:
+            try:
+                process.stdin.write(stdin_data.encode('utf-8'))
+                await process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # child exited without reading its input
+            finally:
+                process.stdin.close()
+
+            await asyncio.gather(
+                self._pump(process.stdout, 'stdout', output_lines, batch_callback, retain_output),
+                self._pump(process.stderr, 'stderr', error_lines, batch_callback, retain_output)
+            )
+            exit_code = await process.wait()
+        finally:
+            timer.cancel()
+            self._processes.pop(process.pid, None)
+
+        if timed_out:
+            self.stats_counters['timed_out'] += 1
+            exit_code = -2
+            error_lines.append(f"Execution timeout after {timeout} seconds")
+        else:
+            self.stats_counters['completed'] += 1
+
+        return {
+            'output': '\n'.join(output_lines),
+            'error_output': '\n'.join(error_lines),
+            'exit_code': exit_code
+        }
+
+    def stats(self) -> Dict:
+        """Return the number of supervised children and lifetime counters."""
+        return {
+            'running': len(self._processes),
+            'loop_running': bool(self._loop and self._loop.is_running()),
+            **self.stats_counters
+        }
+
+    def shutdown(self):
+        """Kill supervised children and stop the loop thread."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+
+        def stop():
+            for process in list(self._processes.values()):
+                if process.returncode is None:
+                    kill_process_tree(process)
+            # Let the killed runs resolve their futures before stopping
+            loop.call_later(1, loop.stop)
+
+        loop.call_soon_threadsafe(stop)
+        thread.join(timeout=5)
+
+
+_supervisor = ProcessSupervisor()
+
+
+def supervisor_enabled() -> bool:
+    """Return True if the event-loop runner is switched on via PWSH_ASYNC_RUNNER."""
+    return os.getenv('PWSH_ASYNC_RUNNER', 'false').lower() in ('1', 'true', 'yes')
+
+
+def get_process_supervisor() -> Optional[ProcessSupervisor]:
+    """
+    Return the process-wide supervisor, or None unless PWSH_ASYNC_RUNNER is
+    set, so the event-loop runner stays opt-in.
+    """
+    return _supervisor if supervisor_enabled() else None
+
+
+def process_supervisor_stats() -> Optional[Dict]:
+    """Return supervisor stats, or None when the runner is not enabled."""
+    return _supervisor.stats() if supervisor_enabled() else None
@@ -0,0 +1,217 @@
+"""
+Per-script resource limits and per-execution resource accounting.
+
+Limits are stored on the script as a JSON object:
+
+    {"memory_mb": 1024, "cpu_seconds": 120, "open_files": 256, "max_output_bytes": 10485760}
+
+memory_mb, cpu_seconds and open_files become rlimits (RLIMIT_AS, RLIMIT_CPU,
+RLIMIT_NOFILE), so they need a process of their own and such runs bypass the
+warm worker pool. They are set with prlimit() on the child's PID right after
+it is spawned and before the script is written to its stdin, so the script
+and everything it starts run limited. (A preexec_fn would run Python in the
+forked child, which can deadlock while other threads hold locks.) prlimit()
+is Linux-only; elsewhere these three limits are not applied.
+max_output_bytes is enforced by the executor, which kills the run once the
+script has written more than that.
+
+Usage is read with wait4() when the runner reaps the child, so it covers the
+pwsh process and the descendants it waited for, and is not mixed up with
+other executions running at the same time (as RUSAGE_CHILDREN deltas would be).
+"""
+import os
+import sys
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+LIMIT_FIELDS = ('memory_mb', 'cpu_seconds', 'open_files', 'max_output_bytes')
+
+
+def validate_resource_limits(limits) -> Tuple[bool, List[str]]:
+    """
+    Validate a script's resource limits object.
+
+    Returns:
+        Tuple of (is_valid, list_of_errors)
+    """
+    if limits is None:
+        return True, []
+    if not isinstance(limits, dict):
+        return False, ['Resource limits must be an object']
+
+    errors = []
+    for name, value in limits.items():
+        if name not in LIMIT_FIELDS:
+            errors.append(f"Unknown resource limit '{name}'")
+        elif value is not None and (isinstance(value, bool) or not isinstance(value, int) or value <= 0):
+            errors.append(f"Resource limit '{name}' must be a positive integer")
+    return len(errors) == 0, errors
+
+
+class ResourceLimits:
+    """Limits applied to one execution."""
+
+    def __init__(
+        self,
+        memory_mb: Optional[int] = None,
+        cpu_seconds: Optional[int] = None,
+        open_files: Optional[int] = None,
+        max_output_bytes: Optional[int] = None
+    ):
+        self.memory_mb = memory_mb
+        self.cpu_seconds = cpu_seconds
+        self.open_files = open_files
+        self.max_output_bytes = max_output_bytes
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> Optional['ResourceLimits']:
+        """Build limits from a script's resource_limits, or None if none are set."""
+        values = {name: (data or {}).get(name) for name in LIMIT_FIELDS}
+        if not any(values.values()):
+            return None
+        return cls(**values)
+
+    def to_dict(self) -> Dict:
+        """Convert limits to dictionary."""
+        return {name: getattr(self, name) for name in LIMIT_FIELDS}
+
+    @property
+    def needs_own_process(self) -> bool:
+        """True if rlimits must be set on a dedicated child process."""
+        return hasattr(resource, 'prlimit') and any((self.memory_mb, self.cpu_seconds, self.open_files))
+
+    def _rlimits(self) -> List[Tuple[int, int, int]]:
+        """(resource, soft, hard) triples to apply in the child."""
+        rlimits = []
+        if self.memory_mb:
+            size = self.memory_mb * 1024 * 1024
+            rlimits.append((resource.RLIMIT_AS, size, size))
+        if self.cpu_seconds:
+            # SIGXCPU at the soft limit, SIGKILL a second later
+            rlimits.append((resource.RLIMIT_CPU, self.cpu_seconds, self.cpu_seconds + 1))
+        if self.open_files:
+            rlimits.append((resource.RLIMIT_NOFILE, self.open_files, self.open_files))
+        return rlimits
+
+    def apply_to(self, pid: int):
+        """Set the rlimits on a freshly spawned child, before it is given work."""
+        if not self.needs_own_process:
+            return
+        try:
+            for kind, soft, hard in self._rlimits():
+                _, current_hard = resource.prlimit(pid, kind)
+                if current_hard != resource.RLIM_INFINITY:
+                    # An unprivileged process cannot raise its hard limit
+                    soft, hard = min(soft, current_hard), min(hard, current_hard)
+                resource.prlimit(pid, kind, (soft, hard))
+        except ProcessLookupError:
+            pass  # the child already exited
+
+    def child_env(self) -> Optional[Dict[str, str]]:
+        """
+        Environment for the child, or None to inherit ours unchanged.
+
+        The .NET GC reserves address space up front based on the machine's
+        memory; under RLIMIT_AS it has to be told the limit or pwsh fails to
+        start.
+        """
+        if not (self.memory_mb and self.needs_own_process):
+            return None
+        return {**os.environ, 'DOTNET_GCHeapHardLimit': format(self.memory_mb * 1024 * 1024 * 3 // 4, 'x')}
+
+
+class OutputBudget:
+    """
+    Batch callback wrapper that stops delivering output after max_bytes and
+    kills the run.
+    """
+
+    def __init__(self, max_bytes: int, deliver: Optional[Callable[[str, List[str]], None]],
+                 retain_output: bool = True):
+        """
+        Initialize budget.
+
+        Args:
+            max_bytes: Bytes of output (stdout and stderr together) allowed
+            deliver: Batch callback receiving the output within the budget
+            retain_output: Collect delivered lines for the result
+        """
+        self.max_bytes = max_bytes
+        self.deliver = deliver
+        self.retain_output = retain_output
+        self.used = 0
+        self.exceeded = False
+        self.lines = {'stdout': [], 'stderr': []}
+        self._kill: Optional[Callable[[], None]] = None
+        self._lock = threading.Lock()
+
+    def wrap_on_process(self, on_process: Optional[Callable]) -> Callable:
+        """Capture the run's kill function while passing it on."""
+        def capture(kill):
+            self._kill = kill
+            if on_process:
+                on_process(kill)
+        return capture
+
+    def __call__(self, stream_name: str, lines: List[str]):
+        with self._lock:
+            if self.exceeded:
+                return
+            for index, line in enumerate(lines):
+                self.used += len(line.encode('utf-8')) + 1
+                if self.used > self.max_bytes:
+                    self.exceeded = True
+                    lines = lines[:index]
+                    break
+            if self.retain_output:
+                self.lines[stream_name].extend(lines)
+        if lines and self.deliver:
+            self.deliver(stream_name, lines)
+        if self.exceeded and self._kill:
+            self._kill()
+
+    def apply(self, result: Dict) -> Dict:
+        """Merge retained output into an executor result and fail it if the budget ran out."""
+        output = '\n'.join(filter(None, ['\n'.join(self.lines['stdout']), result['output']]))
+        errors = ['\n'.join(self.lines['stderr']), result['error_output']]
+        result = {**result, 'output': output}
+        if self.exceeded:
+            result['status'] = 'failed'
+            errors.append(f"Output limit of {self.max_bytes} bytes exceeded")
+        result['error_output'] = '\n'.join(filter(None, errors))
+        return result
+
+
+def rusage_to_dict(usage) -> Dict:
+    """Convert a struct_rusage into the fields recorded on an execution."""
+    max_rss = usage.ru_maxrss
+    if sys.platform == 'darwin':
+        max_rss //= 1024  # bytes on macOS, kilobytes elsewhere
+    return {
+        'cpu_user_seconds': usage.ru_utime,
+        'cpu_system_seconds': usage.ru_stime,
+        'max_rss_kb': max_rss,
+        'io_read_blocks': usage.ru_inblock,
+        'io_write_blocks': usage.ru_oublock
+    }
+
+
+def wait_with_rusage(process) -> Tuple[int, Optional[Dict]]:
+    """
+    Wait for a Popen child and return (exit code, resource usage).
+
+    Usage is None where wait4() is unavailable or the child was already reaped.
+    """
+    if not hasattr(os, 'wait4'):
+        return process.wait(), None
+    try:
+        _, status, usage = os.wait4(process.pid, 0)
+    except ChildProcessError:
+        return process.wait(), None
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return process.returncode, rusage_to_dict(usage)
@@ -0,0 +1,112 @@
+"""
+Memoized results of idempotent scripts.
+
+Scripts flagged cacheable (cache_ttl_seconds > 0) are read-only queries whose
+result only depends on the script, its parameters and the interpreter. A
+successful run is remembered under (content hash, normalized parameters,
+resolved pwsh version) for the script's TTL; executing it again within that window
+creates a completed Execution that shares the cached run's stored output
+(see share_output) instead of starting pwsh.
+
+The cache holds execution IDs only, so it is small; it is bounded by entry
+count with least-recently-used eviction, and is local to this process: with
+EXECUTION_AGENTS the runs happen in the agents, so caching is off.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from services.interpreter_registry import registry, InterpreterNotFoundError
+from services.script_verdicts import content_hash
+
+CacheKey = Tuple[str, str, str]
+
+
+def cache_key(script, parameters: Optional[Dict]) -> CacheKey:
+    """
+    Build the cache key of running a script with parameters.
+
+    Parameters are normalized (sorted keys, compact separators) so that
+    equivalent requests share an entry. The script's version selector is
+    resolved to the full installed version ('7' -> '7.4.6'), so upgrading
+    pwsh or changing PWSH_DEFAULT_VERSION does not serve results of the old
+    interpreter.
+    """
+    normalized = json.dumps(parameters or {}, sort_keys=True, separators=(',', ':'), default=str)
+    try:
+        version = registry.get(script.pwsh_version).version
+    except InterpreterNotFoundError:
+        # The run fails without an interpreter, and failed runs are not cached
+        version = script.pwsh_version or ''
+    return content_hash(script.content), normalized, version
+
+
+class ResultCache:
+    """LRU map of cache keys to the execution holding the result, with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 1024):
+        """
+        Initialize cache.
+
+        Args:
+            max_entries: Results kept before the least recently used is evicted
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, Tuple[int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats_counters = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+
+    def init_app(self, app):
+        """Read the cache size from the application config."""
+        self.max_entries = app.config.get('RESULT_CACHE_SIZE', self.max_entries)
+        app.extensions['result_cache'] = self
+
+    def get(self, key: CacheKey) -> Optional[int]:
+        """Return the ID of the execution cached under key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                del self._entries[key]
+                self.stats_counters['expired'] += 1
+                entry = None
+            if entry is None:
+                self.stats_counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats_counters['hits'] += 1
+            return entry[0]
+
+    def put(self, key: CacheKey, execution_id: int, ttl_seconds: float):
+        """Cache a successful execution for ttl_seconds, evicting the least recently used."""
+        with self._lock:
+            self._entries[key] = (execution_id, time.monotonic() + ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats_counters['evictions'] += 1
+
+    def discard(self, key: CacheKey):
+        """Forget an entry whose execution can no longer be served."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Return entry count, capacity, counters and hit rate."""
+        with self._lock:
+            lookups = self.stats_counters['hits'] + self.stats_counters['misses']
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                **self.stats_counters,
+                'hit_rate': round(self.stats_counters['hits'] / lookups, 3) if lookups else None
+            }
+
+
+result_cache = ResultCache()
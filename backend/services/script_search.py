@@ -0,0 +1,258 @@
+"""
+Full-text search over scripts.
+
+Script name, description, tags and content are indexed so the script list's
+search parameter is an index lookup ranked by relevance instead of a LIKE
+scan. Fields are weighted name > tags > description > content.
+
+PostgreSQL keeps a weighted tsvector in scripts.search_vector behind a GIN
+index, matched with websearch_to_tsquery and ranked with ts_rank_cd. pg_trgm
+GIN indexes on name and content serve substring matches (part of a cmdlet
+name such as 'VMCluster'), which also add their name similarity to the rank.
+SQLite (development and tests) uses an FTS5 table, scripts_fts, keyed by the
+script ID and ranked with bm25; each search word matches as a prefix.
+
+The index structures are created by their migration (or with the scripts
+table on a new database) and are not part of the models, so include_name
+keeps them out of autogenerate. The index is written explicitly by the
+script routes (index_script, remove_script) in the same transaction as the
+script, so it never lags behind. init_db indexes scripts that have no entry,
+and `flask reindex-scripts` rebuilds the index from scratch.
+
+Snippets mark matched terms with private-use sentinels, which highlight()
+turns into <mark> tags after HTML-escaping the rest of the text.
+"""
+import html
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Float, cast, column, event, false, func, literal, literal_column, or_, table, text
+
+from models import db, Script
+from services.pagination import keyset_page
+
+FTS_TABLE = 'scripts_fts'
+HIGHLIGHT_START = '\ue000'
+HIGHLIGHT_END = '\ue001'
+SNIPPET_WORDS = 16
+
+# bm25 weights in FTS column order: name, description, tags, content
+_BM25_WEIGHTS = (10.0, 4.0, 6.0, 1.0)
+
+_SQLITE_DDL = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(name, description, tags, content)',
+)
+_SQLITE_FILL = (
+    f'INSERT INTO {FTS_TABLE} (rowid, name, description, tags, content) '
+    "SELECT id, name, coalesce(description, ''), replace(coalesce(tags, ''), ',', ' '), content "
+    'FROM scripts WHERE {where}'
+)
+
+_POSTGRES_DDL = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'ALTER TABLE scripts ADD COLUMN IF NOT EXISTS search_vector tsvector',
+    'CREATE INDEX IF NOT EXISTS ix_scripts_search_vector ON scripts USING gin (search_vector)',
+    'CREATE INDEX IF NOT EXISTS ix_scripts_name_trgm ON scripts USING gin (name gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_scripts_content_trgm ON scripts USING gin (content gin_trgm_ops)',
+)
+_POSTGRES_FILL = (
+    'UPDATE scripts SET search_vector = '
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', replace(coalesce(tags, ''), ',', ' ')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C') || "
+    "setweight(to_tsvector('simple', coalesce(content, '')), 'D') "
+    'WHERE {where}'
+)
+_HEADLINE_OPTIONS = f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords={SNIPPET_WORDS}, MinWords=6'
+_POSTGRES_INDEXES = ('ix_scripts_search_vector', 'ix_scripts_name_trgm', 'ix_scripts_content_trgm')
+
+
+def _dialect(bind=None) -> str:
+    return (bind or db.engine).dialect.name
+
+
+def _has_backend() -> bool:
+    return _dialect() in ('sqlite', 'postgresql')
+
+
+def create_index(connection):
+    """Create the index structures if they are missing."""
+    ddl = {'sqlite': _SQLITE_DDL, 'postgresql': _POSTGRES_DDL}.get(_dialect(connection), ())
+    for statement in ddl:
+        connection.exec_driver_sql(statement)
+
+
+def include_name(name, type_, parent_names) -> bool:
+    """Alembic include_name hook: leave the index structures out of autogenerate."""
+    if type_ == 'table':
+        return name != FTS_TABLE and not name.startswith(f'{FTS_TABLE}_')
+    if type_ == 'column':
+        return not (parent_names.get('table_name') == 'scripts' and name == 'search_vector')
+    if type_ == 'index':
+        return name not in _POSTGRES_INDEXES
+    return True
+
+
+@event.listens_for(Script.__table__, 'after_create')
+def _create_with_table(target, connection, **kw):
+    create_index(connection)
+
+
+@event.listens_for(Script.__table__, 'before_drop')
+def _drop_with_table(target, connection, **kw):
+    if _dialect(connection) == 'sqlite':
+        connection.exec_driver_sql(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def _fill(where: str, **params) -> int:
+    """Write index entries for the scripts matching where (an SQL condition on scripts)."""
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        statement = _SQLITE_FILL
+    elif dialect == 'postgresql':
+        statement = _POSTGRES_FILL
+    else:
+        return 0
+    return db.session.execute(text(statement.format(where=where)), params).rowcount
+
+
+def index_script(script: Script):
+    """
+    Write a script's index entry from its flushed row (not committed).
+
+    Call after the script's changes are flushed and before the commit.
+    """
+    if _dialect() == 'sqlite':
+        remove_script(script.id)
+    _fill('id = :id', id=script.id)
+
+
+def remove_script(script_id: int):
+    """Delete a script's index entry (not committed); PostgreSQL entries go with the row."""
+    if _dialect() == 'sqlite':
+        db.session.execute(text(f'DELETE FROM {FTS_TABLE} WHERE rowid = :id'), {'id': script_id})
+
+
+def ensure_index() -> int:
+    """
+    Index scripts that have no entry (call at startup, after the migrations).
+
+    Returns:
+        Number of scripts indexed
+    """
+    if not _has_backend():
+        return 0
+    if _dialect() == 'sqlite':
+        indexed = _fill(f'id NOT IN (SELECT rowid FROM {FTS_TABLE})')
+    else:
+        indexed = _fill('search_vector IS NULL')
+    db.session.commit()
+    return indexed
+
+
+def rebuild_index() -> int:
+    """
+    Rebuild every script's index entry.
+
+    Returns:
+        Number of scripts indexed
+    """
+    if not _has_backend():
+        return 0
+    if _dialect() == 'sqlite':
+        db.session.execute(text(f'DELETE FROM {FTS_TABLE}'))
+    indexed = _fill('1 = 1')
+    db.session.commit()
+    return indexed
+
+
+def fts_query(search: str) -> str:
+    """
+    Turn a search string into an FTS5 query: every word must match, as a
+    prefix, and words holding punctuation (Get-VM) match as a phrase.
+    """
+    phrases = []
+    for word in search.split():
+        tokens = re.findall(r'\w+', word)
+        if tokens:
+            phrases.append('"' + ' '.join(tokens) + '"*')
+    return ' '.join(phrases)
+
+
+def _search_vector():
+    return literal_column('scripts.search_vector')
+
+
+def _fts():
+    return literal_column(FTS_TABLE)
+
+
+def match(query, search: str):
+    """
+    Restrict a Script query to scripts matching search.
+
+    Databases without a full-text backend fall back to a substring match on
+    name and description.
+    """
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        terms = fts_query(search)
+        if not terms:
+            return query.filter(false())
+        index = table(FTS_TABLE, column('rowid'))
+        return query.join(index, index.c.rowid == Script.id).filter(_fts().match(terms))
+    pattern = f'%{search}%'
+    if dialect == 'postgresql':
+        tsquery = func.websearch_to_tsquery('simple', search)
+        return query.filter(or_(
+            _search_vector().op('@@')(tsquery),
+            Script.name.ilike(pattern),
+            Script.content.ilike(pattern)
+        ))
+    return query.filter(or_(Script.name.ilike(pattern), Script.description.ilike(pattern)))
+
+
+def _score_and_snippet(search: str):
+    """Rank (lower is better) and highlighted snippet expressions of a matched query."""
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        score = func.bm25(_fts(), *_BM25_WEIGHTS)
+        snippet = func.snippet(_fts(), -1, HIGHLIGHT_START, HIGHLIGHT_END, '…', SNIPPET_WORDS)
+        return score, snippet
+    if dialect == 'postgresql':
+        tsquery = func.websearch_to_tsquery('simple', search)
+        score = cast(-(func.ts_rank_cd(_search_vector(), tsquery) + func.similarity(Script.name, search)), Float)
+        document = func.concat_ws(' ', Script.name, Script.description, Script.content)
+        snippet = func.ts_headline('simple', document, tsquery, _HEADLINE_OPTIONS)
+        return score, snippet
+    return cast(literal(0.0), Float), literal(None)
+
+
+def ranked_page(query, search: str, limit: int,
+                after: Optional[Tuple[float, int]] = None) -> Tuple[List[Tuple[Script, Optional[str]]], Optional[str]]:
+    """
+    Fetch one page of a matched query (see match), best match first.
+
+    Args:
+        query: Script query filtered with match()
+        search: The search string given to match()
+        limit: Rows per page
+        after: Decoded float cursor of the previous page
+
+    Returns:
+        Tuple of ([(script, highlighted snippet or None)], next cursor or None)
+    """
+    score, snippet = _score_and_snippet(search)
+    query = query.add_columns(score.label('search_score'), snippet.label('search_snippet'))
+    rows, next_cursor = keyset_page(
+        query, score, Script.id, limit, after, descending=False,
+        position=lambda row: (row.search_score, row[0].id)
+    )
+    return [(row[0], highlight(row.search_snippet)) for row in rows], next_cursor
+
+
+def highlight(snippet: Optional[str]) -> Optional[str]:
+    """HTML-escape a snippet and turn its match sentinels into <mark> tags."""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
@@ -0,0 +1,149 @@
+"""
+Normalized script tags and faceted counts.
+
+The API keeps exchanging tags as a list of strings, stored on the script as
+Script.tags (comma-separated). Each flush mirrors changed tag strings into
+the tags and script_tags tables, so filters are exact-match index lookups
+instead of LIKE scans that also matched substrings ('ad' in 'azure-admin'),
+and tag counts are a GROUP BY over the association table.
+
+Tag names are exact: case is kept, surrounding whitespace and duplicates
+are dropped. Missing tags are inserted ignoring conflicts, so concurrent
+writes introducing the same new tag both link to the one row.
+"""
+from typing import Dict, Iterable, List, Union
+
+from sqlalchemy import event, func, insert, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import db, Script, Tag, script_tags
+
+
+def split_tags(tags: Union[str, Iterable[str], None]) -> List[str]:
+    """Return tag names from a comma-separated string or a list, stripped and deduplicated in order."""
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    names = []
+    for name in tags:
+        name = str(name).strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def join_tags(tags: Union[str, Iterable[str], None]) -> str:
+    """Return the Script.tags value for a tag list or string."""
+    return ','.join(split_tags(tags))
+
+
+def _insert_tags(session, names: Iterable[str]):
+    """Insert tag rows, skipping names that exist (or were just inserted by another transaction)."""
+    rows = [{'name': name} for name in sorted(names)]
+    connection = session.connection()
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        dialect_insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        connection.execute(dialect_insert(Tag.__table__).on_conflict_do_nothing(index_elements=['name']), rows)
+    elif dialect in ('mysql', 'mariadb'):
+        connection.execute(insert(Tag.__table__).prefix_with('IGNORE'), rows)
+    else:
+        for row in rows:
+            try:
+                with connection.begin_nested():
+                    connection.execute(insert(Tag.__table__), row)
+            except IntegrityError:
+                pass
+
+
+def link_tags(session, scripts: List[Script]):
+    """Point each script's tag_objects at its Script.tags, creating missing tags."""
+    names = {name for script in scripts for name in split_tags(script.tags)}
+    with session.no_autoflush:
+        tags = {tag.name: tag for tag in session.new if isinstance(tag, Tag)}
+        missing = names - tags.keys()
+        if missing:
+            tags.update((tag.name, tag) for tag in session.query(Tag).filter(Tag.name.in_(missing)))
+            missing -= tags.keys()
+        if missing:
+            _insert_tags(session, missing)
+            tags.update((tag.name, tag) for tag in session.query(Tag).filter(Tag.name.in_(missing)))
+        for script in scripts:
+            script.tag_objects = [tags[name] for name in split_tags(script.tags)]
+
+
+@event.listens_for(Session, 'before_flush')
+def _sync_tags(session, flush_context, instances):
+    changed = [obj for obj in session.new if isinstance(obj, Script)]
+    changed += [
+        obj for obj in session.dirty
+        if isinstance(obj, Script) and inspect(obj).attrs.tags.history.has_changes()
+    ]
+    if changed:
+        link_tags(session, changed)
+
+
+def link_untagged_scripts() -> int:
+    """
+    Link scripts saved before tags were normalized (call at startup).
+
+    Returns:
+        Number of scripts linked
+    """
+    scripts = Script.query.filter(
+        Script.tags.isnot(None), Script.tags != '', ~Script.tag_objects.any()
+    ).all()
+    if scripts:
+        link_tags(db.session, scripts)
+        db.session.commit()
+    return len(scripts)
+
+
+def tag_filter(names: List[str], match_all: bool = True):
+    """
+    Condition on Script: tagged with all (or, with match_all False, any) of names.
+
+    One subquery over script_tags, however many tags are given.
+    """
+    names = split_tags(names)
+    tagged = (
+        select(script_tags.c.script_id)
+        .join(Tag, Tag.id == script_tags.c.tag_id)
+        .where(Tag.name.in_(names))
+    )
+    if match_all:
+        tagged = tagged.group_by(script_tags.c.script_id).having(func.count() == len(names))
+    return Script.id.in_(tagged)
+
+
+def facet_counts(visible=None) -> Dict[str, List[Dict]]:
+    """
+    Count scripts per tag and per category, most used first.
+
+    Args:
+        visible: Condition on Script limiting the scripts counted (None counts all)
+
+    Returns:
+        Dictionary with 'tags' and 'categories', each a list of {name, count}
+    """
+    count = func.count(Script.id)
+    tags = (
+        db.session.query(Tag.name, count)
+        .join(script_tags, script_tags.c.tag_id == Tag.id)
+        .join(Script, Script.id == script_tags.c.script_id)
+    )
+    categories = db.session.query(Script.category, count).filter(Script.category.isnot(None), Script.category != '')
+    if visible is not None:
+        tags = tags.filter(visible)
+        categories = categories.filter(visible)
+    return {
+        'tags': _facet(tags.group_by(Tag.name).order_by(count.desc(), Tag.name)),
+        'categories': _facet(categories.group_by(Script.category).order_by(count.desc(), Script.category))
+    }
+
+
+def _facet(rows) -> List[Dict]:
+    return [{'name': name, 'count': count} for name, count in rows]
@@ -0,0 +1,240 @@
+"""
+Persisted security verdicts keyed by script content hash.
+
+A script body is validated once per rule-set version: when it is created or
+updated, or in bulk (in a process pool, in the background) at startup and
+whenever a reload switches to a new rule set. Executions and /validate calls
+then look the verdict up by (content_hash, rule_set_version) instead of
+re-scanning the script; lookups never write.
+
+Script.content_hash is set whenever content is assigned, so it is written in
+the same flush as the body it describes, and lookups for a script rehash its
+current content rather than trusting the stored hash.
+"""
+import hashlib
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from models import db, Script, ValidationVerdict
+from services.security_rules import (
+    CompiledRuleSet, SecurityRuleDefinition, compile_rules, get_active_rule_set, on_rule_set_change
+)
+
+# Background recomputes by rule-set version, so a version is refreshed once at a time
+_refreshing: Dict[str, threading.Thread] = {}
+_refresh_lock = threading.Lock()
+
+
+def content_hash(content: str) -> str:
+    """Return the sha256 hex digest of a script body."""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+@event.listens_for(Script.content, 'set')
+def _hash_content(script, value, oldvalue, initiator):
+    script.content_hash = content_hash(value) if value is not None else None
+
+
+def _store(digest: str, rule_set: CompiledRuleSet, is_valid: bool, issues: List[str],
+           hits: List[Dict]) -> ValidationVerdict:
+    """Insert a verdict, tolerating a concurrent insert of the same key."""
+    verdict = ValidationVerdict(
+        content_hash=digest,
+        rule_set_version=rule_set.version,
+        is_valid=is_valid,
+        issues=issues,
+        hits=hits
+    )
+    db.session.add(verdict)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        verdict = ValidationVerdict.query.filter_by(
+            content_hash=digest, rule_set_version=rule_set.version
+        ).first()
+    return verdict
+
+
+def get_verdict(content: str, digest: Optional[str] = None,
+                rule_set: Optional[CompiledRuleSet] = None) -> ValidationVerdict:
+    """
+    Return the verdict for a script body, validating and storing it on a miss.
+
+    Args:
+        content: Script content (only scanned on a miss)
+        digest: Precomputed content hash, if known
+        rule_set: Rule set to validate against (defaults to the active one)
+
+    Returns:
+        ValidationVerdict for (content hash, rule-set version)
+    """
+    rule_set = rule_set or get_active_rule_set()
+    digest = digest or content_hash(content)
+
+    verdict = ValidationVerdict.query.filter_by(
+        content_hash=digest, rule_set_version=rule_set.version
+    ).first()
+    if verdict:
+        return verdict
+
+    is_valid, issues, hits = rule_set.validate(content)
+    return _store(digest, rule_set, is_valid, issues, [hit.to_dict() for hit in hits])
+
+
+def record_script_verdict(script: Script) -> ValidationVerdict:
+    """
+    Hash a script's content and make sure a verdict exists for it.
+
+    Called when a script is created or its content changes. Commits.
+    """
+    digest = content_hash(script.content)
+    if script.content_hash != digest:
+        script.content_hash = digest
+        db.session.commit()
+    return get_verdict(script.content, digest)
+
+
+def get_script_verdict(script: Script) -> ValidationVerdict:
+    """
+    Return the verdict for a script's current content, without writing.
+
+    The content is rehashed, so a stale or missing stored hash never selects
+    the verdict of another body. A body without a stored verdict for the
+    active rule set (one the bulk recompute has not reached yet) is validated
+    in memory; the returned verdict is not added to the session.
+    """
+    rule_set = get_active_rule_set()
+    digest = content_hash(script.content)
+    verdict = ValidationVerdict.query.filter_by(
+        content_hash=digest, rule_set_version=rule_set.version
+    ).first()
+    if verdict:
+        return verdict
+
+    is_valid, issues, hits = rule_set.validate(script.content)
+    return ValidationVerdict(
+        content_hash=digest,
+        rule_set_version=rule_set.version,
+        is_valid=is_valid,
+        issues=issues,
+        hits=[hit.to_dict() for hit in hits]
+    )
+
+
+def _validate_batch(rule_dicts: List[Dict], items: List[Tuple[str, str]]) -> List[Tuple]:
+    """Process-pool worker: validate (hash, content) pairs against serialized rules."""
+    rule_set = compile_rules(SecurityRuleDefinition.from_dict(rule) for rule in rule_dicts)
+    results = []
+    for digest, content in items:
+        is_valid, issues, hits = rule_set.validate(content)
+        results.append((digest, is_valid, issues, [hit.to_dict() for hit in hits]))
+    return results
+
+
+def recompute_verdicts(rule_set: Optional[CompiledRuleSet] = None,
+                       batch_size: int = 200, max_workers: Optional[int] = None) -> int:
+    """
+    Validate, in a process pool, every distinct script body that has no
+    verdict for the given rule-set version. Requires an app context.
+
+    Args:
+        rule_set: Rule set to validate against (defaults to the active one)
+        batch_size: Script bodies sent to a worker process at a time
+        max_workers: Worker process count (defaults to the CPU count)
+
+    Returns:
+        Number of verdicts created
+    """
+    rule_set = rule_set or get_active_rule_set()
+
+    # Backfill hashes for scripts written before verdicts existed
+    for script in Script.query.filter(Script.content_hash.is_(None)).all():
+        script.content_hash = content_hash(script.content)
+    db.session.commit()
+
+    known = db.session.query(ValidationVerdict.content_hash).filter(
+        ValidationVerdict.rule_set_version == rule_set.version
+    )
+    pending = {}
+    rows = db.session.query(Script.content_hash, Script.content).filter(
+        ~Script.content_hash.in_(known)
+    ).yield_per(batch_size)
+    for digest, content in rows:
+        pending.setdefault(digest, content)
+
+    if not pending:
+        return 0
+
+    items = list(pending.items())
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    rule_dicts = [rule.to_dict() for rule in rule_set.rules]
+
+    created = 0
+    # Spawned, not forked: this runs beside the server's threads, whose locks a fork would copy
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        for results in pool.map(_validate_batch, [rule_dicts] * len(batches), batches):
+            db.session.add_all([
+                ValidationVerdict(
+                    content_hash=digest,
+                    rule_set_version=rule_set.version,
+                    is_valid=is_valid,
+                    issues=issues,
+                    hits=hits
+                )
+                for digest, is_valid, issues, hits in results
+            ])
+            try:
+                db.session.commit()
+                created += len(results)
+            except IntegrityError:
+                # A script write stored some of these meanwhile; insert the rest one by one
+                db.session.rollback()
+                stored = {digest for digest, in db.session.query(ValidationVerdict.content_hash).filter(
+                    ValidationVerdict.rule_set_version == rule_set.version,
+                    ValidationVerdict.content_hash.in_([result[0] for result in results])
+                )}
+                for digest, is_valid, issues, hits in results:
+                    if digest not in stored:
+                        _store(digest, rule_set, is_valid, issues, hits)
+                        created += 1
+    return created
+
+
+def start_verdict_refresh(app, rule_set: Optional[CompiledRuleSet] = None) -> threading.Thread:
+    """
+    Recompute missing verdicts for a rule set (the active one by default) in
+    the background, unless a refresh of that version is already running.
+
+    Returns:
+        The thread running the refresh
+    """
+    rule_set = rule_set or get_active_rule_set()
+
+    def refresh():
+        with app.app_context():
+            try:
+                recompute_verdicts(rule_set)
+            finally:
+                db.session.remove()
+
+    with _refresh_lock:
+        running = _refreshing.get(rule_set.version)
+        if running is not None and running.is_alive():
+            return running
+        thread = threading.Thread(target=refresh, name='verdict-refresh', daemon=True)
+        _refreshing[rule_set.version] = thread
+        thread.start()
+    return thread
+
+
+def _refresh_on_change(rule_set: CompiledRuleSet):
+    # Reloads that notify run inside an app context (they read the security_rules table)
+    start_verdict_refresh(current_app._get_current_object(), rule_set)
+
+
+on_rule_set_change(_refresh_on_change)
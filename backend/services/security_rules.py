@@ -0,0 +1,420 @@
+"""
+Compiled security rule engine for script validation.
+
+A rule set is compiled once per version into a single scanner that walks the
+script text in one pass:
+
+- cmdlet rules never appear in the scanner. Every identifier token
+  (``\\w+(?:-\\w+)*``) is looked up in a case-folded dictionary, so adding
+  cmdlets does not make the scan slower.
+- pattern rules are indexed by their leading literal text ('rm', 'iex',
+  'Invoke-WebRequest', ...). All literals are merged into one trie-shaped
+  alternation, so finding candidate positions costs the same for 5 or 500
+  rules, and a full rule regex only runs where its literal occurs.
+- pattern rules without a leading literal cannot be indexed and are searched
+  individually, as before.
+
+Hits carry the rule, the matched text and the 1-based line and column.
+
+Rules stored in the security_rules table are reread at most every
+SECURITY_RULES_RELOAD_INTERVAL seconds (default 60), so rows added or
+disabled by any process take effect everywhere without a restart. A new rule
+set has a new version; listeners registered with on_rule_set_change are told
+when a reload switches to one (script_verdicts revalidates stored scripts).
+"""
+import bisect
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+TOKEN_PATTERN = r'\w+(?:-\w+)*'
+CMDLET_PATTERN = re.compile(rf'^{TOKEN_PATTERN}$')
+
+DEFAULT_CMDLETS = [
+    'Remove-Item', 'Remove-Computer', 'Remove-ADUser',
+    'Format-Volume', 'Clear-Disk', 'Initialize-Disk',
+    'Remove-VM', 'Remove-VMHost', 'Remove-Datacenter',
+    'Invoke-Expression', 'Invoke-Command',
+    'Start-Process', 'New-Service', 'Stop-Service',
+    'Disable-WindowsOptionalFeature', 'Uninstall-WindowsFeature',
+    'Set-ExecutionPolicy', 'Remove-Module'
+]
+
+DEFAULT_PATTERNS = [
+    r'rm\s+-rf',
+    r'del\s+/[fs]',
+    r'\|\s*Out-File\s+.*>',
+    r'Invoke-WebRequest.*\|.*Invoke-Expression',
+    r'iex\s*\(',
+    r'&\s*\(',
+]
+
+
+class SecurityRuleDefinition:
+    """A single cmdlet or pattern rule."""
+
+    CMDLET = 'cmdlet'
+    PATTERN = 'pattern'
+
+    def __init__(self, rule_type: str, value: str, message: Optional[str] = None):
+        """
+        Initialize rule.
+
+        Args:
+            rule_type: 'cmdlet' (whole-word, case-insensitive) or 'pattern' (regex)
+            value: Cmdlet name or regular expression
+            message: Issue text reported on a hit (defaults to the legacy wording)
+        """
+        if rule_type not in (self.CMDLET, self.PATTERN):
+            raise ValueError(f"Unknown rule type: {rule_type}")
+        if rule_type == self.PATTERN:
+            re.compile(value)
+
+        self.rule_type = rule_type
+        self.value = value
+        if message:
+            self.message = message
+        elif rule_type == self.CMDLET:
+            self.message = f"Restricted cmdlet detected: {value}"
+        else:
+            self.message = f"Dangerous pattern detected: {value}"
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'SecurityRuleDefinition':
+        """Create rule from a {'type', 'value', 'message'} dictionary."""
+        return cls(data.get('type', cls.PATTERN), data['value'], data.get('message'))
+
+    def to_dict(self) -> Dict:
+        """Convert rule to dictionary."""
+        return {'type': self.rule_type, 'value': self.value, 'message': self.message}
+
+
+class RuleHit:
+    """A rule match at a position in the scanned script."""
+
+    def __init__(self, rule: SecurityRuleDefinition, match: str, offset: int, line: int, column: int):
+        self.rule = rule
+        self.match = match
+        self.offset = offset
+        self.line = line
+        self.column = column
+
+    def to_dict(self) -> Dict:
+        """Convert hit to dictionary."""
+        return {
+            'type': self.rule.rule_type,
+            'rule': self.rule.value,
+            'message': self.rule.message,
+            'match': self.match,
+            'line': self.line,
+            'column': self.column
+        }
+
+
+REGEX_METACHARACTERS = frozenset('.^$*+?{}[]()|\\')
+LEADING_ASSERTIONS = ('^', r'\b', r'\A')
+
+
+def literal_prefix(pattern: str) -> str:
+    """
+    Return the literal text every match of pattern must start with.
+
+    A conservative scan of the pattern text: leading zero-width assertions
+    (\\b, \\A, ^) are skipped, then plain characters and backslash-escaped
+    punctuation are collected up to the first other metacharacter. A character
+    made optional by a quantifier is not part of the prefix. An empty string
+    means the pattern has no usable prefix (including any pattern with a
+    top-level alternation), and it is searched on its own instead.
+    """
+    if _has_top_level_alternation(pattern):
+        return ''
+
+    index = 0
+    while True:
+        assertion = next((a for a in LEADING_ASSERTIONS if pattern.startswith(a, index)), None)
+        if assertion is None:
+            break
+        index += len(assertion)
+
+    chars = []
+    while index < len(pattern):
+        char = pattern[index]
+        if char == '\\':
+            escaped = pattern[index + 1:index + 2]
+            # \s, \d, \b, \1, \x41 ... are classes, assertions or escapes we do not decode
+            if not escaped or escaped.isalnum():
+                break
+            char, step = escaped, 2
+        elif char in REGEX_METACHARACTERS:
+            break
+        else:
+            step = 1
+        following = pattern[index + step:index + step + 1]
+        if following in ('*', '?', '{'):
+            break
+        chars.append(char)
+        if following == '+':
+            break
+        index += step
+    return ''.join(chars).lower()
+
+
+def _has_top_level_alternation(pattern: str) -> bool:
+    """True if pattern has a '|' outside groups and character classes."""
+    depth = 0
+    in_class = False
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if char == '\\':
+            index += 2
+            continue
+        if in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+            # A ']' right after '[' or '[^' is a literal member
+            if pattern.startswith(']', index + 1):
+                index += 1
+            elif pattern.startswith('^]', index + 1):
+                index += 2
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            return True
+        index += 1
+    return False
+
+
+def trie_regex(words: Iterable[str]) -> str:
+    """Build a regex alternation shaped like a trie of the given words."""
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def render(node):
+        terminal = '' in node
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if terminal:
+            return '(?:' + body + ')?'
+        return body
+
+    return render(trie)
+
+
+class CompiledRuleSet:
+    """Immutable, compiled rule set identified by a content version hash."""
+
+    def __init__(self, rules: Iterable[SecurityRuleDefinition]):
+        self.rules = list(rules)
+        self.version = self._compute_version(self.rules)
+
+        # Cmdlets made only of word characters and hyphens are dictionary
+        # lookups; anything else falls back to an equivalent \b...\b pattern.
+        self._cmdlets: Dict[str, SecurityRuleDefinition] = {}
+        self._max_cmdlet_parts = 1
+        self._by_prefix: Dict[str, List] = {}
+        self._unindexed: List = []
+
+        for rule in self.rules:
+            if rule.rule_type == SecurityRuleDefinition.CMDLET and CMDLET_PATTERN.match(rule.value):
+                self._cmdlets.setdefault(rule.value.casefold(), rule)
+                self._max_cmdlet_parts = max(self._max_cmdlet_parts, rule.value.count('-') + 1)
+                continue
+
+            pattern = rule.value
+            if rule.rule_type == SecurityRuleDefinition.CMDLET:
+                pattern = rf'\b{re.escape(rule.value)}\b'
+            compiled = re.compile(pattern, re.IGNORECASE)
+            prefix = literal_prefix(pattern)
+            if prefix:
+                self._by_prefix.setdefault(prefix, []).append((rule, compiled))
+            else:
+                self._unindexed.append((rule, compiled))
+
+        alternatives = []
+        if self._by_prefix:
+            alternatives.append(f'(?P<lit>{trie_regex(self._by_prefix)})')
+        alternatives.append(rf'(?P<tok>\b{TOKEN_PATTERN})')
+        self._scanner = re.compile('|'.join(alternatives), re.IGNORECASE)
+        self._token = re.compile(rf'\b{TOKEN_PATTERN}')
+
+    @staticmethod
+    def _compute_version(rules: List[SecurityRuleDefinition]) -> str:
+        canonical = json.dumps([rule.to_dict() for rule in rules], sort_keys=True)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+    def _cmdlet_hits(self, token: str):
+        """Yield (rule, matched_text) for cmdlets that are hyphen-prefixes of token."""
+        parts = token.split('-')
+        for count in range(1, min(len(parts), self._max_cmdlet_parts) + 1):
+            candidate = '-'.join(parts[:count])
+            rule = self._cmdlets.get(candidate.casefold())
+            if rule:
+                yield rule, candidate
+
+    def scan(self, text: str) -> List[RuleHit]:
+        """
+        Scan text once and return every rule hit in document order.
+
+        Args:
+            text: Script content
+
+        Returns:
+            List of RuleHit with 1-based line and column
+        """
+        found = []
+
+        # Restarting one character after each match (instead of at its end)
+        # keeps overlapping hits, e.g. a pattern starting inside a token.
+        search = self._scanner.search
+        position = 0
+        while True:
+            match = search(text, position)
+            if match is None:
+                break
+            offset = match.start()
+            position = offset + 1
+
+            if match.lastgroup == 'tok':
+                if self._cmdlets:
+                    for rule, matched in self._cmdlet_hits(match.group('tok')):
+                        found.append((offset, rule, matched))
+                continue
+
+            literal = match.group('lit').lower()
+            for length in range(1, len(literal) + 1):
+                for rule, compiled in self._by_prefix.get(literal[:length], ()):
+                    hit = compiled.match(text, offset)
+                    if hit:
+                        found.append((offset, rule, hit.group(0)))
+            if self._cmdlets:
+                token = self._token.match(text, offset)
+                if token:
+                    for rule, matched in self._cmdlet_hits(token.group(0)):
+                        found.append((offset, rule, matched))
+
+        for rule, compiled in self._unindexed:
+            for hit in compiled.finditer(text):
+                found.append((hit.start(), rule, hit.group(0)))
+
+        if not found:
+            return []
+
+        found.sort(key=lambda item: item[0])
+        line_starts = [0] + [m.end() for m in re.finditer('\n', text)]
+        hits = []
+        for offset, rule, matched in found:
+            line = bisect.bisect_right(line_starts, offset)
+            hits.append(RuleHit(rule, matched, offset, line, offset - line_starts[line - 1] + 1))
+        return hits
+
+    def validate(self, text: str):
+        """
+        Validate text against the rule set.
+
+        Returns:
+            Tuple of (is_valid, list_of_issues, list_of_hits); issues hold one
+            message per rule that fired, in rule-set order
+        """
+        hits = self.scan(text)
+        fired = {id(hit.rule) for hit in hits}
+        issues = [rule.message for rule in self.rules if id(rule) in fired]
+        return len(issues) == 0, issues, hits
+
+
+def default_rules() -> List[SecurityRuleDefinition]:
+    """Built-in rules (the historical RESTRICTED_CMDLETS and DANGEROUS_PATTERNS)."""
+    return (
+        [SecurityRuleDefinition(SecurityRuleDefinition.CMDLET, c) for c in DEFAULT_CMDLETS] +
+        [SecurityRuleDefinition(SecurityRuleDefinition.PATTERN, p) for p in DEFAULT_PATTERNS]
+    )
+
+
+def load_rules_from_file(path: str) -> List[SecurityRuleDefinition]:
+    """Load rules from a JSON file containing a list of rule dictionaries."""
+    with open(path) as f:
+        return [SecurityRuleDefinition.from_dict(item) for item in json.load(f)]
+
+
+def load_rules_from_db() -> List[SecurityRuleDefinition]:
+    """Load enabled rules from the security_rules table (requires app context)."""
+    from models import SecurityRule
+
+    rows = SecurityRule.query.filter_by(enabled=True).order_by(SecurityRule.id).all()
+    return [SecurityRuleDefinition(row.rule_type, row.value, row.message) for row in rows]
+
+
+_compiled: Dict[str, CompiledRuleSet] = {}
+_active: Optional[CompiledRuleSet] = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+_listeners: List[Callable[[CompiledRuleSet], None]] = []
+
+
+def on_rule_set_change(listener: Callable[[CompiledRuleSet], None]):
+    """
+    Call listener with the new rule set whenever a reload with database access
+    replaces the active rule set by one of another version.
+    """
+    _listeners.append(listener)
+
+
+def compile_rules(rules: Iterable[SecurityRuleDefinition]) -> CompiledRuleSet:
+    """Compile rules, reusing an existing compilation of the same version."""
+    rule_set = CompiledRuleSet(rules)
+    with _lock:
+        return _compiled.setdefault(rule_set.version, rule_set)
+
+
+def reload_rule_set() -> CompiledRuleSet:
+    """
+    Rebuild the active rule set.
+
+    Base rules come from SECURITY_RULES_FILE when set, otherwise the built-in
+    defaults; enabled rules from the database are appended when an app
+    context is available.
+    """
+    global _active, _loaded_at
+    from flask import has_app_context
+
+    rules_file = os.getenv('SECURITY_RULES_FILE')
+    rules = load_rules_from_file(rules_file) if rules_file else default_rules()
+    with_db = has_app_context()
+    if with_db:
+        rules.extend(load_rules_from_db())
+
+    rule_set = compile_rules(rules)
+    with _lock:
+        previous, _active = _active, rule_set
+        if with_db:
+            _loaded_at = time.monotonic()
+    if with_db and previous is not None and previous.version != rule_set.version:
+        for listener in _listeners:
+            listener(rule_set)
+    return rule_set
+
+
+def get_active_rule_set() -> CompiledRuleSet:
+    """Return the active compiled rule set, building it on first use and rereading database rules when due."""
+    from flask import has_app_context
+
+    if _active is None:
+        return reload_rule_set()
+    interval = float(os.getenv('SECURITY_RULES_RELOAD_INTERVAL', 60))
+    if interval > 0 and has_app_context() and time.monotonic() - _loaded_at >= interval:
+        return reload_rule_set()
+    return _active
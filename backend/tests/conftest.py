@@ -4,8 +4,12 @@ Pytest configuration and fixtures for PSMachine tests.
 import pytest
 import os
 import tempfile
+import threading
+from sqlalchemy import event
 from app import app as flask_app
 from models import db, User, Script, Execution
+from services.execution_scheduler import scheduler
+from services.facet_cache import facet_cache
 
 
 @pytest.fixture(scope='session')
@@ -44,6 +48,7 @@ def app_context(app):
 def init_database(app_context):
     """Initialize clean database for each test."""
     db.create_all()
+    facet_cache.clear()
 
     yield db
 
@@ -116,3 +121,42 @@ def admin_headers(client, test_admin):
     })
     token = response.get_json()['access_token']
     return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def idle_scheduler(monkeypatch):
+    """Scheduler whose runner blocks, so submitted executions stay put."""
+    release = threading.Event()
+    monkeypatch.setattr(scheduler, 'runner', lambda execution_id: release.wait(5))
+    monkeypatch.setattr(scheduler, 'max_concurrency', 1)
+    yield scheduler
+    release.set()
+    with scheduler._cond:
+        scheduler._queue.clear()
+        scheduler._order.clear()
+        scheduler._entries.clear()
+
+
+@pytest.fixture
+def count_queries(init_database):
+    """
+    Return a function that calls func(*args) and returns the number of SQL
+    statements it issued.
+
+    The session is expired first, so relationships are loaded as in a fresh
+    request instead of being served from objects the test created.
+    """
+    def count(func, *args, **kwargs):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        db.session.expire_all()
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            func(*args, **kwargs)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        return len(statements)
+    return count
@@ -0,0 +1,77 @@
+"""
+Tests for runtime estimates and shortest-expected-job-first ordering.
+"""
+from datetime import datetime, timedelta
+import pytest
+from models import db, Execution
+from services.duration_estimates import ewma, record_duration, schedule_fields
+
+
+def add_runs(script, user, durations):
+    """Store completed runs of script, oldest first."""
+    start = datetime.utcnow() - timedelta(hours=1)
+    for index, duration in enumerate(durations):
+        db.session.add(Execution(
+            script_id=script.id, user_id=user.id, status='completed',
+            duration_seconds=duration, completed_at=start + timedelta(minutes=index)
+        ))
+    db.session.commit()
+
+
+@pytest.mark.unit
+class TestDurationEstimates:
+    """Test the per-script moving average."""
+
+    def test_ewma_weights_recent_runs(self):
+        """Test newer durations count more than older ones."""
+        assert ewma([10, 10, 100], alpha=0.5) == 55
+        assert ewma([100, 10, 10], alpha=0.5) == 32.5
+        assert ewma([], alpha=0.5) is None
+
+    def test_first_estimate_seeded_from_history(self, test_script, test_user):
+        """Test a script's history is folded in when it gets its first estimate."""
+        add_runs(test_script, test_user, [4, 4, 4, 4])
+
+        record_duration(test_script, 4)
+
+        assert test_script.estimated_duration_seconds == pytest.approx(4)
+
+    def test_estimate_moves_towards_new_runs(self, app, test_script):
+        """Test each completed run updates the estimate by alpha."""
+        test_script.estimated_duration_seconds = 100
+        app.config['EXECUTION_ESTIMATE_ALPHA'] = 0.5
+        try:
+            record_duration(test_script, 20)
+        finally:
+            del app.config['EXECUTION_ESTIMATE_ALPHA']
+
+        assert test_script.estimated_duration_seconds == 60
+
+    def test_priority_adds_estimate_divided_by_aging_rate(self, app, test_script):
+        """Test the queue key of short scripts is earlier than that of long ones."""
+        queued_at = datetime(2024, 1, 1)
+        test_script.estimated_duration_seconds = 1200
+        app.config['EXECUTION_AGING_RATE'] = 2.0
+        try:
+            fields = schedule_fields(test_script, queued_at)
+        finally:
+            del app.config['EXECUTION_AGING_RATE']
+
+        assert fields['estimated_duration_seconds'] == 1200
+        assert fields['priority_at'] == queued_at + timedelta(seconds=600)
+
+
+@pytest.mark.integration
+class TestEstimateEndpoint:
+    """Test the estimate is exposed when queuing."""
+
+    def test_execute_returns_estimate(self, client, auth_headers, test_script, idle_scheduler):
+        """Test the response and the execution carry the script's estimate."""
+        test_script.estimated_duration_seconds = 2.5
+        db.session.commit()
+
+        response = client.post(f'/api/execution/execute/{test_script.id}', json={}, headers=auth_headers)
+
+        data = response.get_json()
+        assert data['estimated_duration_seconds'] == 2.5
+        assert Execution.query.get(data['execution_id']).to_dict()['estimated_duration_seconds'] == 2.5
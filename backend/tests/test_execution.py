@@ -0,0 +1,465 @@
+"""
+Tests for execution endpoints.
+"""
+import threading
+import time
+import pytest
+from sqlalchemy import delete
+from models import db, Execution, ExecutionBatch, ExecutionOutputChunk, OutputBlob, Script
+from services.output_store import OutputChunkWriter, finalize_output
+from services.process_registry import process_registry
+from services.result_cache import result_cache, cache_key
+from services.execution_coalescer import coalescer, mirror_leader
+from services import execution_runner
+
+
+class FakeExecutor:
+    """Stands in for PowerShellExecutor, completing every run with fixed output."""
+
+    def __init__(self, enable_restrictions=True, pwsh_version=None):
+        self.enable_restrictions = enable_restrictions
+        self.pwsh_path = 'pwsh'
+
+    def execute(self, **kwargs):
+        kwargs['batch_callback']('stdout', ['shared result'])
+        return {'status': 'completed', 'exit_code': 0, 'output': '', 'error_output': '',
+                'duration_seconds': 0.1}
+
+
+@pytest.mark.integration
+class TestExecuteEndpoint:
+    """Test queuing of script executions."""
+
+    def test_execute_queues_execution(self, client, auth_headers, test_script, idle_scheduler):
+        """Test execution is persisted as queued with a queue position."""
+        response = client.post(
+            f'/api/execution/execute/{test_script.id}',
+            json={'timeout': 60},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 202
+        data = response.get_json()
+        assert data['status'] == 'queued'
+        assert data['queue_position'] >= 1
+
+        execution = Execution.query.get(data['execution_id'])
+        assert execution.timeout_seconds == 60
+        assert execution.queued_at is not None
+        assert execution.worker_id == idle_scheduler.worker_id
+        assert execution.heartbeat_at is not None
+
+    def test_started_execution_is_not_run_again(self, test_script, test_user, monkeypatch):
+        """Test a run already started by another process is not started twice."""
+        execution = Execution(script_id=test_script.id, user_id=test_user.id, status='running',
+                              worker_id='api-2')
+        db.session.add(execution)
+        db.session.commit()
+        executed = []
+        monkeypatch.setattr(execution_runner, 'PowerShellExecutor',
+                            lambda *args, **kwargs: executed.append(True))
+
+        execution_runner.run_execution(execution.id)
+
+        assert executed == []
+        assert (execution.status, execution.worker_id) == ('running', 'api-2')
+
+    def test_execute_rejects_when_queue_full(self, client, auth_headers, test_script,
+                                             idle_scheduler, monkeypatch):
+        """Test a full queue sheds load with 429 and Retry-After."""
+        monkeypatch.setattr(idle_scheduler, 'max_queue_size', 0)
+        monkeypatch.setattr(idle_scheduler, 'retry_after', 9)
+
+        response = client.post(
+            f'/api/execution/execute/{test_script.id}',
+            json={},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '9'
+        assert Execution.query.count() == 0
+
+    def test_get_execution_reports_queue_position(self, client, auth_headers, test_script,
+                                                  idle_scheduler):
+        """Test queued executions expose their position."""
+        ids = [
+            client.post(f'/api/execution/execute/{test_script.id}', json={},
+                        headers=auth_headers).get_json()['execution_id']
+            for _ in range(3)
+        ]
+
+        response = client.get(f'/api/execution/executions/{ids[-1]}', headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['status'] in ('queued', 'running')
+        if data['status'] == 'queued':
+            assert data['queue_position'] >= 1
+
+
+@pytest.mark.integration
+class TestCancelEndpoint:
+    """Test cancellation of queued and running executions."""
+
+    def test_cancel_queued_execution(self, client, auth_headers, test_script, idle_scheduler):
+        """Test a queued execution is dropped from the queue and marked cancelled."""
+        ids = [
+            client.post(f'/api/execution/execute/{test_script.id}', json={},
+                        headers=auth_headers).get_json()['execution_id']
+            for _ in range(2)
+        ]
+
+        response = client.post(f'/api/execution/executions/{ids[-1]}/cancel', headers=auth_headers)
+
+        assert response.status_code == 200
+        assert Execution.query.get(ids[-1]).status == 'cancelled'
+        assert idle_scheduler.queue_position(ids[-1]) is None
+
+    def test_cancel_running_execution_kills_process(self, client, auth_headers, test_script,
+                                                   test_user):
+        """Test a running execution's kill function is invoked."""
+        execution = Execution(script_id=test_script.id, user_id=test_user.id, status='running')
+        db.session.add(execution)
+        db.session.commit()
+        killed = threading.Event()
+        process_registry.track(execution.id)
+        process_registry.attach(execution.id, killed.set)
+
+        response = client.post(f'/api/execution/executions/{execution.id}/cancel',
+                               headers=auth_headers)
+
+        assert response.status_code == 202
+        assert killed.is_set()
+        assert process_registry.release(execution.id) is True
+
+    def test_cancel_taken_from_queue_before_start(self, client, auth_headers, test_script, idle_scheduler):
+        """Test a job a worker has taken but not started yet is still cancellable."""
+        execution_id = client.post(f'/api/execution/execute/{test_script.id}', json={},
+                                   headers=auth_headers).get_json()['execution_id']
+        deadline = time.monotonic() + 2
+        while idle_scheduler.queue_position(execution_id) is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        response = client.post(f'/api/execution/executions/{execution_id}/cancel', headers=auth_headers)
+
+        assert response.status_code == 202
+        assert process_registry.is_cancelled(execution_id)
+
+    def test_cancel_finished_execution_conflicts(self, client, auth_headers, test_script,
+                                                 test_user):
+        """Test finished executions cannot be cancelled."""
+        execution = Execution(script_id=test_script.id, user_id=test_user.id, status='completed')
+        db.session.add(execution)
+        db.session.commit()
+
+        response = client.post(f'/api/execution/executions/{execution.id}/cancel',
+                               headers=auth_headers)
+
+        assert response.status_code == 409
+
+
+    def test_delete_running_execution_refused(self, client, auth_headers, test_script, test_user):
+        """Test a running execution is not deleted until its runner has let go of it."""
+        execution = Execution(script_id=test_script.id, user_id=test_user.id, status='running')
+        db.session.add(execution)
+        db.session.commit()
+        execution_id = execution.id
+        process_registry.track(execution_id)
+
+        response = client.delete(f'/api/execution/executions/{execution_id}', headers=auth_headers)
+
+        assert response.status_code == 409
+        assert Execution.query.get(execution_id) is not None
+
+        # Cancelled, but the runner has not finished with it yet
+        execution.status = 'cancelled'
+        db.session.commit()
+        assert client.delete(f'/api/execution/executions/{execution_id}', headers=auth_headers).status_code == 409
+
+        process_registry.release(execution_id)
+        response = client.delete(f'/api/execution/executions/{execution_id}', headers=auth_headers)
+
+        assert response.status_code == 200
+        assert Execution.query.get(execution_id) is None
+
+
+@pytest.mark.integration
+class TestBatchEndpoint:
+    """Test fan-out of one script over many parameter sets."""
+
+    def test_batch_creates_children(self, client, auth_headers, test_script, idle_scheduler):
+        """Test one batch row and one queued child per parameter set."""
+        sets = [{'vm': f'vm-{i}'} for i in range(5)]
+        response = client.post(
+            f'/api/execution/execute/{test_script.id}/batch',
+            json={'parameter_sets': sets, 'parallelism': 8},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 202
+        batch = ExecutionBatch.query.get(response.get_json()['batch_id'])
+        children = batch.executions.order_by(Execution.id).all()
+        assert [child.parameters for child in children] == sets
+        assert {child.status for child in children} <= {'queued', 'running'}
+        assert batch.parallelism == idle_scheduler.max_concurrency  # capped by the scheduler
+
+        progress = client.get(f'/api/execution/batches/{batch.id}', headers=auth_headers).get_json()
+        assert progress['progress']['total'] == 5
+        assert progress['progress']['complete'] is False
+        assert len(progress['executions']) == 5
+
+    def test_batch_validates_every_set(self, client, auth_headers, test_script, idle_scheduler):
+        """Test invalid parameter sets are reported by index and nothing is created."""
+        test_script.parameters = [{'name': 'vm', 'type': 'string', 'required': True}]
+        db.session.commit()
+
+        response = client.post(
+            f'/api/execution/execute/{test_script.id}/batch',
+            json={'parameter_sets': [{'vm': 'a'}, {}, {'vm': 3}]},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 400
+        assert [error['index'] for error in response.get_json()['validation_errors']] == [1, 2]
+        assert ExecutionBatch.query.count() == 0
+        assert Execution.query.count() == 0
+
+
+@pytest.mark.integration
+class TestCoalescingEndpoint:
+    """Test identical requests for coalescable scripts share one run."""
+
+    @pytest.fixture
+    def coalescable(self, test_script, idle_scheduler):
+        test_script.coalesce = True
+        db.session.commit()
+        coalescer.clear()
+        yield test_script
+        coalescer.clear()
+
+    def execute(self, client, headers, script, parameters):
+        return client.post(
+            f'/api/execution/execute/{script.id}',
+            json={'parameters': parameters},
+            headers=headers
+        )
+
+    def test_identical_request_follows_leader(self, client, auth_headers, coalescable, idle_scheduler):
+        """Test the second identical request attaches instead of queueing."""
+        leader = self.execute(client, auth_headers, coalescable, {'site': 'a'}).get_json()
+        follower = self.execute(client, auth_headers, coalescable, {'site': 'a'}).get_json()
+        other = self.execute(client, auth_headers, coalescable, {'site': 'b'}).get_json()
+
+        assert 'coalesced_with_id' not in leader
+        assert follower['coalesced_with_id'] == leader['execution_id']
+        assert 'coalesced_with_id' not in other
+        assert Execution.query.get(follower['execution_id']).coalesced_with_id == leader['execution_id']
+        assert idle_scheduler.queue_position(follower['execution_id']) is None
+        assert coalescer.stats()['followers'] == 1
+
+    def test_admin_runs_are_not_shared(self, client, auth_headers, admin_headers, coalescable):
+        """Test unrestricted and restricted callers never share a run."""
+        self.execute(client, admin_headers, coalescable, {})
+        response = self.execute(client, auth_headers, coalescable, {}).get_json()
+
+        assert 'coalesced_with_id' not in response
+
+    def test_followers_mirror_finished_leader(self, client, auth_headers, coalescable):
+        """Test followers take the leader's status, exit code and output."""
+        leader_id = self.execute(client, auth_headers, coalescable, {}).get_json()['execution_id']
+        follower_id = self.execute(client, auth_headers, coalescable, {}).get_json()['execution_id']
+        leader = Execution.query.get(leader_id)
+        writer = OutputChunkWriter(leader_id, db.engine, flush_interval=60)
+        writer.write('stdout', 'shared result')
+        writer.close()
+        finalize_output(leader_id, writer)
+        db.session.expire(leader)
+        leader.status, leader.exit_code, leader.duration_seconds = 'completed', 0, 1.5
+        db.session.commit()
+
+        mirror_leader(leader, coalescer.finish(leader_id))
+
+        follower = Execution.query.get(follower_id)
+        assert (follower.status, follower.exit_code, follower.duration_seconds) == ('completed', 0, 1.5)
+        assert follower.stream_text('stdout') == 'shared result\n'
+        assert OutputBlob.query.one().ref_count == 2
+        assert coalescer.stats()['in_flight'] == 0
+
+    def test_cancel_follower_detaches(self, client, auth_headers, coalescable):
+        """Test cancelling a follower leaves the leader running for others."""
+        leader_id = self.execute(client, auth_headers, coalescable, {}).get_json()['execution_id']
+        follower_id = self.execute(client, auth_headers, coalescable, {}).get_json()['execution_id']
+
+        response = client.post(f'/api/execution/executions/{follower_id}/cancel', headers=auth_headers)
+
+        assert response.status_code == 200
+        assert Execution.query.get(follower_id).status == 'cancelled'
+        assert Execution.query.get(leader_id).status == 'queued'
+        assert coalescer.followers(leader_id) == []
+
+    def test_cancel_queued_leader_promotes_follower(self, client, auth_headers, coalescable,
+                                                    idle_scheduler):
+        """Test a queued leader's first follower takes its place and leads the others."""
+        # Occupy the only slot so the leader stays queued
+        self.execute(client, auth_headers, coalescable, {'site': 'busy'})
+        leader_id = self.execute(client, auth_headers, coalescable, {}).get_json()['execution_id']
+        first_id = self.execute(client, auth_headers, coalescable, {}).get_json()['execution_id']
+        second_id = self.execute(client, auth_headers, coalescable, {}).get_json()['execution_id']
+
+        response = client.post(f'/api/execution/executions/{leader_id}/cancel', headers=auth_headers)
+
+        assert response.status_code == 200
+        assert Execution.query.get(leader_id).status == 'cancelled'
+        first = Execution.query.get(first_id)
+        assert (first.status, first.coalesced_with_id) == ('queued', None)
+        assert idle_scheduler.queue_position(first_id) is not None
+        assert Execution.query.get(second_id).coalesced_with_id == first_id
+        assert coalescer.followers(first_id) == [second_id]
+        assert self.execute(client, auth_headers, coalescable, {}).get_json()['coalesced_with_id'] == first_id
+
+    def test_cancel_running_leader_keeps_run_for_followers(self, client, auth_headers, coalescable,
+                                                           idle_scheduler, monkeypatch):
+        """Test cancelling a claimed leader only cancels its own caller's execution."""
+        leader_id = self.execute(client, auth_headers, coalescable, {}).get_json()['execution_id']
+        follower_id = self.execute(client, auth_headers, coalescable, {}).get_json()['execution_id']
+        # Claimed by a worker, not running yet
+        idle_scheduler.remove(leader_id)
+
+        response = client.post(f'/api/execution/executions/{leader_id}/cancel', headers=auth_headers)
+
+        assert response.status_code == 200
+        assert Execution.query.get(leader_id).status == 'cancelled'
+        assert coalescer.is_abandoned(leader_id)
+
+        monkeypatch.setattr(execution_runner, 'PowerShellExecutor', FakeExecutor)
+        monkeypatch.setattr(execution_runner, 'get_worker_pool', lambda *args: None)
+        execution_runner.run_execution(leader_id)
+
+        assert Execution.query.get(leader_id).status == 'cancelled'
+        follower = Execution.query.get(follower_id)
+        assert (follower.status, follower.exit_code) == ('completed', 0)
+        assert follower.stream_text('stdout') == 'shared result\n'
+
+    def test_last_follower_cancel_stops_abandoned_run(self, client, auth_headers, coalescable,
+                                                      idle_scheduler):
+        """Test an abandoned run is killed once no follower is waiting for it."""
+        leader_id = self.execute(client, auth_headers, coalescable, {}).get_json()['execution_id']
+        follower_id = self.execute(client, auth_headers, coalescable, {}).get_json()['execution_id']
+        idle_scheduler.remove(leader_id)
+        killed = threading.Event()
+        process_registry.track(leader_id)
+        process_registry.attach(leader_id, killed.set)
+        client.post(f'/api/execution/executions/{leader_id}/cancel', headers=auth_headers)
+
+        assert not killed.is_set()
+
+        response = client.post(f'/api/execution/executions/{follower_id}/cancel', headers=auth_headers)
+
+        assert response.status_code == 200
+        assert Execution.query.get(follower_id).status == 'cancelled'
+        assert killed.is_set()
+        assert process_registry.release(leader_id) is True
+
+
+@pytest.mark.integration
+class TestResultCacheEndpoint:
+    """Test cacheable scripts are answered from recent identical runs."""
+
+    @pytest.fixture
+    def cached_run(self, test_script, test_user):
+        """A finished run of a cacheable script, stored the way the runner does."""
+        result_cache.clear()
+        test_script.cache_ttl_seconds = 300
+        source = Execution(script_id=test_script.id, user_id=test_user.id, status='running',
+                           parameters={'site': 'a'})
+        db.session.add(source)
+        db.session.commit()
+        writer = OutputChunkWriter(source.id, db.engine, flush_interval=60)
+        writer.write('stdout', 'datastore1')
+        writer.close()
+        finalize_output(source.id, writer)
+        db.session.expire(source)
+        source.status, source.exit_code = 'completed', 0
+        db.session.commit()
+        result_cache.put(cache_key(test_script, {'site': 'a'}), source.id, 300)
+        yield source
+        result_cache.clear()
+
+    def test_hit_returns_completed_execution(self, client, auth_headers, test_script, cached_run,
+                                             idle_scheduler):
+        """Test a hit creates a completed execution sharing the cached output."""
+        response = client.post(
+            f'/api/execution/execute/{test_script.id}',
+            json={'parameters': {'site': 'a'}},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['cached'] is True
+        execution = Execution.query.get(data['execution_id'])
+        assert execution.status == 'completed'
+        assert execution.cached_from_id == cached_run.id
+        assert execution.stream_text('stdout') == 'datastore1\n'
+        assert OutputBlob.query.one().ref_count == 2
+
+    def test_different_parameters_miss(self, client, auth_headers, test_script, cached_run,
+                                       idle_scheduler):
+        """Test other parameters queue a real run."""
+        response = client.post(
+            f'/api/execution/execute/{test_script.id}',
+            json={'parameters': {'site': 'b'}},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 202
+        assert result_cache.stats()['misses'] == 1
+
+    def test_run_cached_under_content_it_ran(self, test_script, test_user, monkeypatch):
+        """Test a script edited during its run does not get the old output cached as its own."""
+        result_cache.clear()
+        test_script.cache_ttl_seconds = 300
+        execution = Execution(script_id=test_script.id, user_id=test_user.id, status='queued')
+        db.session.add(execution)
+        db.session.commit()
+        script_id, execution_id = test_script.id, execution.id
+        ran = cache_key(test_script, None)
+
+        class EditingExecutor(FakeExecutor):
+            def execute(self, **kwargs):
+                db.session.get(Script, script_id).content = 'Get-Date'
+                db.session.commit()
+                return super().execute(**kwargs)
+
+        monkeypatch.setattr(execution_runner, 'PowerShellExecutor', EditingExecutor)
+        monkeypatch.setattr(execution_runner, 'get_worker_pool', lambda *args: None)
+
+        execution_runner.run_execution(execution_id)
+
+        assert result_cache.get(ran) == execution_id
+        assert result_cache.get(cache_key(db.session.get(Script, script_id), None)) is None
+        result_cache.clear()
+
+    def test_run_deleted_while_running(self, test_script, test_user, monkeypatch):
+        """Test a run whose row is deleted mid-run finishes without raising and leaves no output behind."""
+        execution = Execution(script_id=test_script.id, user_id=test_user.id, status='queued')
+        db.session.add(execution)
+        db.session.commit()
+        execution_id = execution.id
+
+        class DeletingExecutor(FakeExecutor):
+            def execute(self, **kwargs):
+                result = super().execute(**kwargs)
+                db.session.execute(delete(Execution.__table__).where(Execution.__table__.c.id == execution_id))
+                db.session.commit()
+                return result
+
+        monkeypatch.setattr(execution_runner, 'PowerShellExecutor', DeletingExecutor)
+        monkeypatch.setattr(execution_runner, 'get_worker_pool', lambda *args: None)
+
+        execution_runner.run_execution(execution_id)
+
+        assert db.session.get(Execution, execution_id) is None
+        assert ExecutionOutputChunk.query.count() == 0
+        assert OutputBlob.query.count() == 0
@@ -0,0 +1,263 @@
+"""
+Tests for the database-backed execution queue and execution agents.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import update
+from models import db, AgentHeartbeat, Execution, ExecutionBatch
+from services import execution_queue
+from services.execution_agent import ExecutionAgent
+from services.execution_queue import (
+    DatabaseExecutionQueue, claim_execution, heartbeat, reap_stale_executions
+)
+from services.execution_scheduler import QueueFullError
+from services.result_cache import result_cache
+from services import execution_runner
+
+
+@pytest.fixture
+def queue_executions(init_database, test_script, test_user):
+    """Create queued executions; returns a function taking a count and optional batch."""
+    def create(count, batch=None, user=test_user):
+        base = datetime.utcnow()
+        executions = [
+            Execution(script_id=test_script.id, user_id=user.id, status='queued',
+                      queued_at=base + timedelta(milliseconds=index), batch=batch)
+            for index in range(count)
+        ]
+        db.session.add_all(executions)
+        db.session.commit()
+        return [execution.id for execution in executions]
+    return create
+
+
+class CompletingExecutor:
+    """Stands in for PowerShellExecutor, completing every run without output."""
+
+    def __init__(self, enable_restrictions=True, pwsh_version=None):
+        self.enable_restrictions = enable_restrictions
+        self.pwsh_path = 'pwsh'
+
+    def execute(self, **kwargs):
+        return {'status': 'completed', 'exit_code': 0, 'output': '', 'error_output': '',
+                'duration_seconds': 0.1}
+
+
+@pytest.fixture
+def agent_mode(app, monkeypatch):
+    """Route executions through the database queue, as with EXECUTION_AGENTS=true."""
+    queue = DatabaseExecutionQueue(max_queue_size=3)
+    monkeypatch.setitem(app.extensions, 'execution_queue', queue)
+    return queue
+
+
+@pytest.mark.unit
+class TestClaimExecution:
+    """Test agents claim each queued execution exactly once, within the caps."""
+
+    def test_claims_oldest_once(self, queue_executions):
+        """Test successive claims hand out rows in queue order, then nothing."""
+        first, second = queue_executions(2)
+
+        assert claim_execution('agent-a', max_per_user=5) == first
+        assert claim_execution('agent-b', max_per_user=5) == second
+        assert claim_execution('agent-a', max_per_user=5) is None
+        assert Execution.query.get(second).worker_id == 'agent-b'
+
+    def test_per_user_cap(self, queue_executions, test_admin):
+        """Test a user at the cap is skipped in favour of others."""
+        queue_executions(2)
+        other, = queue_executions(1, user=test_admin)
+
+        claim_execution('agent-a', max_per_user=1)
+
+        assert claim_execution('agent-a', max_per_user=1) == other
+
+    def test_batch_parallelism(self, queue_executions, test_script, test_user):
+        """Test batch children are capped by the batch's parallelism, not the user cap."""
+        batch = ExecutionBatch(script_id=test_script.id, user_id=test_user.id, total=3, parallelism=2)
+        db.session.add(batch)
+        queue_executions(3, batch=batch)
+
+        claimed = [claim_execution('agent-a', max_per_user=1) for _ in range(3)]
+
+        assert claimed[0] and claimed[1] and claimed[2] is None
+
+    def test_concurrent_agents_never_share_a_row(self, app, queue_executions):
+        """Test racing claimers each get distinct executions."""
+        ids = queue_executions(12)
+        claimed, lock = [], threading.Lock()
+
+        def claim_all(name):
+            with app.app_context():
+                while (execution_id := claim_execution(name, max_per_user=100)) is not None:
+                    with lock:
+                        claimed.append(execution_id)
+
+        threads = [threading.Thread(target=claim_all, args=(f'agent-{i}',)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(claimed) == ids
+
+
+@pytest.mark.unit
+class TestHeartbeats:
+    """Test liveness tracking and cancel requests."""
+
+    def test_heartbeat_reports_cancel_requests(self, queue_executions):
+        """Test an agent learns which of its runs were cancelled through the API."""
+        execution_id, = queue_executions(1)
+        claim_execution('agent-a', max_per_user=5)
+        Execution.query.get(execution_id).cancel_requested = True
+        db.session.commit()
+
+        assert heartbeat('agent-b', [execution_id]) == []
+        assert heartbeat('agent-a', [execution_id]) == [execution_id]
+
+    def test_stale_runs_are_failed(self, queue_executions):
+        """Test runs of an agent that stopped heartbeating are failed."""
+        stale_id, fresh_id = queue_executions(2)
+        claim_execution('dead-agent', max_per_user=5)
+        claim_execution('live-agent', max_per_user=5)
+        Execution.query.get(stale_id).heartbeat_at = datetime.utcnow() - timedelta(minutes=5)
+        db.session.commit()
+
+        assert reap_stale_executions(60) == 1
+        stale = Execution.query.get(stale_id)
+        assert stale.status == 'failed'
+        assert 'dead-agent stopped responding' in stale.stream_text('stderr')
+        assert Execution.query.get(fresh_id).status == 'queued'
+
+    def test_host_clock_skew_does_not_reap(self, queue_executions, monkeypatch):
+        """Test heartbeats are judged by the database clock, not the host's."""
+        execution_id, = queue_executions(1)
+        claim_execution('agent-a', max_per_user=5)
+
+        class SkewedClock(datetime):
+            @classmethod
+            def utcnow(cls):
+                return datetime.utcnow() + timedelta(hours=1)
+
+        monkeypatch.setattr(execution_queue, 'datetime', SkewedClock)
+
+        assert reap_stale_executions(60) == 0
+        assert Execution.query.get(execution_id).status == 'queued'
+
+    def test_idle_agents_are_counted(self, queue_executions):
+        """Test agents count as live from their heartbeats, running anything or not."""
+        execution_id, = queue_executions(1)
+        claim_execution('busy-agent', max_per_user=5)
+        heartbeat('busy-agent', [execution_id])
+        heartbeat('idle-agent', [])
+        queue = DatabaseExecutionQueue(heartbeat_timeout=60)
+
+        assert queue.stats()['agents'] == 2
+
+        db.session.execute(update(AgentHeartbeat).where(AgentHeartbeat.worker_id == 'idle-agent')
+                           .values(heartbeat_at=datetime.utcnow() - timedelta(minutes=5)))
+        db.session.commit()
+
+        assert queue.stats()['agents'] == 1
+        reap_stale_executions(60)
+        assert db.session.get(AgentHeartbeat, 'idle-agent') is None
+
+
+@pytest.mark.integration
+class TestExecutionAgent:
+    """Test agents drain the shared queue."""
+
+    def test_two_agents_drain_queue(self, app, queue_executions):
+        """Test every execution is run once across several agents."""
+        ids = queue_executions(8)
+        runs = []
+
+        def runner(execution_id):
+            runs.append(execution_id)
+            execution = Execution.query.get(execution_id)
+            execution.status = 'completed'
+            db.session.commit()
+
+        agents = [
+            ExecutionAgent(app, runner, worker_id=f'agent-{i}', concurrency=2, poll_interval=0.05)
+            for i in range(2)
+        ]
+        for agent in agents:
+            agent.start()
+        deadline = time.time() + 10
+        while len(runs) < len(ids) and time.time() < deadline:
+            time.sleep(0.05)
+        for agent in agents:
+            agent.stop()
+
+        assert sorted(runs) == ids
+        assert sum(agent.completed for agent in agents) == len(ids)
+
+
+@pytest.mark.integration
+class TestAgentModeEndpoints:
+    """Test the API only enqueues when agents run executions."""
+
+    def test_execute_leaves_row_for_agents(self, client, auth_headers, test_script, agent_mode):
+        """Test an execution is queued in the table with its position."""
+        response = client.post(f'/api/execution/execute/{test_script.id}', json={}, headers=auth_headers)
+
+        assert response.status_code == 202
+        assert response.get_json()['queue_position'] == 1
+        assert agent_mode.stats()['queued'] == 1
+
+    def test_cacheable_script_not_cached(self, client, auth_headers, test_script, agent_mode,
+                                         monkeypatch):
+        """Test agent runs are not cached, so identical requests keep queuing real runs."""
+        result_cache.clear()
+        test_script.cache_ttl_seconds = 300
+        db.session.commit()
+        url = f'/api/execution/execute/{test_script.id}'
+        monkeypatch.setattr(execution_runner, 'PowerShellExecutor', CompletingExecutor)
+        monkeypatch.setattr(execution_runner, 'get_worker_pool', lambda *args: None)
+        first = client.post(url, json={}, headers=auth_headers)
+
+        execution_runner.run_execution(first.get_json()['execution_id'])
+        second = client.post(url, json={}, headers=auth_headers)
+
+        assert Execution.query.get(first.get_json()['execution_id']).status == 'completed'
+        assert second.status_code == 202
+        assert result_cache.stats()['entries'] == 0
+
+    def test_queue_full(self, queue_executions, agent_mode):
+        """Test unclaimed rows count against the queue size."""
+        queue_executions(3)
+
+        with pytest.raises(QueueFullError):
+            agent_mode.check_capacity()
+
+    def test_cancel_unclaimed_and_claimed(self, client, auth_headers, queue_executions, agent_mode):
+        """Test unclaimed executions are withdrawn and claimed ones flagged for their agent."""
+        claimed_id, waiting_id = queue_executions(2)
+        claim_execution('agent-a', max_per_user=5)
+
+        waiting = client.post(f'/api/execution/executions/{waiting_id}/cancel', headers=auth_headers)
+        claimed = client.post(f'/api/execution/executions/{claimed_id}/cancel', headers=auth_headers)
+
+        assert waiting.status_code == 200
+        assert Execution.query.get(waiting_id).status == 'cancelled'
+        assert claimed.status_code == 202
+        assert Execution.query.get(claimed_id).cancel_requested is True
+
+    def test_list_positions_in_one_query(self, client, auth_headers, queue_executions, agent_mode,
+                                         count_queries):
+        """Test listed queued executions get their positions from a single lookup."""
+        queue_executions(2)
+        few = count_queries(client.get, '/api/execution/executions', headers=auth_headers)
+        ids = queue_executions(2)
+        many = count_queries(client.get, '/api/execution/executions', headers=auth_headers)
+
+        listed = client.get('/api/execution/executions', headers=auth_headers).get_json()
+
+        assert many == few
+        assert sorted(row['queue_position'] for row in listed) == [1, 2, 3, 4]
+        assert agent_mode.queue_positions(ids) == {ids[0]: 3, ids[1]: 4}
@@ -0,0 +1,313 @@
+"""
+Tests for the bounded execution scheduler.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+from models import db, Execution, ExecutionBatch
+from services.execution_scheduler import ExecutionScheduler, QueueFullError
+from services.process_registry import process_registry
+
+
+class BlockingRunner:
+    """Runner that records running IDs and blocks until released."""
+
+    def __init__(self):
+        self.started = []
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+
+    def __call__(self, execution_id):
+        with self.lock:
+            self.started.append(execution_id)
+        self.release.wait(5)
+
+
+def wait_for(predicate, timeout=2):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def runner():
+    runner = BlockingRunner()
+    yield runner
+    runner.release.set()
+
+
+@pytest.fixture
+def make_scheduler(app, runner):
+    schedulers = []
+
+    def factory(**limits):
+        scheduler = ExecutionScheduler(**limits)
+        scheduler.app = app
+        scheduler.runner = runner
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield factory
+    for scheduler in schedulers:
+        scheduler.shutdown()
+
+
+@pytest.mark.unit
+class TestExecutionScheduler:
+    """Test concurrency caps and load shedding."""
+
+    def test_global_concurrency_cap(self, make_scheduler, runner):
+        """Test no more than max_concurrency executions run at once."""
+        scheduler = make_scheduler(max_concurrency=2, max_per_user=10)
+        for execution_id in range(1, 6):
+            scheduler.submit(execution_id, user_id=execution_id)
+
+        assert wait_for(lambda: len(runner.started) == 2)
+        time.sleep(0.05)
+        assert runner.started == [1, 2]
+        assert scheduler.stats()['queued'] == 3
+        assert scheduler.queue_position(3) == 1
+        assert scheduler.queue_position(5) == 3
+
+        runner.release.set()
+        assert wait_for(lambda: len(runner.started) == 5)
+
+    def test_per_user_cap_skips_to_other_users(self, make_scheduler, runner):
+        """Test a user at their cap does not block other users' jobs."""
+        scheduler = make_scheduler(max_concurrency=3, max_per_user=1)
+        scheduler.submit(1, user_id=7)
+        scheduler.submit(2, user_id=7)
+        scheduler.submit(3, user_id=8)
+
+        assert wait_for(lambda: len(runner.started) == 2)
+        time.sleep(0.05)
+        assert sorted(runner.started) == [1, 3]
+        assert scheduler.queue_position(2) == 1
+
+    def test_queue_full_raises(self, make_scheduler):
+        """Test submissions beyond max_queue_size are rejected."""
+        scheduler = make_scheduler(max_concurrency=1, max_queue_size=2, retry_after=7)
+        scheduler.submit(1, user_id=1)
+        assert wait_for(lambda: scheduler.stats()['running'] == 1)
+        scheduler.submit(2, user_id=1)
+        scheduler.submit(3, user_id=1)
+
+        with pytest.raises(QueueFullError) as excinfo:
+            scheduler.submit(4, user_id=1)
+        assert excinfo.value.retry_after == 7
+
+    def test_batch_must_fit_whole(self, make_scheduler):
+        """Test a batch is rejected when its children would overflow the queue."""
+        scheduler = make_scheduler(max_concurrency=1, max_queue_size=3)
+        scheduler.submit(1, user_id=1)
+        assert wait_for(lambda: scheduler.stats()['running'] == 1)
+        scheduler.submit(2, user_id=1)
+
+        with pytest.raises(QueueFullError):
+            scheduler.submit_batch([3, 4, 5], user_id=1, batch_id=1, parallelism=1)
+        with pytest.raises(QueueFullError):
+            scheduler.check_capacity(3)
+        assert scheduler.stats()['queued'] == 1
+
+        scheduler.submit_batch([3, 4], user_id=1, batch_id=1, parallelism=1)
+        assert scheduler.stats()['queued'] == 3
+
+    def test_positions_follow_priority(self, make_scheduler):
+        """Test positions stay in priority order as jobs are added and withdrawn."""
+        scheduler = make_scheduler(max_concurrency=1, max_per_user=10)
+        scheduler.submit(1, user_id=1)
+        assert wait_for(lambda: scheduler.stats()['running'] == 1)
+        now = time.time()
+        for execution_id, offset in ((2, 30), (3, 10), (4, 20), (5, 10)):
+            scheduler.submit(execution_id, user_id=1, priority=now + offset)
+
+        assert scheduler.queue_positions([2, 3, 4, 5]) == {3: 1, 5: 2, 4: 3, 2: 4}
+
+        scheduler.remove(5)
+
+        assert scheduler.queue_positions([2, 3, 4, 5]) == {3: 1, 4: 2, 2: 3}
+        assert scheduler.submit(6, user_id=1, priority=now) == 1
+
+    def test_shortest_expected_job_first(self, make_scheduler, runner):
+        """Test a short job overtakes long ones queued before it."""
+        scheduler = make_scheduler(max_concurrency=1, max_per_user=10)
+        now = time.time()
+        scheduler.submit(1, user_id=1, priority=now)
+        assert wait_for(lambda: runner.started == [1])
+        scheduler.submit(2, user_id=1, priority=now + 1200)  # 20-minute report
+        scheduler.submit(3, user_id=1, priority=now + 2)     # 2-second script
+
+        assert scheduler.queue_position(3) == 1
+        assert scheduler.queue_position(2) == 2
+        runner.release.set()
+        assert wait_for(lambda: len(runner.started) == 3)
+        assert runner.started == [1, 3, 2]
+
+    def test_aged_job_not_overtaken(self, make_scheduler):
+        """Test a long job that has waited long enough keeps its place."""
+        scheduler = make_scheduler(max_concurrency=1, max_per_user=10)
+        now = time.time()
+        scheduler.submit(1, user_id=1, priority=now)
+        assert wait_for(lambda: scheduler.stats()['running'] == 1)
+        scheduler.submit(2, user_id=1, priority=now - 30)  # queued 20 minutes ago
+        scheduler.submit(3, user_id=1, priority=now + 2)
+
+        assert scheduler.queue_position(2) == 1
+
+    def test_remove_queued(self, make_scheduler, runner):
+        """Test a queued execution can be withdrawn before it runs."""
+        scheduler = make_scheduler(max_concurrency=1)
+        scheduler.submit(1, user_id=1)
+        scheduler.submit(2, user_id=1)
+
+        assert scheduler.remove(2) is True
+        assert scheduler.remove(2) is False
+        runner.release.set()
+        time.sleep(0.1)
+        assert runner.started == [1]
+
+    def test_taken_job_can_be_cancelled_before_it_starts(self, make_scheduler, runner):
+        """Test a cancel after the job left the queue, before the runner tracks it, is kept."""
+        scheduler = make_scheduler(max_concurrency=1)
+        scheduler.submit(1, user_id=1)
+        assert wait_for(lambda: runner.started == [1])
+
+        assert scheduler.remove(1) is False
+        assert process_registry.cancel(1) is True
+        process_registry.track(1)  # as the runner does when it starts
+        assert process_registry.is_cancelled(1)
+
+        runner.release.set()
+        assert wait_for(lambda: 1 not in process_registry.running())
+
+    def test_batch_limited_by_its_parallelism(self, make_scheduler, runner):
+        """Test batch children ignore the per-user cap but respect the batch's parallelism."""
+        scheduler = make_scheduler(max_concurrency=4, max_per_user=1)
+        scheduler.submit_batch([1, 2, 3, 4, 5], user_id=7, batch_id=1, parallelism=3)
+        scheduler.submit(6, user_id=7)
+
+        assert wait_for(lambda: len(runner.started) == 4)
+        time.sleep(0.05)
+        assert sorted(runner.started) == [1, 2, 3, 6]
+        assert scheduler.stats()['batches'] == 1
+
+        runner.release.set()
+        assert wait_for(lambda: len(runner.started) == 6)
+        assert wait_for(lambda: scheduler.stats()['batches'] == 0)
+
+
+@pytest.mark.integration
+class TestRecover:
+    """Test startup recovery leaves other processes' runs alone."""
+
+    def test_only_abandoned_runs_are_failed(self, make_scheduler, runner, test_script, test_user):
+        """Test runs heartbeated by a live process survive, stale and unstamped ones fail."""
+        def execution(status, worker_id=None, heartbeat_age=None):
+            row = Execution(script_id=test_script.id, user_id=test_user.id, status=status,
+                            queued_at=datetime.utcnow(), worker_id=worker_id)
+            if heartbeat_age is not None:
+                row.heartbeat_at = datetime.utcnow() - timedelta(seconds=heartbeat_age)
+            db.session.add(row)
+            return row
+
+        live = execution('running', 'api-2', heartbeat_age=0)
+        dead = execution('running', 'api-1', heartbeat_age=300)
+        unstamped = execution('running')
+        queued = execution('queued')
+        db.session.commit()
+        scheduler = make_scheduler(max_concurrency=1, heartbeat_timeout=60)
+
+        scheduler.recover()
+
+        assert (live.status, dead.status, unstamped.status) == ('running', 'failed', 'failed')
+        assert wait_for(lambda: runner.started == [queued.id])
+
+    def test_live_process_queue_is_left_alone(self, make_scheduler, runner, test_script, test_user):
+        """Test executions queued by a live process are not taken over."""
+        execution = Execution(script_id=test_script.id, user_id=test_user.id, status='queued',
+                              queued_at=datetime.utcnow(), worker_id='api-2',
+                              heartbeat_at=datetime.utcnow())
+        db.session.add(execution)
+        db.session.commit()
+        scheduler = make_scheduler(heartbeat_timeout=60)
+
+        scheduler.recover()
+
+        assert scheduler.stats()['queued'] == 0
+        assert execution.worker_id == 'api-2'
+        assert runner.started == []
+
+    def test_orphaned_queue_adopted_once(self, make_scheduler, test_script, test_user):
+        """Test two recovering processes split orphaned executions instead of both running them."""
+        stale = datetime.utcnow() - timedelta(seconds=300)
+        ids = []
+        for worker_id in (None, 'api-1'):
+            execution = Execution(script_id=test_script.id, user_id=test_user.id, status='queued',
+                                  queued_at=datetime.utcnow(), worker_id=worker_id, heartbeat_at=stale)
+            db.session.add(execution)
+            db.session.commit()
+            ids.append(execution.id)
+        first = make_scheduler(max_concurrency=0, heartbeat_timeout=60)
+        second = make_scheduler(max_concurrency=0, heartbeat_timeout=60)
+
+        first.recover()
+        second.recover()
+
+        assert first.stats()['queued'] == 2
+        assert second.stats()['queued'] == 0
+        assert {row.worker_id for row in Execution.query.filter(Execution.id.in_(ids))} == {first.worker_id}
+
+    def test_children_of_deleted_batch_recovered(self, make_scheduler, runner, test_script, test_user):
+        """Test batch children whose batch record is gone still run."""
+        batch = ExecutionBatch(script_id=test_script.id, user_id=test_user.id, parallelism=1, total=1)
+        db.session.add(batch)
+        db.session.flush()
+        execution = Execution(script_id=test_script.id, user_id=test_user.id, status='queued',
+                              queued_at=datetime.utcnow(), batch_id=batch.id)
+        db.session.add(execution)
+        db.session.commit()
+        # Removed behind the ORM's back, as by a manual cleanup
+        db.session.execute(ExecutionBatch.__table__.delete().where(ExecutionBatch.id == batch.id))
+        db.session.commit()
+        scheduler = make_scheduler(max_concurrency=1)
+
+        scheduler.recover()
+
+        assert wait_for(lambda: runner.started == [execution.id])
+
+    def test_heartbeat_refreshes_own_runs(self, make_scheduler, test_script, test_user):
+        """Test the runs stamped with this process are kept alive by its heartbeat."""
+        scheduler = make_scheduler()
+        execution = Execution(script_id=test_script.id, user_id=test_user.id, status='running',
+                              worker_id=scheduler.worker_id,
+                              heartbeat_at=datetime.utcnow() - timedelta(seconds=30))
+        db.session.add(execution)
+        db.session.commit()
+        process_registry.track(execution.id)
+
+        try:
+            scheduler.beat()
+        finally:
+            process_registry.release(execution.id)
+
+        db.session.expire(execution)
+        assert execution.status == 'running'
+        assert execution.heartbeat_at > datetime.utcnow() - timedelta(seconds=10)
+
+    def test_heartbeat_lets_orphaned_runs_expire(self, make_scheduler, test_script, test_user):
+        """Test a run stamped with this process but no longer running in it is failed."""
+        scheduler = make_scheduler(heartbeat_timeout=60)
+        execution = Execution(script_id=test_script.id, user_id=test_user.id, status='running',
+                              worker_id=scheduler.worker_id,
+                              heartbeat_at=datetime.utcnow() - timedelta(seconds=300))
+        db.session.add(execution)
+        db.session.commit()
+
+        scheduler.beat()
+
+        db.session.expire(execution)
+        assert execution.status == 'failed'
@@ -0,0 +1,150 @@
+"""
+Tests for the category and facet cache.
+"""
+import pytest
+from sqlalchemy import update
+from models import db, CacheVersion
+from services.facet_cache import FacetCache, VERSION_NAME, facet_cache
+
+
+def bump_version_elsewhere():
+    """Bump the shared version as another process's script write would."""
+    if not db.session.execute(update(CacheVersion).values(version=CacheVersion.version + 1)).rowcount:
+        db.session.add(CacheVersion(name=VERSION_NAME, version=1))
+    db.session.commit()
+
+
+@pytest.mark.integration
+class TestFacetCache:
+    """Test caching and invalidation of computed results."""
+
+    def test_hit_and_miss(self, init_database):
+        """Test a result is computed once and then served from memory."""
+        cache = FacetCache(check_interval=60)
+        calls = []
+
+        first = cache.get('k', lambda: calls.append(1) or ['a'])
+        second = cache.get('k', lambda: calls.append(1) or ['b'])
+
+        assert first == second == ['a']
+        assert len(calls) == 1
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['hit_rate'] == 0.5
+
+    def test_invalidate_bumps_version(self, init_database):
+        """Test a local write drops entries and bumps the shared counter."""
+        cache = FacetCache(check_interval=60)
+        cache.get('k', lambda: 'old')
+
+        cache.invalidate()
+        db.session.commit()
+
+        assert cache.get('k', lambda: 'new') == 'new'
+        assert db.session.get(CacheVersion, VERSION_NAME).version == 1
+        assert cache.stats()['remote_invalidations'] == 0
+
+    def test_first_invalidations_race(self, init_database, monkeypatch):
+        """Test losing the race to create the counter row bumps the winner's row instead of failing."""
+        cache = FacetCache(check_interval=60)
+        execute = db.session.execute
+
+        def racing_execute(statement, *args, **kwargs):
+            result = execute(statement, *args, **kwargs)
+            if not CacheVersion.query.count():
+                # Another process's first write commits right after our UPDATE missed
+                execute(CacheVersion.__table__.insert().values(name=VERSION_NAME, version=1))
+            return result
+        monkeypatch.setattr(db.session, 'execute', racing_execute)
+
+        cache.invalidate()
+        db.session.commit()
+
+        assert db.session.get(CacheVersion, VERSION_NAME).version == 2
+
+    def test_remote_invalidation(self, init_database):
+        """Test another process's bump is noticed at the next version check."""
+        cache = FacetCache(check_interval=0)
+        cache.get('k', lambda: 'old')
+
+        bump_version_elsewhere()
+
+        assert cache.get('k', lambda: 'new') == 'new'
+        assert cache.stats()['remote_invalidations'] == 1
+        assert cache.stats()['version'] == 1
+
+    def test_checks_version_at_interval(self, init_database):
+        """Test the counter is not read on every lookup."""
+        cache = FacetCache(check_interval=60)
+        cache.get('k', lambda: 'old')
+
+        bump_version_elsewhere()
+
+        assert cache.get('k', lambda: 'new') == 'old'
+
+    def test_result_computed_across_invalidation_is_not_stored(self, init_database):
+        """Test a result computed while a write invalidated the cache is served once, not kept."""
+        cache = FacetCache(check_interval=60)
+
+        def compute():
+            cache.invalidate()
+            return 'stale'
+
+        assert cache.get('k', compute) == 'stale'
+        assert cache.stats()['entries'] == 0
+
+    def test_lru_eviction(self, init_database):
+        """Test the least recently used entry is evicted at capacity."""
+        cache = FacetCache(max_entries=2, check_interval=60)
+        for key in ('a', 'b', 'a', 'c'):
+            cache.get(key, lambda: key)
+
+        assert cache.get('b', lambda: 'recomputed') == 'recomputed'
+        assert cache.stats()['evictions'] == 2
+
+
+@pytest.mark.integration
+class TestCachedEndpoints:
+    """Test the category and facet endpoints go through the cache."""
+
+    def test_categories_served_from_cache(self, client, auth_headers, count_queries, monkeypatch):
+        """Test repeated loads run no query until a script is written."""
+        monkeypatch.setattr(facet_cache, 'check_interval', 60)
+        load = lambda: client.get('/api/scripts/categories', headers=auth_headers)
+        load()
+        hits = facet_cache.stats()['hits']
+
+        assert count_queries(load) == 0
+        assert facet_cache.stats()['hits'] == hits + 1
+
+        client.post('/api/scripts/', json={'name': 'Fw', 'content': 'Get-Date', 'category': 'Firewall'},
+                    headers=auth_headers)
+
+        assert 'Firewall' in load().get_json()
+
+    def test_facets_scoped_per_user(self, client, auth_headers, admin_headers):
+        """Test users get their own cached facets and writes refresh them."""
+        client.post('/api/scripts/', json={'name': 'A', 'content': 'x', 'tags': ['ops']}, headers=admin_headers)
+
+        assert client.get('/api/scripts/facets', headers=auth_headers).get_json()['tags'] == []
+        assert client.get('/api/scripts/facets', headers=admin_headers).get_json()['tags'] == [
+            {'name': 'ops', 'count': 1}
+        ]
+
+        client.post('/api/scripts/', json={'name': 'B', 'content': 'x', 'tags': ['ops']}, headers=auth_headers)
+
+        assert client.get('/api/scripts/facets', headers=auth_headers).get_json()['tags'] == [
+            {'name': 'ops', 'count': 1}
+        ]
+        assert client.get('/api/scripts/facets', headers=admin_headers).get_json()['tags'] == [
+            {'name': 'ops', 'count': 2}
+        ]
+
+    def test_stats_in_system_info(self, client, auth_headers):
+        """Test hit rates are reported with the other system statistics."""
+        client.get('/api/scripts/categories', headers=auth_headers)
+        client.get('/api/scripts/categories', headers=auth_headers)
+
+        stats = client.get('/api/execution/system/info', headers=auth_headers).get_json()['facet_cache']
+
+        assert stats['hits'] >= 1
+        assert stats['hit_rate'] is not None
@@ -0,0 +1,94 @@
+"""
+Tests for the PowerShell interpreter registry.
+"""
+import os
+import stat
+import pytest
+from services.interpreter_registry import InterpreterRegistry, InterpreterNotFoundError
+from services.powershell_executor import PowerShellExecutor
+
+
+def make_fake_pwsh(directory, name, version, edition='Core'):
+    """Create an executable that answers the version probe and counts calls."""
+    path = directory / name
+    counter = directory / f'{name}.calls'
+    path.write_text(
+        '#!/bin/sh\n'
+        f'echo x >> "{counter}"\n'
+        f'echo {version}\n'
+        f'echo {edition}\n'
+    )
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return path, counter
+
+
+@pytest.fixture
+def fake_installs(tmp_path, monkeypatch):
+    pwsh72, calls72 = make_fake_pwsh(tmp_path, 'pwsh72', '7.2.18')
+    pwsh74, calls74 = make_fake_pwsh(tmp_path, 'pwsh74', '7.4.6')
+    monkeypatch.setenv('PWSH_PATHS', os.pathsep.join([str(pwsh72), str(pwsh74)]))
+    monkeypatch.delenv('PWSH_DEFAULT_VERSION', raising=False)
+    return {'7.2': (pwsh72, calls72), '7.4': (pwsh74, calls74)}
+
+
+def probe_count(counter):
+    return len(counter.read_text().splitlines()) if counter.exists() else 0
+
+
+@pytest.mark.unit
+class TestInterpreterRegistry:
+    """Test lazy discovery, caching and version selection."""
+
+    def test_construction_does_not_probe(self, fake_installs):
+        """Test nothing is spawned until an interpreter is requested."""
+        InterpreterRegistry(commands=[], search_globs=[])
+        PowerShellExecutor(interpreter_registry=InterpreterRegistry(commands=[], search_globs=[]))
+
+        assert probe_count(fake_installs['7.4'][1]) == 0
+
+    def test_probes_once_and_caches(self, fake_installs):
+        """Test each installation is probed once across many lookups."""
+        registry = InterpreterRegistry(commands=[], search_globs=[])
+        for _ in range(5):
+            PowerShellExecutor(interpreter_registry=registry).pwsh_path
+
+        assert probe_count(fake_installs['7.4'][1]) == 1
+        assert probe_count(fake_installs['7.2'][1]) == 1
+
+    def test_default_is_newest(self, fake_installs):
+        """Test the newest installed version is the default."""
+        registry = InterpreterRegistry(commands=[], search_globs=[])
+        interpreter = registry.get()
+
+        assert interpreter.version == '7.4.6'
+        assert interpreter.edition == 'Core'
+        assert interpreter.path == str(fake_installs['7.4'][0])
+
+    def test_select_by_version_prefix(self, fake_installs):
+        """Test scripts can pin a version by prefix."""
+        registry = InterpreterRegistry(commands=[], search_globs=[])
+
+        assert registry.get('7.2').version == '7.2.18'
+        assert registry.get('7').version == '7.4.6'
+        with pytest.raises(InterpreterNotFoundError):
+            registry.get('5.1')
+
+    def test_refresh_reprobes(self, fake_installs, monkeypatch):
+        """Test refresh() picks up changed installations."""
+        registry = InterpreterRegistry(commands=[], search_globs=[])
+        assert len(registry.all()) == 2
+
+        monkeypatch.setenv('PWSH_PATHS', str(fake_installs['7.2'][0]))
+        assert len(registry.all()) == 2
+        assert [i.version for i in registry.refresh()] == ['7.2.18']
+
+    def test_missing_pwsh_fails_on_use(self, monkeypatch):
+        """Test a host without PowerShell fails at execution, not construction."""
+        monkeypatch.setenv('PWSH_PATHS', '')
+        registry = InterpreterRegistry(commands=[], search_globs=[])
+        executor = PowerShellExecutor(interpreter_registry=registry)
+
+        result = executor.execute('Write-Output "hi"')
+
+        assert result['status'] == 'failed'
+        assert 'not found' in result['error_output']
@@ -0,0 +1,58 @@
+"""
+Tests that list endpoints issue a fixed number of queries, whatever the result size.
+"""
+from datetime import datetime, timedelta
+import pytest
+from models import db, User, Script, Execution
+
+
+def add_scripts(count, start=0):
+    """Create public scripts, each by its own author so lazy author loads would show."""
+    for index in range(start, start + count):
+        author = User(username=f'author{index}', email=f'author{index}@example.com')
+        author.set_password('password123')
+        db.session.add(author)
+        db.session.flush()
+        db.session.add(Script(name=f'Script {index}', content='Get-Date' * 100,
+                              author_id=author.id, is_public=True))
+    db.session.commit()
+
+
+def add_executions(count, start=0, status='completed'):
+    """Create executions, each of a different script and user."""
+    add_scripts(count, start)
+    base = datetime.utcnow()
+    for index, script in enumerate(Script.query.order_by(Script.id).offset(start).limit(count)):
+        db.session.add(Execution(script_id=script.id, user_id=script.author_id, status=status,
+                                 queued_at=base + timedelta(milliseconds=index)))
+    db.session.commit()
+
+
+@pytest.mark.integration
+class TestListQueryCounts:
+    """Test list endpoints do not issue a query per row."""
+
+    def test_list_scripts(self, client, auth_headers, count_queries):
+        """Test listing scripts costs the same for 2 and 12 authors."""
+        add_scripts(2)
+        few = count_queries(client.get, '/api/scripts/', headers=auth_headers)
+        add_scripts(10, start=2)
+        many = count_queries(client.get, '/api/scripts/', headers=auth_headers)
+
+        response = client.get('/api/scripts/', headers=auth_headers).get_json()
+        assert len(response) == 12
+        assert response[0]['author_username'].startswith('author')
+        assert 'content' not in response[0]
+        assert many == few
+
+    def test_list_executions(self, client, admin_headers, count_queries):
+        """Test listing executions costs the same for 2 and 12 scripts and users."""
+        add_executions(2)
+        few = count_queries(client.get, '/api/execution/executions', headers=admin_headers)
+        add_executions(10, start=2)
+        many = count_queries(client.get, '/api/execution/executions', headers=admin_headers)
+
+        response = client.get('/api/execution/executions', headers=admin_headers).get_json()
+        assert len(response) == 12
+        assert {row['script_name'] for row in response} == {f'Script {index}' for index in range(12)}
+        assert many == few
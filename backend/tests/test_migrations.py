@@ -0,0 +1,59 @@
+"""
+Tests for the Alembic migrations.
+"""
+import os
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect
+from models import db
+from services.script_search import include_name
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+@pytest.fixture
+def migrate(tmp_path):
+    """Run every revision up (or down) against an empty SQLite file; returns the engine."""
+    engine = create_engine(f'sqlite:///{tmp_path / "migrated.db"}')
+    revisions = list(ScriptDirectory(MIGRATIONS).walk_revisions())  # newest first
+
+    def run(down=False):
+        with engine.begin() as connection:
+            context = MigrationContext.configure(connection, opts={'render_as_batch': True})
+            with Operations.context(context):
+                for revision in (revisions if down else reversed(revisions)):
+                    (revision.module.downgrade if down else revision.module.upgrade)()
+        return engine
+
+    yield run
+    engine.dispose()
+
+
+@pytest.mark.unit
+class TestMigrations:
+    """Test the migrations build the schema the models describe."""
+
+    def test_upgrade_matches_models(self, migrate):
+        """Test upgrading an empty database leaves nothing for autogenerate to add."""
+        engine = migrate()
+
+        with engine.connect() as connection:
+            context = MigrationContext.configure(connection, opts={'compare_type': True, 'include_name': include_name})
+            assert compare_metadata(context, db.metadata) == []
+
+    def test_upgrade_creates_search_index(self, migrate):
+        """Test the search index is created by the migrations."""
+        engine = migrate()
+
+        assert 'scripts_fts' in inspect(engine).get_table_names()
+
+    def test_downgrade_to_base(self, migrate):
+        """Test every revision can be rolled back."""
+        migrate()
+
+        engine = migrate(down=True)
+
+        assert inspect(engine).get_table_names() == []
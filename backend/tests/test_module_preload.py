@@ -0,0 +1,122 @@
+"""
+Tests for required PowerShell modules and module import timing.
+"""
+import stat
+import pytest
+from models import Script
+from services.module_preload import (
+    ModuleImportProbe, normalize_modules, validate_required_modules
+)
+from services.powershell_executor import PowerShellExecutor
+
+
+# Prints the probe's marker line as the prologue would, then the script's output
+MARKER_ECHO = r'''script=$(cat)
+printf '%s\n' "$script" | sed -n "s/^\[Console\]::Out.WriteLine('\([^']*\)'.*/\10.5/p"
+echo hello'''
+
+
+@pytest.fixture
+def fake_pwsh(tmp_path, monkeypatch):
+    """Install a shell script as pwsh; returns a function that sets its body."""
+    fake = tmp_path / 'pwsh'
+    monkeypatch.setattr(PowerShellExecutor, 'pwsh_path', property(lambda self: str(fake)))
+
+    def install(body):
+        fake.write_text(f'#!/bin/sh\n{body}\n')
+        fake.chmod(fake.stat().st_mode | stat.S_IEXEC)
+        return PowerShellExecutor(enable_restrictions=False)
+    return install
+
+
+@pytest.mark.unit
+class TestRequiredModules:
+    """Test module lists are checked and put in canonical form."""
+
+    def test_validation(self):
+        """Test module names are checked before they are stored."""
+        assert validate_required_modules(['VMware.PowerCLI', 'Az.Accounts']) == (True, [])
+        assert validate_required_modules(None) == (True, [])
+        assert validate_required_modules('Az')[0] is False
+
+        is_valid, errors = validate_required_modules(['Az', "Az'; Remove-Item", 3])
+
+        assert not is_valid
+        assert len(errors) == 2
+
+    def test_normalize_dedupes_and_sorts(self):
+        """Test the same set in any order or case maps to one pool key."""
+        assert normalize_modules(['VMware.PowerCLI', 'az', 'Az']) == ('az', 'VMware.PowerCLI')
+        assert normalize_modules(None) == ()
+
+
+@pytest.mark.unit
+class TestModuleImportProbe:
+    """Test runs outside the pool report their import time."""
+
+    def test_marker_is_consumed(self):
+        """Test the timing line is taken out of the output and parsed."""
+        delivered = []
+        probe = ModuleImportProbe(lambda stream, lines: delivered.append((stream, lines)))
+        marker = probe.prologue(['Az']).split("WriteLine('")[1].split("'")[0]
+
+        probe('stdout', [marker + '1.25', 'first'])
+        probe('stderr', ['warning'])
+        result = probe.apply({'output': '', 'error_output': 'Execution timeout', 'exit_code': -2})
+
+        assert delivered == [('stdout', ['first']), ('stderr', ['warning'])]
+        assert result['module_import_seconds'] == 1.25
+        assert result['output'] == 'first'
+        assert result['error_output'] == 'warning\nExecution timeout'
+
+    def test_prologue_imports_modules(self):
+        """Test the prologue imports every module with quotes escaped."""
+        prologue = ModuleImportProbe(None).prologue(['Az', 'VMware.PowerCLI'])
+
+        assert "Import-Module -Name 'Az', 'VMware.PowerCLI'" in prologue
+
+    def test_cold_run_reports_import_time(self, fake_pwsh):
+        """Test a cold process run reports module_import_seconds apart from its output."""
+        executor = fake_pwsh(MARKER_ECHO)
+        lines = []
+
+        result = executor.execute('Get-VM', timeout=10, required_modules=['VMware.PowerCLI'],
+                                  batch_callback=lambda stream, batch: lines.extend(batch))
+
+        assert result['module_import_seconds'] == 0.5
+        assert result['output'] == 'hello'
+        assert lines == ['hello']
+
+    def test_no_modules_no_prologue(self, fake_pwsh):
+        """Test scripts without required modules run unchanged."""
+        executor = fake_pwsh('cat')
+
+        result = executor.execute('Get-Date', timeout=10)
+
+        assert result['output'] == 'Get-Date'
+        assert 'module_import_seconds' not in result
+
+
+@pytest.mark.integration
+class TestRequiredModulesEndpoint:
+    """Test scripts declare their modules through the API."""
+
+    def test_create_and_update(self, client, auth_headers):
+        """Test modules are stored in canonical form and bad names rejected."""
+        response = client.post('/api/scripts/', json={
+            'name': 'VM report', 'content': 'Get-VM',
+            'required_modules': ['VMware.PowerCLI', 'vmware.powercli']
+        }, headers=auth_headers)
+        script_id = response.get_json()['script']['id']
+
+        assert response.status_code == 201
+        assert response.get_json()['script']['required_modules'] == ['VMware.PowerCLI']
+
+        bad = client.put(f'/api/scripts/{script_id}', json={'required_modules': ['Az; iex']},
+                         headers=auth_headers)
+        cleared = client.put(f'/api/scripts/{script_id}', json={'required_modules': []},
+                             headers=auth_headers)
+
+        assert bad.status_code == 400
+        assert cleared.status_code == 200
+        assert Script.query.get(script_id).required_modules is None
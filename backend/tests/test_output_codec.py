@@ -0,0 +1,83 @@
+"""
+Tests for compressed output storage.
+"""
+import pytest
+from models import db, Execution, ExecutionOutputChunk
+from services.output_codec import OutputCodec, MARKER, codec
+from services.output_store import OutputChunkWriter, read_range, recompress_output
+
+LOG = ''.join(f'[INFO] Processed item {i} of 500 in share \\\\files\\dept\n' for i in range(500))
+
+
+@pytest.mark.unit
+class TestOutputCodec:
+    """Test encoding round trips and the format marker."""
+
+    def test_round_trip_compresses_repetitive_text(self):
+        """Test repetitive output is stored smaller and decodes unchanged."""
+        stored = OutputCodec('zlib').encode(LOG)
+
+        assert stored.startswith(f'{MARKER}zlib:')
+        assert len(stored) * 5 < len(LOG)
+        assert OutputCodec('zlib').decode(stored) == LOG
+
+    def test_short_text_stored_plain(self):
+        """Test values below min_size are not worth compressing."""
+        assert OutputCodec('zlib', min_size=256).encode('done') == 'done'
+
+    def test_plain_rows_still_read(self):
+        """Test rows written before compression decode as themselves."""
+        assert OutputCodec('zlib').decode('legacy output') == 'legacy output'
+        assert OutputCodec('zlib').decode(None) is None
+
+    def test_text_starting_with_marker_is_escaped(self):
+        """Test plain text that looks like a marker survives a round trip."""
+        codec_ = OutputCodec('none')
+        text = f'{MARKER}zlib:not base64'
+
+        assert codec_.decode(codec_.encode(text)) == text
+
+    def test_unknown_method_rejected(self):
+        """Test misconfiguration fails at startup."""
+        with pytest.raises(ValueError):
+            OutputCodec('lzma')
+
+
+@pytest.mark.integration
+class TestCompressedStorage:
+    """Test models and the chunk store compress transparently."""
+
+    @pytest.fixture
+    def execution(self, init_database, test_script, test_user):
+        execution = Execution(script_id=test_script.id, user_id=test_user.id, status='completed')
+        init_database.session.add(execution)
+        init_database.session.commit()
+        return execution
+
+    def test_chunks_stored_compressed(self, execution, monkeypatch):
+        """Test chunk rows hold compressed data but read back as text."""
+        monkeypatch.setattr(codec, 'method', 'zlib')
+        writer = OutputChunkWriter(execution.id, db.engine, flush_interval=60)
+        for line in LOG.splitlines():
+            writer.write('stdout', line)
+        writer.close()
+
+        chunk = ExecutionOutputChunk.query.filter_by(execution_id=execution.id).one()
+        assert chunk._data.startswith(f'{MARKER}zlib:')
+        assert chunk.length == len(LOG)
+        assert read_range(execution, 'stdout', 0, 38) == LOG[:38].encode('utf-8')
+
+    def test_recompress_historical_rows(self, execution, monkeypatch):
+        """Test the migration rewrites plain rows once and leaves them readable."""
+        monkeypatch.setattr(codec, 'method', 'none')
+        execution.output = LOG
+        db.session.commit()
+        assert execution._output == LOG
+
+        monkeypatch.setattr(codec, 'method', 'zlib')
+        stats = recompress_output(batch_size=1)
+
+        assert stats['rows'] == 1
+        assert stats['bytes_after'] * 5 < stats['bytes_before']
+        assert Execution.query.get(execution.id).output == LOG
+        assert recompress_output()['rows'] == 0
@@ -0,0 +1,97 @@
+"""
+Tests for chunked process output reading.
+"""
+import io
+import subprocess
+import sys
+import pytest
+from services.output_reader import LineBatchReader, LineSplitter, OutputTail
+from services.output_stream import OutputStreamer
+
+
+@pytest.mark.unit
+class TestLineSplitter:
+    """Test raw chunks are split into decoded lines."""
+
+    def test_multibyte_character_split_across_chunks(self):
+        """Test a character cut by a chunk boundary is decoded whole."""
+        splitter = LineSplitter()
+
+        assert splitter.feed(b'ab\xc3') == []
+        assert splitter.feed(b'\xa9c\nde\r\nf') == ['abéc', 'de']
+        assert splitter.finish() == ['f']
+
+    def test_reused_buffer_length(self):
+        """Test only the valid prefix of a reused read buffer is consumed."""
+        buffer = bytearray(b'one\ntwo\nSTALE')
+        splitter = LineSplitter()
+
+        assert splitter.feed(buffer, 8) == ['one', 'two']
+        assert splitter.finish() == []
+
+    def test_overlong_line_delivered_in_pieces(self):
+        """Test a line without a newline does not grow without bound."""
+        splitter = LineSplitter(max_line=4)
+
+        assert splitter.feed(b'abcdef') == ['abcdef']
+        assert splitter.feed(b'gh\n') == ['gh']
+
+
+@pytest.mark.unit
+class TestLineBatchReader:
+    """Test a stream is read in chunks and delivered in batches."""
+
+    def test_batches_follow_reads(self):
+        """Test one callback per chunk, with lines in order."""
+        batches = []
+        data = b''.join(f'line {i}\n'.encode() for i in range(100))
+        LineBatchReader(io.BytesIO(data), batches.append, chunk_size=64).run()
+
+        assert [line for batch in batches for line in batch] == [f'line {i}' for i in range(100)]
+        assert 1 < len(batches) < 100
+
+    def test_reads_child_process(self):
+        """Test output of a real pipe, including a final unterminated line."""
+        process = subprocess.Popen(
+            [sys.executable, '-c', 'import sys; sys.stdout.write("a\\nb\\nc")'],
+            stdout=subprocess.PIPE,
+            bufsize=0
+        )
+        batches = []
+        LineBatchReader(process.stdout, batches.append).run()
+        process.wait()
+
+        assert [line for batch in batches for line in batch] == ['a', 'b', 'c']
+
+
+@pytest.mark.unit
+class TestOutputTail:
+    """Test the live tail is bounded by lines and bytes."""
+
+    def test_evicts_by_line_count(self):
+        """Test only the newest max_lines are kept."""
+        tail = OutputTail(max_lines=3)
+        for i in range(5):
+            tail.append(str(i))
+
+        assert list(tail) == ['2', '3', '4']
+
+    def test_evicts_by_bytes(self):
+        """Test long lines are evicted before the line limit is reached."""
+        tail = OutputTail(max_lines=100, max_bytes=10)
+        for text in ['aaaa', 'bbbb', 'cccc']:
+            tail.append(text)
+
+        assert list(tail) == ['bbbb', 'cccc']
+        assert tail.size_bytes == 8
+
+    def test_streamer_replay_bounded_by_bytes(self):
+        """Test the live stream keeps positions when the tail drops old lines."""
+        streamer = OutputStreamer(max_buffer_lines=100, max_buffer_bytes=10)
+        streamer.open(1)
+        streamer.publish_lines(1, ['aaaa', 'bbbb', 'cccc'])
+
+        replay = streamer.replay(1, 0)
+        assert [line['text'] for line in replay['lines']] == ['bbbb', 'cccc']
+        assert replay['truncated'] is True
+        assert streamer.read(1, 5, 0)['stdout'] == 'bbbb\ncccc\n'
@@ -0,0 +1,228 @@
+"""
+Tests for the append-only execution output store.
+"""
+import time
+import pytest
+from sqlalchemy import event
+from models import db, Execution, ExecutionOutputChunk, OutputBlob
+from services.output_store import (
+    OutputChunkWriter, append_message, finalize_output, is_finalized, output_storage_stats, read_range,
+    stream_length
+)
+from services.execution_scheduler import ExecutionScheduler
+
+
+@pytest.fixture
+def execution(init_database, test_script, test_user):
+    execution = Execution(script_id=test_script.id, user_id=test_user.id, status='running')
+    init_database.session.add(execution)
+    init_database.session.commit()
+    return execution
+
+
+@pytest.mark.integration
+class TestOutputChunkWriter:
+    """Test output is appended to the chunk table while the run is in progress."""
+
+    def test_flushes_when_buffer_is_full(self, execution):
+        """Test a full buffer wakes the flusher without waiting for the interval."""
+        writer = OutputChunkWriter(execution.id, db.engine, flush_bytes=10, flush_interval=60)
+        writer.write('stdout', 'abcd')
+        time.sleep(0.1)
+        assert execution.output_chunks.count() == 0
+
+        writer.write('stdout', 'efghij')
+        deadline = time.time() + 5
+        while execution.output_chunks.count() == 0 and time.time() < deadline:
+            time.sleep(0.02)
+        assert execution.output_chunks.count() == 1
+        writer.close()
+
+    def test_write_flushes_inline_when_flusher_falls_behind(self, execution):
+        """Test backpressure bounds the buffer if the flusher cannot keep up."""
+        writer = OutputChunkWriter(execution.id, db.engine, flush_bytes=4, flush_interval=60)
+        writer._closed.set()  # stop the background flusher
+        writer._wake.set()
+        writer._thread.join()
+
+        for _ in range(8):
+            writer.write('stdout', 'abc')
+
+        assert writer._pending_bytes == 0
+        assert execution.stream_text('stdout') == 'abc\n' * 8
+
+    def test_flushes_partial_buffer_on_interval(self, execution):
+        """Test a quiet script's partial output still reaches the database."""
+        writer = OutputChunkWriter(execution.id, db.engine, flush_bytes=65536, flush_interval=0.05)
+        writer.write('stderr', 'warning')
+
+        deadline = time.time() + 5
+        while execution.output_chunks.count() == 0 and time.time() < deadline:
+            time.sleep(0.02)
+
+        assert execution.stream_text('stderr') == 'warning\n'
+        writer.close()
+
+    def test_chunks_are_positioned_per_stream(self, execution):
+        """Test chunk positions are contiguous byte offsets within each stream."""
+        writer = OutputChunkWriter(execution.id, db.engine, flush_bytes=1, flush_interval=60)
+        for line in ['one', 'twö', 'three']:
+            writer.write('stdout', line)
+        writer.write('stderr', 'err')
+        writer.close()
+
+        chunks = ExecutionOutputChunk.query.filter_by(
+            execution_id=execution.id, stream='stdout'
+        ).order_by(ExecutionOutputChunk.start_pos).all()
+        assert chunks[0].start_pos == 0
+        assert all(a.start_pos + a.length == b.start_pos for a, b in zip(chunks, chunks[1:]))
+        assert chunks[-1].start_pos + chunks[-1].length == 15
+        assert execution.to_dict()['output'] == 'one\ntwö\nthree\n'
+        assert execution.to_dict()['error_output'] == 'err\n'
+
+
+@pytest.mark.integration
+class TestReadRange:
+    """Test byte ranges are served from only the overlapping chunks."""
+
+    def test_range_spanning_chunks(self, execution):
+        """Test a range crossing chunk boundaries is stitched together."""
+        writer = OutputChunkWriter(execution.id, db.engine, flush_bytes=1, flush_interval=60)
+        for line in ['alpha', 'beta', 'gamma']:
+            writer.write('stdout', line)
+        writer.close()
+
+        assert stream_length(execution, 'stdout') == 17
+        assert read_range(execution, 'stdout', 3, 8) == b'ha\nbe'
+        assert read_range(execution, 'stdout', 11) == b'gamma\n'
+        assert read_range(execution, 'stdout', 17) == b''
+
+    def test_legacy_columns_still_served(self, execution):
+        """Test executions stored before chunks existed read from their columns."""
+        execution.output = 'old output'
+        db.session.commit()
+
+        assert stream_length(execution, 'stdout') == 10
+        assert read_range(execution, 'stdout', 4) == b'output'
+
+
+@pytest.mark.integration
+class TestInterruptedExecutions:
+    """Test partial output survives a restart."""
+
+    def test_recover_keeps_partial_output(self, execution):
+        """Test recovery appends its message after the output already stored."""
+        writer = OutputChunkWriter(execution.id, db.engine, flush_bytes=1, flush_interval=60)
+        writer.write('stderr', 'partial')
+        writer.close()
+
+        ExecutionScheduler().recover()
+
+        assert execution.status == 'failed'
+        assert execution.stream_text('stderr') == 'partial\nExecution interrupted by server restart\n'
+
+
+def finished_run(script, user, lines):
+    """Create an execution and store its output the way the runner does."""
+    execution = Execution(script_id=script.id, user_id=user.id, status='running')
+    db.session.add(execution)
+    db.session.commit()
+    writer = OutputChunkWriter(execution.id, db.engine, flush_bytes=8, flush_interval=60)
+    for line in lines:
+        writer.write('stdout', line)
+    writer.close()
+    finalize_output(execution.id, writer)
+    db.session.expire(execution)
+    return execution
+
+
+@pytest.mark.integration
+class TestOutputDeduplication:
+    """Test finished output is stored once per distinct content."""
+
+    def test_identical_output_shares_one_blob(self, init_database, test_script, test_user):
+        """Test repeated runs reference a single blob and keep their own reads."""
+        first = finished_run(test_script, test_user, ['disk ok', 'memory ok'])
+        second = finished_run(test_script, test_user, ['disk ok', 'memory ok'])
+
+        assert first.stdout_blob_id == second.stdout_blob_id
+        assert OutputBlob.query.one().ref_count == 2
+        assert ExecutionOutputChunk.query.filter(ExecutionOutputChunk.execution_id.isnot(None)).count() == 0
+        assert second.stream_text('stdout') == 'disk ok\nmemory ok\n'
+        assert read_range(second, 'stdout', 8) == b'memory ok\n'
+        assert output_storage_stats()['dedup_ratio'] == 2.0
+
+    def test_different_output_gets_its_own_blob(self, init_database, test_script, test_user):
+        """Test changed output is stored separately."""
+        first = finished_run(test_script, test_user, ['disk ok'])
+        second = finished_run(test_script, test_user, ['disk FULL'])
+
+        assert first.stdout_blob_id != second.stdout_blob_id
+        assert output_storage_stats()['blobs'] == 2
+
+    def test_message_after_finalize_is_read(self, init_database, test_script, test_user):
+        """Test a line appended to finalized output follows it without altering the shared blob."""
+        first = finished_run(test_script, test_user, ['same'])
+        second = finished_run(test_script, test_user, ['same'])
+
+        append_message(second, 'stdout', 'Execution cancelled')
+        db.session.commit()
+
+        assert second.stream_text('stdout') == 'same\nExecution cancelled\n'
+        assert read_range(second, 'stdout', 5) == b'Execution cancelled\n'
+        assert first.stream_text('stdout') == 'same\n'
+        assert not is_finalized(second)
+
+    def test_finalize_again_after_late_write(self, execution):
+        """Test a second finalize leaves finalized streams' blobs and references alone."""
+        writer = OutputChunkWriter(execution.id, db.engine, flush_interval=60)
+        writer.write('stdout', 'report')
+        writer.write('stderr', 'warning')
+        writer.close()
+        finalize_output(execution.id, writer)
+
+        writer.write('stderr', 'commit failed')
+        writer.close()
+        finalize_output(execution.id, writer)
+        db.session.expire(execution)
+
+        assert [blob.ref_count for blob in OutputBlob.query] == [1, 1]
+        assert execution.stream_text('stdout') == 'report\n'
+        assert execution.stream_text('stderr') == 'warning\ncommit failed\n'
+
+    def test_blob_collected_while_referencing(self, init_database, test_script, test_user):
+        """Test output whose matching blob is collected before it is referenced gets a blob of its own."""
+        finished_run(test_script, test_user, ['same'])
+        collected = []
+
+        def collect(connection, cursor, statement, parameters, context, executemany):
+            # Delete the blob (as the last reference's release would) right before it is referenced
+            if statement.startswith('UPDATE output_blobs') and not collected:
+                collected.append(True)
+                cursor.execute('DELETE FROM execution_output_chunks WHERE blob_id IS NOT NULL')
+                cursor.execute('DELETE FROM output_blobs')
+
+        event.listen(db.engine, 'before_cursor_execute', collect)
+        try:
+            second = finished_run(test_script, test_user, ['same'])
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', collect)
+
+        assert collected
+        assert second.stdout_blob_id == OutputBlob.query.one().id
+        assert second.stream_text('stdout') == 'same\n'
+
+    def test_blob_collected_with_last_reference(self, init_database, test_script, test_user):
+        """Test deleting executions releases references and removes unreferenced blobs."""
+        first = finished_run(test_script, test_user, ['same'])
+        second = finished_run(test_script, test_user, ['same'])
+
+        db.session.delete(first)
+        db.session.commit()
+        assert OutputBlob.query.one().ref_count == 1
+        assert second.stream_text('stdout') == 'same\n'
+
+        db.session.delete(second)
+        db.session.commit()
+        assert OutputBlob.query.count() == 0
+        assert ExecutionOutputChunk.query.count() == 0
@@ -0,0 +1,220 @@
+"""
+Tests for live execution output over SocketIO.
+"""
+import pytest
+from flask_jwt_extended import create_access_token, create_refresh_token
+from app import socketio
+from models import Execution
+from services.output_stream import streamer
+
+
+@pytest.fixture
+def running_execution(init_database, test_script, test_user):
+    execution = Execution(
+        script_id=test_script.id,
+        user_id=test_user.id,
+        status='running'
+    )
+    init_database.session.add(execution)
+    init_database.session.commit()
+    streamer.open(execution.id)
+    yield execution
+    streamer.close(execution.id)
+
+
+@pytest.fixture
+def socket_client(app, client):
+    socket = socketio.test_client(app, flask_test_client=client)
+    yield socket
+    socket.disconnect()
+
+
+def events(socket, name):
+    return [event['args'][0] for event in socket.get_received() if event['name'] == name]
+
+
+@pytest.mark.integration
+class TestOutputStreaming:
+    """Test the subscribe handshake and batched output events."""
+
+    def test_subscribe_replays_from_offset(self, socket_client, running_execution, test_user):
+        """Test a resuming client gets only the lines it missed, then the status."""
+        for line in ['one', 'two', 'three']:
+            streamer.publish(running_execution.id, line)
+
+        socket_client.emit('subscribe_execution', {
+            'execution_id': running_execution.id,
+            'offset': 1,
+            'token': create_access_token(identity=str(test_user.id))
+        })
+        received = socket_client.get_received()
+
+        output = [e['args'][0] for e in received if e['name'] == 'execution_output']
+        status = [e['args'][0] for e in received if e['name'] == 'execution_status']
+        assert [line['text'] for line in output[0]['lines']] == ['two', 'three']
+        assert output[0]['next_offset'] == 3
+        assert status[0]['status'] == 'running'
+
+    def test_batches_pushed_to_room(self, socket_client, running_execution, test_user):
+        """Test lines published after subscribing arrive batched on the room."""
+        socket_client.emit('subscribe_execution', {
+            'execution_id': running_execution.id,
+            'token': create_access_token(identity=str(test_user.id))
+        })
+        socket_client.get_received()
+
+        streamer.publish(running_execution.id, 'out line')
+        streamer.publish(running_execution.id, 'err line', 'stderr')
+        streamer.flush()
+
+        batches = events(socket_client, 'execution_output')
+        lines = [line for batch in batches for line in batch['lines']]
+        assert [(l['stream'], l['text']) for l in lines] == [
+            ('stdout', 'out line'), ('stderr', 'err line')
+        ]
+
+    def test_status_event_flushes_pending_output(self, socket_client, running_execution, test_user):
+        """Test pending output is delivered before the final status."""
+        socket_client.emit('subscribe_execution', {
+            'execution_id': running_execution.id,
+            'token': create_access_token(identity=str(test_user.id))
+        })
+        socket_client.get_received()
+
+        streamer.publish(running_execution.id, 'last line')
+        streamer.publish_status(running_execution.id, 'completed', exit_code=0)
+
+        names = [event['name'] for event in socket_client.get_received()]
+        assert names[-1] == 'execution_status'
+        assert 'execution_output' in names
+
+    def test_subscribe_requires_valid_token(self, socket_client, running_execution):
+        """Test tokens are required and checked."""
+        socket_client.emit('subscribe_execution', {'execution_id': running_execution.id, 'token': 'bad'})
+
+        assert events(socket_client, 'execution_error') == [{'error': 'Invalid token'}]
+
+    def test_subscribe_rejects_refresh_token(self, socket_client, running_execution, test_user):
+        """Test only access tokens subscribe, as on the HTTP routes."""
+        socket_client.emit('subscribe_execution', {
+            'execution_id': running_execution.id,
+            'token': create_refresh_token(identity=str(test_user.id))
+        })
+
+        assert events(socket_client, 'execution_error') == [{'error': 'Invalid token'}]
+
+    @pytest.mark.parametrize('offset', ['abc', -1])
+    def test_subscribe_rejects_invalid_offset(self, socket_client, running_execution, test_user, offset):
+        """Test a malformed or negative offset is answered with an error."""
+        socket_client.emit('subscribe_execution', {
+            'execution_id': running_execution.id,
+            'offset': offset,
+            'token': create_access_token(identity=str(test_user.id))
+        })
+
+        assert events(socket_client, 'execution_error') == [{'error': 'Invalid offset'}]
+
+
+@pytest.fixture
+def finished_execution(init_database, test_script, test_user):
+    execution = Execution(
+        script_id=test_script.id,
+        user_id=test_user.id,
+        status='completed',
+        output='alpha\nbeta\ngamma',
+        error_output='warn',
+        exit_code=0
+    )
+    init_database.session.add(execution)
+    init_database.session.commit()
+    return execution
+
+
+@pytest.mark.integration
+class TestIncrementalOutput:
+    """Test the cursor and Range based output endpoint."""
+
+    def test_cursor_returns_only_new_live_output(self, client, auth_headers, running_execution):
+        """Test successive polls of a running execution return deltas."""
+        url = f'/api/execution/executions/{running_execution.id}/output'
+        streamer.publish(running_execution.id, 'alpha')
+        streamer.publish(running_execution.id, 'oops', 'stderr')
+
+        first = client.get(url, headers=auth_headers).get_json()
+        assert (first['stdout'], first['stderr']) == ('alpha\n', 'oops\n')
+        assert first['complete'] is False
+
+        streamer.publish(running_execution.id, 'beta')
+        second = client.get(f"{url}?since={first['cursor']}", headers=auth_headers).get_json()
+        assert (second['stdout'], second['stderr']) == ('beta\n', '')
+
+        third = client.get(f"{url}?since={second['cursor']}", headers=auth_headers).get_json()
+        assert (third['stdout'], third['cursor']) == ('', second['cursor'])
+
+    def test_live_cursor_resumes_in_persisted_output(self, client, auth_headers, running_execution):
+        """Test a cursor taken while running stays valid once output is persisted."""
+        url = f'/api/execution/executions/{running_execution.id}/output'
+        streamer.publish(running_execution.id, 'alpha')
+        cursor = client.get(url, headers=auth_headers).get_json()['cursor']
+
+        running_execution.status = 'completed'
+        running_execution.output = 'alpha\nbeta'
+        Execution.query.session.commit()
+
+        data = client.get(f'{url}?since={cursor}', headers=auth_headers).get_json()
+        assert data['stdout'] == 'beta'
+        assert data['complete'] is True
+
+    def test_range_request_on_finished_output(self, client, auth_headers, finished_execution):
+        """Test Range returns 206 with the requested bytes."""
+        url = f'/api/execution/executions/{finished_execution.id}/output'
+
+        response = client.get(url, headers={**auth_headers, 'Range': 'bytes=6-9'})
+        assert response.status_code == 206
+        assert response.data == b'beta'
+        assert response.headers['Content-Range'] == 'bytes 6-9/16'
+
+        tail = client.get(f'{url}?stream=stderr', headers={**auth_headers, 'Range': 'bytes=-2'})
+        assert tail.data == b'rn'
+
+        outside = client.get(url, headers={**auth_headers, 'Range': 'bytes=100-'})
+        assert outside.status_code == 416
+
+    def test_invalid_cursor_rejected(self, client, auth_headers, finished_execution):
+        """Test malformed cursors return 400."""
+        response = client.get(
+            f'/api/execution/executions/{finished_execution.id}/output?since=abc',
+            headers=auth_headers
+        )
+
+        assert response.status_code == 400
+
+
+@pytest.mark.integration
+class TestCoalescedStreaming:
+    """Test a coalesced execution is served from its leader's stream."""
+
+    def test_follower_room_gets_leader_output(self, socket_client, running_execution, test_user,
+                                              init_database, test_script):
+        """Test output and replay of the leader reach a follower subscriber."""
+        follower = Execution(script_id=test_script.id, user_id=test_user.id, status='running',
+                             coalesced_with_id=running_execution.id)
+        init_database.session.add(follower)
+        init_database.session.commit()
+        streamer.alias(follower.id, running_execution.id)
+        streamer.publish(running_execution.id, 'before')
+        streamer.flush()
+
+        socket_client.emit('subscribe_execution', {
+            'execution_id': follower.id,
+            'token': create_access_token(identity=str(test_user.id))
+        })
+        replayed = events(socket_client, 'execution_output')
+        streamer.publish(running_execution.id, 'after')
+        streamer.flush()
+        live = events(socket_client, 'execution_output')
+        streamer.unalias(follower.id)
+
+        assert [line['text'] for line in replayed[0]['lines']] == ['before']
+        assert live[0]['execution_id'] == follower.id
+        assert [line['text'] for line in live[0]['lines']] == ['after']
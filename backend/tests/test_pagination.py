@@ -0,0 +1,134 @@
+"""
+Tests for keyset pagination of the script and execution lists.
+"""
+from datetime import datetime, timedelta
+import pytest
+from models import db, Script, Execution
+from services.pagination import decode_cursor, encode_cursor
+
+
+def page_through(client, url, headers, **params):
+    """Follow X-Next-Cursor to the end; returns the pages' ID lists."""
+    pages, cursor = [], None
+    while True:
+        query = dict(params, **({'cursor': cursor} if cursor else {}))
+        response = client.get(url, query_string=query, headers=headers)
+        assert response.status_code == 200
+        pages.append([row['id'] for row in response.get_json()])
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return pages
+
+
+@pytest.mark.unit
+class TestCursors:
+    """Test cursor tokens."""
+
+    def test_round_trip(self):
+        """Test a cursor decodes to the position it was made from."""
+        timestamp = datetime(2024, 5, 1, 12, 30, 15, 123456)
+
+        assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+
+    def test_malformed(self):
+        """Test garbage is rejected with ValueError."""
+        for cursor in ('not-a-cursor', encode_cursor(datetime.utcnow(), 1)[:-3], 'WzFd'):
+            with pytest.raises(ValueError):
+                decode_cursor(cursor)
+
+
+@pytest.mark.integration
+class TestScriptPagination:
+    """Test the script list pages on (updated_at, id)."""
+
+    @pytest.fixture
+    def scripts(self, test_user):
+        same_time = datetime(2024, 1, 1)
+        rows = [
+            Script(name=f'Script {index}', content='Get-Date', author_id=test_user.id,
+                   updated_at=same_time if index < 4 else same_time + timedelta(minutes=index))
+            for index in range(7)
+        ]
+        db.session.add_all(rows)
+        db.session.commit()
+        return rows
+
+    def test_pages_cover_every_script_once(self, client, auth_headers, scripts):
+        """Test pages are disjoint, newest first, even across equal timestamps."""
+        pages = page_through(client, '/api/scripts/', auth_headers, limit=3)
+        ids = [script_id for page in pages for script_id in page]
+
+        assert [len(page) for page in pages] == [3, 3, 1]
+        assert ids == [script.id for script in reversed(scripts)]
+
+    def test_new_rows_do_not_shift_pages(self, client, auth_headers, scripts, test_user):
+        """Test rows created while paging do not repeat on later pages."""
+        first = client.get('/api/scripts/?limit=3', headers=auth_headers)
+        db.session.add(Script(name='Newest', content='Get-Date', author_id=test_user.id))
+        db.session.commit()
+        second = client.get('/api/scripts/', query_string={
+            'limit': 3, 'cursor': first.headers['X-Next-Cursor']
+        }, headers=auth_headers)
+
+        assert not {row['id'] for row in first.get_json()} & {row['id'] for row in second.get_json()}
+
+    def test_total_count_is_opt_in(self, client, auth_headers, scripts):
+        """Test X-Total-Count is only computed when asked for."""
+        plain = client.get('/api/scripts/?limit=2', headers=auth_headers)
+        counted = client.get('/api/scripts/?limit=2&count=estimate', headers=auth_headers)
+
+        assert 'X-Total-Count' not in plain.headers
+        assert counted.headers['X-Total-Count'] == '7'
+        assert 'X-Total-Count-Estimated' not in counted.headers  # exact outside PostgreSQL
+
+    def test_invalid_arguments(self, client, auth_headers, scripts):
+        """Test bad cursors, limits and count modes are rejected."""
+        for query in ('cursor=bogus', 'limit=0', 'limit=5000', 'count=maybe'):
+            assert client.get(f'/api/scripts/?{query}', headers=auth_headers).status_code == 400
+
+
+@pytest.mark.integration
+class TestExecutionPagination:
+    """Test execution history pages on (created_at, id)."""
+
+    def test_filtered_pages(self, client, auth_headers, test_script, test_user):
+        """Test paging composes with filters and serves newest first."""
+        base = datetime(2024, 1, 1)
+        executions = [
+            Execution(script_id=test_script.id, user_id=test_user.id,
+                      status='completed' if index % 2 else 'failed',
+                      created_at=base + timedelta(seconds=index // 2))
+            for index in range(9)
+        ]
+        db.session.add_all(executions)
+        db.session.commit()
+
+        pages = page_through(client, '/api/execution/executions', auth_headers,
+                             limit=2, status='completed')
+        ids = [execution_id for page in pages for execution_id in page]
+
+        assert ids == [execution.id for execution in reversed(executions) if execution.status == 'completed']
+        assert len(pages) == 2
+
+    def test_started_run_keeps_its_page(self, client, auth_headers, test_script, test_user):
+        """Test a queued run that starts while a client pages is neither skipped nor repeated."""
+        base = datetime(2024, 1, 1)
+        executions = [
+            Execution(script_id=test_script.id, user_id=test_user.id, status='queued',
+                      created_at=base + timedelta(seconds=index), started_at=base + timedelta(seconds=index))
+            for index in range(4)
+        ]
+        db.session.add_all(executions)
+        db.session.commit()
+
+        response = client.get('/api/execution/executions', query_string={'limit': 2}, headers=auth_headers)
+        first_page = [row['id'] for row in response.get_json()]
+        executions[0].status = 'running'
+        executions[0].started_at = datetime.utcnow()
+        db.session.commit()
+        response = client.get('/api/execution/executions', headers=auth_headers,
+                              query_string={'limit': 2, 'cursor': response.headers['X-Next-Cursor']})
+
+        assert first_page + [row['id'] for row in response.get_json()] == [
+            execution.id for execution in reversed(executions)
+        ]
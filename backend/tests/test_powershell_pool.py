@@ -0,0 +1,337 @@
+"""
+Tests for the warm PowerShell worker pool.
+
+The pool is exercised against a small Python host that speaks the same frame
+protocol as the real pwsh host, so no PowerShell installation is required.
+"""
+import stat
+import sys
+import time
+from collections import OrderedDict
+import pytest
+from services import powershell_pool
+from services.powershell_executor import PowerShellExecutor
+from services.powershell_pool import (
+    PowerShellWorkerPool, PowerShellWorker, WorkerError, get_worker_pool, retire_module_pools
+)
+
+
+FAKE_HOST = r'''
+import base64, os, sys, time
+nonce, modules = sys.argv[1], sys.argv[2:]
+def frame(kind, payload=''):
+    sys.stdout.write(f"{nonce} {kind} {payload}\n")
+    sys.stdout.flush()
+def text(kind, line):
+    frame(kind, base64.b64encode(line.encode()).decode())
+frame('READY', f"{os.getpid()} {0.25 if modules else 0}")
+for line in sys.stdin:
+    line = line.rstrip('\n')
+    if line == 'QUIT':
+        break
+    if line == 'PING':
+        frame('PONG')
+        continue
+    script = base64.b64decode(line[4:]).decode()
+    code = 0
+    for cmd in script.splitlines():
+        op, _, arg = cmd.partition(' ')
+        if op == 'echo':
+            text('OUT', arg)
+        elif op == 'err':
+            text('ERR', arg)
+        elif op == 'raw':
+            sys.stdout.write(arg + '\n')
+            sys.stdout.flush()
+        elif op == 'sleep':
+            time.sleep(float(arg))
+        elif op == 'exit':
+            code = int(arg)
+        elif op == 'crash':
+            sys.exit(3)
+        elif op == 'pid':
+            text('OUT', str(os.getpid()))
+        elif op == 'modules':
+            text('OUT', ','.join(modules))
+    frame('END', code)
+'''
+
+
+def fake_host_command(pwsh_path, nonce, modules=()):
+    return [sys.executable, '-c', FAKE_HOST, nonce, *modules]
+
+
+@pytest.fixture
+def pool():
+    pool = PowerShellWorkerPool(
+        'pwsh',
+        min_size=1,
+        max_size=2,
+        max_runs_per_worker=3,
+        health_check_interval=0,
+        acquire_timeout=5,
+        command_factory=fake_host_command
+    )
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+@pytest.mark.unit
+class TestPowerShellWorkerPool:
+    """Test pooled execution over the frame protocol."""
+
+    def test_run_collects_streams(self, pool):
+        """Test stdout, stderr and exit code are framed back."""
+        lines = []
+        result = pool.run('echo hello\nerr oops\necho world\nexit 4', callback=lines.append)
+
+        assert result['output'] == 'hello\nworld'
+        assert result['error_output'] == 'oops'
+        assert result['exit_code'] == 4
+        assert lines == ['hello', 'world']
+
+    def test_unframed_output_is_stdout(self, pool):
+        """Test lines without the worker nonce are treated as plain output."""
+        result = pool.run('raw direct console write')
+
+        assert result['output'] == 'direct console write'
+        assert result['exit_code'] == 0
+
+    def test_worker_is_reused(self, pool):
+        """Test consecutive runs land on the same warm process."""
+        first = pool.run('pid')['output']
+        second = pool.run('pid')['output']
+
+        assert first == second
+        assert pool.stats()['workers_started'] == 1
+
+    def test_recycle_after_max_runs(self, pool):
+        """Test a worker is replaced after max_runs_per_worker runs."""
+        pids = {pool.run('pid')['output'] for _ in range(4)}
+
+        assert len(pids) == 2
+        assert pool.stats()['workers_recycled'] == 1
+        assert pool.size() == 1
+
+    def test_timeout_kills_worker(self, pool):
+        """Test a timed out run returns -2 and the worker is replaced."""
+        result = pool.run('echo before\nsleep 5', timeout=1)
+
+        assert result['exit_code'] == -2
+        assert result['output'] == 'before'
+        assert 'timeout' in result['error_output']
+        assert pool.run('echo after')['output'] == 'after'
+
+    def test_crashed_worker_raises_and_is_replaced(self, pool):
+        """Test a worker dying mid-run surfaces an error and is recycled."""
+        with pytest.raises(WorkerError):
+            pool.run('crash')
+
+        assert pool.run('echo ok')['exit_code'] == 0
+
+    def test_health_check_replaces_dead_worker(self, pool):
+        """Test the health check drops dead idle workers and tops up."""
+        worker = pool.acquire()
+        pool.release(worker)
+        worker.kill()
+
+        result = pool.health_check()
+
+        assert result['replaced'] == 1
+        assert pool.size() == 1
+        assert pool.run('echo alive')['output'] == 'alive'
+
+    def test_acquire_respects_max_size(self, pool):
+        """Test acquire times out when all max_size workers are busy."""
+        first = pool.acquire()
+        second = pool.acquire()
+
+        with pytest.raises(TimeoutError):
+            pool.acquire(timeout=0.2)
+
+        pool.release(first)
+        pool.release(second)
+
+    def test_worker_ping(self):
+        """Test a standalone worker answers health pings."""
+        worker = PowerShellWorker('pwsh', command_factory=fake_host_command)
+        worker.start()
+        try:
+            assert worker.ping() is True
+        finally:
+            worker.stop()
+        assert worker.ping() is False
+
+
+@pytest.mark.unit
+class TestModulePools:
+    """Test pools whose workers keep a module set imported."""
+
+    @pytest.fixture
+    def module_pool(self):
+        pool = PowerShellWorkerPool(
+            'pwsh',
+            min_size=0,
+            max_size=1,
+            health_check_interval=0,
+            acquire_timeout=5,
+            command_factory=fake_host_command,
+            modules=('Az', 'VMware.PowerCLI')
+        )
+        pool.start()
+        yield pool
+        pool.shutdown()
+
+    def test_workers_load_the_module_set(self, module_pool):
+        """Test workers are started with the pool's modules."""
+        assert module_pool.run('modules')['output'] == 'Az,VMware.PowerCLI'
+        assert module_pool.stats()['modules'] == ['Az', 'VMware.PowerCLI']
+
+    def test_import_time_only_charged_to_cold_runs(self, module_pool):
+        """Test the run that started a worker reports its import, later runs none."""
+        cold = module_pool.run('echo first')
+        warm = module_pool.run('echo second')
+
+        assert cold['module_import_seconds'] == 0.25
+        assert warm['module_import_seconds'] == 0.0
+        assert module_pool.stats()['cold_runs'] == 1
+
+    def test_plain_pool_reports_no_import(self, pool):
+        """Test pools without modules leave module_import_seconds out."""
+        assert 'module_import_seconds' not in pool.run('echo hi')
+
+    def test_background_warmup(self):
+        """Test start(wait=False) brings the pool to min_size without blocking."""
+        pool = PowerShellWorkerPool('pwsh', min_size=1, max_size=2, health_check_interval=0,
+                                    command_factory=fake_host_command, modules=('Az',))
+        pool.start(wait=False)
+        try:
+            deadline = time.time() + 10
+            while pool.stats()['idle'] < 1 and time.time() < deadline:
+                time.sleep(0.05)
+
+            assert pool.run('echo hi')['module_import_seconds'] == 0.0
+            assert pool.stats()['cold_runs'] == 0
+        finally:
+            pool.shutdown()
+
+    def test_executor_routes_covered_modules_to_pool(self, module_pool):
+        """Test a warm pool with the modules runs the script without a prologue."""
+        executor = PowerShellExecutor(enable_restrictions=False, pool=module_pool)
+
+        covered = executor.execute('echo ran', required_modules=['az'])
+        uncovered = executor.execute('echo ran', required_modules=['Microsoft.Graph'])
+
+        assert covered['output'] == 'ran'
+        assert covered['module_import_seconds'] == 0.25
+        assert uncovered['module_import_seconds'] is None  # imported by a prologue instead
+
+    def test_full_pool_runs_cold(self, module_pool, tmp_path, monkeypatch):
+        """Test a run finding every worker busy runs in a cold process, importing its modules, without waiting."""
+        fake = tmp_path / 'pwsh'
+        fake.write_text('#!/bin/sh\ngrep -c Import-Module\n')
+        fake.chmod(fake.stat().st_mode | stat.S_IEXEC)
+        monkeypatch.setattr(PowerShellExecutor, 'pwsh_path', property(lambda self: str(fake)))
+        executor = PowerShellExecutor(enable_restrictions=False, pool=module_pool)
+        busy = module_pool.acquire()
+        try:
+            started = time.monotonic()
+            result = executor.execute('echo ran', timeout=10, required_modules=['Az'])
+        finally:
+            module_pool.release(busy)
+
+        assert result['status'] == 'completed'
+        assert result['output'] == '1'
+        assert time.monotonic() - started < module_pool.acquire_timeout
+        assert module_pool.stats()['runs'] == 0
+
+
+@pytest.mark.unit
+class TestModulePoolLimits:
+    """Test the number of module pools is capped and unused ones are retired."""
+
+    @pytest.fixture(autouse=True)
+    def pools(self, monkeypatch):
+        monkeypatch.setenv('PWSH_POOL_ENABLED', 'true')
+        monkeypatch.setenv('PWSH_POOL_MIN_SIZE', '0')
+        monkeypatch.setenv('PWSH_POOL_HEALTH_INTERVAL', '0')
+        monkeypatch.setenv('PWSH_POOL_MAX_MODULE_POOLS', '2')
+        monkeypatch.setattr(powershell_pool, '_pools', OrderedDict())
+        monkeypatch.setattr(powershell_pool, 'PowerShellWorkerPool', lambda *args, **kwargs: PowerShellWorkerPool(
+            *args, command_factory=fake_host_command, **kwargs
+        ))
+        yield powershell_pool._pools
+        for pool in list(powershell_pool._pools.values()):
+            pool.shutdown()
+
+    def test_least_recently_used_idle_pool_is_shut_down(self, pools):
+        """Test a new module set replaces the idle pool used longest ago."""
+        first = get_worker_pool('pwsh', ('Az',))
+        second = get_worker_pool('pwsh', ('VMware.PowerCLI',))
+        get_worker_pool('pwsh', ('Az',))
+        get_worker_pool('pwsh')
+
+        third = get_worker_pool('pwsh', ('Microsoft.Graph',))
+
+        assert second.closed
+        assert not first.closed and not third.closed
+        assert [modules for _, modules in pools] == [('Az',), (), ('Microsoft.Graph',)]
+
+    def test_busy_pools_are_kept(self, pools):
+        """Test no pool is created for a new set while every module pool is busy."""
+        for modules in (('Az',), ('VMware.PowerCLI',)):
+            get_worker_pool('pwsh', modules).acquire()
+
+        assert get_worker_pool('pwsh', ('Microsoft.Graph',)) is None
+
+        busy = next(iter(pools.values()))
+        busy.release(busy._busy[0])
+
+        assert get_worker_pool('pwsh', ('Microsoft.Graph',)) is not None
+        assert busy.closed
+
+    def test_idle_pool_kept_when_eviction_cannot_fit(self, pools, monkeypatch):
+        """Test an idle pool is not shut down if evicting it alone would not make room."""
+        idle = get_worker_pool('pwsh', ('Az',))
+        get_worker_pool('pwsh', ('VMware.PowerCLI',)).acquire()
+        monkeypatch.setenv('PWSH_POOL_MAX_MODULE_POOLS', '1')
+
+        assert get_worker_pool('pwsh', ('Microsoft.Graph',)) is None
+        assert not idle.closed
+        assert len(pools) == 2
+
+    def test_undeclared_sets_are_retired(self, pools):
+        """Test idle pools of module sets no script declares are shut down, others kept."""
+        plain = get_worker_pool('pwsh')
+        kept = get_worker_pool('pwsh', ('Az',))
+        unused = get_worker_pool('pwsh', ('VMware.PowerCLI',))
+
+        assert retire_module_pools([('pwsh', ('Az',))]) == 1
+        assert unused.closed
+        assert not kept.closed and not plain.closed
+
+    def test_broken_host_runs_cold(self, pools, tmp_path, monkeypatch):
+        """Test a pool whose workers cannot start is created without waiting and runs fall back to cold pwsh."""
+        monkeypatch.setattr(powershell_pool, 'PowerShellWorkerPool', lambda *args, **kwargs: PowerShellWorkerPool(
+            *args, command_factory=lambda *_: [sys.executable, '-c', 'pass'], **kwargs
+        ))
+        monkeypatch.setenv('PWSH_POOL_MIN_SIZE', '1')
+        fake = tmp_path / 'pwsh'
+        fake.write_text('#!/bin/sh\necho cold\n')
+        fake.chmod(fake.stat().st_mode | stat.S_IEXEC)
+        monkeypatch.setattr(PowerShellExecutor, 'pwsh_path', property(lambda self: str(fake)))
+
+        pool = get_worker_pool('pwsh')
+        result = PowerShellExecutor(enable_restrictions=False, pool=pool).execute('echo ran', timeout=10)
+
+        assert result['status'] == 'completed'
+        assert result['output'] == 'cold'
+        assert pool.stats()['workers_failed'] >= 1
+
+    def test_executor_skips_closed_pool(self, pools):
+        """Test a run handed a pool that was retired meanwhile runs without it."""
+        pool = get_worker_pool('pwsh', ('Az',))
+        retire_module_pools([])
+
+        assert not PowerShellExecutor(enable_restrictions=False, pool=pool)._uses_pool(None)
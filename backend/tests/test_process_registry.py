@@ -0,0 +1,112 @@
+"""
+Tests for process-tree cancellation and timeouts.
+"""
+import stat
+import threading
+import time
+import pytest
+from services.powershell_executor import PowerShellExecutor
+from services.process_registry import ProcessRegistry
+from services.process_supervisor import ProcessSupervisor
+
+# Stands in for pwsh: starts a grandchild that would outlive a plain kill
+SPAWNING_PWSH = '#!/bin/sh\nsleep 60 &\necho $!\nwait\n'
+
+
+def is_running(pid):
+    """True if pid exists and is not a zombie."""
+    try:
+        with open(f'/proc/{pid}/stat') as proc_stat:
+            return proc_stat.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except (FileNotFoundError, ProcessLookupError):
+        return False
+
+
+def wait_until_stopped(pid, timeout=5):
+    deadline = time.time() + timeout
+    while is_running(pid) and time.time() < deadline:
+        time.sleep(0.05)
+    return not is_running(pid)
+
+
+@pytest.fixture
+def spawning_executor(tmp_path, monkeypatch):
+    fake = tmp_path / 'pwsh'
+    fake.write_text(SPAWNING_PWSH)
+    fake.chmod(fake.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(PowerShellExecutor, 'pwsh_path', property(lambda self: str(fake)))
+    return PowerShellExecutor(enable_restrictions=False)
+
+
+@pytest.mark.unit
+class TestProcessTreeKill:
+    """Test timeouts and cancels stop the script's child processes too."""
+
+    def test_timeout_kills_grandchildren(self, spawning_executor):
+        """Test the thread runner kills the whole process group on timeout."""
+        result = spawning_executor.execute('', timeout=1)
+
+        assert result['exit_code'] == -2
+        assert wait_until_stopped(int(result['output']))
+
+    def test_supervisor_timeout_kills_grandchildren(self, spawning_executor):
+        """Test the event-loop runner kills the whole process group on timeout."""
+        spawning_executor.supervisor = ProcessSupervisor()
+        try:
+            result = spawning_executor.execute('', timeout=1)
+        finally:
+            spawning_executor.supervisor.shutdown()
+
+        assert result['exit_code'] == -2
+        assert wait_until_stopped(int(result['output']))
+
+    def test_cancel_through_registry(self, spawning_executor):
+        """Test cancelling a tracked run kills its tree well before the timeout."""
+        registry = ProcessRegistry()
+        registry.track(7)
+        pids = []
+
+        def on_batch(stream_name, lines):
+            pids.extend(int(line) for line in lines)
+            registry.cancel(7)
+
+        started = time.time()
+        spawning_executor.execute(
+            '', timeout=60, batch_callback=on_batch,
+            on_process=lambda kill: registry.attach(7, kill)
+        )
+
+        assert time.time() - started < 10
+        assert registry.release(7) is True
+        assert wait_until_stopped(pids[0])
+
+
+@pytest.mark.unit
+class TestProcessRegistry:
+    """Test cancel bookkeeping."""
+
+    def test_cancel_before_attach_kills_on_attach(self):
+        """Test a cancel racing the process start still takes effect."""
+        registry = ProcessRegistry()
+        registry.track(1)
+        killed = threading.Event()
+
+        assert registry.cancel(1) is True
+        registry.attach(1, killed.set)
+
+        assert killed.is_set()
+
+    def test_tracking_again_keeps_cancel(self):
+        """Test a cancel between the scheduler's and the runner's track survives."""
+        registry = ProcessRegistry()
+        registry.track(1)
+        registry.cancel(1)
+
+        registry.track(1)
+
+        assert registry.is_cancelled(1)
+        assert registry.release(1) is True
+
+    def test_cancel_unknown_execution(self):
+        """Test executions not running here are reported as such."""
+        assert ProcessRegistry().cancel(99) is False
@@ -0,0 +1,89 @@
+"""
+Tests for the event-loop process supervisor.
+"""
+import stat
+import sys
+import threading
+import time
+import pytest
+from services.output_reader import MAX_LINE
+from services.process_supervisor import ProcessSupervisor
+from services.powershell_executor import PowerShellExecutor
+
+
+def python_child(code):
+    return [sys.executable, '-c', code]
+
+
+@pytest.fixture
+def supervisor():
+    supervisor = ProcessSupervisor()
+    yield supervisor
+    supervisor.shutdown()
+
+
+@pytest.mark.unit
+class TestProcessSupervisor:
+    """Test children are multiplexed on one loop with loop-timer timeouts."""
+
+    def test_streams_stdout_and_stderr(self, supervisor):
+        """Test both pipes are read line by line and stdin is delivered."""
+        out, err = [], []
+        result = supervisor.run(
+            python_child(
+                'import sys\n'
+                'print(sys.stdin.read().strip())\n'
+                'print("warn", file=sys.stderr)\n'
+                'sys.exit(3)'
+            ),
+            'hello',
+            callback=out.append,
+            error_callback=err.append
+        )
+
+        assert result == {'output': 'hello', 'error_output': 'warn', 'exit_code': 3}
+        assert (out, err) == (['hello'], ['warn'])
+
+    def test_timeout_kills_child(self, supervisor):
+        """Test an overrunning child is killed by the loop timer."""
+        result = supervisor.run(python_child('import time; time.sleep(30)'), timeout=0.3)
+
+        assert result['exit_code'] == -2
+        assert 'timeout' in result['error_output']
+        assert supervisor.stats()['running'] == 0
+
+    def test_many_children_share_one_thread(self, supervisor):
+        """Test concurrent runs do not add threads per child."""
+        supervisor.start()
+        before = threading.active_count()
+
+        futures = [
+            supervisor.submit(python_child(f'import time; time.sleep(1); print({i})'))
+            for i in range(20)
+        ]
+        time.sleep(0.5)
+        during = threading.active_count()
+        results = [future.result(timeout=30) for future in futures]
+
+        assert during - before < 5  # not one waiter thread per child
+        assert sorted(int(r['output']) for r in results) == list(range(20))
+
+    def test_overlong_line_delivered_in_pieces(self, supervisor):
+        """Test lines above the stream limit are not lost."""
+        result = supervisor.run(python_child(f'print("x" * {MAX_LINE + 10})'))
+
+        assert len(result['output'].replace('\n', '')) == MAX_LINE + 10
+
+    def test_executor_runs_on_supervisor(self, supervisor, tmp_path, monkeypatch):
+        """Test PowerShellExecutor uses the supervisor for cold runs."""
+        fake = tmp_path / 'pwsh'
+        fake.write_text('#!/bin/sh\ncat\n')
+        fake.chmod(fake.stat().st_mode | stat.S_IEXEC)
+        monkeypatch.setattr(PowerShellExecutor, 'pwsh_path', property(lambda self: str(fake)))
+
+        executor = PowerShellExecutor(enable_restrictions=False, supervisor=supervisor)
+        result = executor.execute('Write-Output "hi"', timeout=10)
+
+        assert result['status'] == 'completed'
+        assert result['output'] == 'Write-Output "hi"'
+        assert supervisor.stats()['completed'] == 1
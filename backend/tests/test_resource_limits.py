@@ -0,0 +1,117 @@
+"""
+Tests for per-script resource limits and rusage accounting.
+"""
+import os
+import stat
+import sys
+import pytest
+from services.powershell_executor import PowerShellExecutor
+from services.process_supervisor import ProcessSupervisor
+from services.resource_limits import ResourceLimits, validate_resource_limits
+
+
+@pytest.fixture
+def fake_pwsh(tmp_path, monkeypatch):
+    """Install a shell script as pwsh; returns a function that sets its body."""
+    fake = tmp_path / 'pwsh'
+    monkeypatch.setattr(PowerShellExecutor, 'pwsh_path', property(lambda self: str(fake)))
+
+    def install(body):
+        fake.write_text(f'#!/bin/sh\n{body}\n')
+        fake.chmod(fake.stat().st_mode | stat.S_IEXEC)
+        return PowerShellExecutor(enable_restrictions=False)
+    return install
+
+
+@pytest.mark.unit
+class TestValidateResourceLimits:
+    """Test script limits are checked before they are stored."""
+
+    def test_accepts_known_positive_limits(self):
+        """Test a complete limits object is valid."""
+        assert validate_resource_limits({'memory_mb': 512, 'cpu_seconds': 30}) == (True, [])
+        assert validate_resource_limits(None) == (True, [])
+
+    def test_rejects_unknown_and_non_positive(self):
+        """Test typos and nonsense values are reported."""
+        is_valid, errors = validate_resource_limits({'memory': 512, 'open_files': 0, 'cpu_seconds': True})
+
+        assert not is_valid
+        assert len(errors) == 3
+
+    def test_empty_limits_mean_none(self):
+        """Test scripts without limits run unrestricted."""
+        assert ResourceLimits.from_dict({}) is None
+        assert ResourceLimits.from_dict(None) is None
+
+
+@pytest.mark.unit
+@pytest.mark.skipif(sys.platform == 'win32', reason='rlimits are POSIX only')
+class TestResourceLimits:
+    """Test limits are applied to the child and usage is measured."""
+
+    def test_rlimits_set_before_script_runs(self, fake_pwsh):
+        """Test the child has the configured rlimits once it has read its script."""
+        executor = fake_pwsh('cat > /dev/null; ulimit -n; ulimit -t; ulimit -v; echo "$DOTNET_GCHeapHardLimit"')
+
+        result = executor.execute('', timeout=10, limits=ResourceLimits(
+            memory_mb=512, cpu_seconds=30, open_files=64
+        ))
+
+        assert result['output'].split('\n') == ['64', '30', str(512 * 1024), format(384 * 1024 * 1024, 'x')]
+
+    def test_supervised_run_is_limited(self, fake_pwsh):
+        """Test runs on the supervisor's event loop get the rlimits as well."""
+        executor = fake_pwsh('cat > /dev/null; ulimit -n')
+        executor.supervisor = ProcessSupervisor()
+        try:
+            result = executor.execute('', timeout=10, limits=ResourceLimits(open_files=48))
+        finally:
+            executor.supervisor.shutdown()
+
+        assert result['output'] == '48'
+
+    @pytest.mark.parametrize('supervised', [False, True])
+    def test_child_killed_when_limits_fail(self, fake_pwsh, monkeypatch, supervised):
+        """Test a child whose rlimits cannot be set is killed and the run fails."""
+        executor = fake_pwsh('cat > /dev/null')
+        pids = []
+
+        def fail(limits, pid):
+            pids.append(pid)
+            raise OSError('prlimit refused')
+
+        monkeypatch.setattr(ResourceLimits, 'apply_to', fail)
+        if supervised:
+            executor.supervisor = ProcessSupervisor()
+        try:
+            result = executor.execute('', timeout=10, limits=ResourceLimits(open_files=48))
+        finally:
+            if supervised:
+                executor.supervisor.shutdown()
+
+        assert result['status'] == 'failed'
+        assert 'prlimit refused' in result['error_output']
+        with pytest.raises(ProcessLookupError):
+            os.kill(pids[0], 0)
+
+    def test_output_limit_kills_run(self, fake_pwsh):
+        """Test a script flooding output is stopped once it exceeds its budget."""
+        executor = fake_pwsh('yes')
+
+        result = executor.execute('', timeout=30, limits=ResourceLimits(max_output_bytes=1000))
+
+        assert result['status'] == 'failed'
+        assert 'Output limit of 1000 bytes exceeded' in result['error_output']
+        assert len(result['output']) <= 1000
+
+    def test_rusage_recorded(self, fake_pwsh):
+        """Test CPU time and peak memory of the child are returned."""
+        executor = fake_pwsh(
+            f'{sys.executable} -c "x = bytearray(32 * 1024 * 1024); sum(range(3 * 10 ** 6))"'
+        )
+
+        usage = executor.execute('', timeout=30)['resource_usage']
+
+        assert usage['cpu_user_seconds'] > 0
+        assert usage['max_rss_kb'] > 32 * 1024
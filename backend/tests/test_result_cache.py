@@ -0,0 +1,87 @@
+"""
+Tests for memoized results of idempotent scripts.
+"""
+import time
+import pytest
+from services import result_cache
+from services.interpreter_registry import InterpreterNotFoundError
+from services.result_cache import ResultCache, cache_key
+
+
+class FakeRegistry:
+    """Resolves version selectors against a fixed list of installed versions."""
+
+    def __init__(self, *versions):
+        self.versions = list(versions)
+
+    def get(self, selector=None):
+        for version in self.versions:
+            if not selector or version == selector or version.startswith(selector + '.'):
+                return FakeInterpreter(version)
+        raise InterpreterNotFoundError(selector)
+
+
+class FakeInterpreter:
+    def __init__(self, version):
+        self.version = version
+
+
+@pytest.fixture
+def installed(monkeypatch):
+    registry = FakeRegistry('7.4.6', '7.2.18')
+    monkeypatch.setattr(result_cache, 'registry', registry)
+    return registry
+
+
+class FakeScript:
+    def __init__(self, content='Get-Datastore', pwsh_version=None):
+        self.content = content
+        self.pwsh_version = pwsh_version
+
+
+@pytest.mark.unit
+class TestResultCache:
+    """Test keys, expiry and LRU eviction."""
+
+    def test_key_normalizes_parameters(self, installed):
+        """Test parameter order does not split entries, but values and versions do."""
+        script = FakeScript()
+
+        assert cache_key(script, {'a': 1, 'b': 2}) == cache_key(script, {'b': 2, 'a': 1})
+        assert cache_key(script, {'a': 1}) != cache_key(script, {'a': 2})
+        assert cache_key(script, None) != cache_key(FakeScript(pwsh_version='7.2'), None)
+
+    def test_key_uses_resolved_version(self, installed):
+        """Test selectors resolving to one interpreter share entries, and upgrades split them."""
+        assert cache_key(FakeScript(), None) == cache_key(FakeScript(pwsh_version='7'), None)
+        assert cache_key(FakeScript(pwsh_version='7.4'), None)[2] == '7.4.6'
+        before = cache_key(FakeScript(pwsh_version='7.4'), None)
+
+        installed.versions.insert(0, '7.4.7')
+
+        assert cache_key(FakeScript(pwsh_version='7.4'), None) != before
+        assert cache_key(FakeScript(pwsh_version='5.1'), None)[2] == '5.1'
+
+    def test_expired_entry_is_a_miss(self):
+        """Test results are not served after their TTL."""
+        cache = ResultCache()
+        cache.put(('k', '', ''), 1, ttl_seconds=0.05)
+        assert cache.get(('k', '', '')) == 1
+
+        time.sleep(0.1)
+
+        assert cache.get(('k', '', '')) is None
+        assert cache.stats()['expired'] == 1
+
+    def test_least_recently_used_evicted(self):
+        """Test a recently read entry survives eviction."""
+        cache = ResultCache(max_entries=2)
+        cache.put(('a', '', ''), 1, 60)
+        cache.put(('b', '', ''), 2, 60)
+        cache.get(('a', '', ''))
+        cache.put(('c', '', ''), 3, 60)
+
+        assert cache.get(('b', '', '')) is None
+        assert cache.get(('a', '', '')) == 1
+        stats = cache.stats()
+        assert (stats['entries'], stats['evictions'], stats['hits'], stats['misses']) == (2, 1, 2, 1)
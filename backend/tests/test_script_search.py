@@ -0,0 +1,131 @@
+"""
+Tests for full-text script search.
+"""
+import pytest
+from services.script_search import ensure_index, fts_query, highlight, HIGHLIGHT_START, HIGHLIGHT_END
+
+
+def create(client, headers, **fields):
+    """Create a script through the API (which indexes it); returns its ID."""
+    response = client.post('/api/scripts/', json={'content': 'Get-Date', **fields}, headers=headers)
+    assert response.status_code == 201
+    return response.get_json()['script']['id']
+
+
+def search(client, headers, text, **params):
+    response = client.get('/api/scripts/', query_string={'search': text, **params}, headers=headers)
+    assert response.status_code == 200
+    return response
+
+
+@pytest.mark.unit
+class TestSearchHelpers:
+    """Test query building and snippet highlighting."""
+
+    def test_fts_query(self):
+        """Test words become prefix phrases and punctuation cannot inject syntax."""
+        assert fts_query('Get-VM report') == '"Get VM"* "report"*'
+        assert fts_query('name:"x" OR') == '"name x"* "OR"*'
+        assert fts_query('-- ""') == ''
+
+    def test_highlight_escapes(self):
+        """Test snippet text is HTML-escaped and only the sentinels become tags."""
+        snippet = f'<b>{HIGHLIGHT_START}Get{HIGHLIGHT_END}-VM & more'
+
+        assert highlight(snippet) == '&lt;b&gt;<mark>Get</mark>-VM &amp; more'
+        assert highlight(None) is None
+
+
+@pytest.mark.integration
+class TestScriptSearch:
+    """Test the script list's search parameter."""
+
+    def test_ranks_name_above_content(self, client, auth_headers):
+        """Test a match in the name ranks above one in the body."""
+        body = create(client, auth_headers, name='Inventory', content='Get-VM | Export-Csv vms.csv')
+        named = create(client, auth_headers, name='Get-VM snapshot cleanup', content='Remove-Snapshot')
+        create(client, auth_headers, name='Disk report', content='Get-PSDrive')
+
+        results = search(client, auth_headers, 'Get-VM').get_json()
+
+        assert [row['id'] for row in results] == [named, body]
+
+    def test_searches_description_tags_and_content(self, client, auth_headers):
+        """Test every indexed field matches, words as prefixes."""
+        tagged = create(client, auth_headers, name='A', tags=['vmware', 'nightly'])
+        described = create(client, auth_headers, name='B', description='Rotates certificates')
+        body = create(client, auth_headers, name='C', content='Invoke-Sqlcmd -Query "SELECT 1"')
+
+        assert [row['id'] for row in search(client, auth_headers, 'nightly').get_json()] == [tagged]
+        assert [row['id'] for row in search(client, auth_headers, 'certif').get_json()] == [described]
+        assert [row['id'] for row in search(client, auth_headers, 'sqlcmd').get_json()] == [body]
+        assert search(client, auth_headers, 'nightly rotates').get_json() == []
+
+    def test_snippet_highlights_match(self, client, auth_headers):
+        """Test results carry an escaped snippet with the matched term marked."""
+        create(client, auth_headers, name='Mailbox audit',
+               content='$users = Get-Mailbox -ResultSize Unlimited # <all>')
+
+        row = search(client, auth_headers, 'unlimited').get_json()[0]
+
+        assert '<mark>Unlimited</mark>' in row['search_snippet']
+        assert '&lt;all&gt;' in row['search_snippet']
+        assert 'content' not in row
+
+    def test_update_and_delete_maintain_index(self, client, auth_headers):
+        """Test edits are searchable at once and deleted scripts disappear."""
+        script_id = create(client, auth_headers, name='Old name')
+
+        client.put(f'/api/scripts/{script_id}', json={'name': 'Certificate expiry'}, headers=auth_headers)
+
+        assert search(client, auth_headers, 'old').get_json() == []
+        assert [row['id'] for row in search(client, auth_headers, 'expiry').get_json()] == [script_id]
+
+        client.delete(f'/api/scripts/{script_id}', headers=auth_headers)
+
+        assert search(client, auth_headers, 'expiry').get_json() == []
+
+    def test_respects_access(self, client, auth_headers, admin_headers):
+        """Test another user's private scripts are not found."""
+        create(client, admin_headers, name='Private backup job', is_public=False)
+        public = create(client, admin_headers, name='Public backup job', is_public=True)
+
+        results = search(client, auth_headers, 'backup').get_json()
+
+        assert [row['id'] for row in results] == [public]
+
+    def test_pages_ranked_results(self, client, auth_headers):
+        """Test ranked results page without repeats, with an exact total."""
+        ids = {create(client, auth_headers, name=f'Patch server {index}') for index in range(5)}
+
+        first = search(client, auth_headers, 'patch', limit=2, count='exact')
+        pages = [[row['id'] for row in first.get_json()]]
+        cursor = first.headers.get('X-Next-Cursor')
+        while cursor:
+            response = search(client, auth_headers, 'patch', limit=2, cursor=cursor)
+            pages.append([row['id'] for row in response.get_json()])
+            cursor = response.headers.get('X-Next-Cursor')
+
+        assert first.headers['X-Total-Count'] == '5'
+        assert [len(page) for page in pages] == [2, 2, 1]
+        assert {script_id for page in pages for script_id in page} == ids
+
+    def test_rejects_list_cursor(self, client, auth_headers):
+        """Test a cursor of the unfiltered list is not accepted for a search."""
+        for index in range(3):
+            create(client, auth_headers, name=f'Script {index}')
+        cursor = client.get('/api/scripts/', query_string={'limit': 1},
+                            headers=auth_headers).headers['X-Next-Cursor']
+
+        response = client.get('/api/scripts/', query_string={'search': 'script', 'cursor': cursor},
+                              headers=auth_headers)
+
+        assert response.status_code == 400
+
+    def test_ensure_index_adds_missing(self, client, auth_headers, test_script):
+        """Test scripts saved without an index entry are indexed at startup."""
+        assert search(client, auth_headers, 'hello').get_json() == []
+
+        assert ensure_index() == 1
+        assert ensure_index() == 0
+        assert [row['id'] for row in search(client, auth_headers, 'hello').get_json()] == [test_script.id]
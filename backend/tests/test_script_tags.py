@@ -0,0 +1,138 @@
+"""
+Tests for normalized script tags and facet counts.
+"""
+import pytest
+from models import db, Tag, script_tags
+from services.script_tags import _insert_tags, link_untagged_scripts, split_tags
+
+
+def create(client, headers, name, tags, **fields):
+    """Create a script through the API; returns its ID."""
+    response = client.post('/api/scripts/', json={'name': name, 'content': 'Get-Date', 'tags': tags, **fields},
+                           headers=headers)
+    assert response.status_code == 201
+    return response.get_json()['script']['id']
+
+
+def listed(client, headers, **params):
+    response = client.get('/api/scripts/', query_string=params, headers=headers)
+    assert response.status_code == 200
+    return sorted(row['id'] for row in response.get_json())
+
+
+def linked_tags(script_id):
+    return sorted(name for name, in db.session.query(Tag.name).join(
+        script_tags, script_tags.c.tag_id == Tag.id
+    ).filter(script_tags.c.script_id == script_id))
+
+
+@pytest.mark.unit
+class TestSplitTags:
+    """Test tag lists are put in canonical form."""
+
+    def test_split(self):
+        """Test strings and lists give stripped, deduplicated names in order."""
+        assert split_tags(' vmware, ad ,,vmware') == ['vmware', 'ad']
+        assert split_tags(['b', 'a', ' b ']) == ['b', 'a']
+        assert split_tags(None) == []
+
+
+@pytest.mark.integration
+class TestTagStorage:
+    """Test tag strings are mirrored into the tag tables."""
+
+    def test_create_update_delete(self, client, auth_headers):
+        """Test links follow the script's tags and the API keeps the list shape."""
+        response = client.post('/api/scripts/', json={
+            'name': 'Report', 'content': 'Get-Date', 'tags': ['vmware', ' nightly', 'vmware']
+        }, headers=auth_headers)
+        script_id = response.get_json()['script']['id']
+
+        assert response.get_json()['script']['tags'] == ['vmware', 'nightly']
+        assert linked_tags(script_id) == ['nightly', 'vmware']
+
+        response = client.put(f'/api/scripts/{script_id}', json={'tags': ['azure']}, headers=auth_headers)
+
+        assert response.get_json()['script']['tags'] == ['azure']
+        assert linked_tags(script_id) == ['azure']
+
+        client.delete(f'/api/scripts/{script_id}', headers=auth_headers)
+
+        assert db.session.query(script_tags).count() == 0
+
+    def test_tags_are_shared(self, client, auth_headers):
+        """Test scripts with the same tag link one tag row."""
+        create(client, auth_headers, 'A', ['vmware'])
+        create(client, auth_headers, 'B', ['vmware'])
+
+        assert Tag.query.filter_by(name='vmware').count() == 1
+
+    def test_insert_existing_tag(self, client, auth_headers):
+        """Test inserting a tag another transaction already created keeps one row."""
+        create(client, auth_headers, 'A', ['vmware'])
+
+        _insert_tags(db.session, ['vmware', 'azure'])
+        db.session.commit()
+
+        assert Tag.query.filter_by(name='vmware').count() == 1
+        assert Tag.query.filter_by(name='azure').count() == 1
+
+    def test_link_untagged_scripts(self, test_script):
+        """Test scripts stored before normalization are linked at startup."""
+        db.session.execute(script_tags.delete())
+        db.session.commit()
+
+        assert link_untagged_scripts() == 1
+        assert linked_tags(test_script.id) == ['sample', 'test']
+        assert link_untagged_scripts() == 0
+
+
+@pytest.mark.integration
+class TestTagFilters:
+    """Test the script list's exact tag filters."""
+
+    @pytest.fixture
+    def scripts(self, client, auth_headers):
+        return {
+            'ad': create(client, auth_headers, 'Users', ['ad', 'reports']),
+            'admin': create(client, auth_headers, 'Roles', ['azure-admin', 'reports']),
+            'vm': create(client, auth_headers, 'Hosts', ['vmware'])
+        }
+
+    def test_exact_match(self, client, auth_headers, scripts):
+        """Test a tag does not match tags containing it."""
+        assert listed(client, auth_headers, tags='ad') == [scripts['ad']]
+
+    def test_all_and_any(self, client, auth_headers, scripts):
+        """Test tag_mode=all requires every tag and tag_mode=any one of them."""
+        assert listed(client, auth_headers, tags='ad,reports') == [scripts['ad']]
+        assert listed(client, auth_headers, tags='ad,vmware', tag_mode='any') == sorted([scripts['ad'], scripts['vm']])
+        assert listed(client, auth_headers, tags='reports, reports') == sorted([scripts['ad'], scripts['admin']])
+
+    def test_bad_mode(self, client, auth_headers):
+        """Test an unknown tag_mode is rejected."""
+        response = client.get('/api/scripts/', query_string={'tags': 'ad', 'tag_mode': 'some'},
+                              headers=auth_headers)
+
+        assert response.status_code == 400
+
+
+@pytest.mark.integration
+class TestFacets:
+    """Test the facet endpoint."""
+
+    def test_counts_visible_scripts(self, client, auth_headers, admin_headers):
+        """Test counts cover the user's own and public scripts only."""
+        create(client, auth_headers, 'Mine', ['vmware', 'reports'], category='VMware')
+        create(client, admin_headers, 'Public', ['vmware'], category='VMware', is_public=True)
+        create(client, admin_headers, 'Private', ['secret', 'vmware'], category='Security')
+
+        user_facets = client.get('/api/scripts/facets', headers=auth_headers).get_json()
+        admin_facets = client.get('/api/scripts/facets', headers=admin_headers).get_json()
+
+        assert user_facets == {
+            'tags': [{'name': 'vmware', 'count': 2}, {'name': 'reports', 'count': 1}],
+            'categories': [{'name': 'VMware', 'count': 2}]
+        }
+        assert admin_facets['tags'][0] == {'name': 'vmware', 'count': 3}
+        assert {'name': 'Security', 'count': 1} in admin_facets['categories']
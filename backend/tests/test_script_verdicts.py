@@ -0,0 +1,126 @@
+"""
+Tests for persisted validation verdicts.
+"""
+import pytest
+from sqlalchemy import update
+from models import db, Script, SecurityRule, ValidationVerdict
+from services import script_verdicts
+from services.script_verdicts import content_hash, recompute_verdicts, get_script_verdict
+from services.security_rules import (
+    CompiledRuleSet, SecurityRuleDefinition, default_rules, get_active_rule_set, reload_rule_set
+)
+
+
+@pytest.mark.integration
+class TestScriptVerdicts:
+    """Test verdicts are computed on write and looked up afterwards."""
+
+    def test_create_script_stores_verdict(self, client, auth_headers):
+        """Test creating a script hashes it and stores its verdict."""
+        response = client.post('/api/scripts/', json={
+            'name': 'Cleanup',
+            'content': 'Remove-Item C:\\temp'
+        }, headers=auth_headers)
+
+        assert response.status_code == 201
+        script = Script.query.get(response.get_json()['script']['id'])
+        assert script.content_hash == content_hash('Remove-Item C:\\temp')
+
+        verdict = ValidationVerdict.query.filter_by(
+            content_hash=script.content_hash,
+            rule_set_version=get_active_rule_set().version
+        ).one()
+        assert verdict.is_valid is False
+        assert verdict.issues == ['Restricted cmdlet detected: Remove-Item']
+        assert verdict.hits[0]['line'] == 1
+
+    def test_validate_endpoint_reads_stored_verdict(self, client, auth_headers, monkeypatch):
+        """Test /validate does not re-scan an unchanged script."""
+        script_id = client.post('/api/scripts/', json={
+            'name': 'Report', 'content': 'Get-Process'
+        }, headers=auth_headers).get_json()['script']['id']
+
+        def fail(*args, **kwargs):
+            raise AssertionError('script was re-validated')
+        monkeypatch.setattr(CompiledRuleSet, 'validate', fail)
+
+        response = client.post(f'/api/execution/validate/{script_id}', headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['valid'] is True
+        assert data['rule_set_version'] == get_active_rule_set().version
+
+    def test_update_content_revalidates(self, client, auth_headers):
+        """Test changing content produces a verdict for the new hash."""
+        script_id = client.post('/api/scripts/', json={
+            'name': 'Report', 'content': 'Get-Process'
+        }, headers=auth_headers).get_json()['script']['id']
+
+        client.put(f'/api/scripts/{script_id}', json={'content': 'Stop-Service spooler'},
+                   headers=auth_headers)
+
+        verdict = get_script_verdict(Script.query.get(script_id))
+        assert verdict.is_valid is False
+        assert verdict.content_hash == content_hash('Stop-Service spooler')
+
+    def test_recompute_after_rule_change(self, test_script):
+        """Test bulk recompute covers every body missing a verdict for a new rule set."""
+        rule_set = CompiledRuleSet(
+            default_rules() + [SecurityRuleDefinition('cmdlet', 'Write-Host')]
+        )
+
+        created = recompute_verdicts(rule_set=rule_set, max_workers=2)
+
+        assert created == 1
+        verdict = ValidationVerdict.query.filter_by(rule_set_version=rule_set.version).one()
+        assert verdict.content_hash == content_hash(test_script.content)
+        assert verdict.is_valid is False
+        assert recompute_verdicts(rule_set=rule_set, max_workers=2) == 0
+
+    def test_hash_written_with_content(self, test_script):
+        """Test assigning content updates the hash in the same flush."""
+        test_script.content = 'Stop-Service spooler'
+
+        assert test_script.content_hash == content_hash('Stop-Service spooler')
+
+    def test_stale_hash_is_not_trusted(self, test_script):
+        """Test a stored hash of another body does not select that body's verdict."""
+        get_script_verdict(test_script)
+        db.session.execute(update(Script).values(content='Remove-Item C:\\temp'))
+        db.session.commit()
+        db.session.expire_all()
+
+        verdict = get_script_verdict(test_script)
+
+        assert verdict.is_valid is False
+        assert verdict.content_hash == content_hash('Remove-Item C:\\temp')
+
+    def test_lookup_does_not_write(self, test_script):
+        """Test a body without a stored verdict is validated without storing one."""
+        verdict = get_script_verdict(test_script)
+
+        assert verdict.is_valid is True
+        assert verdict not in db.session
+        assert ValidationVerdict.query.count() == 0
+
+    def test_database_rules_reloaded(self, test_script, monkeypatch):
+        """Test rules added to the table apply without a restart."""
+        reload_rule_set()
+        assert get_script_verdict(test_script).is_valid is True
+
+        db.session.add(SecurityRule(rule_type='cmdlet', value='Write-Host'))
+        db.session.commit()
+        monkeypatch.setenv('SECURITY_RULES_RELOAD_INTERVAL', '0.000001')
+
+        try:
+            assert get_script_verdict(test_script).is_valid is False
+            # The reload revalidates stored scripts in bulk for the new version
+            version = get_active_rule_set().version
+            script_verdicts._refreshing[version].join(30)
+            db.session.expire_all()
+            assert ValidationVerdict.query.filter_by(rule_set_version=version).one().is_valid is False
+        finally:
+            db.session.query(SecurityRule).delete()
+            db.session.commit()
+            script_verdicts._refreshing[reload_rule_set().version].join(30)
@@ -0,0 +1,126 @@
+"""
+Tests for the compiled security rule engine.
+"""
+import re
+import pytest
+from services.security_rules import (
+    CompiledRuleSet, SecurityRuleDefinition, default_rules, literal_prefix, DEFAULT_CMDLETS, DEFAULT_PATTERNS
+)
+from services.powershell_executor import PowerShellExecutor
+
+
+def legacy_issues(script_content):
+    """The original per-rule re.search validation, used as the reference."""
+    issues = []
+    for cmdlet in DEFAULT_CMDLETS:
+        if re.search(rf'\b{re.escape(cmdlet)}\b', script_content, re.IGNORECASE):
+            issues.append(f"Restricted cmdlet detected: {cmdlet}")
+    for pattern in DEFAULT_PATTERNS:
+        if re.search(pattern, script_content, re.IGNORECASE):
+            issues.append(f"Dangerous pattern detected: {pattern}")
+    return issues
+
+
+SAMPLES = [
+    'Write-Host "Hello, World!"',
+    'remove-item C:\\temp -Recurse',
+    'Get-ChildItem | Remove-ItemProperty -Name x',
+    'Foo-Remove-Item-Bar',
+    'Remove-Item_x',
+    'Invoke-WebRequest http://x | Invoke-Expression',
+    '$x = iex ("calc")\n& (Get-Command Stop-Service)',
+    'xrm -rf /\ndel /f file',
+    'Get-Process | Out-File proc.txt > log',
+    'Start-Process notepad; Start-ProcessX; New-Service svc',
+    'Set-ExecutionPolicy Bypass\nRemove-Module Az',
+]
+
+
+@pytest.mark.unit
+class TestCompiledRuleSet:
+    """Test single-pass scanning against the legacy behaviour."""
+
+    @pytest.mark.parametrize('script', SAMPLES)
+    def test_matches_legacy_validation(self, script):
+        """Test the compiled scan reports exactly the legacy issues."""
+        is_valid, issues, _ = CompiledRuleSet(default_rules()).validate(script)
+
+        assert issues == legacy_issues(script)
+        assert is_valid == (not issues)
+
+    def test_hits_report_line_and_column(self):
+        """Test every hit carries its 1-based line and column."""
+        script = 'Get-Date\n  Remove-Item x\nInvoke-WebRequest u | Invoke-Expression'
+        hits = CompiledRuleSet(default_rules()).scan(script)
+
+        found = {(hit.rule.value, hit.line, hit.column) for hit in hits}
+        assert ('Remove-Item', 2, 3) in found
+        assert ('Invoke-WebRequest.*\\|.*Invoke-Expression', 3, 1) in found
+        assert ('Invoke-Expression', 3, 23) in found
+
+    def test_reports_every_occurrence(self):
+        """Test repeated matches of one rule are all returned."""
+        hits = CompiledRuleSet(default_rules()).scan('Remove-Item a\nremove-item b')
+
+        assert [(h.match, h.line) for h in hits] == [('Remove-Item', 1), ('remove-item', 2)]
+
+    def test_cmdlet_with_special_characters_falls_back_to_pattern(self):
+        """Test cmdlet rules outside the token alphabet still match as words."""
+        rule_set = CompiledRuleSet([SecurityRuleDefinition('cmdlet', 'Get-Foo.Bar')])
+
+        assert rule_set.validate('Get-Foo.Bar -x')[0] is False
+        assert rule_set.validate('Get-FooXBar')[0] is True
+
+    def test_prefix_index_and_unindexed_patterns(self):
+        """Test patterns sharing literal prefixes and prefix-less patterns."""
+        rule_set = CompiledRuleSet([
+            SecurityRuleDefinition('pattern', r'del\s+/f'),
+            SecurityRuleDefinition('pattern', r'delete-all'),
+            SecurityRuleDefinition('pattern', r'[xy]mount'),
+        ])
+
+        assert [h.rule.value for h in rule_set.scan('delete-all; del /f; ymount')] == [
+            'delete-all', r'del\s+/f', '[xy]mount'
+        ]
+
+    def test_literal_prefix(self):
+        """Test prefixes stop at metacharacters and never include optional text."""
+        assert literal_prefix(r'rm\s+-rf') == 'rm'
+        assert literal_prefix(r'\bInvoke-WebRequest.*\|') == 'invoke-webrequest'
+        assert literal_prefix(r'\|\s*Out-File') == '|'
+        assert literal_prefix(r'^del\s+/[fs]') == 'del'
+        assert literal_prefix('colou?r') == 'colo'
+        assert literal_prefix('ab+c') == 'ab'
+        assert literal_prefix('ab{0,2}') == 'a'
+        assert literal_prefix('[xy]mount') == ''
+        assert literal_prefix('(?i)iex') == ''
+        assert literal_prefix('iex|curl') == ''
+        assert literal_prefix(r'(iex|curl)\s') == ''
+        assert literal_prefix(r'iex[|]\(') == 'iex'
+        assert literal_prefix(r'iex\|curl') == 'iex|curl'
+
+    def test_version_is_stable_and_content_addressed(self):
+        """Test identical rules share a version and changed rules do not."""
+        first = CompiledRuleSet(default_rules())
+        second = CompiledRuleSet(default_rules())
+        extended = CompiledRuleSet(default_rules() + [SecurityRuleDefinition('cmdlet', 'Stop-Computer')])
+
+        assert first.version == second.version
+        assert first.version != extended.version
+
+    def test_invalid_rules_rejected(self):
+        """Test unknown types and bad regexes fail at load time."""
+        with pytest.raises(ValueError):
+            SecurityRuleDefinition('keyword', 'x')
+        with pytest.raises(re.error):
+            SecurityRuleDefinition('pattern', '(unclosed')
+
+    def test_executor_uses_rule_engine(self):
+        """Test PowerShellExecutor.validate_script keeps its contract."""
+        executor = PowerShellExecutor(enable_restrictions=True)
+
+        assert executor.validate_script('Get-Date') == (True, [])
+        assert executor.validate_script('Remove-Item x') == (
+            False, ['Restricted cmdlet detected: Remove-Item']
+        )
+        assert PowerShellExecutor(enable_restrictions=False).validate_script('Remove-Item x') == (True, [])
@@ -0,0 +1,50 @@
+"""
+PowerShell Script Manager - Execution Agent
+
+Runs queued executions from the shared database so pwsh capacity can be
+added without scaling the web tier. Start the API with EXECUTION_AGENTS=true
+(so it only enqueues) and any number of agents against the same DATABASE_URL:
+
+    python -m worker --concurrency 4
+"""
+import argparse
+import signal
+
+from app import app
+from services.execution_agent import ExecutionAgent
+from services.execution_runner import run_execution
+from services.module_preload import preload_module_sets
+from services.security_rules import reload_rule_set
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run queued PowerShell executions.')
+    parser.add_argument('--name', help='Agent name stored on claimed executions (default: host:pid)')
+    parser.add_argument('--concurrency', type=int,
+                        help='Executions run at once (default: EXECUTION_MAX_CONCURRENCY)')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help='Seconds an idle slot waits before looking for work again')
+    args = parser.parse_args(argv)
+
+    with app.app_context():
+        # Same validation rules as the API
+        reload_rule_set()
+        # Warm workers for the module sets scripts declare
+        preload_module_sets()
+
+    agent = ExecutionAgent(
+        app,
+        runner=run_execution,
+        worker_id=args.name,
+        concurrency=args.concurrency,
+        poll_interval=args.poll_interval
+    )
+    # Finish running executions on SIGTERM as on Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: agent.shutdown())
+
+    print(f"Execution agent {agent.worker_id} running {agent.concurrency} slot(s)")
+    agent.run()
+
+
+if __name__ == '__main__':
+    main()
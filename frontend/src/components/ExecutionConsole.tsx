@@ -1,7 +1,16 @@
 import React, { useState, useEffect, useRef } from 'react';
-import { executionAPI } from '../services/api';
-import { Play, X, AlertCircle, CheckCircle, Loader, Terminal } from 'lucide-react';
-import type { Script, Execution } from '../types';
+import { io, Socket } from 'socket.io-client';
+import { executionAPI, API_BASE_URL } from '../services/api';
+import { Play, X, AlertCircle, CheckCircle, Loader, Terminal, Square } from 'lucide-react';
+import type {
+  Script,
+  Execution,
+  OutputLine,
+  OutputBatch,
+  ExecutionStatusEvent,
+} from '../types';
+
+const TERMINAL_STATUSES = ['completed', 'failed', 'cancelled'];
 
 interface ExecutionConsoleProps {
   script: Script;
@@ -13,6 +22,9 @@ const ExecutionConsole: React.FC<ExecutionConsoleProps> = ({ script, onClose })
   const [execution, setExecution] = useState<Execution | null>(null);
   const [isExecuting, setIsExecuting] = useState(false);
   const [pollInterval, setPollInterval] = useState<number | null>(null);
+  const [liveLines, setLiveLines] = useState<OutputLine[]>([]);
+  const socketRef = useRef<Socket | null>(null);
+  const offsetRef = useRef(0);
   const outputRef = useRef<HTMLDivElement>(null);
 
   useEffect(() => {
@@ -37,7 +49,7 @@ const ExecutionConsole: React.FC<ExecutionConsoleProps> = ({ script, onClose })
     if (outputRef.current) {
       outputRef.current.scrollTop = outputRef.current.scrollHeight;
     }
-  }, [execution?.output, execution?.error_output]);
+  }, [execution?.output, execution?.error_output, liveLines]);
 
   useEffect(() => {
     // Cleanup poll interval on unmount
@@ -48,13 +60,34 @@ const ExecutionConsole: React.FC<ExecutionConsoleProps> = ({ script, onClose })
     };
   }, [pollInterval]);
 
+  useEffect(() => {
+    // Close the live output socket on unmount
+    return () => {
+      socketRef.current?.disconnect();
+    };
+  }, []);
+
   const pollExecution = (executionId: number) => {
+    let cursor: string | undefined;
+    setLiveLines([]);
+
     const interval = window.setInterval(async () => {
       try {
-        const data = await executionAPI.get(executionId);
-        setExecution(data);
+        // Only the output produced since the last poll is transferred
+        const data = await executionAPI.getOutput(executionId, cursor);
+        cursor = data.cursor;
+        setExecution((previous) =>
+          previous
+            ? {
+                ...previous,
+                status: data.status,
+                output: (previous.output || '') + data.stdout,
+                error_output: (previous.error_output || '') + data.stderr,
+              }
+            : previous
+        );
 
-        if (data.status === 'completed' || data.status === 'failed') {
+        if (data.complete) {
           clearInterval(interval);
           setPollInterval(null);
           setIsExecuting(false);
@@ -67,9 +100,71 @@ const ExecutionConsole: React.FC<ExecutionConsoleProps> = ({ script, onClose })
     setPollInterval(interval);
   };
 
+  const stopStreaming = () => {
+    socketRef.current?.disconnect();
+    socketRef.current = null;
+  };
+
+  const finishExecution = async (executionId: number) => {
+    stopStreaming();
+    try {
+      // One final fetch for the complete, persisted output
+      const data = await executionAPI.get(executionId);
+      setExecution(data);
+      setLiveLines([]);
+    } catch (error) {
+      console.error('Failed to load execution result:', error);
+    }
+    setIsExecuting(false);
+  };
+
+  const streamExecution = (executionId: number) => {
+    offsetRef.current = 0;
+    setLiveLines([]);
+
+    const socket = io(API_BASE_URL, { transports: ['websocket', 'polling'] });
+    socketRef.current = socket;
+
+    // Fires on the first connect and on every reconnect; the offset makes the
+    // server replay only the lines we have not seen yet.
+    socket.on('connect', () => {
+      socket.emit('subscribe_execution', {
+        execution_id: executionId,
+        offset: offsetRef.current,
+        token: localStorage.getItem('token'),
+      });
+    });
+
+    socket.on('execution_output', (batch: OutputBatch) => {
+      const fresh = batch.lines.filter((line) => line.offset >= offsetRef.current);
+      if (fresh.length === 0) return;
+      offsetRef.current = fresh[fresh.length - 1].offset + 1;
+      setLiveLines((previous) => [...previous, ...fresh]);
+    });
+
+    socket.on('execution_status', (event: ExecutionStatusEvent) => {
+      setExecution((previous) =>
+        previous ? { ...previous, status: event.status, queue_position: event.queue_position } : previous
+      );
+      if (TERMINAL_STATUSES.includes(event.status)) {
+        finishExecution(executionId);
+      }
+    });
+
+    // Fall back to polling if live output is unavailable
+    const fallback = () => {
+      if (socketRef.current !== socket) return;
+      stopStreaming();
+      pollExecution(executionId);
+    };
+    socket.on('connect_error', fallback);
+    socket.on('execution_error', fallback);
+  };
+
   const handleExecute = async () => {
     setIsExecuting(true);
     setExecution(null);
+    setLiveLines([]);
 
     try {
       const response = await executionAPI.execute(script.id, {
@@ -77,24 +172,51 @@ const ExecutionConsole: React.FC<ExecutionConsoleProps> = ({ script, onClose })
         timeout: 300,
       });
 
-      // Start polling for execution status
-      pollExecution(response.execution_id);
+      setExecution(await executionAPI.get(response.execution_id));
+
+      // A cached result is already complete
+      if (response.cached) {
+        setIsExecuting(false);
+        return;
+      }
+
+      // Stream output and status changes while the execution is in flight
+      streamExecution(response.execution_id);
     } catch (error: any) {
+      if (error.response?.status === 429) {
+        const retryAfter = error.response.headers['retry-after'];
+        alert(`Execution queue is full. Try again in ${retryAfter || 'a few'} seconds.`);
+        setIsExecuting(false);
+        return;
+      }
       alert(error.response?.data?.error || 'Failed to execute script');
       setIsExecuting(false);
     }
   };
 
+  const handleCancel = async () => {
+    if (!execution) return;
+    try {
+      await executionAPI.cancel(execution.id);
+    } catch (error: any) {
+      alert(error.response?.data?.error || 'Failed to cancel execution');
+    }
+  };
+
   const getStatusIcon = () => {
     if (!execution) return null;
 
     switch (execution.status) {
+      case 'queued':
+        return <Loader className="w-5 h-5 text-yellow-400 animate-spin" />;
       case 'running':
         return <Loader className="w-5 h-5 text-blue-400 animate-spin" />;
       case 'completed':
         return <CheckCircle className="w-5 h-5 text-green-400" />;
       case 'failed':
         return <AlertCircle className="w-5 h-5 text-red-400" />;
+      case 'cancelled':
+        return <Square className="w-5 h-5 text-gray-400" />;
       default:
         return null;
     }
@@ -104,6 +226,8 @@ const ExecutionConsole: React.FC<ExecutionConsoleProps> = ({ script, onClose })
     if (!execution) return 'text-gray-400';
 
     switch (execution.status) {
+      case 'queued':
+        return 'text-yellow-400';
       case 'running':
         return 'text-blue-400';
       case 'completed':
@@ -221,14 +345,54 @@ const ExecutionConsole: React.FC<ExecutionConsoleProps> = ({ script, onClose })
                   <span className={`ml-2 font-semibold ${getStatusColor()}`}>
                     {execution.status.toUpperCase()}
                   </span>
+                  {execution.status === 'queued' && execution.queue_position && (
+                    <span className="ml-2 text-sm text-gray-400">
+                      (position {execution.queue_position} in queue)
+                    </span>
+                  )}
+                  {(execution.status === 'queued' || execution.status === 'running') &&
+                    execution.estimated_duration_seconds != null && (
+                      <span className="ml-2 text-sm text-gray-400">
+                        ~{execution.estimated_duration_seconds.toFixed(1)}s expected
+                      </span>
+                    )}
                 </div>
-                <div className="text-sm text-gray-400">
+                <div className="text-sm text-gray-400 flex items-center">
+                  {(execution.status === 'queued' || execution.status === 'running') && (
+                    <button
+                      onClick={handleCancel}
+                      className="mr-4 px-3 py-1 bg-red-700 hover:bg-red-600 text-white rounded transition"
+                    >
+                      Cancel
+                    </button>
+                  )}
                   {execution.duration_seconds && (
                     <span>Duration: {execution.duration_seconds.toFixed(2)}s</span>
                   )}
+                  {execution.module_import_seconds != null && (
+                    <span className="ml-4">
+                      Module import: {execution.module_import_seconds.toFixed(2)}s
+                    </span>
+                  )}
                   {execution.exit_code !== undefined && (
                     <span className="ml-4">Exit Code: {execution.exit_code}</span>
                   )}
+                  {execution.cached_from_id && (
+                    <span className="ml-4">Cached result of #{execution.cached_from_id}</span>
+                  )}
+                  {execution.coalesced_with_id && (
+                    <span className="ml-4">Shared run #{execution.coalesced_with_id}</span>
+                  )}
+                  {execution.resource_usage && (
+                    <span className="ml-4">
+                      CPU:{' '}
+                      {(
+                        execution.resource_usage.cpu_user_seconds +
+                        execution.resource_usage.cpu_system_seconds
+                      ).toFixed(2)}
+                      s · Peak memory: {(execution.resource_usage.max_rss_kb / 1024).toFixed(0)} MB
+                    </span>
+                  )}
                 </div>
               </div>
 
@@ -237,6 +401,14 @@ const ExecutionConsole: React.FC<ExecutionConsoleProps> = ({ script, onClose })
                 ref={outputRef}
                 className="p-4 bg-black text-green-400 font-mono text-sm max-h-96 overflow-auto"
               >
+                {liveLines.map((line) => (
+                  <div
+                    key={line.offset}
+                    className={`whitespace-pre-wrap ${line.stream === 'stderr' ? 'text-red-400' : ''}`}
+                  >
+                    {line.text}
+                  </div>
+                ))}
                 {execution.output && (
                   <div className="whitespace-pre-wrap">{execution.output}</div>
                 )}
@@ -245,9 +417,15 @@ const ExecutionConsole: React.FC<ExecutionConsoleProps> = ({ script, onClose })
                     {execution.error_output}
                   </div>
                 )}
-                {!execution.output && !execution.error_output && execution.status === 'running' && (
+                {!execution.output &&
+                  !execution.error_output &&
+                  liveLines.length === 0 &&
+                  execution.status === 'running' && (
                   <div className="text-gray-500">Waiting for output...</div>
                 )}
+                {execution.status === 'queued' && (
+                  <div className="text-gray-500">Waiting for a free execution slot...</div>
+                )}
               </div>
             </div>
           )}
@@ -1,5 +1,6 @@
-import React, { useState, useEffect } from 'react';
+import React, { useEffect, useCallback } from 'react';
 import { executionAPI } from '../services/api';
+import { usePagedList } from '../hooks/usePagedList';
 import { Clock, CheckCircle, XCircle, Loader, RefreshCw, Trash2 } from 'lucide-react';
 import type { Execution } from '../types';
 
@@ -12,24 +13,22 @@ const ExecutionHistory: React.FC<ExecutionHistoryProps> = ({
   selectedExecution,
   onExecutionSelect,
 }) => {
-  const [executions, setExecutions] = useState<Execution[]>([]);
-  const [loading, setLoading] = useState(true);
-
-  const loadExecutions = async () => {
-    setLoading(true);
-    try {
-      const data = await executionAPI.list({ limit: 100 });
-      setExecutions(data);
-    } catch (error) {
-      console.error('Failed to load executions:', error);
-    } finally {
-      setLoading(false);
-    }
-  };
+  const fetchPage = useCallback(
+    (cursor?: string) => executionAPI.list({ limit: 100, cursor }),
+    []
+  );
+  const {
+    items: executions,
+    loading,
+    loadingMore,
+    hasMore,
+    reload: loadExecutions,
+    sentinelRef,
+  } = usePagedList(fetchPage);
 
   useEffect(() => {
     loadExecutions();
-  }, []);
+  }, [loadExecutions]);
 
   const handleDelete = async (execution: Execution) => {
     if (!confirm('Delete this execution record?')) return;
@@ -131,6 +130,11 @@ const ExecutionHistory: React.FC<ExecutionHistoryProps> = ({
                 </div>
               </div>
             ))}
+            {hasMore && (
+              <div ref={sentinelRef} className="p-4 text-center text-xs text-gray-400">
+                {loadingMore ? 'Loading older executions...' : ''}
+              </div>
+            )}
           </div>
         )}
       </div>
@@ -1,5 +1,6 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
 import { scriptsAPI } from '../services/api';
+import { usePagedList } from '../hooks/usePagedList';
 import { Search, Play, Edit, Trash2, RefreshCw } from 'lucide-react';
 import type { Script } from '../types';
 
@@ -9,26 +10,28 @@ interface ScriptListProps {
 }
 
 const ScriptList: React.FC<ScriptListProps> = ({ onEdit, onExecute }) => {
-  const [scripts, setScripts] = useState<Script[]>([]);
-  const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState('');
   const [selectedCategory, setSelectedCategory] = useState<string>('');
   const [categories, setCategories] = useState<string[]>([]);
 
-  const loadScripts = async () => {
-    setLoading(true);
-    try {
-      const data = await scriptsAPI.list({
+  const fetchPage = useCallback(
+    (cursor?: string) =>
+      scriptsAPI.list({
         search: searchTerm || undefined,
         category: selectedCategory || undefined,
-      });
-      setScripts(data);
-    } catch (error) {
-      console.error('Failed to load scripts:', error);
-    } finally {
-      setLoading(false);
-    }
-  };
+        limit: 60,
+        cursor,
+      }),
+    [searchTerm, selectedCategory]
+  );
+  const {
+    items: scripts,
+    loading,
+    loadingMore,
+    hasMore,
+    reload: loadScripts,
+    sentinelRef,
+  } = usePagedList(fetchPage);
 
   const loadCategories = async () => {
     try {
@@ -40,7 +43,6 @@ const ScriptList: React.FC<ScriptListProps> = ({ onEdit, onExecute }) => {
   };
 
   useEffect(() => {
-    loadScripts();
     loadCategories();
   }, []);
 
@@ -49,7 +51,7 @@ const ScriptList: React.FC<ScriptListProps> = ({ onEdit, onExecute }) => {
       loadScripts();
     }, 300);
     return () => clearTimeout(debounce);
-  }, [searchTerm, selectedCategory]);
+  }, [loadScripts]);
 
   const handleDelete = async (script: Script) => {
     if (!confirm(`Delete script "${script.name}"?`)) return;
@@ -138,9 +140,16 @@ const ScriptList: React.FC<ScriptListProps> = ({ onEdit, onExecute }) => {
                 </span>
               </div>
 
-              <p className="text-gray-400 text-sm mb-3 line-clamp-2">
-                {script.description || 'No description'}
-              </p>
+              {script.search_snippet ? (
+                <p
+                  className="text-gray-400 text-sm mb-3 line-clamp-2 font-mono [&_mark]:bg-yellow-500/30 [&_mark]:text-yellow-200"
+                  dangerouslySetInnerHTML={{ __html: script.search_snippet }}
+                />
+              ) : (
+                <p className="text-gray-400 text-sm mb-3 line-clamp-2">
+                  {script.description || 'No description'}
+                </p>
+              )}
 
               <div className="flex flex-wrap gap-1 mb-3">
                 {script.tags.slice(0, 3).map((tag, idx) => (
@@ -183,6 +192,11 @@ const ScriptList: React.FC<ScriptListProps> = ({ onEdit, onExecute }) => {
           ))}
         </div>
       )}
+      {!loading && hasMore && (
+        <div ref={sentinelRef} className="text-center text-gray-400 py-6">
+          {loadingMore ? 'Loading more scripts...' : ''}
+        </div>
+      )}
     </div>
   );
 };
@@ -0,0 +1,64 @@
+import { useCallback, useEffect, useRef, useState } from 'react';
+import type { Page } from '../types';
+
+/**
+ * Lazily paged list: loads the first page, then the next one whenever the
+ * sentinel element scrolls into view, following the API's cursors.
+ */
+export function usePagedList<T>(fetchPage: (cursor?: string) => Promise<Page<T>>) {
+  const [items, setItems] = useState<T[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Responses for an earlier reload are dropped
+  const generation = useRef(0);
+  const observer = useRef<IntersectionObserver | null>(null);
+
+  const reload = useCallback(async () => {
+    const current = ++generation.current;
+    setLoading(true);
+    try {
+      const page = await fetchPage();
+      if (current !== generation.current) return;
+      setItems(page.items);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Failed to load list:', error);
+    } finally {
+      if (current === generation.current) setLoading(false);
+    }
+  }, [fetchPage]);
+
+  const loadMore = useCallback(async () => {
+    if (!nextCursor || loadingMore) return;
+    const current = generation.current;
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(nextCursor);
+      if (current !== generation.current) return;
+      setItems((previous) => [...previous, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Failed to load more:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [fetchPage, nextCursor, loadingMore]);
+
+  // Attach to the element after the last item
+  const sentinelRef = useCallback(
+    (node: HTMLElement | null) => {
+      observer.current?.disconnect();
+      if (!node) return;
+      observer.current = new IntersectionObserver((entries) => {
+        if (entries[0].isIntersecting) loadMore();
+      });
+      observer.current.observe(node);
+    },
+    [loadMore]
+  );
+
+  useEffect(() => () => observer.current?.disconnect(), []);
+
+  return { items, loading, loadingMore, hasMore: nextCursor !== null, reload, sentinelRef };
+}
@@ -1,17 +1,21 @@
-import axios from 'axios';
+import axios, { type AxiosResponse } from 'axios';
 import type {
   User,
   Script,
   Execution,
   ScriptVersion,
+  ScriptFacets,
   LoginRequest,
   RegisterRequest,
   AuthResponse,
   ExecuteScriptRequest,
   ExecuteScriptResponse,
+  ExecutionOutputDelta,
+  ExecutionBatch,
+  Page,
 } from '../types';
 
-const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:5001';
+export const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:5001';
 
 // Create axios instance
 const api = axios.create({
@@ -21,6 +25,16 @@ const api = axios.create({
   },
 });
 
+// Build a page from a list response and its pagination headers
+function toPage<T>(response: AxiosResponse<T[]>): Page<T> {
+  const total = response.headers['x-total-count'];
+  return {
+    items: response.data,
+    nextCursor: response.headers['x-next-cursor'] || null,
+    total: total !== undefined ? Number(total) : undefined,
+  };
+}
+
 // Add token to requests
 api.interceptors.request.use((config) => {
   const token = localStorage.getItem('token');
@@ -59,9 +73,13 @@ export const scriptsAPI = {
     category?: string;
     search?: string;
     tags?: string;
-  }): Promise<Script[]> => {
+    tag_mode?: 'all' | 'any';
+    limit?: number;
+    cursor?: string;
+    count?: 'exact' | 'estimate';
+  }): Promise<Page<Script>> => {
     const response = await api.get<Script[]>('/api/scripts/', { params });
-    return response.data;
+    return toPage(response);
   },
 
   get: async (id: number): Promise<Script> => {
@@ -96,6 +114,11 @@ export const scriptsAPI = {
     const response = await api.get<string[]>('/api/scripts/categories');
     return response.data;
   },
+
+  getFacets: async (): Promise<ScriptFacets> => {
+    const response = await api.get<ScriptFacets>('/api/scripts/facets');
+    return response.data;
+  },
 };
 
 // Execution API
@@ -111,13 +134,28 @@ export const executionAPI = {
     return response.data;
   },
 
+  executeBatch: async (
+    scriptId: number,
+    data: { parameter_sets: Record<string, any>[]; parallelism?: number; timeout?: number }
+  ): Promise<{ message: string; batch_id: number; total: number; parallelism: number; status: string }> => {
+    const response = await api.post(`/api/execution/execute/${scriptId}/batch`, data);
+    return response.data;
+  },
+
+  getBatch: async (id: number): Promise<ExecutionBatch> => {
+    const response = await api.get<ExecutionBatch>(`/api/execution/batches/${id}`);
+    return response.data;
+  },
+
   list: async (params?: {
     script_id?: number;
     status?: string;
     limit?: number;
-  }): Promise<Execution[]> => {
+    cursor?: string;
+    count?: 'exact' | 'estimate';
+  }): Promise<Page<Execution>> => {
     const response = await api.get<Execution[]>('/api/execution/executions', { params });
-    return response.data;
+    return toPage(response);
   },
 
   get: async (id: number): Promise<Execution> => {
@@ -125,6 +163,19 @@ export const executionAPI = {
     return response.data;
   },
 
+  getOutput: async (id: number, since?: string): Promise<ExecutionOutputDelta> => {
+    const response = await api.get<ExecutionOutputDelta>(
+      `/api/execution/executions/${id}/output`,
+      { params: since ? { since } : undefined }
+    );
+    return response.data;
+  },
+
+  cancel: async (id: number): Promise<{ message: string; status: Execution['status'] }> => {
+    const response = await api.post(`/api/execution/executions/${id}/cancel`);
+    return response.data;
+  },
+
   delete: async (id: number): Promise<{ message: string }> => {
     const response = await api.delete(`/api/execution/executions/${id}`);
     return response.data;
@@ -139,6 +190,7 @@ export const executionAPI = {
 
   getSystemInfo: async (): Promise<{
     powershell_version: string;
+    powershell_edition: string | null;
     restrictions_enabled: boolean;
   }> => {
     const response = await api.get('/api/execution/system/info');
@@ -15,6 +15,13 @@ export interface Script {
   category: string;
   tags: string[];
   parameters: ScriptParameter[];
+  pwsh_version?: string | null;
+  resource_limits?: ResourceLimits;
+  cache_ttl_seconds?: number | null;
+  coalesce?: boolean;
+  estimated_duration_seconds?: number | null;
+  required_modules?: string[];
+  search_snippet?: string | null; // HTML-escaped, matches in <mark>; search results only
   author_id: number;
   author_username?: string;
   created_at: string;
@@ -23,6 +30,21 @@ export interface Script {
   execution_count: number;
 }
 
+export interface ResourceLimits {
+  memory_mb?: number | null;
+  cpu_seconds?: number | null;
+  open_files?: number | null;
+  max_output_bytes?: number | null;
+}
+
+export interface ResourceUsage {
+  cpu_user_seconds: number;
+  cpu_system_seconds: number;
+  max_rss_kb: number;
+  io_read_blocks: number;
+  io_write_blocks: number;
+}
+
 export interface ScriptParameter {
   name: string;
   type: 'string' | 'int' | 'bool';
@@ -39,13 +61,39 @@ export interface Execution {
   user_id: number;
   username?: string;
   parameters: Record<string, any>;
-  status: 'pending' | 'running' | 'completed' | 'failed';
+  status: 'pending' | 'queued' | 'running' | 'completed' | 'failed' | 'cancelled';
+  queue_position?: number | null;
+  estimated_duration_seconds?: number | null;
   output?: string;
   error_output?: string;
   exit_code?: number;
   started_at: string;
   completed_at?: string;
   duration_seconds?: number;
+  module_import_seconds?: number | null;
+  resource_usage?: ResourceUsage | null;
+  batch_id?: number | null;
+  cached_from_id?: number | null;
+  coalesced_with_id?: number | null;
+}
+
+export interface ExecutionBatch {
+  id: number;
+  script_id: number;
+  script_name?: string;
+  user_id: number;
+  total: number;
+  parallelism: number;
+  timeout_seconds: number;
+  created_at: string;
+  progress: {
+    total: number;
+    by_status: Record<string, number>;
+    finished: number;
+    succeeded: number;
+    complete: boolean;
+  };
+  executions?: Pick<Execution, 'id' | 'parameters' | 'status' | 'exit_code' | 'duration_seconds'>[];
 }
 
 export interface ScriptVersion {
@@ -57,6 +105,16 @@ export interface ScriptVersion {
   created_at: string;
 }
 
+export interface FacetCount {
+  name: string;
+  count: number;
+}
+
+export interface ScriptFacets {
+  tags: FacetCount[];
+  categories: FacetCount[];
+}
+
 export interface LoginRequest {
   username: string;
   password: string;
@@ -73,6 +131,12 @@ export interface AuthResponse {
   user: User;
 }
 
+export interface Page<T> {
+  items: T[];
+  nextCursor: string | null;
+  total?: number;
+}
+
 export interface ExecuteScriptRequest {
   parameters?: Record<string, any>;
   timeout?: number;
@@ -81,4 +145,42 @@ export interface ExecuteScriptRequest {
 export interface ExecuteScriptResponse {
   message: string;
   execution_id: number;
+  status: Execution['status'];
+  queue_position?: number;
+  estimated_duration_seconds?: number | null;
+  cached?: boolean;
+  cached_from_id?: number;
+  coalesced_with_id?: number;
+}
+
+export interface OutputLine {
+  offset: number;
+  stream: 'stdout' | 'stderr';
+  text: string;
+}
+
+export interface OutputBatch {
+  execution_id: number;
+  offset: number;
+  next_offset: number;
+  lines: OutputLine[];
+  truncated?: boolean;
+}
+
+export interface ExecutionStatusEvent {
+  execution_id: number;
+  status: Execution['status'];
+  exit_code?: number | null;
+  duration_seconds?: number | null;
+  queue_position?: number | null;
+  truncated?: boolean;
+}
+
+export interface ExecutionOutputDelta {
+  execution_id: number;
+  status: Execution['status'];
+  stdout: string;
+  stderr: string;
+  cursor: string;
+  complete: boolean;
 }